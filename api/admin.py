@@ -13,7 +13,6 @@ from .models import (
     UserImageProfile
 )
 from .models import OtpCode
-from .models import ActivePlayback
 from django.utils import timezone
 from django.db import transaction
 
@@ -763,14 +762,6 @@ class PlayConfigurationAdmin(admin.ModelAdmin):
         return configuration
 
 
-@admin.register(ActivePlayback)
-class ActivePlaybackAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'song', 'start_time', 'expiration_time')
-    list_filter = ('start_time', 'expiration_time')
-    search_fields = ('user__phone_number', 'song__title')
-    readonly_fields = ('start_time',)
-
-
 @admin.register(PaymentTransaction)
 class PaymentTransactionAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'transaction_id', 'amount', 'created_at')
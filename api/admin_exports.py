@@ -0,0 +1,98 @@
+"""Streaming CSV/NDJSON exports of filtered admin tables.
+
+Rows are read with ``QuerySet.iterator()``, which uses a server-side cursor on
+PostgreSQL, and written out in chunks of ``EXPORT_CHUNK_ROWS``. The response
+body is an async iterator that pulls each chunk on the request's sync thread,
+so Daphne streams it instead of buffering the whole export and memory stays
+constant however large the table is.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_CHUNK_ROWS = 2000
+EXPORT_FORMATS = ('csv', 'ndjson')
+_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+# Spreadsheet apps evaluate cells starting with these as formulas.
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return f"'{value}"
+    return _plain(value)
+
+
+def _chunks(queryset, columns, export_format):
+    headers = [header for header, _ in columns]
+    rows = (
+        queryset.prefetch_related(None)
+        .values_list(*[path for _, path in columns])
+        .iterator(chunk_size=EXPORT_CHUNK_ROWS)
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == 'csv' else None
+    if writer is not None:
+        # The BOM lets spreadsheet apps detect UTF-8 (Persian names and titles).
+        buffer.write('\ufeff')
+        writer.writerow(headers)
+    pending = 0
+    for row in rows:
+        if writer is not None:
+            writer.writerow([_csv_cell(value) for value in row])
+        else:
+            buffer.write(json.dumps(dict(zip(headers, map(_plain, row))), ensure_ascii=False))
+            buffer.write('\n')
+        pending += 1
+        if pending >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def _stream(chunks):
+    # Every pull runs on the request's sync thread, keeping the server-side
+    # cursor on the connection that opened it.
+    next_chunk = sync_to_async(lambda: next(chunks, None))
+    while True:
+        chunk = await next_chunk()
+        if chunk is None:
+            break
+        yield chunk
+
+
+def stream_export(queryset, columns, export_format: str, name: str) -> StreamingHttpResponse:
+    """Stream ``queryset`` as ``export_format`` with ``(header, values path)`` columns."""
+    response = StreamingHttpResponse(
+        _stream(_chunks(queryset, columns, export_format)),
+        content_type=_CONTENT_TYPES[export_format],
+    )
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="{name}-{stamp}.{export_format}"'
+    response['Cache-Control'] = 'private, no-store'
+    return response
@@ -0,0 +1,205 @@
+"""Admin list pagination: page numbers by default, keyset cursors on request.
+
+Page-number pagination counts every filtered row and skips ``OFFSET`` rows per
+page, so deep pages of songs, users, payments or payouts get slower the further
+staff go. Sending ``cursor`` (empty for the first page) switches any admin list
+to keyset pagination: the opaque cursor carries the ordering values of the page
+edge, and the next page filters on them and reads only ``page_size + 1`` rows.
+Cursor pages leave out ``count``, and pages after the first also skip
+list-wide totals (``is_cursor_continuation``).
+
+The queryset's own ``order_by`` defines the keyset; the primary key is appended
+when missing so the order is total. ``NULL`` values sort last in both
+directions.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Count, F, Q
+from django.db.models.expressions import OrderBy
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+INVALID_CURSOR_MESSAGE = 'نشانگر صفحه معتبر نیست.'
+
+
+def _ordering(queryset) -> list[str] | None:
+    ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering or [])
+    if not all(isinstance(item, str) and item and item != '?' for item in ordering):
+        return None
+    names = [item.lstrip('-') for item in ordering]
+    if not {'pk', 'id', queryset.model._meta.pk.name} & set(names):
+        descending = bool(ordering) and ordering[0].startswith('-')
+        ordering.append('-pk' if descending else 'pk')
+    return ordering
+
+
+def _output_field(queryset, name):
+    """The field that parses ``name``'s cursor value, and whether it can be NULL."""
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field, not isinstance(annotation, Count)
+    model = queryset.model
+    field = None
+    nullable = False
+    for part in name.split('__'):
+        if model is None:
+            raise FieldDoesNotExist(name)
+        field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+        nullable = nullable or bool(field.null) or field.is_relation
+        model = field.related_model if field.is_relation else None
+    if field.is_relation:
+        field = field.target_field
+    return field, nullable
+
+
+def _row_value(row, name):
+    if isinstance(row, dict):
+        return row.get(name)
+    value = row
+    for part in name.split('__'):
+        if value is None:
+            return None
+        value = value.pk if part == 'pk' else getattr(value, part)
+    return value.pk if hasattr(value, '_meta') else value
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPage:
+    """One keyset page of an ordered queryset."""
+
+    def __init__(self, queryset, cursor: str, page_size: int):
+        ordering = _ordering(queryset)
+        if ordering is None:
+            raise ValueError('keyset pagination needs plain field ordering')
+        self.keys = []
+        for item in ordering:
+            name = item.lstrip('-')
+            field, nullable = _output_field(queryset, name)
+            self.keys.append((name, item.startswith('-'), nullable, field))
+        values, reverse = self._decode(cursor) if cursor else (None, False)
+
+        ordered = queryset.order_by(*[
+            OrderBy(
+                F(name), descending=descending != reverse,
+                **({'nulls_first': True} if reverse else {'nulls_last': True}),
+            )
+            for name, descending, _, _ in self.keys
+        ])
+        if values is not None:
+            after = self._after(values, reverse)
+            ordered = ordered.filter(after) if after is not None else ordered.none()
+        rows = list(ordered[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+        self.rows = rows
+        self.next_cursor = None
+        self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self._encode(rows[-1], reverse=False)
+            if (has_more and reverse) or (values is not None and not reverse):
+                self.previous_cursor = self._encode(rows[0], reverse=True)
+
+    def _signature(self) -> list[str]:
+        return [('-' if descending else '') + name for name, descending, _, _ in self.keys]
+
+    def _encode(self, row, *, reverse: bool) -> str:
+        payload = {
+            'o': self._signature(),
+            'v': [_encode_value(_row_value(row, name)) for name, _, _, _ in self.keys],
+            'r': int(reverse),
+        }
+        raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def _decode(self, cursor: str):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            if payload.get('o') != self._signature() or len(payload.get('v') or []) != len(self.keys):
+                raise ValueError
+            values = [
+                None if value is None else field.to_python(value)
+                for (_, _, _, field), value in zip(self.keys, payload['v'])
+            ]
+        except (AttributeError, TypeError, ValueError, ValidationError, binascii.Error):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+        return values, bool(payload.get('r'))
+
+    def _after(self, values, reverse: bool) -> Q | None:
+        """Rows strictly after ``values`` in the (possibly reversed) page order."""
+        terms = []
+        equal = Q()
+        for (name, descending, nullable, _), value in zip(self.keys, values):
+            descending = descending != reverse
+            if value is None:
+                # NULLs sort last going forward, so only a reversed walk finds rows after one.
+                step = Q(**{f'{name}__isnull': False}) if reverse else None
+            else:
+                step = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+                if nullable and not reverse:
+                    step |= Q(**{f'{name}__isnull': True})
+            if step is not None:
+                terms.append(equal & step)
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return reduce(or_, terms) if terms else None
+
+
+class AdminPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.cursor_query_param not in request.query_params or _ordering(queryset) is None:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.keyset = KeysetPage(
+            queryset, request.query_params.get(self.cursor_query_param) or '', self.get_page_size(request),
+        )
+        return self.keyset.rows
+
+    @property
+    def is_cursor_continuation(self) -> bool:
+        return self.keyset is not None and bool(self.request.query_params.get(self.cursor_query_param))
+
+    def _cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self._cursor_link(self.keyset.next_cursor),
+            'previous': self._cursor_link(self.keyset.previous_cursor),
+            'next_cursor': self.keyset.next_cursor,
+            'previous_cursor': self.keyset.previous_cursor,
+            'results': data,
+        })
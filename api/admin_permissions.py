@@ -221,6 +221,15 @@ def _groups_for_request(request, view) -> tuple[tuple[str, ...], ...] | None:
             return (('artists.view',),)
         return None
 
+    if name == 'AdminExportView' and method == 'GET':
+        return {
+            'payments': (('finance.payments',),),
+            'payouts': (('finance.payouts',),),
+            'users': (('users.view',),),
+            'songs': (('songs.view',),),
+            'reports': (('support.reports',),),
+        }.get(str(getattr(view, 'kwargs', {}).get('dataset') or ''))
+
     if name == 'AdminArtistDetailView' and method in {'PATCH', 'PUT'}:
         if method == 'PATCH':
             keys = set(getattr(request, 'data', {}) or {})
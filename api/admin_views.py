@@ -2,13 +2,13 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, serializers
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes, inline_serializer
-from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from .models import (
     User, Artist, ArtistAuth, Song, Album, Genre, SubGenre, Mood, Tag, Report, 
     PlayConfiguration, BannerAd, AudioAd, PaymentTransaction, DepositRequest,
     SearchSection, EventPlaylist, Playlist, SupportTicket, SongPromotion,
-    ArtistRelease, ArtistReleaseTrack, ArtistReleaseStatusHistory, ArtistSocialAccount, SocialPlatform, RefreshToken
+    ArtistRelease, ArtistReleaseTrack, ArtistReleaseStatusHistory, ArtistSocialAccount, SocialPlatform, RefreshToken,
+    EngagementCounter,
 )
 from .models import PlayCount
 from django.utils import timezone
@@ -28,12 +28,17 @@ from .admin_serializers import (
 from rest_framework.parsers import MultiPartParser, FormParser
 from .utils import upload_file_to_r2, convert_to_128kbps, get_audio_info, make_safe_filename, generate_signed_r2_url, check_r2_storage, cleanup_r2_urls
 from .song_play_metrics import apply_annotated_song_play_counts, hydrate_song_play_counts
+from .admin_exports import EXPORT_FORMATS, stream_export
+from .admin_pagination import AdminPagination
+from .engagement_counters import get_counters
+from .dashboard_metrics import TOP_ARTISTS, dashboard_totals, directory_counts, top_artists
 from .admin_permissions import (
     IsAdminPanelSession, IsAdminPanelUser, IsOwnerAdmin, bump_employee_session_version,
     employee_role, has_employee_permission, is_employee, is_employee_account, is_platform_admin,
     panel_identity, require_employee_permission, normalize_employee_permissions,
 )
 from .performance import CATALOG_VERSION_KEY, cache_increment
+from .session_cache import invalidate_auth_cache
 import os
 import json
 import logging
@@ -43,12 +48,6 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 
 logger = logging.getLogger(__name__)
 
-class AdminPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
 _TAXONOMY_MODELS = {
     'genre': Genre,
     'subgenre': SubGenre,
@@ -726,6 +725,7 @@ def _employee_queryset():
 
 def _revoke_employee_sessions(user):
     RefreshToken.objects.filter(user=user, revoked_at__isnull=True).update(revoked_at=timezone.now())
+    invalidate_auth_cache(user.pk)
 
 
 def _employee_can_edit_song_via_admin_release(user, song) -> bool:
@@ -740,42 +740,45 @@ def _employee_can_edit_song_via_admin_release(user, song) -> bool:
     ).exists()
 
 
+def _admin_user_list_queryset(request):
+    role = str(request.query_params.get('role') or User.ROLE_AUDIENCE).strip()
+    if role == 'employee':
+        if not is_platform_admin(request.user):
+            queryset = User.objects.none()
+        else:
+            queryset = _employee_queryset().select_related('artist_profile')
+    else:
+        queryset = User.objects.filter(roles__contains=role).select_related('artist_profile')
+        queryset = _exclude_employee_accounts_for_employee(queryset, request)
+    query = str(request.query_params.get('q') or '').strip()
+    if query:
+        queryset = queryset.filter(
+            Q(phone_number__icontains=query) | Q(unique_id__icontains=query)
+            | Q(first_name__icontains=query) | Q(last_name__icontains=query)
+            | Q(email__icontains=query)
+        )
+    state = str(request.query_params.get('state') or '').strip()
+    if state == 'active':
+        queryset = queryset.filter(is_active=True, is_banned=False)
+    elif state == 'inactive':
+        queryset = queryset.filter(is_active=False)
+    elif state == 'banned':
+        queryset = queryset.filter(is_banned=True)
+    plan = str(request.query_params.get('plan') or '').strip()
+    if plan in {User.PLAN_FREE, User.PLAN_PREMIUM}:
+        queryset = queryset.filter(plan=plan)
+    sort = str(request.query_params.get('sort') or 'time').strip()
+    direction = 'asc' if request.query_params.get('direction') == 'asc' else 'desc'
+    field = {'time': 'date_joined', 'name': 'first_name'}.get(sort, 'date_joined')
+    return queryset.order_by(field if direction == 'asc' else f'-{field}', '-id')
+
+
 @extend_schema(tags=['Admin App Endpoints اندپوینت های اپلیکیشن ادمین'])
 class AdminUserListView(APIView):
     permission_classes = [IsAdminPanelUser]
 
     def get(self, request):
-        role = str(request.query_params.get('role') or User.ROLE_AUDIENCE).strip()
-        if role == 'employee':
-            if not is_platform_admin(request.user):
-                queryset = User.objects.none()
-            else:
-                queryset = _employee_queryset().select_related('artist_profile')
-        else:
-            queryset = User.objects.filter(roles__contains=role).select_related('artist_profile')
-            queryset = _exclude_employee_accounts_for_employee(queryset, request)
-        query = str(request.query_params.get('q') or '').strip()
-        if query:
-            queryset = queryset.filter(
-                Q(phone_number__icontains=query) | Q(unique_id__icontains=query)
-                | Q(first_name__icontains=query) | Q(last_name__icontains=query)
-                | Q(email__icontains=query)
-            )
-        state = str(request.query_params.get('state') or '').strip()
-        if state == 'active':
-            queryset = queryset.filter(is_active=True, is_banned=False)
-        elif state == 'inactive':
-            queryset = queryset.filter(is_active=False)
-        elif state == 'banned':
-            queryset = queryset.filter(is_banned=True)
-        plan = str(request.query_params.get('plan') or '').strip()
-        if plan in {User.PLAN_FREE, User.PLAN_PREMIUM}:
-            queryset = queryset.filter(plan=plan)
-        sort = str(request.query_params.get('sort') or 'time').strip()
-        direction = 'asc' if request.query_params.get('direction') == 'asc' else 'desc'
-        field = {'time': 'date_joined', 'name': 'first_name'}.get(sort, 'date_joined')
-        queryset = queryset.order_by(field if direction == 'asc' else f'-{field}', '-id')
-
+        queryset = _admin_user_list_queryset(request)
         paginator = AdminPagination()
         page = paginator.paginate_queryset(queryset, request)
         return paginator.get_paginated_response(AdminUserSerializer(page, many=True, context={'request': request}).data)
@@ -1233,89 +1236,80 @@ class AdminHomeSummaryView(APIView):
     """Structured product dashboard: audience, artists, streams and money."""
     permission_classes = [IsOwnerAdmin]
 
-    @staticmethod
-    def _decimal_total(queryset, field='amount'):
-        value = queryset.aggregate(total=Sum(field))['total'] or Decimal('0')
-        return float(value)
-
     def get(self, request):
-        now = timezone.now()
-        last_24 = now - timedelta(days=1)
-        last_7 = now - timedelta(days=7)
-        last_30 = now - timedelta(days=30)
+        # Running counters, hourly windows and the background leaderboard keep
+        # this view off the play, payment and payout tables.
+        totals = dashboard_totals()
+        plays = totals['plays']
+        all_time = plays['total']
+        artist_earned_total = float(all_time['pay'])
+        payments = totals['payments']
+        payouts = totals['payouts']
+        revenue_total = float(payments[PaymentTransaction.STATUS_SUCCESS][1])
+        paid_payout_total = float(payouts[DepositRequest.STATUS_DONE][1])
+        pending_payout_total = float(sum(
+            payouts[value][1] for value in (DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED)
+        ))
+        pending_payout_count = sum(
+            payouts[value][0] for value in (DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED)
+        )
+        directory = directory_counts()
 
-        streams = PlayCount.objects.all()
-        artist_earned_total = self._decimal_total(streams, 'pay')
-        successful_payments = PaymentTransaction.objects.filter(status=PaymentTransaction.STATUS_SUCCESS)
-        revenue_total = self._decimal_total(successful_payments)
-        paid_payouts = DepositRequest.objects.filter(status=DepositRequest.STATUS_DONE)
-        pending_payouts = DepositRequest.objects.filter(status__in=[DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED])
-        paid_payout_total = self._decimal_total(paid_payouts)
-        pending_payout_total = self._decimal_total(pending_payouts)
-
-        audience = User.objects.filter(roles__contains=User.ROLE_AUDIENCE)
-        premium = audience.filter(plan=User.PLAN_PREMIUM, is_banned=False)
+        ranked = top_artists()
+        ranked_artist_ids = [artist_id for artist_id, _, _ in ranked]
+        artist_totals = {artist_id: (artist_plays, pay) for artist_id, artist_plays, pay in ranked}
         artists = Artist.objects.all()
-        top_artists = list(
-            artists.annotate(
-                total_streams=Count('songs__play_counts'),
-                earned=Sum('songs__play_counts__pay'),
-            ).order_by('-total_streams', '-created_at')[:6]
-        )
+        artists_by_id = artists.in_bulk(ranked_artist_ids)
+        top_artists_list = [artists_by_id[artist_id] for artist_id in ranked_artist_ids if artist_id in artists_by_id]
+        if len(top_artists_list) < TOP_ARTISTS:
+            top_artists_list.extend(
+                artists.exclude(id__in=ranked_artist_ids).order_by('-created_at')[:TOP_ARTISTS - len(top_artists_list)]
+            )
         top_artist_payload = [{
             'id': artist.id,
             'name': artist.artistic_name or artist.name,
             'profile_image': generate_signed_r2_url(artist.profile_image) or artist.profile_image,
             'verified': artist.verified,
-            'streams': int(getattr(artist, 'total_streams', 0) or 0),
-            'earned': float(getattr(artist, 'earned', 0) or 0),
-        } for artist in top_artists]
+            'streams': int(artist_totals.get(artist.id, (0, 0))[0]),
+            'earned': float(artist_totals.get(artist.id, (0, 0))[1]),
+        } for artist in top_artists_list]
 
         return Response({
-            'total': streams.count(),
-            'last_30_days': streams.filter(created_at__gte=last_30).count(),
-            'last_7_days': streams.filter(created_at__gte=last_7).count(),
-            'last_24_hours': streams.filter(created_at__gte=last_24).count(),
+            'total': all_time['plays'],
+            'last_30_days': plays['last_30_days']['plays'],
+            'last_7_days': plays['last_7_days']['plays'],
+            'last_24_hours': plays['last_24_hours']['plays'],
             'total_pay': artist_earned_total,
-            'pay_last_30_days': self._decimal_total(streams.filter(created_at__gte=last_30), 'pay'),
-            'pay_last_7_days': self._decimal_total(streams.filter(created_at__gte=last_7), 'pay'),
-            'pay_last_24_hours': self._decimal_total(streams.filter(created_at__gte=last_24), 'pay'),
-            'audience_count': audience.count(),
-            'artist_profiles_count': artists.count(),
-            'users': {
-                'total': audience.count(),
-                'active': audience.filter(is_active=True, is_banned=False).count(),
-                'banned': audience.filter(is_banned=True).count(),
-                'premium': premium.count(),
-                'free': audience.filter(plan=User.PLAN_FREE).count(),
-                'new_30_days': audience.filter(date_joined__gte=last_30).count(),
-            },
+            'pay_last_30_days': float(plays['last_30_days']['pay']),
+            'pay_last_7_days': float(plays['last_7_days']['pay']),
+            'pay_last_24_hours': float(plays['last_24_hours']['pay']),
+            'audience_count': directory['users']['total'],
+            'artist_profiles_count': directory['artists']['total'],
+            'users': directory['users'],
             'artists': {
-                'total': artists.count(),
-                'verified': artists.filter(verified=True).count(),
-                'pending_verification': ArtistAuth.objects.exclude(
-                    status__in=[ArtistAuth.STATUS_ACCEPTED, ArtistAuth.STATUS_REJECTED]
-                ).count(),
-                'successful': artists.filter(verified=True, songs__status=Song.STATUS_PUBLISHED).distinct().count(),
+                'total': directory['artists']['total'],
+                'verified': directory['artists']['verified'],
+                'pending_verification': directory['artists']['pending_verification'],
+                'successful': directory['artists']['successful'],
                 'top': top_artist_payload,
             },
             'streams': {
-                'total': streams.count(),
-                'last_24_hours': streams.filter(created_at__gte=last_24).count(),
-                'last_7_days': streams.filter(created_at__gte=last_7).count(),
-                'last_30_days': streams.filter(created_at__gte=last_30).count(),
+                'total': all_time['plays'],
+                'last_24_hours': plays['last_24_hours']['plays'],
+                'last_7_days': plays['last_7_days']['plays'],
+                'last_30_days': plays['last_30_days']['plays'],
                 'artist_earned_total': artist_earned_total,
             },
             'money': {
                 'platform_revenue': revenue_total,
-                'revenue_30_days': self._decimal_total(successful_payments.filter(created_at__gte=last_30)),
-                'successful_payments_count': successful_payments.count(),
-                'pending_payments_count': PaymentTransaction.objects.filter(status=PaymentTransaction.STATUS_PENDING).count(),
-                'failed_payments_count': PaymentTransaction.objects.filter(status=PaymentTransaction.STATUS_FAILED).count(),
+                'revenue_30_days': float(totals['revenue_30_days']),
+                'successful_payments_count': payments[PaymentTransaction.STATUS_SUCCESS][0],
+                'pending_payments_count': payments[PaymentTransaction.STATUS_PENDING][0],
+                'failed_payments_count': payments[PaymentTransaction.STATUS_FAILED][0],
                 'artist_earned_total': artist_earned_total,
                 'artist_paid_total': paid_payout_total,
                 'artist_pending_payout_total': pending_payout_total,
-                'artist_pending_payout_count': pending_payouts.count(),
+                'artist_pending_payout_count': pending_payout_count,
                 'gross_after_paid_payouts': revenue_total - paid_payout_total,
             },
             'recent_transactions': AdminPaymentTransactionSerializer(
@@ -1373,6 +1367,28 @@ class AdminUserSearchView(APIView):
 
 
 
+def _filter_admin_songs(songs, request, status_filter):
+    if status_filter != 'all':
+        songs = songs.filter(status=status_filter)
+    artist_id = str(request.query_params.get('artist_id') or '').strip()
+    if artist_id:
+        try:
+            artist_id_value = int(artist_id)
+        except (TypeError, ValueError):
+            artist_id_value = 0
+        if artist_id_value <= 0:
+            raise serializers.ValidationError({'artist_id': ['شناسه هنرمند معتبر نیست.']})
+        songs = songs.filter(artist_id=artist_id_value)
+    query = str(request.query_params.get('q') or '').strip()
+    if query:
+        songs = songs.filter(
+            Q(title__icontains=query) | Q(title_en__icontains=query)
+            | Q(artist__name__icontains=query) | Q(artist__name_en__icontains=query)
+            | Q(artist__artistic_name__icontains=query) | Q(artist__artistic_name_en__icontains=query)
+        )
+    return songs
+
+
 @extend_schema(tags=['Admin App Endpoints اندپوینت های اپلیکیشن ادمین'])
 class AdminSongListView(APIView):
     """List songs for admin with status filtering."""
@@ -1404,13 +1420,15 @@ class AdminSongListView(APIView):
             base_songs
             .select_related('artist', 'album')
             .prefetch_related('featured_artists', 'genres', 'sub_genres', 'moods')
-            .annotate(likes_count=Count('liked_by', distinct=True))
         )
 
-        # The large play relation is deliberately absent from ordinary list SQL.
-        # Only explicit play sorting needs a DB aggregate because Redis must not
-        # become the authority for ordering.
-        if sort == 'plays':
+        # The large play and like relations are deliberately absent from
+        # ordinary list SQL. Only explicit play/like sorting needs a DB
+        # aggregate because cached counters must not become the authority for
+        # ordering; other pages read likes from the engagement counters.
+        if sort == 'likes':
+            songs = songs.annotate(likes_count=Count('liked_by', distinct=True))
+        elif sort == 'plays':
             songs = (
                 songs.annotate(tracked_plays=Count('play_counts', distinct=True))
                 .annotate(total_plays=F('plays') + F('tracked_plays'))
@@ -1437,24 +1455,7 @@ class AdminSongListView(APIView):
                 )
             )
 
-        if status_filter != 'all':
-            songs = songs.filter(status=status_filter)
-        artist_id = str(request.query_params.get('artist_id') or '').strip()
-        if artist_id:
-            try:
-                artist_id_value = int(artist_id)
-            except (TypeError, ValueError):
-                return Response({'artist_id': ['شناسه هنرمند معتبر نیست.']}, status=status.HTTP_400_BAD_REQUEST)
-            if artist_id_value <= 0:
-                return Response({'artist_id': ['شناسه هنرمند معتبر نیست.']}, status=status.HTTP_400_BAD_REQUEST)
-            songs = songs.filter(artist_id=artist_id_value)
-        query = str(request.query_params.get('q') or '').strip()
-        if query:
-            songs = songs.filter(
-                Q(title__icontains=query) | Q(title_en__icontains=query)
-                | Q(artist__name__icontains=query) | Q(artist__name_en__icontains=query)
-                | Q(artist__artistic_name__icontains=query) | Q(artist__artistic_name_en__icontains=query)
-            )
+        songs = _filter_admin_songs(songs, request, status_filter)
 
         field = {
             'time': 'created_at', 'plays': 'total_plays', 'likes': 'likes_count',
@@ -1467,6 +1468,10 @@ class AdminSongListView(APIView):
             apply_annotated_song_play_counts(page)
         else:
             hydrate_song_play_counts(page)
+        if sort != 'likes':
+            song_counters = get_counters(EngagementCounter.KIND_SONG, [song.pk for song in page])
+            for song in page:
+                song.likes_count = song_counters.get(song.pk, {}).get('likes', 0)
         serialized = AdminSongSerializer(page, many=True).data
         if picker_only:
             picker_fields = {'id', 'title', 'title_en', 'artist', 'artist_name', 'cover_image', 'status'}
@@ -1802,6 +1807,21 @@ class AdminSongDetailView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _report_list_queryset(request):
+    qs = Report.objects.select_related('user', 'song', 'artist', 'reported_user').all().order_by('-created_at')
+    has_reviewed = request.query_params.get('has_reviewed')
+    if has_reviewed is not None:
+        qs = qs.filter(has_reviewed=has_reviewed.lower() == 'true')
+    typ = request.query_params.get('type')
+    if typ == 'song':
+        qs = qs.filter(song__isnull=False)
+    elif typ == 'artist':
+        qs = qs.filter(artist__isnull=False)
+    elif typ == 'user':
+        qs = qs.filter(reported_user__isnull=False)
+    return qs
+
+
 @extend_schema(tags=['Admin App Endpoints اندپوینت های اپلیکیشن ادمین'])
 class AdminReportListView(APIView):
     """List reports for admin with filtering."""
@@ -1817,20 +1837,7 @@ class AdminReportListView(APIView):
         responses={200: AdminReportSerializer(many=True)}
     )
     def get(self, request):
-        qs = Report.objects.select_related('user', 'song', 'artist', 'reported_user').all().order_by('-created_at')
-        
-        has_reviewed = request.query_params.get('has_reviewed')
-        if has_reviewed is not None:
-            qs = qs.filter(has_reviewed=has_reviewed.lower() == 'true')
-            
-        typ = request.query_params.get('type')
-        if typ == 'song':
-            qs = qs.filter(song__isnull=False)
-        elif typ == 'artist':
-            qs = qs.filter(artist__isnull=False)
-        elif typ == 'user':
-            qs = qs.filter(reported_user__isnull=False)
-            
+        qs = _report_list_queryset(request)
         paginator = AdminPagination()
         result_page = paginator.paginate_queryset(qs, request)
         serializer = AdminReportSerializer(result_page, many=True)
@@ -2442,69 +2449,141 @@ class AdminArtistEarningsListView(APIView):
                 'remaining_total': float(max(Decimal('0'), earned - paid - pending)),
             })
         response = paginator.get_paginated_response(rows)
-        response.data['total_amount'] = float(PlayCount.objects.filter(songs__artist_id__in=queryset.values('id')).distinct().aggregate(total=Sum('pay'))['total'] or 0)
+        if not paginator.is_cursor_continuation:
+            response.data['total_amount'] = float(PlayCount.objects.filter(songs__artist_id__in=queryset.values('id')).distinct().aggregate(total=Sum('pay'))['total'] or 0)
         return response
 
 
+def _payment_transaction_list_queryset(request):
+    queryset = PaymentTransaction.objects.select_related('user').all()
+    status_filter = str(request.query_params.get('status') or '').strip()
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    query = str(request.query_params.get('q') or '').strip()
+    if query:
+        queryset = queryset.filter(
+            Q(transaction_id__icontains=query) | Q(user__phone_number__icontains=query)
+            | Q(description__icontains=query)
+        )
+    sort = str(request.query_params.get('sort') or 'time').strip()
+    direction = 'asc' if request.query_params.get('direction') == 'asc' else 'desc'
+    field = 'amount' if sort == 'amount' else 'created_at'
+    return queryset.order_by(field if direction == 'asc' else f'-{field}', '-id')
+
+
 @extend_schema(tags=['Admin App Endpoints اندپوینت های اپلیکیشن ادمین'])
 class AdminPaymentTransactionListView(APIView):
     permission_classes = [IsAdminPanelUser]
 
     def get(self, request):
-        queryset = PaymentTransaction.objects.select_related('user').all()
-        status_filter = str(request.query_params.get('status') or '').strip()
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        query = str(request.query_params.get('q') or '').strip()
-        if query:
-            queryset = queryset.filter(
-                Q(transaction_id__icontains=query) | Q(user__phone_number__icontains=query)
-                | Q(description__icontains=query)
-            )
-        sort = str(request.query_params.get('sort') or 'time').strip()
-        direction = 'asc' if request.query_params.get('direction') == 'asc' else 'desc'
-        field = 'amount' if sort == 'amount' else 'created_at'
-        queryset = queryset.order_by(field if direction == 'asc' else f'-{field}', '-id')
+        queryset = _payment_transaction_list_queryset(request)
         paginator = AdminPagination()
         page = paginator.paginate_queryset(queryset, request)
         response = paginator.get_paginated_response(AdminPaymentTransactionSerializer(page, many=True).data)
-        response.data['total_amount'] = float(queryset.aggregate(total=Sum('amount'))['total'] or 0)
-        response.data['total_count'] = queryset.count()
+        if not paginator.is_cursor_continuation:
+            response.data['total_amount'] = float(queryset.aggregate(total=Sum('amount'))['total'] or 0)
+            response.data['total_count'] = queryset.count()
         return response
 
 
 
+def _deposit_request_list_queryset(request):
+    queryset = DepositRequest.objects.select_related('artist', 'artist__user').all()
+    status_filter = str(request.query_params.get('status') or '').strip()
+    if status_filter:
+        statuses = [item for item in status_filter.split(',') if item]
+        if status_filter == 'open':
+            statuses = [DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED]
+        queryset = queryset.filter(status__in=statuses)
+    query = str(request.query_params.get('q') or '').strip()
+    if query:
+        queryset = queryset.filter(
+            Q(transaction_id__icontains=query) | Q(artist__name__icontains=query)
+            | Q(artist__artistic_name__icontains=query) | Q(artist__user__phone_number__icontains=query)
+        )
+    sort = str(request.query_params.get('sort') or 'time').strip()
+    direction = 'asc' if request.query_params.get('direction') == 'asc' else 'desc'
+    field = 'amount' if sort == 'amount' else 'submission_date'
+    return queryset.order_by(field if direction == 'asc' else f'-{field}', '-id')
+
+
 @extend_schema(tags=['Admin App Endpoints اندپوینت های اپلیکیشن ادمین'])
 class AdminDepositRequestListView(APIView):
     permission_classes = [IsAdminPanelUser]
 
     def get(self, request):
-        queryset = DepositRequest.objects.select_related('artist', 'artist__user').all()
-        status_filter = str(request.query_params.get('status') or '').strip()
-        if status_filter:
-            statuses = [item for item in status_filter.split(',') if item]
-            if status_filter == 'open':
-                statuses = [DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED]
-            queryset = queryset.filter(status__in=statuses)
-        query = str(request.query_params.get('q') or '').strip()
-        if query:
-            queryset = queryset.filter(
-                Q(transaction_id__icontains=query) | Q(artist__name__icontains=query)
-                | Q(artist__artistic_name__icontains=query) | Q(artist__user__phone_number__icontains=query)
-            )
-        sort = str(request.query_params.get('sort') or 'time').strip()
-        direction = 'asc' if request.query_params.get('direction') == 'asc' else 'desc'
-        field = 'amount' if sort == 'amount' else 'submission_date'
-        queryset = queryset.order_by(field if direction == 'asc' else f'-{field}', '-id')
+        queryset = _deposit_request_list_queryset(request)
         paginator = AdminPagination()
         page = paginator.paginate_queryset(queryset, request)
         response = paginator.get_paginated_response(AdminDepositRequestSerializer(page, many=True).data)
-        response.data['total_amount'] = float(queryset.aggregate(total=Sum('amount'))['total'] or 0)
-        response.data['total_count'] = queryset.count()
+        if not paginator.is_cursor_continuation:
+            response.data['total_amount'] = float(queryset.aggregate(total=Sum('amount'))['total'] or 0)
+            response.data['total_count'] = queryset.count()
         return response
 
 
 
+def _admin_song_export_queryset(request):
+    status_filter = str(request.query_params.get('status') or Song.STATUS_PUBLISHED).strip()
+    include_drafts = str(request.query_params.get('include_drafts') or '').lower() in {'1', 'true', 'yes'}
+    songs = Song.objects.all() if include_drafts else Song.objects.exclude(status=Song.STATUS_DRAFT)
+    songs = _filter_admin_songs(songs, request, status_filter)
+    direction = 'asc' if request.query_params.get('direction') == 'asc' else 'desc'
+    field = 'release_date' if request.query_params.get('sort') == 'release' else 'created_at'
+    return songs.order_by(field if direction == 'asc' else f'-{field}', '-id')
+
+
+# dataset -> (filtered queryset builder shared with its list view, (header, values path) columns)
+_ADMIN_EXPORTS = {
+    'payments': (_payment_transaction_list_queryset, (
+        ('id', 'id'), ('transaction_id', 'transaction_id'), ('user_id', 'user_id'),
+        ('user_phone', 'user__phone_number'), ('amount', 'amount'), ('status', 'status'),
+        ('payment_method', 'payment_method'), ('description', 'description'), ('created_at', 'created_at'),
+    )),
+    'payouts': (_deposit_request_list_queryset, (
+        ('id', 'id'), ('artist_id', 'artist_id'), ('artist_name', 'artist__name'),
+        ('artistic_name', 'artist__artistic_name'), ('artist_phone', 'artist__user__phone_number'),
+        ('amount', 'amount'), ('status', 'status'), ('transaction_id', 'transaction_id'),
+        ('submission_date', 'submission_date'), ('status_change_date', 'status_change_date'),
+    )),
+    'users': (_admin_user_list_queryset, (
+        ('id', 'id'), ('phone_number', 'phone_number'), ('unique_id', 'unique_id'),
+        ('first_name', 'first_name'), ('last_name', 'last_name'), ('email', 'email'), ('plan', 'plan'),
+        ('is_active', 'is_active'), ('is_banned', 'is_banned'), ('date_joined', 'date_joined'),
+        ('last_login_at', 'last_login_at'),
+    )),
+    'songs': (_admin_song_export_queryset, (
+        ('id', 'id'), ('title', 'title'), ('title_en', 'title_en'), ('artist_id', 'artist_id'),
+        ('artist_name', 'artist__name'), ('status', 'status'), ('release_date', 'release_date'),
+        ('created_at', 'created_at'),
+    )),
+    'reports': (_report_list_queryset, (
+        ('id', 'id'), ('user_id', 'user_id'), ('song_id', 'song_id'), ('artist_id', 'artist_id'),
+        ('reported_user_id', 'reported_user_id'), ('text', 'text'), ('has_reviewed', 'has_reviewed'),
+        ('reviewed_at', 'reviewed_at'), ('created_at', 'created_at'),
+    )),
+}
+
+
+@extend_schema(tags=['Admin App Endpoints اندپوینت های اپلیکیشن ادمین'])
+class AdminExportView(APIView):
+    """Stream a filtered admin table as CSV or NDJSON.
+
+    Accepts the same filter and sort parameters as the dataset's list endpoint.
+    """
+    permission_classes = [IsAdminPanelUser]
+
+    def get(self, request, dataset):
+        spec = _ADMIN_EXPORTS.get(dataset)
+        if spec is None:
+            return Response({'detail': 'خروجی درخواستی وجود ندارد.'}, status=status.HTTP_404_NOT_FOUND)
+        export_format = str(request.query_params.get('file_format') or 'csv').strip().lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response({'file_format': ['قالب خروجی باید csv یا ndjson باشد.']}, status=status.HTTP_400_BAD_REQUEST)
+        build_queryset, columns = spec
+        return stream_export(build_queryset(request), columns, export_format, dataset)
+
+
 @extend_schema(tags=['Admin App Endpoints اندپوینت های اپلیکیشن ادمین'])
 class AdminSearchSectionListView(APIView):
     """List and create search sections for admin."""
@@ -0,0 +1,396 @@
+"""Per-artist analytics snapshots for the artist dashboard.
+
+``ArtistAnalyticsView`` used to aggregate the requested period's plays,
+income, likes, followers, unique listeners, city/country/plan splits, charts
+and top songs on every call. ``build_artist_snapshot`` now materializes those
+figures per artist and period from everything recorded before the start of
+the current hour (``covers_until``), and ``artist_analytics`` answers from the
+stored snapshot plus a live delta: hour play rollups, likes and follows since
+``covers_until``. A dashboard load runs the same handful of queries however
+large or old the artist's catalog is.
+
+``refresh_artist_snapshots`` runs from ``run_runtime_maintenance``: hourly it
+rebuilds artists played since the previous pass, and after midnight it
+rebuilds every snapshot of the previous day. A snapshot from an earlier day,
+older than ``ARTIST_ANALYTICS_SNAPSHOT_MAX_AGE`` or missing is built on read.
+Unique listeners and the city/country/plan splits are as of ``covers_until``.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .engagement_counters import get_counters_bulk
+from .models import (
+    ArtistAnalyticsSnapshot,
+    ArtistMonthlyListener,
+    EngagementCounter,
+    Follow,
+    PlayCount,
+    PlayDimensionRollup,
+    PlayRollup,
+    Song,
+    SongLike,
+    User,
+)
+from .play_rollups import dimension_play_totals, hour_bucket, window_play_totals
+from .utils import generate_signed_r2_url
+
+logger = logging.getLogger(__name__)
+
+PERIODS = tuple(value for value, _ in ArtistAnalyticsSnapshot.PERIOD_CHOICES)
+CHART_TYPES = ('hourly', 'daily', 'monthly')
+# Top-song candidates kept per snapshot; the live delta re-ranks within them.
+_TOP_CANDIDATES = 50
+_TOP_SONGS = 10
+_DISTRIBUTION_LIMIT = 20
+
+
+def _day_start(value: date) -> datetime:
+    return timezone.make_aware(datetime.combine(value, datetime.min.time()), timezone.get_current_timezone())
+
+
+def _shift_month(value: date, offset: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _local_day(value: datetime) -> date:
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def _hour_key(value: datetime) -> str:
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+def _window(period: str, today_date: date):
+    """``(start, previous_start, previous_end)`` of ``period``; ``None`` for all time."""
+    twelve_month_start = _shift_month(today_date.replace(day=1), -11)
+    if period == ArtistAnalyticsSnapshot.PERIOD_TODAY:
+        today = _day_start(today_date)
+        return today, today - timedelta(days=1), today
+    if period == ArtistAnalyticsSnapshot.PERIOD_7D:
+        start = _day_start(today_date - timedelta(days=6))
+        return start, _day_start(today_date - timedelta(days=13)), start
+    if period == ArtistAnalyticsSnapshot.PERIOD_30D:
+        start = _day_start(today_date - timedelta(days=29))
+        return start, _day_start(today_date - timedelta(days=59)), start
+    if period == ArtistAnalyticsSnapshot.PERIOD_365D:
+        start = _day_start(twelve_month_start)
+        return start, _day_start(_shift_month(twelve_month_start, -12)), start
+    return None, None, None
+
+
+def _rollup_songs(artist_id: int) -> Q:
+    return Q(song__artist_id=artist_id) & ~Q(song__status=Song.STATUS_DELETED)
+
+
+def _created_between(queryset, start, end):
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=start)
+    return queryset.filter(created_at__lt=end)
+
+
+def build_artist_snapshot(artist_id, period: str, *, now: datetime | None = None) -> ArtistAnalyticsSnapshot:
+    """Materialize ``period``'s figures for one artist up to the current hour."""
+    artist_id = int(artist_id)
+    now = now or timezone.now()
+    today_date = timezone.localdate(now)
+    covers_until = hour_bucket(now)
+    start, previous_start, previous_end = _window(period, today_date)
+    songs = Song.objects.filter(artist_id=artist_id).exclude(status=Song.STATUS_DELETED)
+    rollup_songs = _rollup_songs(artist_id)
+
+    song_totals = window_play_totals(start, covers_until, filters=rollup_songs)
+    previous = {'plays': 0, 'pay': Decimal('0')}
+    if previous_start is not None:
+        previous = window_play_totals(previous_start, previous_end, group_by=None, filters=rollup_songs)
+    likes = SongLike.objects.filter(song__in=songs)
+    followers = Follow.objects.filter(followed_artist_id=artist_id)
+    legacy_plays = {}
+    if period == ArtistAnalyticsSnapshot.PERIOD_ALL:
+        legacy_plays = {pk: int(plays or 0) for pk, plays in songs.filter(plays__gt=0).values_list('pk', 'plays')}
+
+    today = _day_start(today_date)
+    hour_rows = PlayRollup.objects.filter(
+        rollup_songs, granularity=PlayRollup.GRANULARITY_HOUR,
+        bucket_start__gte=today, bucket_start__lt=covers_until,
+    ).values('bucket_start').annotate(total=Sum('plays'))
+    hourly = {_hour_key(row['bucket_start']): int(row['total'] or 0) for row in hour_rows}
+    day_rows = PlayRollup.objects.filter(
+        rollup_songs, granularity=PlayRollup.GRANULARITY_DAY, bucket_start__lt=today,
+    )
+    if start is not None:
+        day_rows = day_rows.filter(bucket_start__gte=start)
+    daily = {
+        _local_day(row['bucket_start']).isoformat(): int(row['total'] or 0)
+        for row in day_rows.values('bucket_start').annotate(total=Sum('plays'))
+    }
+    if hourly:
+        daily[today_date.isoformat()] = daily.get(today_date.isoformat(), 0) + sum(hourly.values())
+
+    start_day = timezone.localdate(start) if start else None
+
+    def distribution(dimension, limit=None):
+        rows = dimension_play_totals(dimension, since_day=start_day, filters=rollup_songs, limit=limit)
+        return [[row['value'], row['plays'], str(row['pay'])] for row in rows]
+
+    song_rows = list(songs.values_list('pk', 'created_at'))
+    song_likes = get_counters_bulk({EngagementCounter.KIND_SONG: [pk for pk, _ in song_rows]}).get(
+        EngagementCounter.KIND_SONG, {}
+    )
+    candidates = sorted(
+        (
+            [
+                pk,
+                song_totals.get(pk, {}).get('plays', 0) + legacy_plays.get(pk, 0),
+                song_likes.get(pk, {}).get('likes', 0),
+                created_at.isoformat(),
+            ]
+            for pk, created_at in song_rows
+        ),
+        key=lambda item: (item[1], item[2], item[3]),
+        reverse=True,
+    )[:_TOP_CANDIDATES]
+
+    payload = {
+        'plays': sum(item['plays'] for item in song_totals.values()),
+        'income': str(sum((item['pay'] for item in song_totals.values()), Decimal('0'))),
+        'legacy_plays': sum(legacy_plays.values()),
+        'likes': _created_between(likes, start, covers_until).count(),
+        'new_followers': _created_between(followers, start, covers_until).count(),
+        'unique_listeners': _created_between(
+            PlayCount.objects.filter(songs__in=songs), start, covers_until,
+        ).values('user_id').distinct().count(),
+        'previous': {
+            'plays': int(previous['plays']),
+            'income': str(previous['pay']),
+            'likes': likes.filter(created_at__gte=previous_start, created_at__lt=previous_end).count()
+            if previous_start is not None else 0,
+            'followers': followers.filter(created_at__gte=previous_start, created_at__lt=previous_end).count()
+            if previous_start is not None else 0,
+        },
+        'hourly': hourly,
+        'daily': daily,
+        'city': distribution(PlayDimensionRollup.DIMENSION_CITY, _DISTRIBUTION_LIMIT),
+        'country': distribution(PlayDimensionRollup.DIMENSION_COUNTRY, _DISTRIBUTION_LIMIT),
+        'plan': distribution(PlayDimensionRollup.DIMENSION_PLAN),
+        'top_songs': candidates,
+    }
+    snapshot, _ = ArtistAnalyticsSnapshot.objects.update_or_create(
+        artist_id=artist_id,
+        period=period,
+        defaults={'day': today_date, 'covers_until': covers_until, 'payload': payload},
+    )
+    return snapshot
+
+
+def build_artist_snapshots(artist_ids: Iterable[int], *, now: datetime | None = None) -> int:
+    """Rebuild every period for the given artists; returns snapshots written."""
+    now = now or timezone.now()
+    written = 0
+    for artist_id in sorted({int(pk) for pk in artist_ids if pk}):
+        for period in PERIODS:
+            build_artist_snapshot(artist_id, period, now=now)
+            written += 1
+    return written
+
+
+def invalidate_artist_snapshots(artist_ids: Iterable[int]) -> None:
+    """Drop snapshots whose song set changed; they are rebuilt on the next read."""
+    ids = {int(pk) for pk in artist_ids if pk}
+    if ids:
+        ArtistAnalyticsSnapshot.objects.filter(artist_id__in=ids).delete()
+
+
+def refresh_artist_snapshots(*, played_since: datetime | None = None, batch_size: int = 100) -> dict[str, int]:
+    """Rebuild stored snapshots from an earlier day and those of artists played since ``played_since``."""
+    now = timezone.now()
+    stored = ArtistAnalyticsSnapshot.objects.values_list('artist_id', flat=True).distinct()
+    rollover = set(
+        ArtistAnalyticsSnapshot.objects.filter(day__lt=timezone.localdate(now))
+        .values_list('artist_id', flat=True).distinct()
+    )
+    played = set()
+    if played_since is not None:
+        played = set(
+            PlayRollup.objects.filter(
+                granularity=PlayRollup.GRANULARITY_HOUR,
+                bucket_start__gte=hour_bucket(played_since),
+                song__artist__analytics_snapshots__isnull=False,
+            ).values_list('song__artist_id', flat=True).distinct()
+        ) - rollover
+    artist_ids = sorted((rollover | played) & set(stored))
+    written = 0
+    for offset in range(0, len(artist_ids), max(1, batch_size)):
+        written += build_artist_snapshots(artist_ids[offset:offset + batch_size], now=now)
+    result = {'rollover_artists': len(rollover), 'played_artists': len(played), 'snapshots': written}
+    if written:
+        logger.info('Artist analytics snapshots refreshed result=%s', result)
+    return result
+
+
+def _snapshot(artist_id: int, period: str, now: datetime) -> ArtistAnalyticsSnapshot:
+    snapshot = ArtistAnalyticsSnapshot.objects.filter(artist_id=artist_id, period=period).first()
+    max_age = timedelta(seconds=max(3600, int(getattr(settings, 'ARTIST_ANALYTICS_SNAPSHOT_MAX_AGE', 86400))))
+    if (
+        snapshot is None
+        or snapshot.day != timezone.localdate(now)
+        or snapshot.covers_until < hour_bucket(now) - max_age
+    ):
+        snapshot = build_artist_snapshot(artist_id, period, now=now)
+    return snapshot
+
+
+def _change(current, previous):
+    if previous in (None, 0):
+        return None
+    return round(((float(current) - float(previous)) / float(previous)) * 100, 1)
+
+
+def _bucket_range(group: str, start: date, end: date):
+    current = start
+    while current <= end:
+        yield current
+        current = _shift_month(current, 1) if group == 'monthly' else current + timedelta(days=1)
+
+
+def artist_analytics(artist, period: str, chart_type: str = '') -> dict:
+    """The analytics endpoint's payload: stored snapshot plus the live delta."""
+    now = timezone.now()
+    today_date = timezone.localdate(now)
+    today = _day_start(today_date)
+    snapshot = _snapshot(artist.pk, period, now)
+    data = snapshot.payload
+    covers_until = snapshot.covers_until
+    start = _window(period, today_date)[0]
+    chart_type = chart_type or (
+        'hourly' if period == ArtistAnalyticsSnapshot.PERIOD_TODAY
+        else 'monthly' if period in {ArtistAnalyticsSnapshot.PERIOD_365D, ArtistAnalyticsSnapshot.PERIOD_ALL}
+        else 'daily'
+    )
+
+    hourly = dict(data['hourly'])
+    daily = {date.fromisoformat(key): value for key, value in data['daily'].items()}
+    song_delta = {}
+    delta_plays = 0
+    delta_pay = Decimal('0')
+    for song_id, bucket_start, plays, pay in PlayRollup.objects.filter(
+        _rollup_songs(artist.pk), granularity=PlayRollup.GRANULARITY_HOUR, bucket_start__gte=covers_until,
+    ).values_list('song_id', 'bucket_start', 'plays', 'pay'):
+        delta_plays += plays
+        delta_pay += Decimal(pay or 0)
+        song_delta[song_id] = song_delta.get(song_id, 0) + plays
+        key = _hour_key(bucket_start)
+        hourly[key] = hourly.get(key, 0) + plays
+        day = _local_day(bucket_start)
+        daily[day] = daily.get(day, 0) + plays
+
+    base_count = data['plays'] + delta_plays
+    current_play_count = base_count + data['legacy_plays']
+    income = Decimal(data['income']) + delta_pay
+    likes = data['likes'] + SongLike.objects.filter(
+        song__artist=artist, created_at__gte=covers_until,
+    ).exclude(song__status=Song.STATUS_DELETED).count()
+    new_followers = data['new_followers'] + Follow.objects.filter(
+        followed_artist=artist, created_at__gte=covers_until,
+    ).count()
+
+    counters = get_counters_bulk({
+        EngagementCounter.KIND_ARTIST: [artist.pk],
+        EngagementCounter.KIND_SONG: [item[0] for item in data['top_songs']],
+    })
+    total_followers = counters.get(EngagementCounter.KIND_ARTIST, {}).get(artist.pk, {}).get('followers', 0)
+    song_counters = counters.get(EngagementCounter.KIND_SONG, {})
+    ranked = sorted(
+        (
+            [song_id, plays + song_delta.get(song_id, 0), song_counters.get(song_id, {}).get('likes', 0), created_at]
+            for song_id, plays, _, created_at in data['top_songs']
+        ),
+        key=lambda item: (item[1], item[2], item[3]),
+        reverse=True,
+    )[:_TOP_SONGS]
+    songs = Song.objects.in_bulk([item[0] for item in ranked])
+    previous = data['previous']
+
+    summary = {
+        'total_plays': int(current_play_count),
+        'total_likes': likes,
+        'total_income': income,
+        'total_followers': total_followers,
+        'new_followers': new_followers if period != ArtistAnalyticsSnapshot.PERIOD_ALL else total_followers,
+        'unique_listeners': data['unique_listeners'],
+        'monthly_listeners': ArtistMonthlyListener.objects.filter(
+            artist=artist, updated_at__gte=now - timedelta(days=28),
+        ).count(),
+        'period': period,
+        'growth': {
+            'plays': _change(current_play_count, previous['plays']),
+            'likes': _change(likes, previous['likes']),
+            'income': _change(income, Decimal(previous['income'])),
+            'followers': _change(new_followers, previous['followers']),
+        },
+    }
+
+    if chart_type == 'hourly':
+        buckets = [today + timedelta(hours=hour) for hour in range(24)]
+        chart = [{'time': item.isoformat(), 'count': hourly.get(_hour_key(item), 0)} for item in buckets]
+    elif chart_type == 'monthly':
+        counts = {}
+        for day, value in daily.items():
+            month = day.replace(day=1)
+            counts[month] = counts.get(month, 0) + value
+        chart_end = today_date.replace(day=1)
+        if start is None:
+            chart_start = min(counts, default=chart_end)
+        else:
+            chart_start = timezone.localdate(start).replace(day=1)
+        chart = [{'time': item.isoformat(), 'count': counts.get(item, 0)} for item in _bucket_range('monthly', chart_start, chart_end)]
+    else:
+        chart_start = min(daily, default=today_date) if start is None else timezone.localdate(start)
+        chart = [{'time': item.isoformat(), 'count': daily.get(item, 0)} for item in _bucket_range('daily', chart_start, today_date)]
+
+    def distribution(rows, label):
+        return [{
+            label: value or 'Unknown',
+            'count': plays,
+            'percentage': round((plays / base_count * 100), 2) if base_count else 0,
+        } for value, plays, _ in rows]
+
+    top_songs = []
+    for song_id, plays, song_likes, _ in ranked:
+        song = songs.get(song_id)
+        if song is None:
+            continue
+        top_songs.append({
+            'id': song.id,
+            'title': song.title,
+            'title_en': song.title_en,
+            'cover_image': generate_signed_r2_url(song.cover_image) if song.cover_image else '',
+            'plays': int(plays),
+            'likes': int(song_likes),
+            'stream_share': round((int(plays) / current_play_count * 100), 2) if current_play_count else 0,
+        })
+
+    return {
+        'summary': summary,
+        'chart': {'type': chart_type, 'data': chart},
+        'city_distribution': distribution(data['city'], 'city'),
+        'country_distribution': distribution(data['country'], 'country'),
+        'plan_distribution': [{
+            'plan': value or User.PLAN_FREE,
+            'count': plays,
+            'income': Decimal(pay),
+            'percentage': round((plays / base_count * 100), 2) if base_count else 0,
+        } for value, plays, pay in sorted(data['plan'], key=lambda row: row[0])],
+        'top_songs': top_songs,
+    }
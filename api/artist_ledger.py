@@ -0,0 +1,343 @@
+"""Incremental per-song finance ledger for artists.
+
+``ArtistSongLedger`` holds, per artist and song, the earned play value, the
+paid/zero-value play counts and how much of those earnings payout requests
+have reserved, are still paying out (pending or approved) or have deposited
+(done). Finance screens read these rows instead of summing every play and
+replaying every historical ``DepositRequest``:
+
+* ``record_song_earnings`` adds a batch of plays with ``F()`` deltas inside the
+  ingestion transaction;
+* ``record_deposit_change`` moves a request's saved ``song_allocations`` between
+  the balances when it is created, changes status or is deleted;
+* an artist without rows is built on first read from the play ledger plus a
+  replay of their payout history (the allocation ``backfill_song_payout_allocations``
+  persists), as is any artist whose request has no usable saved allocation.
+
+``reconcile_artist_ledgers`` rebuilds every stored artist; it repairs drift
+from deleted plays and from rows built while a delta was still uncommitted.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from decimal import ROUND_DOWN, Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import ArtistSongLedger, DepositRequest, Song
+
+logger = logging.getLogger(__name__)
+
+FINANCE_QUANTUM = Decimal('0.00000001')
+LEDGER_STATUSES = (DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED, DepositRequest.STATUS_DONE)
+_PENDING_STATUSES = (DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED)
+_BALANCES = ('reserved', 'deposited', 'pending')
+_FIELDS = ('earned', 'paid_plays', 'zero_value_plays', *_BALANCES)
+_ZERO = Decimal('0')
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(FINANCE_QUANTUM)
+
+
+def _amount(value) -> Value:
+    return Value(_decimal(value), output_field=DecimalField(max_digits=20, decimal_places=8))
+
+
+def saved_song_allocations(summary) -> dict[int, Decimal]:
+    """The ``song_allocations`` persisted on a payout request's summary."""
+    if not isinstance(summary, dict):
+        return {}
+    raw = summary.get('song_allocations')
+    if isinstance(raw, dict):
+        items = raw.items()
+    elif isinstance(raw, list):
+        items = ((item.get('song_id'), item.get('amount')) for item in raw if isinstance(item, dict))
+    else:
+        return {}
+
+    allocations = {}
+    for song_id, amount in items:
+        try:
+            song_id = int(song_id)
+            value = max(_ZERO, _decimal(amount))
+        except (TypeError, ValueError, ArithmeticError):
+            continue
+        if value:
+            allocations[song_id] = allocations.get(song_id, _ZERO) + value
+    return allocations
+
+
+def allocate_across_songs(song_totals, already_allocated, amount) -> dict[int, Decimal]:
+    """Split ``amount`` over the songs' unallocated earnings, largest balance first."""
+    target = max(_ZERO, _decimal(amount))
+    available = {
+        song_id: max(_ZERO, _decimal(total) - _decimal(already_allocated.get(song_id, 0)))
+        for song_id, total in song_totals.items()
+    }
+    available = {song_id: value for song_id, value in available.items() if value > 0}
+    available_total = sum(available.values(), _ZERO)
+    target = min(target, available_total)
+    if target <= 0 or available_total <= 0:
+        return {}
+
+    ordered = sorted(available.items(), key=lambda item: (-item[1], item[0]))
+    allocations = {}
+    allocated_total = _ZERO
+    for song_id, balance in ordered:
+        share = (target * balance / available_total).quantize(FINANCE_QUANTUM, rounding=ROUND_DOWN)
+        share = min(balance, share)
+        if share > 0:
+            allocations[song_id] = share
+            allocated_total += share
+
+    remainder = target - allocated_total
+    if remainder > 0:
+        for song_id, balance in ordered:
+            capacity = balance - allocations.get(song_id, _ZERO)
+            if capacity <= 0:
+                continue
+            addition = min(capacity, remainder)
+            allocations[song_id] = allocations.get(song_id, _ZERO) + addition
+            remainder -= addition
+            if remainder <= 0:
+                break
+
+    return {song_id: _decimal(value) for song_id, value in allocations.items() if value > 0}
+
+
+def replay_song_allocations(song_totals, requests):
+    """Replay payout ``requests`` in submission order over ``song_totals``.
+
+    Returns ``(reserved, deposited, pending)`` dicts keyed by song id. Saved
+    allocations are used when they still fit; anything else is re-allocated.
+    """
+    reserved = {song_id: _ZERO for song_id in song_totals}
+    deposited = {song_id: _ZERO for song_id in song_totals}
+    pending = {song_id: _ZERO for song_id in song_totals}
+
+    for payout in requests:
+        saved = saved_song_allocations(payout.summary)
+        valid_saved = {
+            song_id: min(value, max(_ZERO, song_totals.get(song_id, _ZERO) - reserved.get(song_id, _ZERO)))
+            for song_id, value in saved.items()
+            if song_id in song_totals and value > 0
+        }
+        requested_amount = max(_ZERO, _decimal(payout.amount))
+        saved_total = sum(valid_saved.values(), _ZERO)
+        if not valid_saved or abs(saved_total - requested_amount) > FINANCE_QUANTUM:
+            allocation = allocate_across_songs(song_totals, reserved, requested_amount)
+        else:
+            allocation = valid_saved
+
+        for song_id, value in allocation.items():
+            reserved[song_id] = reserved.get(song_id, _ZERO) + value
+            if payout.status == DepositRequest.STATUS_DONE:
+                deposited[song_id] = deposited.get(song_id, _ZERO) + value
+            else:
+                pending[song_id] = pending.get(song_id, _ZERO) + value
+
+    return reserved, deposited, pending
+
+
+def song_earnings(songs) -> dict[int, dict]:
+    """Exact earned value and play counts for a ``Song`` queryset, from the play ledger."""
+    rows = songs.annotate(
+        ledger_earned=Coalesce(Sum('play_counts__pay'), _amount(0)),
+        ledger_paid=Count('play_counts', filter=Q(play_counts__pay__gt=0)),
+        ledger_zero=Count('play_counts', filter=Q(play_counts__pay=0)),
+    ).values_list('pk', 'ledger_earned', 'ledger_paid', 'ledger_zero')
+    return {
+        int(song_id): {'earned': _decimal(earned), 'paid_plays': int(paid or 0), 'zero_value_plays': int(zero or 0)}
+        for song_id, earned, paid, zero in rows
+    }
+
+
+def _rebuild(artist_id: int) -> tuple[dict[int, dict], int]:
+    with transaction.atomic():
+        # Derive only after the rows are locked: a concurrent delta is then
+        # either already visible to the sums or applied after this write.
+        existing = {
+            row.song_id: row
+            for row in ArtistSongLedger.objects.select_for_update().filter(artist_id=artist_id).order_by('pk')
+        }
+        ledger = song_earnings(Song.objects.filter(artist_id=artist_id))
+        reserved, deposited, pending = replay_song_allocations(
+            {song_id: values['earned'] for song_id, values in ledger.items()},
+            DepositRequest.objects.filter(artist_id=artist_id, status__in=LEDGER_STATUSES)
+            .order_by('submission_date', 'pk'),
+        )
+        for song_id, values in ledger.items():
+            values['reserved'] = reserved.get(song_id, _ZERO)
+            values['deposited'] = deposited.get(song_id, _ZERO)
+            values['pending'] = pending.get(song_id, _ZERO)
+
+        stale = [row.pk for song_id, row in existing.items() if song_id not in ledger]
+        if stale:
+            ArtistSongLedger.objects.filter(pk__in=stale).delete()
+        created = []
+        changed = []
+        for song_id, values in ledger.items():
+            row = existing.get(song_id)
+            if row is None:
+                created.append(ArtistSongLedger(artist_id=artist_id, song_id=song_id, **values))
+            elif any(getattr(row, field) != values[field] for field in _FIELDS):
+                for field in _FIELDS:
+                    setattr(row, field, values[field])
+                changed.append(row)
+        if changed:
+            ArtistSongLedger.objects.bulk_update(changed, _FIELDS, batch_size=500)
+        if created:
+            ArtistSongLedger.objects.bulk_create(created, batch_size=500, ignore_conflicts=True)
+    return ledger, len(stale) + len(created) + len(changed)
+
+
+def rebuild_artist_ledger(artist_id) -> dict[int, dict]:
+    """Re-derive one artist's rows from plays and payout history; returns them by song id."""
+    return _rebuild(int(artist_id))[0]
+
+
+def rebuild_stored_ledgers(artist_ids: Iterable[int]) -> None:
+    """Rebuild the given artists that already have a ledger; others build on first read."""
+    ids = sorted({int(pk) for pk in artist_ids if pk})
+    if not ids:
+        return
+    stored = ArtistSongLedger.objects.filter(artist_id__in=ids).values_list('artist_id', flat=True).distinct()
+    for artist_id in sorted(set(stored)):
+        _rebuild(artist_id)
+
+
+def artist_ledger(artist_id) -> dict[int, dict]:
+    """Ledger values keyed by song id; builds the artist's rows when none exist yet.
+
+    Songs without a row (no play since the ledger was built) have no earnings
+    or allocations yet and are simply absent.
+    """
+    artist_id = int(artist_id)
+    rows = {
+        row['song_id']: row
+        for row in ArtistSongLedger.objects.filter(artist_id=artist_id).values('song_id', *_FIELDS)
+    }
+    if not rows:
+        return rebuild_artist_ledger(artist_id)
+    for row in rows.values():
+        for field in ('earned', *_BALANCES):
+            row[field] = _decimal(row[field])
+    return rows
+
+
+def record_song_earnings(plays: Iterable[tuple[int, int, Decimal]]) -> None:
+    """Add ``(artist_id, song_id, pay)`` plays inside the caller's transaction.
+
+    A song without a row gets one derived from its plays (this batch included)
+    when its artist's ledger already exists; an artist without a ledger is left
+    alone and built on first read, which already includes these plays.
+    """
+    totals = {}
+    for artist_id, song_id, pay in plays:
+        if not artist_id or not song_id:
+            continue
+        pay = max(_ZERO, _decimal(pay))
+        key = (int(artist_id), int(song_id))
+        earned, paid, zero = totals.get(key, (_ZERO, 0, 0))
+        totals[key] = (earned + pay, paid + int(pay > 0), zero + int(pay == 0))
+    if not totals:
+        return
+
+    lookup = Q()
+    for artist_id, song_id in totals:
+        lookup |= Q(artist_id=artist_id, song_id=song_id)
+    existing = set(ArtistSongLedger.objects.filter(lookup).values_list('artist_id', 'song_id'))
+    if existing:
+        def delta(field, index):
+            return F(field) + Case(
+                *[When(artist_id=artist_id, song_id=song_id, then=Value(totals[(artist_id, song_id)][index]))
+                  for artist_id, song_id in sorted(existing)],
+                default=Value(0),
+                output_field=ArtistSongLedger._meta.get_field(field),
+            )
+
+        ArtistSongLedger.objects.filter(lookup).update(
+            earned=delta('earned', 0),
+            paid_plays=delta('paid_plays', 1),
+            zero_value_plays=delta('zero_value_plays', 2),
+        )
+
+    missing = set(totals) - existing
+    if not missing:
+        return
+    stored = set(
+        ArtistSongLedger.objects.filter(artist_id__in={artist_id for artist_id, _ in missing})
+        .values_list('artist_id', flat=True).distinct()
+    )
+    seed = {song_id: artist_id for artist_id, song_id in missing if artist_id in stored}
+    if seed:
+        earnings = song_earnings(Song.objects.filter(pk__in=list(seed)))
+        ArtistSongLedger.objects.bulk_create(
+            [
+                ArtistSongLedger(artist_id=seed[song_id], song_id=song_id, **values)
+                for song_id, values in earnings.items()
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def _weights(status) -> dict[str, int]:
+    return {
+        'reserved': int(status in LEDGER_STATUSES),
+        'deposited': int(status == DepositRequest.STATUS_DONE),
+        'pending': int(status in _PENDING_STATUSES),
+    }
+
+
+def record_deposit_change(deposit, previous_status, status) -> None:
+    """Move ``deposit``'s saved allocation between balances inside the caller's transaction.
+
+    ``previous_status`` is ``None`` for a new request and ``status`` is
+    ``None`` for a deleted one. A request without a saved allocation that
+    matches its amount is placed by rebuilding the artist after commit.
+    """
+    artist_id = deposit.artist_id
+    before, after = _weights(previous_status), _weights(status)
+    deltas = {field: after[field] - before[field] for field in _BALANCES if after[field] != before[field]}
+    if not artist_id or not deltas:
+        return
+    allocation = saved_song_allocations(deposit.summary)
+    requested = max(_ZERO, _decimal(deposit.amount))
+    if not allocation or abs(sum(allocation.values(), _ZERO) - requested) > FINANCE_QUANTUM:
+        transaction.on_commit(lambda: rebuild_stored_ledgers([artist_id]))
+        return
+    ArtistSongLedger.objects.filter(artist_id=artist_id, song_id__in=list(allocation)).update(**{
+        field: F(field) + Case(
+            *[When(song_id=song_id, then=_amount(amount * sign)) for song_id, amount in sorted(allocation.items())],
+            default=_amount(0),
+            output_field=DecimalField(max_digits=20, decimal_places=8),
+        )
+        for field, sign in deltas.items()
+    })
+
+
+def reconcile_artist_ledgers(*, batch_size: int = 200) -> dict[str, int]:
+    """Rebuild every stored artist ledger; returns artists checked and rows changed."""
+    artists = 0
+    changed = 0
+    last_id = 0
+    while True:
+        batch = list(
+            ArtistSongLedger.objects.filter(artist_id__gt=last_id)
+            .order_by('artist_id').values_list('artist_id', flat=True).distinct()[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1]
+        for artist_id in batch:
+            changed += _rebuild(artist_id)[1]
+        artists += len(batch)
+    result = {'artists': artists, 'rows_changed': changed}
+    if changed:
+        logger.info('Artist finance ledgers reconciled result=%s', result)
+    return result
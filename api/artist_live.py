@@ -0,0 +1,168 @@
+"""Realtime artist dashboard counters for Django Channels.
+
+Write paths (stream unwraps, committed plays, follows) only add the affected
+artist to a Redis dirty set. ``run_artist_live_publisher`` drains that set,
+plus artists whose listeners' tracks have ended, on a short interval, computes
+live listeners, today's plays and follower counts for the whole batch in a few
+bulk reads, and sends one group message per artist. However many dashboards
+are open, each change costs one fan-out.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .live_presence import artist_live_listener_counts, pop_expired_artists
+from .models import Follow, Song, User
+from .play_rollups import day_bucket, window_play_totals
+from .recommendation_runtime import get_redis_client
+
+logger = logging.getLogger(__name__)
+ARTIST_LIVE_GROUP_PREFIX = "artist-live"
+
+_DIRTY_KEY = "sedabox:artist-live:dirty:v1"
+_NEW_FOLLOWERS_KEY = "sedabox:artist-live:new-followers:{}:v1"
+_NEW_FOLLOWERS_LIMIT = 20
+_NEW_FOLLOWERS_TTL = 10 * 60
+
+
+def artist_live_group_name(artist_id: int) -> str:
+    return f"{ARTIST_LIVE_GROUP_PREFIX}.{int(artist_id)}"
+
+
+def mark_artists_dirty(artist_ids: Iterable[int]) -> None:
+    ids = {int(pk) for pk in artist_ids if pk}
+    client = get_redis_client()
+    if client is None or not ids:
+        return
+    try:
+        client.sadd(_DIRTY_KEY, *ids)
+    except Exception:
+        pass
+
+
+def schedule_artist_live_update(artist_ids: Iterable[int]) -> None:
+    ids = tuple(int(pk) for pk in artist_ids if pk)
+    if ids:
+        transaction.on_commit(lambda: mark_artists_dirty(ids))
+
+
+def schedule_song_artists_live_update(song_ids: Iterable[int]) -> None:
+    ids = tuple(int(pk) for pk in song_ids if pk)
+    if ids:
+        transaction.on_commit(lambda: mark_artists_dirty(
+            Song.objects.filter(pk__in=ids).values_list("artist_id", flat=True).distinct()
+        ))
+
+
+def _record_new_follower(artist_id: int, user_id: int) -> None:
+    client = get_redis_client()
+    if client is None:
+        return
+    key = _NEW_FOLLOWERS_KEY.format(artist_id)
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.rpush(key, user_id)
+        pipe.ltrim(key, -_NEW_FOLLOWERS_LIMIT, -1)
+        pipe.expire(key, _NEW_FOLLOWERS_TTL)
+        pipe.sadd(_DIRTY_KEY, artist_id)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def schedule_new_follower(artist_id: int, user_id: int) -> None:
+    if artist_id and user_id:
+        transaction.on_commit(lambda: _record_new_follower(int(artist_id), int(user_id)))
+
+
+def artist_live_snapshots(artist_ids: Iterable[int]) -> dict[int, dict]:
+    """Current counters for many artists from one Redis pipeline and two queries."""
+    ids = sorted({int(pk) for pk in artist_ids if pk})
+    if not ids:
+        return {}
+    live = artist_live_listener_counts(ids)
+    plays = window_play_totals(
+        day_bucket(timezone.now()),
+        group_by="song__artist_id",
+        filters=Q(song__artist_id__in=ids),
+    )
+    followers = dict(
+        Follow.objects.filter(followed_artist_id__in=ids)
+        .values("followed_artist_id").annotate(total=Count("id"))
+        .values_list("followed_artist_id", "total")
+    )
+    return {
+        artist_id: {
+            "artist_id": artist_id,
+            "live_listeners": live.get(artist_id, 0),
+            "plays_today": int(plays.get(artist_id, {}).get("plays", 0)),
+            "followers_count": int(followers.get(artist_id, 0)),
+        }
+        for artist_id in ids
+    }
+
+
+def _pop_new_followers(client, artist_ids: list[int]) -> dict[int, list[int]]:
+    pipe = client.pipeline(transaction=True)
+    for artist_id in artist_ids:
+        key = _NEW_FOLLOWERS_KEY.format(artist_id)
+        pipe.lrange(key, 0, -1)
+        pipe.delete(key)
+    results = pipe.execute()
+    return {
+        artist_id: [int(value) for value in results[index * 2] or ()]
+        for index, artist_id in enumerate(artist_ids)
+    }
+
+
+def publish_pending_artist_live_updates(limit: int = 500) -> int:
+    """Send one coalesced counter event per dirty artist; returns artists sent."""
+    client = get_redis_client()
+    channel_layer = get_channel_layer()
+    if client is None or channel_layer is None:
+        return 0
+    try:
+        artist_ids = {int(value) for value in client.spop(_DIRTY_KEY, max(1, int(limit))) or ()}
+        # Listeners whose track ended leave without a write, so their artists
+        # come from the expiry index rather than the dirty set.
+        artist_ids = sorted(artist_ids.union(pop_expired_artists(limit)))
+        if not artist_ids:
+            return 0
+        new_followers = _pop_new_followers(client, artist_ids)
+    except Exception:
+        logger.warning("Artist live dirty set unavailable", exc_info=True)
+        return 0
+
+    snapshots = artist_live_snapshots(artist_ids)
+    follower_ids = {user_id for ids in new_followers.values() for user_id in ids}
+    users = {
+        row["id"]: row
+        for row in User.objects.filter(pk__in=follower_ids, is_active=True)
+        .values("id", "unique_id", "first_name", "last_name")
+    } if follower_ids else {}
+    for artist_id in artist_ids:
+        payload = dict(snapshots[artist_id])
+        payload["new_followers"] = [
+            {
+                "id": user_id,
+                "unique_id": users[user_id]["unique_id"],
+                "name": f"{users[user_id]['first_name']} {users[user_id]['last_name']}".strip(),
+            }
+            for user_id in new_followers.get(artist_id, ())
+            if user_id in users
+        ]
+        try:
+            async_to_sync(channel_layer.group_send)(
+                artist_live_group_name(artist_id),
+                {"type": "artist_live_event", "event_type": "artist.live", "payload": payload},
+            )
+        except Exception:
+            logger.exception("Failed to publish artist live event artist_id=%s", artist_id)
+    return len(artist_ids)
@@ -41,6 +41,7 @@ import hashlib
 import re
 from .recommendation_runtime import redis_delete, redis_get, redis_set
 from .auth_errors import AuthAPIView, auth_error, validation_error
+from .session_cache import invalidate_auth_cache
 from .utils import MediaPipelineError
 from .admin_permissions import employee_session_version, is_employee
 
@@ -265,6 +266,7 @@ def consume_otp(user: User, purpose: str, raw_code: str, *, max_attempts: int =
         OtpCode.objects.filter(pk=otp_obj.pk).update(consumed=True)
         if purpose in {OtpCode.PURPOSE_VERIFY, OtpCode.PURPOSE_LOGIN} and not user.is_verified:
             User.objects.filter(pk=user.pk).update(is_verified=True)
+            invalidate_auth_cache(user.pk)
             user.is_verified = True
         redis_delete(cache_key)
         return 'ok'
@@ -1134,6 +1136,7 @@ class PasswordResetView(AuthAPIView):
             user.save()
             # revoke refresh tokens
             RefreshToken.objects.filter(user=user, revoked_at__isnull=True).update(revoked_at=timezone.now())
+            invalidate_auth_cache(user.pk)
             return Response({'status': 'password_reset'})
         return auth_error('VALIDATION_ERROR', status.HTTP_400_BAD_REQUEST, fields={'phone': ['این فیلد الزامی است.']})
 
@@ -1286,6 +1289,7 @@ class LogoutView(AuthAPIView):
             RefreshToken.objects.filter(
                 pk=matching_id, revoked_at__isnull=True,
             ).update(revoked_at=timezone.now())
+            invalidate_auth_cache(user_id)
         return Response({'status': 'ok'})
 
 
@@ -1419,6 +1423,7 @@ class SessionRevokeOtherView(AuthAPIView):
             revoked_at__isnull=True,
             expires_at__gt=timezone.now(),
         ).exclude(pk=current_session_id).update(revoked_at=timezone.now())
+        invalidate_auth_cache(request.user.pk)
 
         return Response({'status': 'ok', 'revoked_count': revoked_count})
 
@@ -1475,6 +1480,7 @@ class ChangePasswordView(AuthAPIView):
             device_type=device_type,
             os_info=os_info
         ).update(revoked_at=timezone.now())
+        invalidate_auth_cache(user.pk)
         
         return Response({'status': 'ok', 'message': 'رمز عبور با موفقیت تغییر کرد.'})
 
@@ -1,9 +1,9 @@
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
 
-from .models import RefreshToken
+from .session_cache import authenticated_session
 from .subscriptions import normalize_expired_premium
 
 
@@ -12,29 +12,33 @@ class OptionalJWTAuthentication(JWTAuthentication):
 
     def authenticate(self, request):
         try:
-            authenticated = super().authenticate(request)
-            if authenticated is not None:
-                user, token = authenticated
-                session_id = token.get("session_id")
-                if session_id is None:
-                    # Access tokens issued before per-device binding cannot be
-                    # mapped safely to a session. Force one refresh so active
-                    # devices receive a bound token; revoked devices cannot.
-                    raise AuthenticationFailed("Token session is revoked.", code="token_revoked")
-                session_is_active = RefreshToken.objects.filter(
-                    pk=session_id,
-                    user_id=user.id,
-                    revoked_at__isnull=True,
-                    expires_at__gt=timezone.now(),
-                ).exists()
-                if not session_is_active:
-                    raise AuthenticationFailed("Token session is revoked.", code="token_revoked")
-                normalize_expired_premium(user)
-                return user, token
-            return None
+            return super().authenticate(request)
         except AuthenticationFailed as error:
             if getattr(error, "code", "") == "token_revoked":
                 raise
             return None
         except (InvalidToken, TokenError, UnicodeError, TypeError, ValueError):
             return None
+
+    def get_user(self, validated_token):
+        # The user row and session state come from ``session_cache``, so a warm
+        # request authenticates without touching the database.
+        session_id = validated_token.get("session_id")
+        if session_id is None:
+            # Access tokens issued before per-device binding cannot be
+            # mapped safely to a session. Force one refresh so active
+            # devices receive a bound token; revoked devices cannot.
+            raise AuthenticationFailed("Token session is revoked.", code="token_revoked")
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        user, session_is_active = authenticated_session(user_id, session_id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if not session_is_active:
+            raise AuthenticationFailed("Token session is revoked.", code="token_revoked")
+        normalize_expired_premium(user)
+        return user
@@ -0,0 +1,84 @@
+"""Version-keyed cache for the user-independent part of card payloads.
+
+Card serializers render titles, localized names, genres, featured artists and
+slugs once per ``(serializer, entity, updated_at, language, catalog version)``
+and keep the result in a small in-process LRU backed by the shared cache.
+Everything a response varies on per user or per minute (like state, counts,
+stream/preview URLs, cover signatures) is computed fresh and merged on top.
+
+The catalog version is bumped by every write that can change a fragment
+(songs, artists, albums, taxonomy rows and the song relations), so stale
+fragments are never read; they simply expire.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_LOCAL: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+_LOCAL_LOCK = threading.Lock()
+# Bounds staleness when the shared cache is down and version bumps are lost.
+_LOCAL_MAX_AGE = 300
+
+
+def fragment_key(kind: str, pk, stamp: str, variant: str, version) -> str:
+    return f"card-fragment:{kind}:{int(pk)}:{stamp}:{variant}:{version}:v1"
+
+
+def _remember(entries: dict[str, dict]) -> None:
+    limit = max(0, int(getattr(settings, 'CARD_FRAGMENT_LOCAL_SIZE', 4096)))
+    if not limit:
+        return
+    expires_at = time.monotonic() + _LOCAL_MAX_AGE
+    with _LOCAL_LOCK:
+        for key, fragment in entries.items():
+            _LOCAL[key] = (expires_at, fragment)
+            _LOCAL.move_to_end(key)
+        while len(_LOCAL) > limit:
+            _LOCAL.popitem(last=False)
+
+
+def get_fragments(keys) -> dict[str, dict]:
+    """Cached fragments for ``keys``: local LRU first, then one shared-cache read.
+
+    Fragments are shared between responses and must be treated as read-only.
+    """
+    found = {}
+    missing = []
+    now = time.monotonic()
+    with _LOCAL_LOCK:
+        for key in dict.fromkeys(keys):
+            entry = _LOCAL.get(key)
+            if entry is None or entry[0] < now:
+                missing.append(key)
+            else:
+                _LOCAL.move_to_end(key)
+                found[key] = entry[1]
+    if missing:
+        try:
+            shared = {key: value for key, value in cache.get_many(missing).items() if isinstance(value, dict)}
+        except Exception as exc:
+            logger.debug("Card fragment cache read failed: %s", exc)
+            shared = {}
+        if shared:
+            _remember(shared)
+            found.update(shared)
+    return found
+
+
+def store_fragments(entries: dict[str, dict]) -> None:
+    if not entries:
+        return
+    _remember(entries)
+    try:
+        cache.set_many(entries, timeout=int(getattr(settings, 'CARD_FRAGMENT_TTL', 3600)))
+    except Exception as exc:
+        logger.debug("Card fragment cache write failed: %s", exc)
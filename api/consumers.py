@@ -8,7 +8,8 @@ from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
-from .models import Notification, User
+from .artist_live import artist_live_group_name, artist_live_snapshots
+from .models import Artist, Notification, User
 from .realtime_notifications import (
     normalize_notification_role,
     notification_group_name,
@@ -16,6 +17,7 @@ from .realtime_notifications import (
 
 logger = logging.getLogger(__name__)
 PUBLIC_SUBPROTOCOL = "sedabox.notifications"
+ARTIST_LIVE_SUBPROTOCOL = "sedabox.artist-live"
 GROUP_REFRESH_INTERVAL_SECONDS = 60
 
 
@@ -170,3 +172,111 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
             recipient_role=recipient_role,
             has_read=False,
         ).count()
+
+
+class ArtistLiveConsumer(AsyncJsonWebsocketConsumer):
+    """Live listener, play and follower counters for one artist's dashboard."""
+
+    group_name: str | None = None
+    artist_id: int | None = None
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated or not user.is_active:
+            logger.warning(
+                "Artist live socket rejected: auth_status=%s token_source=%s path=%s",
+                self.scope.get("ws_auth_status", "unknown"),
+                self.scope.get("ws_token_source", "unknown"),
+                self.scope.get("path", ""),
+            )
+            await self.close(code=4401)
+            return
+
+        self.artist_id = await self._artist_id(user.pk)
+        if not self.artist_id:
+            logger.warning("Artist live socket rejected: no artist profile user_id=%s", user.pk)
+            await self.close(code=4403)
+            return
+
+        if self.channel_layer is None:
+            logger.error("Artist live socket rejected: channel layer is unavailable")
+            await self.close(code=1011)
+            return
+
+        self.group_name = artist_live_group_name(self.artist_id)
+        try:
+            await self.channel_layer.group_add(self.group_name, self.channel_name)
+        except Exception:
+            logger.exception("Artist live socket group_add failed artist_id=%s", self.artist_id)
+            self.group_name = None
+            await self.close(code=1011)
+            return
+
+        accepted_protocol = (
+            ARTIST_LIVE_SUBPROTOCOL
+            if ARTIST_LIVE_SUBPROTOCOL in self.scope.get("subprotocols", ())
+            else None
+        )
+        await self.accept(subprotocol=accepted_protocol)
+        self._last_group_refresh = time.monotonic()
+
+        try:
+            snapshot = await self._snapshot(self.artist_id)
+        except Exception:
+            logger.exception("Artist live snapshot failed artist_id=%s", self.artist_id)
+            await self.close(code=1011)
+            return
+        await self.send_json({"type": "artist.live.connected", **snapshot, "new_followers": []})
+
+    async def disconnect(self, close_code):
+        if self.group_name and self.channel_layer is not None:
+            try:
+                await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            except Exception:
+                logger.warning(
+                    "Artist live socket group_discard failed group=%s",
+                    self.group_name,
+                    exc_info=True,
+                )
+            finally:
+                self.group_name = None
+
+    async def receive_json(self, content, **kwargs):
+        if isinstance(content, dict) and content.get("type") == "ping":
+            if (
+                self.group_name
+                and self.channel_layer is not None
+                and time.monotonic() - getattr(self, "_last_group_refresh", 0)
+                >= GROUP_REFRESH_INTERVAL_SECONDS
+            ):
+                try:
+                    await self.channel_layer.group_add(self.group_name, self.channel_name)
+                    self._last_group_refresh = time.monotonic()
+                except Exception:
+                    logger.warning(
+                        "Artist live socket group refresh failed group=%s",
+                        self.group_name,
+                        exc_info=True,
+                    )
+                    await self.close(code=1011)
+                    return
+            await self.send_json({"type": "pong", "ts": content.get("ts")})
+
+    async def artist_live_event(self, event):
+        payload = event.get("payload") or {}
+        if event.get("event_type") != "artist.live" or not isinstance(payload, dict):
+            return
+        if payload.get("artist_id") != self.artist_id:
+            return
+        await self.send_json({"type": "artist.live", **payload})
+
+    @database_sync_to_async
+    def _artist_id(self, user_id: int) -> int | None:
+        user = User.objects.only("roles").filter(pk=user_id, is_active=True).first()
+        if not user or User.ROLE_ARTIST not in (user.roles or []):
+            return None
+        return Artist.objects.filter(user_id=user_id).values_list("id", flat=True).first()
+
+    @database_sync_to_async
+    def _snapshot(self, artist_id: int) -> dict:
+        return artist_live_snapshots([artist_id])[artist_id]
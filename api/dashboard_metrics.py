@@ -0,0 +1,497 @@
+"""Running totals and hourly windows for the owner home dashboard.
+
+The dashboard used to count and sum plays, payments and payout requests on
+every load. Now:
+
+* ``record_dashboard_plays`` queues recorded plays in a Redis hash of hour
+  buckets once the play transaction commits, so concurrent plays never wait
+  on the shared counter rows; ``flush_dashboard_plays`` (maintenance worker)
+  moves them into the all-time ``plays`` counter and the hour buckets, and
+  dashboard reads add what is still queued. Without Redis the deltas are
+  written right after the play commits;
+* payment and payout saves move one row between ``payments:<status>`` /
+  ``payouts:<status>`` counters (successful payments also feed the hourly
+  ``revenue`` bucket of their creation hour);
+* the top-artists leaderboard is rebuilt in the background by
+  ``refresh_top_artists`` and read from the cache.
+
+Missing counters are derived from the source tables on first read, so an empty
+table is correct from the first request. ``rebuild_dashboard_metrics`` derives
+everything again; the maintenance worker runs it to repair drift from bulk
+updates that bypass signals. Hour buckets are kept for ``_RETENTION``; the play
+hours are re-derived from hourly ``PlayRollup`` rows, which outlive them.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import (
+    Artist,
+    ArtistAuth,
+    DashboardCounter,
+    DashboardHourlyRollup,
+    DepositRequest,
+    PaymentTransaction,
+    PlayRollup,
+    Song,
+    User,
+)
+from .performance import cache_get, cache_set
+from .play_rollups import hour_bucket, window_play_totals
+from .recommendation_runtime import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+PLAYS_KEY = 'plays'
+TOP_ARTISTS_CACHE_KEY = 'admin-dashboard:top-artists:v1'
+DIRECTORY_CACHE_KEY = 'admin-dashboard:directory:v1'
+PAYMENT_STATUSES = tuple(value for value, _ in PaymentTransaction.STATUS_CHOICES)
+PAYOUT_STATUSES = tuple(value for value, _ in DepositRequest.STATUS_CHOICES)
+TOP_ARTISTS = 6
+_PLAYS = DashboardHourlyRollup.METRIC_PLAYS
+_REVENUE = DashboardHourlyRollup.METRIC_REVENUE
+_RETENTION = timedelta(days=31)
+_ZERO = Decimal('0')
+_PENDING_PLAYS_KEY = 'sedabox:dashboard:pending-plays:v1'
+# Queued deltas outlive several missed flush cycles; the rebuild repairs the rest.
+_PENDING_TTL = 7 * 24 * 60 * 60
+# Pay is queued as an integer count of the counters' smallest unit.
+_AMOUNT_PLACES = DashboardCounter._meta.get_field('amount').decimal_places
+
+# KEYS: pending plays hash. ARGV: field, negated amount pairs snapshotted by a
+# rebuild. Fields left at zero are removed; a negative remainder (a flush
+# drained the amounts while the rebuild held the counter locks) cancels on the
+# next flush.
+_SUBTRACT_PENDING_LUA = """
+for i = 1, #ARGV, 2 do
+    if redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1]) == 0 then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+return 1
+"""
+
+
+def payment_key(status: str) -> str:
+    return f'payments:{status}'
+
+
+def payout_key(status: str) -> str:
+    return f'payouts:{status}'
+
+
+_KEYS = (
+    PLAYS_KEY,
+    *(payment_key(status) for status in PAYMENT_STATUSES),
+    *(payout_key(status) for status in PAYOUT_STATUSES),
+)
+
+
+def _retention_cutoff() -> datetime:
+    return hour_bucket(timezone.now()) - _RETENTION
+
+
+def _adjust(deltas: dict[str, tuple[int, Decimal]]) -> None:
+    """Apply counter deltas; a missing counter is derived on first read instead."""
+    for key, (count, amount) in sorted(deltas.items()):
+        if count or amount:
+            DashboardCounter.objects.filter(key=key).update(
+                count=F('count') + count, amount=F('amount') + amount,
+            )
+
+
+def _add_hourly(metric: str, buckets: dict[datetime, tuple[int, Decimal]]) -> None:
+    cutoff = _retention_cutoff()
+    rows = sorted(
+        (bucket, count, amount) for bucket, (count, amount) in buckets.items()
+        if bucket >= cutoff and (count or amount)
+    )
+    if not rows:
+        return
+    if connection.vendor == 'postgresql':
+        table = connection.ops.quote_name(DashboardHourlyRollup._meta.db_table)
+        placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+        params = []
+        for bucket, count, amount in rows:
+            params.extend((metric, bucket, count, amount))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (metric, bucket_start, count, amount) '
+                f'VALUES {placeholders} '
+                'ON CONFLICT (metric, bucket_start) DO UPDATE SET '
+                f'count = {table}.count + EXCLUDED.count, '
+                f'amount = {table}.amount + EXCLUDED.amount',
+                params,
+            )
+        return
+    for bucket, count, amount in rows:
+        lookup = DashboardHourlyRollup.objects.filter(metric=metric, bucket_start=bucket)
+        updates = {'count': F('count') + count, 'amount': F('amount') + amount}
+        if lookup.update(**updates):
+            continue
+        try:
+            with transaction.atomic():
+                DashboardHourlyRollup.objects.create(
+                    metric=metric, bucket_start=bucket, count=count, amount=amount,
+                )
+        except IntegrityError:
+            lookup.update(**updates)
+
+
+def _apply_play_buckets(buckets: dict[datetime, tuple[int, Decimal]]) -> None:
+    _adjust({PLAYS_KEY: (
+        sum(count for count, _ in buckets.values()),
+        sum((amount for _, amount in buckets.values()), _ZERO),
+    )})
+    _add_hourly(_PLAYS, buckets)
+
+
+def _push_pending_plays(client, buckets: dict[datetime, tuple[int, Decimal]]) -> None:
+    pipe = client.pipeline(transaction=True)
+    for bucket, (count, amount) in buckets.items():
+        stamp = int(bucket.timestamp())
+        pipe.hincrby(_PENDING_PLAYS_KEY, f'plays:{stamp}', int(count))
+        pipe.hincrby(_PENDING_PLAYS_KEY, f'pay:{stamp}', int(amount.scaleb(_AMOUNT_PLACES).to_integral_value()))
+    pipe.expire(_PENDING_PLAYS_KEY, _PENDING_TTL)
+    pipe.execute()
+
+
+def _parse_pending_plays(raw) -> dict[datetime, tuple[int, Decimal]]:
+    buckets: dict[datetime, tuple[int, Decimal]] = {}
+    for field, value in (raw or {}).items():
+        name, _, stamp = str(field).partition(':')
+        try:
+            bucket = datetime.fromtimestamp(int(stamp), tz=dt_timezone.utc)
+            value = int(value)
+        except (TypeError, ValueError, OverflowError):
+            continue
+        count, amount = buckets.get(bucket, (0, _ZERO))
+        if name == 'plays':
+            buckets[bucket] = (count + value, amount)
+        elif name == 'pay':
+            buckets[bucket] = (count, amount + Decimal(value).scaleb(-_AMOUNT_PLACES))
+    return buckets
+
+
+def _queue_play_buckets(buckets: dict[datetime, tuple[int, Decimal]]) -> None:
+    client = get_redis_client()
+    if client is not None:
+        try:
+            _push_pending_plays(client, buckets)
+            return
+        except Exception as exc:
+            logger.warning('Dashboard play queue unavailable; writing counters directly: %s', exc)
+    with transaction.atomic():
+        _apply_play_buckets(buckets)
+
+
+def record_dashboard_plays(events: Iterable[dict]) -> None:
+    """Queue plays (``played_at`` and ``pay`` per event) once the play transaction commits."""
+    buckets: dict[datetime, tuple[int, Decimal]] = {}
+    for event in events:
+        bucket = hour_bucket(event['played_at'])
+        count, amount = buckets.get(bucket, (0, _ZERO))
+        buckets[bucket] = (count + 1, amount + Decimal(str(event.get('pay') or 0)))
+    if buckets:
+        transaction.on_commit(lambda: _queue_play_buckets(buckets))
+
+
+def flush_dashboard_plays() -> int:
+    """Move queued plays into the counters and hour buckets; returns buckets written."""
+    client = get_redis_client()
+    if client is None:
+        return 0
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.hgetall(_PENDING_PLAYS_KEY)
+        pipe.delete(_PENDING_PLAYS_KEY)
+        raw, _ = pipe.execute()
+    except Exception as exc:
+        logger.warning('Dashboard play queue unavailable: %s', exc)
+        return 0
+    buckets = _parse_pending_plays(raw)
+    if not buckets:
+        return 0
+    try:
+        with transaction.atomic():
+            _apply_play_buckets(buckets)
+    except Exception:
+        try:
+            _push_pending_plays(client, buckets)
+        except Exception:
+            logger.exception('Could not restore queued dashboard plays buckets=%s', len(buckets))
+        raise
+    return len(buckets)
+
+
+def _pending_play_buckets() -> dict[datetime, tuple[int, Decimal]]:
+    client = get_redis_client()
+    if client is None:
+        return {}
+    try:
+        return _parse_pending_plays(client.hgetall(_PENDING_PLAYS_KEY))
+    except Exception:
+        return {}
+
+
+def _status_deltas(key, previous, current) -> dict[str, tuple[int, Decimal]]:
+    deltas: dict[str, tuple[int, Decimal]] = {}
+    for state, sign in ((previous, -1), (current, 1)):
+        if state is None:
+            continue
+        status, amount = state
+        count, total = deltas.get(key(status), (0, _ZERO))
+        deltas[key(status)] = (count + sign, total + sign * Decimal(str(amount or 0)))
+    return deltas
+
+
+def record_payment_change(previous, current, created_at=None) -> None:
+    """Move a payment between status counters inside the saving transaction.
+
+    ``previous`` and ``current`` are ``(status, amount)`` or ``None`` for a new
+    or deleted payment; ``created_at`` places successful revenue in its hour.
+    """
+    if previous == current:
+        return
+    _adjust(_status_deltas(payment_key, previous, current))
+    revenue = _status_deltas(lambda status: status, previous, current).get(PaymentTransaction.STATUS_SUCCESS)
+    if revenue and created_at is not None:
+        _add_hourly(_REVENUE, {hour_bucket(created_at): revenue})
+
+
+def record_payout_change(previous, current) -> None:
+    """Move a payout request between status counters; same arguments as payments."""
+    if previous != current:
+        _adjust(_status_deltas(payout_key, previous, current))
+
+
+def _exact_counters() -> dict[str, tuple[int, Decimal]]:
+    plays = window_play_totals(None, group_by=None)
+    exact = {key: (0, _ZERO) for key in _KEYS}
+    exact[PLAYS_KEY] = (plays['plays'], plays['pay'])
+    for model, key in ((PaymentTransaction, payment_key), (DepositRequest, payout_key)):
+        for row in model.objects.values('status').annotate(count=Count('pk'), amount=Sum('amount')):
+            exact[key(row['status'])] = (row['count'], row['amount'] or _ZERO)
+    return exact
+
+
+def _exact_hourly(cutoff: datetime) -> dict[tuple[str, datetime], tuple[int, Decimal]]:
+    exact = {}
+    plays = (
+        PlayRollup.objects.filter(granularity=PlayRollup.GRANULARITY_HOUR, bucket_start__gte=cutoff)
+        .values('bucket_start').annotate(count=Sum('plays'), amount=Sum('pay'))
+    )
+    for row in plays:
+        exact[(_PLAYS, row['bucket_start'])] = (int(row['count'] or 0), row['amount'] or _ZERO)
+    revenue = (
+        PaymentTransaction.objects.filter(status=PaymentTransaction.STATUS_SUCCESS, created_at__gte=cutoff)
+        .annotate(bucket=TruncHour('created_at', tzinfo=dt_timezone.utc))
+        .values('bucket').annotate(count=Count('pk'), amount=Sum('amount'))
+    )
+    for row in revenue:
+        exact[(_REVENUE, row['bucket'])] = (row['count'], row['amount'] or _ZERO)
+    return exact
+
+
+def _pending_plays_snapshot() -> dict[str, int]:
+    client = get_redis_client()
+    if client is None:
+        return {}
+    try:
+        raw = client.hgetall(_PENDING_PLAYS_KEY)
+    except Exception:
+        return {}
+    snapshot = {}
+    for field, value in (raw or {}).items():
+        try:
+            snapshot[str(field)] = int(value)
+        except (TypeError, ValueError):
+            continue
+    return snapshot
+
+
+def _subtract_pending_plays(snapshot: dict[str, int]) -> None:
+    client = get_redis_client()
+    if client is None or not snapshot:
+        return
+    args = []
+    for field, value in snapshot.items():
+        args.extend((field, -value))
+    try:
+        client.eval(_SUBTRACT_PENDING_LUA, 1, _PENDING_PLAYS_KEY, *args)
+    except Exception as exc:
+        logger.warning('Could not drop rebuilt dashboard plays from the queue: %s', exc)
+
+
+def rebuild_dashboard_metrics() -> int:
+    """Re-derive every counter and retained hour bucket; returns rows changed."""
+    cutoff = _retention_cutoff()
+    with transaction.atomic():
+        # Sum only after the rows are locked: a concurrent delta is then
+        # either already visible to the sums or applied after this write.
+        counters = {
+            counter.key: counter
+            for counter in DashboardCounter.objects.select_for_update().order_by('key')
+        }
+        hours = {
+            (row.metric, row.bucket_start): row
+            for row in DashboardHourlyRollup.objects.select_for_update()
+            .filter(bucket_start__gte=cutoff).order_by('metric', 'bucket_start')
+        }
+        # Plays queued before the snapshot committed before it, so the sums
+        # below already include them; only those amounts leave the queue once
+        # the rebuild commits. Plays queued later stay queued for the flush.
+        snapshot = _pending_plays_snapshot()
+        exact = _exact_counters()
+        exact_hours = _exact_hourly(cutoff)
+
+        changed, created = [], []
+        for key, (count, amount) in exact.items():
+            counter = counters.get(key)
+            if counter is None:
+                created.append(DashboardCounter(key=key, count=count, amount=amount))
+            elif counter.count != count or counter.amount != amount:
+                counter.count, counter.amount = count, amount
+                changed.append(counter)
+        DashboardCounter.objects.bulk_create(created, ignore_conflicts=True)
+        DashboardCounter.objects.bulk_update(changed, ['count', 'amount'])
+
+        changed_hours, created_hours = [], []
+        for (metric, bucket), (count, amount) in exact_hours.items():
+            row = hours.pop((metric, bucket), None)
+            if row is None:
+                created_hours.append(DashboardHourlyRollup(
+                    metric=metric, bucket_start=bucket, count=count, amount=amount,
+                ))
+            elif row.count != count or row.amount != amount:
+                row.count, row.amount = count, amount
+                changed_hours.append(row)
+        DashboardHourlyRollup.objects.bulk_create(created_hours, batch_size=500, ignore_conflicts=True)
+        DashboardHourlyRollup.objects.bulk_update(changed_hours, ['count', 'amount'], batch_size=500)
+        if hours:
+            DashboardHourlyRollup.objects.filter(pk__in=[row.pk for row in hours.values()]).delete()
+        transaction.on_commit(lambda: _subtract_pending_plays(snapshot))
+    total = len(changed) + len(created) + len(changed_hours) + len(created_hours) + len(hours)
+    if total:
+        logger.info('Dashboard metrics rebuilt rows_changed=%s', total)
+    return total
+
+
+def expired_dashboard_hours():
+    """Hour buckets older than the longest dashboard window."""
+    return DashboardHourlyRollup.objects.filter(bucket_start__lt=_retention_cutoff())
+
+
+def _counters() -> dict[str, tuple[int, Decimal]]:
+    rows = {key: (count, amount) for key, count, amount in DashboardCounter.objects.values_list('key', 'count', 'amount')}
+    if any(key not in rows for key in _KEYS):
+        rebuild_dashboard_metrics()
+        rows = {key: (count, amount) for key, count, amount in DashboardCounter.objects.values_list('key', 'count', 'amount')}
+    return rows
+
+
+def dashboard_totals(now: datetime | None = None) -> dict:
+    """All-time and windowed play, payment and payout totals from stored counters.
+
+    Windows start at the hour containing ``now`` minus the window, like the
+    play rollup windows they replace.
+    """
+    now = now or timezone.now()
+    counters = _counters()
+    starts = {
+        'last_24_hours': hour_bucket(now - timedelta(days=1)),
+        'last_7_days': hour_bucket(now - timedelta(days=7)),
+        'last_30_days': hour_bucket(now - timedelta(days=30)),
+    }
+    aggregates = {}
+    for name, start in starts.items():
+        window = Q(metric=_PLAYS, bucket_start__gte=start)
+        aggregates[f'{name}_plays'] = Sum('count', filter=window)
+        aggregates[f'{name}_pay'] = Sum('amount', filter=window)
+    aggregates['revenue_30_days'] = Sum('amount', filter=Q(metric=_REVENUE, bucket_start__gte=starts['last_30_days']))
+    windows = DashboardHourlyRollup.objects.filter(bucket_start__gte=starts['last_30_days']).aggregate(**aggregates)
+
+    plays, pay = counters.get(PLAYS_KEY, (0, _ZERO))
+    plays_by_window = {
+        name: [int(windows[f'{name}_plays'] or 0), Decimal(windows[f'{name}_pay'] or 0)]
+        for name in starts
+    }
+    # Plays still queued for the next flush.
+    for bucket, (count, amount) in _pending_play_buckets().items():
+        plays, pay = plays + count, pay + amount
+        for name, start in starts.items():
+            if bucket >= start:
+                plays_by_window[name][0] += count
+                plays_by_window[name][1] += amount
+    return {
+        'plays': {
+            'total': {'plays': int(plays), 'pay': Decimal(pay)},
+            **{
+                name: {'plays': window_plays, 'pay': window_pay}
+                for name, (window_plays, window_pay) in plays_by_window.items()
+            },
+        },
+        'payments': {status: counters.get(payment_key(status), (0, _ZERO)) for status in PAYMENT_STATUSES},
+        'payouts': {status: counters.get(payout_key(status), (0, _ZERO)) for status in PAYOUT_STATUSES},
+        'revenue_30_days': Decimal(windows['revenue_30_days'] or 0),
+    }
+
+
+def _leaderboard_timeout() -> int:
+    return 3 * max(60, int(getattr(settings, 'ADMIN_DASHBOARD_LEADERBOARD_INTERVAL', 600)))
+
+
+def refresh_top_artists() -> list[list]:
+    """Rank artists by all-time rolled-up plays and cache ``[artist_id, plays, pay]``."""
+    totals = window_play_totals(None, group_by='song__artist_id')
+    ranked = sorted(totals.items(), key=lambda item: (item[1]['plays'], item[0]), reverse=True)[:TOP_ARTISTS]
+    entries = [[int(artist_id), int(values['plays']), str(values['pay'])] for artist_id, values in ranked]
+    cache_set(TOP_ARTISTS_CACHE_KEY, entries, _leaderboard_timeout())
+    return entries
+
+
+def top_artists() -> list[list]:
+    """The cached leaderboard, built inline only when the cache is empty."""
+    cached = cache_get(TOP_ARTISTS_CACHE_KEY)
+    if isinstance(cached, list):
+        return cached
+    return refresh_top_artists()
+
+
+def directory_counts(now: datetime | None = None) -> dict:
+    """Audience and artist profile counts, cached for a short TTL."""
+    cached = cache_get(DIRECTORY_CACHE_KEY)
+    if isinstance(cached, dict):
+        return cached
+    now = now or timezone.now()
+    audience = User.objects.filter(roles__contains=User.ROLE_AUDIENCE).aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(is_active=True, is_banned=False)),
+        banned=Count('pk', filter=Q(is_banned=True)),
+        premium=Count('pk', filter=Q(plan=User.PLAN_PREMIUM, is_banned=False)),
+        free=Count('pk', filter=Q(plan=User.PLAN_FREE)),
+        new_30_days=Count('pk', filter=Q(date_joined__gte=now - timedelta(days=30))),
+    )
+    artists = Artist.objects.aggregate(
+        total=Count('pk'),
+        verified=Count('pk', filter=Q(verified=True)),
+    )
+    artists['pending_verification'] = ArtistAuth.objects.exclude(
+        status__in=[ArtistAuth.STATUS_ACCEPTED, ArtistAuth.STATUS_REJECTED]
+    ).count()
+    artists['successful'] = Artist.objects.filter(
+        verified=True, songs__status=Song.STATUS_PUBLISHED,
+    ).distinct().count()
+    counts = {'users': audience, 'artists': artists}
+    cache_set(DIRECTORY_CACHE_KEY, counts, max(5, int(getattr(settings, 'ADMIN_DASHBOARD_DIRECTORY_TTL', 60))))
+    return counts
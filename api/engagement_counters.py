@@ -0,0 +1,182 @@
+"""Materialized like/follow/playlist counters.
+
+``EngagementCounter`` holds one row per counted song, album, playlist, artist
+or user. Like and follow signals apply ``F()`` deltas in the same transaction
+as the write; user-playlist membership changes recompute the affected songs'
+playlist totals exactly, because the distinct-listener count cannot be kept as
+a delta. A missing row is computed from the relation tables the first time it
+is read, so an empty table is correct from the first request.
+
+``reconcile_engagement_counters`` re-derives existing rows from the relation
+tables in batches and drops rows whose entity is gone; it repairs drift from
+bulk writes that bypass signals and from a row seeded while a delta was still
+uncommitted.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import (
+    Album,
+    AlbumLike,
+    Artist,
+    EngagementCounter,
+    Follow,
+    Playlist,
+    PlaylistLike,
+    Song,
+    SongLike,
+    User,
+    UserPlaylist,
+)
+
+logger = logging.getLogger(__name__)
+
+_PLAYLIST_SONGS = UserPlaylist.songs.through
+
+# kind -> (entity model, [(relation model, group column, {counter field: aggregate})])
+_SOURCES = {
+    EngagementCounter.KIND_SONG: (Song, [
+        (SongLike, 'song_id', {'likes': Count('id')}),
+        (_PLAYLIST_SONGS, 'song_id', {
+            'playlist_adds': Count('userplaylist_id'),
+            'playlist_users': Count('userplaylist__user_id', distinct=True),
+        }),
+    ]),
+    EngagementCounter.KIND_ALBUM: (Album, [
+        (AlbumLike, 'album_id', {'likes': Count('id')}),
+    ]),
+    EngagementCounter.KIND_PLAYLIST: (Playlist, [
+        (PlaylistLike, 'playlist_id', {'likes': Count('id')}),
+    ]),
+    EngagementCounter.KIND_ARTIST: (Artist, [
+        (Follow, 'followed_artist_id', {'followers': Count('id')}),
+        (Follow, 'follower_artist_id', {'followings': Count('id')}),
+    ]),
+    EngagementCounter.KIND_USER: (User, [
+        (Follow, 'followed_user_id', {'followers': Count('id')}),
+        (Follow, 'follower_user_id', {'followings': Count('id')}),
+    ]),
+}
+_FIELDS = {
+    kind: [field for _, _, aggregates in sources for field in aggregates]
+    for kind, (_, sources) in _SOURCES.items()
+}
+
+
+def _exact_counts(kind: str, ids: list[int]) -> dict[int, dict[str, int]]:
+    totals = {pk: dict.fromkeys(_FIELDS[kind], 0) for pk in ids}
+    for model, column, aggregates in _SOURCES[kind][1]:
+        rows = model.objects.filter(**{f'{column}__in': ids}).values(column).annotate(**aggregates)
+        for row in rows:
+            for field in aggregates:
+                totals[row[column]][field] = int(row[field] or 0)
+    return totals
+
+
+def _normalize_ids(ids: Iterable[int]) -> list[int]:
+    return sorted({int(pk) for pk in ids if pk})
+
+
+def get_counters(kind: str, ids: Iterable[int]) -> dict[int, dict[str, int]]:
+    """Counter values for many entities of one kind; missing rows are seeded."""
+    return get_counters_bulk({kind: ids}).get(kind, {})
+
+
+def get_counters_bulk(requested: dict[str, Iterable[int]]) -> dict[str, dict[int, dict[str, int]]]:
+    """``get_counters`` for several kinds with one read of the counter table."""
+    wanted = {kind: ids for kind, ids in ((kind, _normalize_ids(ids)) for kind, ids in requested.items()) if ids}
+    counters = {kind: {} for kind in wanted}
+    if not wanted:
+        return counters
+    lookup = Q()
+    for kind, ids in wanted.items():
+        lookup |= Q(kind=kind, object_id__in=ids)
+    fields = sorted({field for kind in wanted for field in _FIELDS[kind]})
+    for row in EngagementCounter.objects.filter(lookup).values('kind', 'object_id', *fields):
+        counters[row['kind']][row['object_id']] = {field: row[field] for field in _FIELDS[row['kind']]}
+    seeded = []
+    for kind, ids in wanted.items():
+        missing = [pk for pk in ids if pk not in counters[kind]]
+        if missing:
+            exact = _exact_counts(kind, missing)
+            seeded.extend(EngagementCounter(kind=kind, object_id=pk, **values) for pk, values in exact.items())
+            counters[kind].update(exact)
+    if seeded:
+        EngagementCounter.objects.bulk_create(seeded, ignore_conflicts=True)
+    return counters
+
+
+def adjust_counter(kind: str, object_id, field: str, delta: int) -> None:
+    """Apply a delta inside the caller's transaction.
+
+    Rows that do not exist yet are left alone; the first read derives them
+    from the committed relation rows, which already include this change.
+    """
+    if not object_id or not delta:
+        return
+    EngagementCounter.objects.filter(kind=kind, object_id=int(object_id)).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def recompute_counters(kind: str, ids: Iterable[int]) -> int:
+    """Re-derive the given rows from the relation tables; returns rows changed."""
+    ids = _normalize_ids(ids)
+    if not ids:
+        return 0
+    fields = _FIELDS[kind]
+    with transaction.atomic():
+        # Count only after the rows are locked: a concurrent delta is then
+        # either already visible to the count or applied after this write.
+        counters = list(
+            EngagementCounter.objects.select_for_update()
+            .filter(kind=kind, object_id__in=ids).order_by('pk')
+        )
+        if not counters:
+            return 0
+        exact = _exact_counts(kind, [counter.object_id for counter in counters])
+        changed = []
+        for counter in counters:
+            values = exact[counter.object_id]
+            if any(getattr(counter, field) != values[field] for field in fields):
+                for field in fields:
+                    setattr(counter, field, values[field])
+                changed.append(counter)
+        if changed:
+            EngagementCounter.objects.bulk_update(changed, fields, batch_size=500)
+    return len(changed)
+
+
+def reconcile_engagement_counters(*, batch_size: int = 1000) -> dict[str, int]:
+    """Repair every stored counter and drop rows for deleted entities."""
+    result = {}
+    for kind, (entity_model, _) in _SOURCES.items():
+        fixed = 0
+        orphaned = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                EngagementCounter.objects.filter(kind=kind, pk__gt=last_pk)
+                .order_by('pk').values_list('pk', 'object_id')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            object_ids = [object_id for _, object_id in batch]
+            live = set(entity_model.objects.filter(pk__in=object_ids).values_list('pk', flat=True))
+            gone = [pk for pk, object_id in batch if object_id not in live]
+            if gone:
+                orphaned += EngagementCounter.objects.filter(pk__in=gone).delete()[0]
+            fixed += recompute_counters(kind, live)
+        result[kind] = fixed
+        result[f'{kind}_orphaned'] = orphaned
+    if any(result.values()):
+        logger.info('Engagement counters reconciled result=%s', result)
+    return result
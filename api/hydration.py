@@ -0,0 +1,175 @@
+"""Request-scoped card hydration.
+
+A view registers every song, album, artist, playlist and user card it is about
+to serialize on one ``HydrationPlan`` and calls ``resolve`` once before
+serialization. The plan then runs a fixed set of bulk reads regardless of how
+many cards or card types the response has:
+
+* one Redis ``MGET`` (or DB fallback) for song play counts;
+* one ``EngagementCounter`` read for every kind, plus seeding of missing rows;
+* one pipelined membership lookup for every liked/followed kind;
+* one monthly-listener aggregate for artist cards.
+
+With ``DEBUG`` on, ``resolve`` counts the queries it ran and raises
+``AssertionError`` above ``HYDRATION_QUERY_BUDGET``, so a change that makes
+hydration scale with the number of cards fails loudly in development.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from .engagement_counters import get_counters_bulk
+from .models import Album, Artist, ArtistMonthlyListener, EngagementCounter, Playlist, Song, User
+from .song_play_metrics import hydrate_song_play_counts
+from .user_membership import (
+    KIND_FOLLOWED_ARTISTS,
+    KIND_FOLLOWED_USERS,
+    KIND_LIKED_ALBUMS,
+    KIND_LIKED_PLAYLISTS,
+    KIND_LIKED_SONGS,
+    member_ids,
+)
+
+_SONG_ATTRS = ('_play_count', '_likes_count', '_playlist_count', '_playlist_users_count', '_is_liked')
+
+
+class HydrationPlan:
+    """Card entities collected for one response, hydrated together."""
+
+    __slots__ = ('user', 'songs', 'albums', 'artists', 'playlists', 'users')
+
+    def __init__(self, user=None):
+        self.user = user if getattr(user, 'is_authenticated', False) else None
+        self.songs: list[tuple[Song, bool]] = []
+        self.albums: list[Album] = []
+        self.artists: list[tuple[Artist, bool]] = []
+        self.playlists: list[Playlist] = []
+        self.users: list[User] = []
+
+    def add(self, *items, include_playlist_count=True, include_monthly_listeners=True):
+        """Register cards; other model types and unsaved objects are ignored.
+
+        ``include_playlist_count=False`` leaves song playlist totals at 0 for
+        compact cards, and ``include_monthly_listeners=False`` skips the
+        monthly-listener figure for artists that only appear in follow lists.
+        """
+        for item in items:
+            if not getattr(item, 'pk', None):
+                continue
+            if isinstance(item, Song):
+                self.songs.append((item, include_playlist_count))
+            elif isinstance(item, Album):
+                self.albums.append(item)
+            elif isinstance(item, Artist):
+                self.artists.append((item, include_monthly_listeners))
+            elif isinstance(item, Playlist):
+                self.playlists.append(item)
+            elif isinstance(item, User):
+                self.users.append(item)
+        return self
+
+    def extend(self, items, **options):
+        return self.add(*items, **options)
+
+    def resolve(self):
+        """Attach every registered card's metrics; returns the plan."""
+        if not settings.DEBUG:
+            self._resolve()
+            return self
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            self._resolve()
+        budget = getattr(settings, 'HYDRATION_QUERY_BUDGET', 32)
+        if len(queries) > budget:
+            raise AssertionError(
+                f"Card hydration ran {len(queries)} queries (budget {budget}) for "
+                f"{len(self.songs)} songs, {len(self.albums)} albums, {len(self.artists)} artists, "
+                f"{len(self.playlists)} playlists and {len(self.users)} users"
+            )
+        return self
+
+    def _resolve(self) -> None:
+        songs = [(song, full) for song, full in self.songs if not all(hasattr(song, attr) for attr in _SONG_ATTRS)]
+        song_ids = {song.pk for song, _ in songs}
+        album_ids = {album.pk for album in self.albums}
+        artist_ids = {artist.pk for artist, _ in self.artists}
+        playlist_ids = {playlist.pk for playlist in self.playlists}
+        user_ids = {item.pk for item in self.users}
+        if not (song_ids or album_ids or artist_ids or playlist_ids or user_ids):
+            return
+
+        if songs:
+            hydrate_song_play_counts([song for song, _ in songs])
+        counters = get_counters_bulk({
+            EngagementCounter.KIND_SONG: song_ids,
+            EngagementCounter.KIND_ALBUM: album_ids,
+            EngagementCounter.KIND_ARTIST: artist_ids,
+            EngagementCounter.KIND_PLAYLIST: playlist_ids,
+            EngagementCounter.KIND_USER: user_ids,
+        })
+        members = member_ids(self.user, {
+            KIND_LIKED_SONGS: song_ids,
+            KIND_LIKED_ALBUMS: album_ids,
+            KIND_FOLLOWED_ARTISTS: artist_ids,
+            KIND_LIKED_PLAYLISTS: playlist_ids,
+            KIND_FOLLOWED_USERS: user_ids,
+        })
+        monthly_ids = {artist.pk for artist, monthly in self.artists if monthly}
+        monthly = {
+            row['artist_id']: row['total']
+            for row in ArtistMonthlyListener.objects.filter(
+                artist_id__in=monthly_ids,
+                updated_at__gte=timezone.now() - timedelta(days=28),
+            ).values('artist_id').annotate(total=Count('user_id', distinct=True))
+        } if monthly_ids else {}
+
+        song_counters = counters.get(EngagementCounter.KIND_SONG, {})
+        liked_songs = members.get(KIND_LIKED_SONGS, set())
+        for song, full in songs:
+            counter = song_counters.get(song.pk, {})
+            song._play_count = int(getattr(song, '_cached_tracked_plays', 0) or 0)
+            song._likes_count = counter.get('likes', 0)
+            song._playlist_count = counter.get('playlist_adds', 0) if full else 0
+            song._playlist_users_count = counter.get('playlist_users', 0) if full else 0
+            song._is_liked = song.pk in liked_songs
+
+        album_counters = counters.get(EngagementCounter.KIND_ALBUM, {})
+        liked_albums = members.get(KIND_LIKED_ALBUMS, set())
+        for album in self.albums:
+            album._likes_count = album_counters.get(album.pk, {}).get('likes', 0)
+            album._is_liked = album.pk in liked_albums
+
+        artist_counters = counters.get(EngagementCounter.KIND_ARTIST, {})
+        followed_artists = members.get(KIND_FOLLOWED_ARTISTS, set())
+        for artist, with_monthly in self.artists:
+            counter = artist_counters.get(artist.pk, {})
+            artist._followers_count = counter.get('followers', 0)
+            artist._followings_count = counter.get('followings', 0)
+            if with_monthly:
+                artist._monthly_listeners_count = monthly.get(artist.pk, 0)
+            artist._is_following = artist.pk in followed_artists
+
+        playlist_counters = counters.get(EngagementCounter.KIND_PLAYLIST, {})
+        liked_playlists = members.get(KIND_LIKED_PLAYLISTS, set())
+        for playlist in self.playlists:
+            playlist._likes_count = playlist_counters.get(playlist.pk, {}).get('likes', 0)
+            playlist._is_liked = playlist.pk in liked_playlists
+
+        user_counters = counters.get(EngagementCounter.KIND_USER, {})
+        followed_users = members.get(KIND_FOLLOWED_USERS, set())
+        for item in self.users:
+            counter = user_counters.get(item.pk, {})
+            item._followers_count = counter.get('followers', 0)
+            item._followings_count = counter.get('followings', 0)
+            item._is_following = item.pk in followed_users
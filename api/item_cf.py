@@ -0,0 +1,275 @@
+"""Item-item collaborative filtering over likes, plays and playlist membership.
+
+``build_item_cf_model`` turns recent interactions into a sparse user x song
+matrix, column-normalizes it and multiplies it by its transpose in column
+blocks to get cosine co-occurrence between songs, keeping only the strongest
+``ITEM_CF_NEIGHBOURS`` per song. The pruned CSR arrays are published to
+``SONG_EMBEDDING_DIR`` next to the song feature matrix and memory-mapped by
+every worker.
+
+Scoring a user is one sparse vector-matrix product of their weighted
+interaction vector against that neighbour matrix.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from scipy import sparse
+
+from .models import Song, SongLike, UserPlaylist
+from .song_embeddings import embedding_dir, publish_arrays, read_manifest
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST = 'item_cf.json'
+_FORMAT = 1
+_BLOCK_COLUMNS = 2048
+_MAX_ITEMS_PER_USER = 500
+_MANIFEST_CHECK_SECONDS = 30
+
+LIKE_WEIGHT = 3.0
+PLAYLIST_WEIGHT = 2.0
+PLAY_WEIGHT = 1.0
+
+_LOCAL = {'model': None, 'checked_at': 0.0}
+_LOCAL_LOCK = threading.Lock()
+
+
+def _play_days() -> int:
+    return max(1, int(getattr(settings, 'ITEM_CF_PLAY_DAYS', 180)))
+
+
+def _neighbours() -> int:
+    return max(5, int(getattr(settings, 'ITEM_CF_NEIGHBOURS', 50)))
+
+
+def _refresh_after() -> float:
+    return max(1, int(getattr(settings, 'ITEM_CF_REFRESH_HOURS', 6))) * 3600.0
+
+
+def interaction_weights(likes: Iterable[int], playlist: Iterable[int], plays: Iterable[tuple[int, int]]) -> dict[int, float]:
+    """Per-song weight of one user's interactions; plays grow logarithmically."""
+    weights: dict[int, float] = {}
+    for song_id, count in plays:
+        weights[int(song_id)] = weights.get(int(song_id), 0.0) + PLAY_WEIGHT * float(np.log1p(count))
+    for song_id in playlist:
+        weights[int(song_id)] = weights.get(int(song_id), 0.0) + PLAYLIST_WEIGHT
+    for song_id in likes:
+        weights[int(song_id)] = weights.get(int(song_id), 0.0) + LIKE_WEIGHT
+    return weights
+
+
+def _user_song_plays(since, user_ids=None):
+    plays = Song.play_counts.through.objects.filter(
+        playcount__created_at__gte=since, song__status=Song.STATUS_PUBLISHED,
+    )
+    if user_ids is not None:
+        plays = plays.filter(playcount__user_id__in=user_ids)
+    return plays.values('playcount__user_id', 'song_id').annotate(total=Count('id')).values_list(
+        'playcount__user_id', 'song_id', 'total',
+    )
+
+
+def _collect_interactions() -> dict[int, dict[int, float]]:
+    since = timezone.now() - timedelta(days=_play_days())
+    likes: dict[int, list[int]] = {}
+    for user_id, song_id in SongLike.objects.filter(song__status=Song.STATUS_PUBLISHED).values_list(
+        'user_id', 'song_id',
+    ).iterator(chunk_size=10000):
+        likes.setdefault(user_id, []).append(song_id)
+    playlist: dict[int, list[int]] = {}
+    for user_id, song_id in UserPlaylist.songs.through.objects.filter(
+        song__status=Song.STATUS_PUBLISHED,
+    ).values_list('userplaylist__user_id', 'song_id').iterator(chunk_size=10000):
+        playlist.setdefault(user_id, []).append(song_id)
+    plays: dict[int, list[tuple[int, int]]] = {}
+    for user_id, song_id, total in _user_song_plays(since).iterator(chunk_size=10000):
+        plays.setdefault(user_id, []).append((song_id, total))
+
+    users = {}
+    for user_id in set(likes) | set(playlist) | set(plays):
+        weights = interaction_weights(likes.get(user_id, ()), playlist.get(user_id, ()), plays.get(user_id, ()))
+        if len(weights) > _MAX_ITEMS_PER_USER:
+            # Very heavy listeners would dominate the quadratic co-occurrence.
+            weights = dict(sorted(weights.items(), key=lambda item: item[1], reverse=True)[:_MAX_ITEMS_PER_USER])
+        if len(weights) > 1:
+            users[user_id] = weights
+    return users
+
+
+def build_item_cf_model() -> dict:
+    """Build and publish the pruned item-item neighbour matrix."""
+    started = time.monotonic()
+    users = _collect_interactions()
+    song_ids = np.array(sorted({song_id for weights in users.values() for song_id in weights}), dtype=np.int64)
+    column_of = {int(song_id): column for column, song_id in enumerate(song_ids)}
+    rows, columns, values = [], [], []
+    for row, weights in enumerate(users.values()):
+        for song_id, weight in weights.items():
+            rows.append(row)
+            columns.append(column_of[song_id])
+            values.append(weight)
+    matrix = sparse.csr_matrix(
+        (np.array(values, dtype=np.float32), (np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64))),
+        shape=(len(users), len(song_ids)),
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1
+    normalized = (matrix @ sparse.diags((1 / norms).astype(np.float32))).tocsr()
+    transposed = normalized.T.tocsr()
+
+    keep = _neighbours()
+    indptr = [0]
+    indices: list[np.ndarray] = []
+    data: list[np.ndarray] = []
+    for start in range(0, len(song_ids), _BLOCK_COLUMNS):
+        block = (transposed[start:start + _BLOCK_COLUMNS] @ normalized).tocsr()
+        for offset in range(block.shape[0]):
+            low, high = block.indptr[offset], block.indptr[offset + 1]
+            neighbour_ids, scores = block.indices[low:high], block.data[low:high]
+            mask = neighbour_ids != start + offset
+            neighbour_ids, scores = neighbour_ids[mask], scores[mask]
+            if len(scores) > keep:
+                top = np.argpartition(-scores, keep - 1)[:keep]
+                neighbour_ids, scores = neighbour_ids[top], scores[top]
+            order = np.argsort(neighbour_ids)
+            indices.append(neighbour_ids[order].astype(np.int32))
+            data.append(scores[order].astype(np.float32))
+            indptr.append(indptr[-1] + len(order))
+
+    arrays = (
+        ('song_ids', song_ids),
+        ('indptr', np.array(indptr, dtype=np.int64)),
+        ('indices', np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32)),
+        ('data', np.concatenate(data) if data else np.zeros(0, dtype=np.float32)),
+    )
+    publish_arrays('item-cf', _MANIFEST, arrays, {'built_at': time.time(), 'format': _FORMAT})
+    with _LOCAL_LOCK:
+        _LOCAL['model'] = None
+        _LOCAL['checked_at'] = 0.0
+    return {
+        'users': len(users),
+        'songs': int(len(song_ids)),
+        'pairs': int(indptr[-1]),
+        'seconds': round(time.monotonic() - started, 2),
+    }
+
+
+def refresh_item_cf_model(*, force: bool = False) -> dict | None:
+    """Rebuild when the published model is older than ``ITEM_CF_REFRESH_HOURS``."""
+    manifest = read_manifest(_MANIFEST)
+    if (
+        not force
+        and manifest is not None
+        and manifest.get('format') == _FORMAT
+        and time.time() - float(manifest.get('built_at') or 0) < _refresh_after()
+    ):
+        return None
+    return build_item_cf_model()
+
+
+class ItemCFModel:
+    """Memory-mapped CSR neighbour matrix keyed by song id."""
+
+    __slots__ = ('build', 'song_ids', 'columns', 'neighbours')
+
+    def __init__(self, build: str, path: str):
+        self.build = build
+        self.song_ids = np.load(os.path.join(path, 'song_ids.npy'), mmap_mode='r')
+        self.columns = {int(song_id): column for column, song_id in enumerate(self.song_ids)}
+        self.neighbours = sparse.csr_matrix(
+            (
+                np.load(os.path.join(path, 'data.npy'), mmap_mode='r'),
+                np.load(os.path.join(path, 'indices.npy'), mmap_mode='r'),
+                np.load(os.path.join(path, 'indptr.npy'), mmap_mode='r'),
+            ),
+            shape=(len(self.song_ids), len(self.song_ids)),
+            copy=False,
+        )
+
+    def score(self, weights: dict[int, float], limit: int) -> list[int]:
+        """Songs ranked by co-occurrence with ``weights``, excluding those songs."""
+        known = [(self.columns[song_id], weight) for song_id, weight in weights.items() if song_id in self.columns]
+        if not known:
+            return []
+        vector = sparse.csr_matrix(
+            ([weight for _, weight in known], ([0] * len(known), [column for column, _ in known])),
+            shape=(1, len(self.song_ids)),
+            dtype=np.float32,
+        )
+        scores = (vector @ self.neighbours).tocsr()
+        columns, values = scores.indices, scores.data
+        seen = np.isin(columns, [column for column, _ in known])
+        columns, values = columns[~seen], values[~seen]
+        if len(values) > limit:
+            top = np.argpartition(-values, limit - 1)[:limit]
+            columns, values = columns[top], values[top]
+        order = np.lexsort((columns, -values))
+        return [int(self.song_ids[column]) for column in columns[order]]
+
+
+def current_item_cf_model() -> ItemCFModel | None:
+    now = time.monotonic()
+    local = _LOCAL['model']
+    if local is not None and now - _LOCAL['checked_at'] < _MANIFEST_CHECK_SECONDS:
+        return local
+    manifest = read_manifest(_MANIFEST)
+    if manifest is None or manifest.get('format') != _FORMAT:
+        return None
+    if local is None or local.build != manifest['build']:
+        try:
+            local = ItemCFModel(manifest['build'], os.path.join(embedding_dir(), manifest['build']))
+        except Exception:
+            logger.warning('Item CF model load failed build=%s', manifest.get('build'))
+            return None
+    with _LOCAL_LOCK:
+        _LOCAL['model'] = local
+        _LOCAL['checked_at'] = now
+    return local
+
+
+def user_interaction_weights_bulk(user_ids: Iterable[int]) -> dict[int, dict[int, float]]:
+    """Interaction vectors for many users from three indexed lookups."""
+    user_ids = sorted({int(pk) for pk in user_ids if pk})
+    if not user_ids:
+        return {}
+    since = timezone.now() - timedelta(days=_play_days())
+    likes: dict[int, list[int]] = {}
+    for user_id, song_id in SongLike.objects.filter(user_id__in=user_ids).values_list('user_id', 'song_id'):
+        likes.setdefault(user_id, []).append(song_id)
+    playlist: dict[int, list[int]] = {}
+    for user_id, song_id in UserPlaylist.songs.through.objects.filter(
+        userplaylist__user_id__in=user_ids,
+    ).values_list('userplaylist__user_id', 'song_id'):
+        playlist.setdefault(user_id, []).append(song_id)
+    plays: dict[int, list[tuple[int, int]]] = {}
+    for user_id, song_id, total in _user_song_plays(since, user_ids):
+        plays.setdefault(user_id, []).append((song_id, total))
+    return {
+        user_id: interaction_weights(likes.get(user_id, ()), playlist.get(user_id, ()), plays.get(user_id, ()))
+        for user_id in user_ids
+    }
+
+
+def user_interaction_weights(user_id: int) -> dict[int, float]:
+    return user_interaction_weights_bulk([user_id]).get(int(user_id), {})
+
+
+def recommended_song_ids(user_id: int, limit: int, weights: dict[int, float] | None = None) -> list[int] | None:
+    """Collaborative candidates for one user; ``None`` when no model is published."""
+    model = current_item_cf_model()
+    if model is None:
+        return None
+    if weights is None:
+        weights = user_interaction_weights(user_id)
+    return model.score(weights, limit)
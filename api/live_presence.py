@@ -0,0 +1,217 @@
+"""Redis live-listener registry.
+
+Every stream unwrap records the listener in sorted sets keyed by song and by
+artist, scored by the timestamp at which that playback ends, and remembers the
+user's current playback so starting another track moves them instead of
+counting them twice. Counts trim expired members with ``ZREMRANGEBYSCORE`` and
+read ``ZCARD`` for many artists in one pipeline. Joins and moves are published
+on a per-artist channel so long-polls wait on Redis instead of re-querying.
+An index of each artist's earliest expiry lets the live publisher push drops
+when tracks simply end.
+
+Like the other runtime helpers this is failure-safe: without Redis nothing is
+recorded and every count reads as zero.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterable
+
+from .recommendation_runtime import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_ARTIST_KEY = "sedabox:live-listeners:artist:{}:v1"
+_SONG_KEY = "sedabox:live-listeners:song:{}:v1"
+_USER_KEY = "sedabox:live-listeners:user:{}:v1"
+_ARTIST_CHANNEL = "sedabox:live-listeners:artist-changes:{}:v1"
+# Earliest listener expiry per artist, so a count that drops because tracks
+# ended is noticed without a new play.
+_EXPIRY_INDEX_KEY = "sedabox:live-listeners:artist-expiries:v1"
+# Tracks without a known duration still count for a short window.
+MIN_PLAYBACK_SECONDS = 30
+
+# KEYS: user playback, song set, artist set, artist expiry index.
+# ARGV: user id, now, expires at, key ttl, artist channel, artist id.
+# Returns the artist ids whose listener count changed.
+_RECORD_PLAYBACK_LUA = """
+local changed = {}
+local previous = redis.call('GET', KEYS[1])
+if previous then
+    local old_song, old_artist, old_channel, old_artist_id =
+        string.match(previous, '^([^|]+)|([^|]+)|([^|]+)|([^|]+)$')
+    if old_song and old_song ~= KEYS[2] then
+        redis.call('ZREM', old_song, ARGV[1])
+    end
+    if old_artist and old_artist ~= KEYS[3] then
+        if redis.call('ZREM', old_artist, ARGV[1]) == 1 then
+            redis.call('PUBLISH', old_channel, 'left')
+            table.insert(changed, old_artist_id)
+        end
+    end
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+local joined = redis.call('ZADD', KEYS[3], ARGV[3], ARGV[1])
+redis.call('ZADD', KEYS[4], 'LT', ARGV[3], ARGV[6])
+local ttl = tonumber(ARGV[4])
+for i = 2, 3 do
+    if redis.call('TTL', KEYS[i]) < ttl then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+redis.call('SET', KEYS[1], KEYS[2] .. '|' .. KEYS[3] .. '|' .. ARGV[5] .. '|' .. ARGV[6], 'EX', ttl)
+if joined == 1 then
+    redis.call('PUBLISH', ARGV[5], 'joined')
+    table.insert(changed, ARGV[6])
+end
+return changed
+"""
+
+
+def record_playback(user_id: int, song_id: int, artist_id: int | None, duration_seconds: int | None) -> list[int]:
+    """Mark ``user_id`` as listening to ``song_id`` until the track ends.
+
+    Returns the ids of artists whose live listener count changed.
+    """
+    if not user_id or not song_id or not artist_id:
+        return []
+    client = get_redis_client()
+    if client is None:
+        return []
+    now = time.time()
+    seconds = max(MIN_PLAYBACK_SECONDS, int(duration_seconds or 0))
+    try:
+        changed = client.eval(
+            _RECORD_PLAYBACK_LUA,
+            4,
+            _USER_KEY.format(int(user_id)),
+            _SONG_KEY.format(int(song_id)),
+            _ARTIST_KEY.format(int(artist_id)),
+            _EXPIRY_INDEX_KEY,
+            int(user_id),
+            now,
+            now + seconds,
+            seconds + 60,
+            _ARTIST_CHANNEL.format(int(artist_id)),
+            int(artist_id),
+        )
+        return [int(value) for value in changed or ()]
+    except Exception as exc:
+        logger.warning("Live listener registry write failed: %s", exc)
+        return []
+
+
+# KEYS: artist expiry index. ARGV: now, limit, artist key prefix, artist key suffix.
+# Pops artists whose earliest listener expiry has passed, trims their sets and
+# re-indexes each at its next expiry. Returns the popped artist ids.
+_POP_EXPIRED_ARTISTS_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, artist_id in ipairs(due) do
+    redis.call('ZREM', KEYS[1], artist_id)
+    local key = ARGV[3] .. artist_id .. ARGV[4]
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', ARGV[1])
+    local first = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    if first[2] then
+        redis.call('ZADD', KEYS[1], 'LT', first[2], artist_id)
+    end
+end
+return due
+"""
+
+
+def pop_expired_artists(limit: int = 500) -> list[int]:
+    """Artists that lost listeners to ended tracks since the previous call."""
+    client = get_redis_client()
+    if client is None:
+        return []
+    prefix, suffix = _ARTIST_KEY.split("{}")
+    try:
+        due = client.eval(_POP_EXPIRED_ARTISTS_LUA, 1, _EXPIRY_INDEX_KEY, time.time(), max(1, int(limit)), prefix, suffix)
+        return [int(value) for value in due or ()]
+    except Exception as exc:
+        logger.warning("Live listener expiry index unavailable: %s", exc)
+        return []
+
+
+def _live_counts(template: str, ids: Iterable[int]) -> dict[int, int]:
+    ids = sorted({int(pk) for pk in ids if pk})
+    counts = dict.fromkeys(ids, 0)
+    client = get_redis_client()
+    if client is None or not ids:
+        return counts
+    now = time.time()
+    try:
+        pipe = client.pipeline(transaction=False)
+        for pk in ids:
+            key = template.format(pk)
+            pipe.zremrangebyscore(key, "-inf", now)
+            pipe.zcard(key)
+        results = pipe.execute()
+    except Exception:
+        return counts
+    for index, pk in enumerate(ids):
+        counts[pk] = int(results[index * 2 + 1] or 0)
+    return counts
+
+
+def artist_live_listener_counts(artist_ids: Iterable[int]) -> dict[int, int]:
+    """Distinct current listeners per artist, for many artists in one round trip."""
+    return _live_counts(_ARTIST_KEY, artist_ids)
+
+
+def song_live_listener_counts(song_ids: Iterable[int]) -> dict[int, int]:
+    return _live_counts(_SONG_KEY, song_ids)
+
+
+def artist_live_listener_count(artist_id: int) -> int:
+    return artist_live_listener_counts([artist_id]).get(int(artist_id), 0)
+
+
+def _next_expiry(client, artist_id: int) -> float | None:
+    first = client.zrange(_ARTIST_KEY.format(int(artist_id)), 0, 0, withscores=True)
+    return float(first[0][1]) if first else None
+
+
+def wait_for_artist_live_listener_change(artist_id: int, timeout: float) -> tuple[int, bool]:
+    """Block until the artist's live count changes or ``timeout`` elapses.
+
+    Woken by the artist's change channel for joins and moves, and by the
+    earliest expiry score for listeners whose track simply ended. Returns the
+    latest count and whether it differs from the count at entry.
+    """
+    deadline = time.monotonic() + max(0.0, float(timeout))
+    client = get_redis_client()
+    if client is None:
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        return 0, False
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        # Subscribe before the first read so no change can slip in between.
+        pubsub.subscribe(_ARTIST_CHANNEL.format(int(artist_id)))
+        initial = artist_live_listener_count(artist_id)
+        next_expiry = _next_expiry(client, artist_id)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return initial, False
+            if next_expiry is not None:
+                remaining = min(remaining, max(0.05, next_expiry - time.time() + 0.05))
+            # Short slices keep the read below the client's socket timeout.
+            message = pubsub.get_message(timeout=min(remaining, 0.9))
+            if message is None and (next_expiry is None or time.time() < next_expiry):
+                continue
+            current = artist_live_listener_count(artist_id)
+            if current != initial:
+                return current, True
+            next_expiry = _next_expiry(client, artist_id)
+    except Exception as exc:
+        logger.warning("Live listener change feed unavailable: %s", exc)
+        return artist_live_listener_count(artist_id), False
+    finally:
+        try:
+            pubsub.close()
+        except Exception:
+            pass
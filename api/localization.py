@@ -581,21 +581,157 @@ def localize_api_payload(
 # Localizing in the renderer catches ordinary responses and DRF-generated
 # validation/authentication errors through one consistent path.
 try:
+    import orjson
+except ImportError:  # The stdlib encoder below is used without orjson.
+    orjson = None
+
+# Success payloads only change under these keys, so a rendered body without
+# any of them is final. Quotes inside string values are escaped, so a value can
+# never fake a marker; the marker count is the number of message keys.
+_MESSAGE_KEY_MARKERS = tuple(f'"{key}":'.encode() for key in sorted(_MESSAGE_RESPONSE_KEYS))
+_EACH = object()
+_MESSAGE = object()
+_MAX_SCHEMA_PATHS = 256
+# view class -> trie of the paths where its success payloads carried message keys
+_MESSAGE_KEY_SCHEMAS: dict[type, dict] = {}
+
+
+def _message_key_paths(value, path=(), found=None):
+    """Paths of every message key with a scalar value, or ``None``."""
+    found = set() if found is None else found
+    if isinstance(value, dict):
+        for child_key, child_value in value.items():
+            if str(child_key) in _MESSAGE_RESPONSE_KEYS:
+                if isinstance(child_value, (dict, list, tuple)):
+                    return None
+                found.add((*path, child_key))
+            elif _message_key_paths(child_value, (*path, child_key), found) is None:
+                return None
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            if _message_key_paths(item, (*path, _EACH), found) is None:
+                return None
+    return found
+
+
+def _learn_message_key_schema(view_class, data) -> None:
+    paths = _message_key_paths(data)
+    if not paths or len(paths) > _MAX_SCHEMA_PATHS:
+        return
+    schema = _MESSAGE_KEY_SCHEMAS.get(view_class, {})
+    schema = {**schema}
+    for path in paths:
+        node = schema
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = _MESSAGE
+    _MESSAGE_KEY_SCHEMAS[view_class] = schema
+
+
+def _localize_schema_paths(value, schema, language, hits):
+    """Localize only the schema's message keys (copy-on-write).
+
+    ``hits`` collects one entry per message key reached; the caller compares
+    it with the marker count to prove no message key was missed.
+    """
+    if isinstance(value, dict):
+        changed = False
+        localized = value
+        for child_key, node in schema.items():
+            if child_key is _EACH or child_key not in value:
+                continue
+            child = value[child_key]
+            if node is _MESSAGE:
+                if isinstance(child, (dict, list, tuple)):
+                    raise LookupError(child_key)
+                hits.append(child_key)
+                new_child = localize_api_message(child, language) if isinstance(child, str) else child
+            else:
+                new_child = _localize_schema_paths(child, node, language, hits)
+            if new_child is not child:
+                if not changed:
+                    localized = dict(value)
+                    changed = True
+                localized[child_key] = new_child
+        return localized
+    if isinstance(value, (list, tuple)) and _EACH in schema:
+        items = [_localize_schema_paths(item, schema[_EACH], language, hits) for item in value]
+        if any(a is not b for a, b in zip(items, value)):
+            return items if isinstance(value, list) else tuple(items)
+    return value
+
+
+try:
+    from django.conf import settings
     from rest_framework.renderers import JSONRenderer
 
     class LocalizedJSONRenderer(JSONRenderer):
+        """Localize API messages, then render compact UTF-8 JSON.
+
+        With orjson installed and no ``indent`` requested, a success body is
+        encoded first and returned as-is when it carries no message key. When
+        it does, only the paths where that view's earlier payloads carried
+        message keys are localized, provided they account for every marker in
+        the body. Otherwise (and for every error body) the whole payload goes
+        through ``localize_api_payload`` and the view's key schema is updated.
+        Values orjson cannot encode fall back to DRF's encoder.
+        """
+
+        def _fast_render(self, data):
+            try:
+                rendered = orjson.dumps(
+                    data, default=self.encoder_class().default,
+                    option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z,
+                )
+            except (TypeError, ValueError):
+                return None
+            # Same escaping as JSONRenderer for JavaScript-embedding safety.
+            return rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
         def render(self, data, accepted_media_type=None, renderer_context=None):
             context = renderer_context or {}
             request = context.get("request")
             response = context.get("response")
-            language = get_request_language(request)
             status_code = int(getattr(response, "status_code", 200) or 200)
+            message_context = status_code >= 400 or isinstance(data, str)
+            fast = (
+                orjson is not None
+                and data is not None
+                and getattr(settings, 'JSON_RENDERER_FAST_PATH', True)
+                and self.get_indent(accepted_media_type or '', context) is None
+            )
+            view_class = type(context["view"]) if context.get("view") is not None else None
+            if fast and not message_context:
+                rendered = self._fast_render(data)
+                if rendered is not None:
+                    markers = sum(rendered.count(marker) for marker in _MESSAGE_KEY_MARKERS)
+                    if not markers:
+                        return rendered
+                    schema = _MESSAGE_KEY_SCHEMAS.get(view_class)
+                    if schema:
+                        hits = []
+                        try:
+                            localized_data = _localize_schema_paths(data, schema, get_request_language(request), hits)
+                        except LookupError:
+                            hits = None
+                        if hits is not None and len(hits) == markers:
+                            if localized_data is data:
+                                return rendered
+                            rendered = self._fast_render(localized_data)
+                            if rendered is not None:
+                                return rendered
+                    if view_class is not None:
+                        _learn_message_key_schema(view_class, data)
             localized_data = localize_api_payload(
                 data,
-                language,
+                get_request_language(request),
                 status_code=status_code,
-                message_context=status_code >= 400 or isinstance(data, str),
+                message_context=message_context,
             )
+            if fast:
+                rendered = self._fast_render(localized_data)
+                if rendered is not None:
+                    return rendered
             return super().render(localized_data, accepted_media_type, context)
 except ImportError:  # Allows static tooling to inspect this module without DRF installed.
     LocalizedJSONRenderer = None  # type: ignore[assignment]
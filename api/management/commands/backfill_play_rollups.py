@@ -0,0 +1,51 @@
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from api.models import PlayCount, PlayRollup
+from api.play_rollups import rebuild_play_rollups_for_day
+
+
+class Command(BaseCommand):
+    help = 'Rebuild hourly/daily play rollups from the PlayCount ledger, one UTC day at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Only rebuild the last N UTC days.')
+        parser.add_argument('--since', type=str, default=None, help='Rebuild from this UTC date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--if-empty',
+            action='store_true',
+            help='Do nothing when rollups already exist (safe to run on every deploy).',
+        )
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and PlayRollup.objects.exists():
+            self.stdout.write('play rollups already populated; skipping backfill')
+            return
+
+        today = timezone.now().astimezone(dt_timezone.utc).date()
+        if options['since']:
+            try:
+                start = date.fromisoformat(options['since'])
+            except ValueError as exc:
+                raise CommandError('--since must be YYYY-MM-DD') from exc
+        elif options['days']:
+            start = today - timedelta(days=max(1, options['days']) - 1)
+        else:
+            first = PlayCount.objects.aggregate(first=Min('created_at'))['first']
+            if first is None:
+                self.stdout.write('no plays recorded; nothing to backfill')
+                return
+            start = first.astimezone(dt_timezone.utc).date()
+
+        day = start
+        total = 0
+        while day <= today:
+            plays = rebuild_play_rollups_for_day(day)
+            total += plays
+            if plays:
+                self.stdout.write(f'{day.isoformat()}: {plays} plays')
+            day += timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f'play rollups rebuilt from {start.isoformat()} ({total} plays)'))
@@ -2,21 +2,21 @@ from decimal import Decimal
 
 from django.core.management.base import BaseCommand
 
-from api.models import Artist, DepositRequest
-from api.views import (
+from api.artist_ledger import (
     FINANCE_QUANTUM,
-    _finance_allocate_across_songs,
-    _finance_decimal,
-    _finance_saved_song_allocations,
-    _finance_song_totals,
-    _finance_string,
+    allocate_across_songs,
+    rebuild_artist_ledger,
+    saved_song_allocations,
+    song_earnings,
 )
+from api.models import Artist, DepositRequest, Song
+from api.views import _finance_decimal, _finance_string
 
 
 class Command(BaseCommand):
     help = (
         "Persist deterministic per-song allocations for historical payout requests "
-        "that predate song-level finance tracking."
+        "that predate song-level finance tracking, then rebuild those artists' finance ledgers."
     )
 
     def handle(self, *args, **options):
@@ -30,7 +30,10 @@ class Command(BaseCommand):
         ).distinct()
 
         for artist in artists.iterator():
-            song_totals = _finance_song_totals(artist)
+            song_totals = {
+                song_id: values["earned"]
+                for song_id, values in song_earnings(Song.objects.filter(artist=artist)).items()
+            }
             reserved = {song_id: Decimal("0") for song_id in song_totals}
             requests = DepositRequest.objects.filter(
                 artist=artist,
@@ -42,7 +45,7 @@ class Command(BaseCommand):
             ).order_by("submission_date", "pk")
 
             for payout in requests.iterator():
-                saved = _finance_saved_song_allocations(payout.summary)
+                saved = saved_song_allocations(payout.summary)
                 requested = max(Decimal("0"), _finance_decimal(payout.amount))
                 saved_total = sum(saved.values(), Decimal("0"))
                 usable_saved = (
@@ -50,7 +53,7 @@ class Command(BaseCommand):
                     and abs(saved_total - requested) <= FINANCE_QUANTUM
                     and all(song_id in song_totals for song_id in saved)
                 )
-                allocation = saved if usable_saved else _finance_allocate_across_songs(
+                allocation = saved if usable_saved else allocate_across_songs(
                     song_totals,
                     reserved,
                     requested,
@@ -70,4 +73,6 @@ class Command(BaseCommand):
                 for song_id, amount in allocation.items():
                     reserved[song_id] = reserved.get(song_id, Decimal("0")) + amount
 
+            rebuild_artist_ledger(artist.pk)
+
         self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} payout request(s)."))
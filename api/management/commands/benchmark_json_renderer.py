@@ -0,0 +1,91 @@
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, RequestFactory
+from django.urls import resolve
+from django.utils.module_loading import import_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.localization import LocalizedJSONRenderer, localize_api_payload
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the previous LocalizedJSONRenderer path (localize + stdlib json) with the '
+        'orjson fast path on recorded response payloads.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('payloads', nargs='*', help='JSON files holding recorded response bodies.')
+        parser.add_argument(
+            '--url', action='append', default=[],
+            help='Record the anonymous GET response of this API path first (repeatable).',
+        )
+        parser.add_argument(
+            '--view', default='',
+            help='Dotted path of the view class the payload files came from (enables its key schema).',
+        )
+        parser.add_argument('--language', default='fa', choices=['fa', 'en'])
+        parser.add_argument('--status', type=int, default=200, help='Response status the payloads are rendered with.')
+        parser.add_argument('--iterations', type=int, default=200, help='Renders timed per payload and path.')
+
+    def _record(self, url, language):
+        response = Client().get(url, HTTP_HOST='localhost', HTTP_ACCEPT_LANGUAGE=language)
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+        view_class = getattr(resolve(urlsplit(url).path).func, 'cls', None)
+        return url, json.loads(response.content), view_class
+
+    def _time(self, render, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            body = render()
+        return (time.perf_counter() - started) * 1000 / iterations, body
+
+    def handle(self, *args, **options):
+        language = options['language']
+        payloads = [self._record(url, language) for url in options['url']]
+        file_view = import_string(options['view']) if options['view'] else None
+        for path in options['payloads']:
+            payloads.append((path, json.loads(Path(path).read_text(encoding='utf-8')), file_view))
+        if not payloads:
+            raise CommandError('Pass recorded payload files and/or --url paths.')
+
+        status_code = options['status']
+        iterations = max(1, options['iterations'])
+        request = Request(RequestFactory().get('/', HTTP_ACCEPT_LANGUAGE=language))
+        response = SimpleNamespace(status_code=status_code)
+        stdlib_renderer = JSONRenderer()
+        renderer = LocalizedJSONRenderer()
+
+        def previous(data, context):
+            localized = localize_api_payload(
+                data, language, status_code=status_code,
+                message_context=status_code >= 400 or isinstance(data, str),
+            )
+            return stdlib_renderer.render(localized, None, context)
+
+        total_previous = total_fast = 0.0
+        for name, data, view_class in payloads:
+            context = {'request': request, 'response': response, 'view': view_class() if view_class else None}
+            # Let the fast path learn the view's message-key schema first.
+            renderer.render(data, None, context)
+            previous_ms, previous_body = self._time(lambda: previous(data, context), iterations)
+            fast_ms, fast_body = self._time(lambda: renderer.render(data, None, context), iterations)
+            if json.loads(previous_body) != json.loads(fast_body):
+                raise CommandError(f'{name}: rendered bodies differ')
+            total_previous += previous_ms
+            total_fast += fast_ms
+            self.stdout.write(
+                f'{name}: {len(previous_body)} bytes, previous {previous_ms:.3f} ms, '
+                f'fast {fast_ms:.3f} ms ({previous_ms / max(fast_ms, 1e-9):.1f}x)'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'total: previous {total_previous:.3f} ms, fast {total_fast:.3f} ms '
+            f'({total_previous / max(total_fast, 1e-9):.1f}x)'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.item_cf import build_item_cf_model, refresh_item_cf_model
+
+
+class Command(BaseCommand):
+    help = 'Build the item-item collaborative filtering model from likes, plays and playlist membership.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-stale',
+            action='store_true',
+            help='Only rebuild when the published model is older than ITEM_CF_REFRESH_HOURS.',
+        )
+
+    def handle(self, *args, **options):
+        built = refresh_item_cf_model() if options['if_stale'] else build_item_cf_model()
+        if built is None:
+            self.stdout.write('item CF model is current; skipping build')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"item CF model built: {built['songs']} songs, {built['users']} users, "
+            f"{built['pairs']} neighbour pairs in {built['seconds']}s"
+        ))
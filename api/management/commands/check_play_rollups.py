@@ -0,0 +1,40 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.play_rollups import ledger_day_counts, rebuild_play_rollups_for_day, rollup_day_counts
+
+
+class Command(BaseCommand):
+    help = 'Compare daily play rollups against the PlayCount ledger and optionally repair drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Number of recent UTC days to audit.')
+        parser.add_argument('--repair', action='store_true', help='Rebuild every day that does not match.')
+
+    def handle(self, *args, **options):
+        today = timezone.now().astimezone(dt_timezone.utc).date()
+        mismatched = []
+        for offset in range(max(1, options['days'])):
+            day = today - timedelta(days=offset)
+            ledger = ledger_day_counts(day)
+            rollups = rollup_day_counts(day)
+            drift = {
+                song_id: (ledger.get(song_id, 0), rollups.get(song_id, 0))
+                for song_id in set(ledger) | set(rollups)
+                if ledger.get(song_id, 0) != rollups.get(song_id, 0)
+            }
+            if not drift:
+                continue
+            mismatched.append(day)
+            self.stdout.write(self.style.WARNING(
+                f'{day.isoformat()}: {len(drift)} songs differ '
+                f'(ledger={sum(ledger.values())}, rollups={sum(rollups.values())})'
+            ))
+            if options['repair']:
+                rebuild_play_rollups_for_day(day)
+                self.stdout.write(f'{day.isoformat()}: rebuilt from ledger')
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('play rollups match the ledger'))
@@ -121,6 +121,13 @@ class Command(BaseCommand):
                     "ON api_playlist USING gin (UPPER(title_en) gin_trgm_ops)",
                     "CREATE INDEX CONCURRENTLY IF NOT EXISTS api_playlist_description_trgm_idx "
                     "ON api_playlist USING gin (UPPER(description) gin_trgm_ops)",
+                    # Precomputed search documents (SEARCH_BACKEND=postgres).
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS api_searchdocument_names_trgm_idx "
+                    "ON api_searchdocument USING gin (names gin_trgm_ops)",
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS api_searchdocument_document_trgm_idx "
+                    "ON api_searchdocument USING gin (document gin_trgm_ops)",
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS api_searchdocument_document_fts_idx "
+                    "ON api_searchdocument USING gin (to_tsvector('simple', document))",
                 ]
 
                 completed = 0
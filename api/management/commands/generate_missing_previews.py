@@ -165,6 +165,7 @@ class Command(BaseCommand):
                             preview_error="",
                             preview_attempts=0,
                             preview_last_attempt_at=timezone.now(),
+                            updated_at=timezone.now(),
                         )
                         generated += 1
                         succeeded = True
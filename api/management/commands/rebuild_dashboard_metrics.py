@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.dashboard_metrics import rebuild_dashboard_metrics, refresh_top_artists
+
+
+class Command(BaseCommand):
+    help = 'Re-derive owner dashboard counters and hour buckets, then refresh the top-artists leaderboard.'
+
+    def handle(self, *args, **options):
+        changed = rebuild_dashboard_metrics()
+        self.stdout.write(f'rows_changed: {changed}')
+        self.stdout.write(f'top_artists: {len(refresh_top_artists())}')
+        self.stdout.write(self.style.SUCCESS('dashboard metrics rebuilt'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from api.models import SearchDocument
+from api.search_documents import documents_enabled, rebuild_search_documents
+from api.search_index import KINDS
+
+
+class Command(BaseCommand):
+    help = 'Rebuild PostgreSQL search documents used by SEARCH_BACKEND=postgres.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=KINDS, action='append', help='Only rebuild these entity kinds.')
+        parser.add_argument(
+            '--if-empty',
+            action='store_true',
+            help='Only rebuild kinds that have no documents yet (safe to run on every deploy).',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild even when SEARCH_BACKEND is not postgres.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['force'] and not documents_enabled():
+            self.stdout.write('search documents skipped: SEARCH_BACKEND=postgres on PostgreSQL is required')
+            return
+        for kind in options['kind'] or KINDS:
+            if options['if_empty'] and SearchDocument.objects.filter(kind=kind).exists():
+                continue
+            written = rebuild_search_documents(kind)
+            self.stdout.write(f'{kind}: {written} documents')
+        self.stdout.write(self.style.SUCCESS('search documents rebuilt'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.artist_ledger import reconcile_artist_ledgers
+
+
+class Command(BaseCommand):
+    help = 'Rebuild stored per-song artist finance ledgers from plays and payout history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Artists read per batch.')
+
+    def handle(self, *args, **options):
+        result = reconcile_artist_ledgers(batch_size=max(1, options['batch_size']))
+        for key, total in result.items():
+            self.stdout.write(f'{key}: {total}')
+        self.stdout.write(self.style.SUCCESS('artist finance ledgers reconciled'))
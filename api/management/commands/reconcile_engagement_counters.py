@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.engagement_counters import reconcile_engagement_counters
+
+
+class Command(BaseCommand):
+    help = 'Re-derive materialized like/follow/playlist counters and drop rows for deleted entities.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Counter rows checked per batch.')
+
+    def handle(self, *args, **options):
+        result = reconcile_engagement_counters(batch_size=max(1, options['batch_size']))
+        for kind, total in result.items():
+            self.stdout.write(f'{kind}: {total}')
+        self.stdout.write(self.style.SUCCESS('engagement counters reconciled'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.play_ingestion import replay_dead_letters
+from api.recommendation_runtime import get_redis_client
+
+
+class Command(BaseCommand):
+    help = 'Move dead-lettered play ingestion entries back onto the ingestion stream.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Replay at most this many entries.')
+
+    def handle(self, *args, **options):
+        client = get_redis_client()
+        if client is None:
+            raise CommandError('Redis is unavailable.')
+        limit = options['limit']
+        moved = replay_dead_letters(client, limit=max(0, limit) if limit is not None else None)
+        self.stdout.write(self.style.SUCCESS(f'replayed {moved} dead-lettered plays'))
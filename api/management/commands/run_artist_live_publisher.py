@@ -0,0 +1,31 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.artist_live import publish_pending_artist_live_updates
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Coalesce artist counter changes and push them to artist dashboard sockets.'
+
+    def handle(self, *args, **options):
+        interval = max(0.2, int(getattr(settings, 'ARTIST_LIVE_PUBLISH_INTERVAL_MS', 1000)) / 1000.0)
+        self.stdout.write('artist live publisher ready')
+        while True:
+            started = time.monotonic()
+            try:
+                close_old_connections()
+                sent = publish_pending_artist_live_updates()
+                if sent:
+                    logger.debug('Published live counters for %s artists', sent)
+            except Exception:
+                logger.exception('Artist live publish cycle failed')
+            finally:
+                close_old_connections()
+            # Changes landing during the pause are coalesced into the next pass.
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
@@ -0,0 +1,56 @@
+import logging
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.play_ingestion import ensure_consumer_group, process_stream_entries, read_play_batch
+from api.recommendation_runtime import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Flush Redis-streamed plays into PostgreSQL in batches (PLAY_INGESTION_MODE=stream).'
+
+    def handle(self, *args, **options):
+        consumer = f'{socket.gethostname()}:{os.getpid()}'
+        batch_size = max(1, int(getattr(settings, 'PLAY_INGESTION_BATCH_SIZE', 200)))
+        # Keep the blocking read below the Redis socket timeout.
+        socket_timeout_ms = int(float(getattr(settings, 'REDIS_SOCKET_TIMEOUT', 1.0)) * 1000)
+        block_ms = max(50, min(int(getattr(settings, 'PLAY_INGESTION_BLOCK_MS', 500)), socket_timeout_ms - 200))
+        reclaim_idle_ms = max(5000, int(getattr(settings, 'PLAY_INGESTION_RECLAIM_IDLE_MS', 60000)))
+        group_ready = False
+
+        self.stdout.write(f'play ingestion worker ready consumer={consumer}')
+        while True:
+            client = get_redis_client()
+            if client is None:
+                group_ready = False
+                time.sleep(2)
+                continue
+            try:
+                if not group_ready:
+                    ensure_consumer_group(client)
+                    group_ready = True
+                messages = read_play_batch(
+                    client,
+                    consumer,
+                    batch_size=batch_size,
+                    block_ms=block_ms,
+                    reclaim_idle_ms=reclaim_idle_ms,
+                )
+                if not messages:
+                    continue
+                close_old_connections()
+                written = process_stream_entries(client, messages)
+                logger.debug('Flushed %s plays from %s stream entries', written, len(messages))
+            except Exception:
+                group_ready = False
+                logger.exception('Play ingestion cycle failed')
+                time.sleep(1)
+            finally:
+                close_old_connections()
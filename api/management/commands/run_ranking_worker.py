@@ -7,14 +7,76 @@ from django.core.management.base import BaseCommand
 from django.db import close_old_connections
 
 from api.recommendation_runtime import get_redis_client
+from api.item_cf import refresh_item_cf_model
+from api.search_index import index_enabled, refresh_search_index
+from api.search_suggest import refresh_suggestions
+from api.similarity import refresh_similar_song_lists
+from api.song_embeddings import refresh_song_matrix
 from api.trending import trending_song_ids
 
 logger = logging.getLogger(__name__)
 _LOCK_KEY = 'sedabox:ranking-worker:trending-refresh:v1'
+_SEARCH_LOCK_KEY = 'sedabox:ranking-worker:search-index:v1'
+_SUGGEST_LOCK_KEY = 'sedabox:ranking-worker:search-suggest:v1'
+_EMBEDDING_LOCK_KEY = 'sedabox:ranking-worker:song-embeddings:v1'
+_ITEM_CF_LOCK_KEY = 'sedabox:ranking-worker:item-cf:v1'
+
+
+def _run_locked(client, key, ttl, label, callback):
+    token = f'{os.getpid()}:{time.time_ns()}'
+    claimed = True
+    try:
+        if client is not None:
+            claimed = bool(client.set(key, token, nx=True, ex=ttl))
+        if claimed:
+            close_old_connections()
+            callback()
+    except Exception:
+        logger.exception('%s failed', label)
+    finally:
+        close_old_connections()
+        if claimed and client is not None:
+            try:
+                if client.get(key) == token:
+                    client.delete(key)
+            except Exception:
+                pass
+
+
+def _refresh_trending():
+    trending_song_ids(require_preview=False, force=True)
+    trending_song_ids(require_preview=True, force=True)
+
+
+def _refresh_search_index():
+    rebuilt = refresh_search_index()
+    if rebuilt:
+        logger.info('Search index segments rebuilt: %s', rebuilt)
+
+
+def _refresh_suggestions():
+    entries = refresh_suggestions()
+    if entries is not None:
+        logger.info('Search suggestions rebuilt: %s entries', entries)
+
+
+def _refresh_song_matrix():
+    built = refresh_song_matrix()
+    if built is not None:
+        logger.info('Song embedding matrix rebuilt: %s', built)
+    refreshed = refresh_similar_song_lists()
+    if refreshed:
+        logger.info('Similar song lists refreshed: %s', refreshed)
+
+
+def _refresh_item_cf():
+    built = refresh_item_cf_model()
+    if built is not None:
+        logger.info('Item CF model rebuilt: %s', built)
 
 
 class Command(BaseCommand):
-    help = 'Precompute expensive global ranking caches outside request workers.'
+    help = 'Precompute ranking caches, search structures, song similarity and recommendation models outside request workers.'
 
     def handle(self, *args, **options):
         # Background ranking should yield CPU to HTTP/WebSocket workers under load.
@@ -23,28 +85,21 @@ class Command(BaseCommand):
         except (AttributeError, OSError):
             pass
         interval = max(30, int(getattr(settings, 'TRENDING_REFRESH_INTERVAL', 90)))
+        # Search segments are only used while current, so check versions often.
+        search_interval = max(2, int(getattr(settings, 'SEARCH_INDEX_REFRESH_INTERVAL', 5)))
+        next_trending = 0.0
+        next_search = 0.0
         self.stdout.write('ranking worker ready')
         while True:
-            started = time.monotonic()
             client = get_redis_client()
-            token = f'{os.getpid()}:{time.time_ns()}'
-            claimed = True
-            try:
-                if client is not None:
-                    claimed = bool(client.set(_LOCK_KEY, token, nx=True, ex=max(120, interval * 2)))
-                if claimed:
-                    close_old_connections()
-                    trending_song_ids(require_preview=False, force=True)
-                    trending_song_ids(require_preview=True, force=True)
-            except Exception:
-                logger.exception('Trending ranking refresh failed')
-            finally:
-                close_old_connections()
-                if claimed and client is not None:
-                    try:
-                        if client.get(_LOCK_KEY) == token:
-                            client.delete(_LOCK_KEY)
-                    except Exception:
-                        pass
-            elapsed = time.monotonic() - started
-            time.sleep(max(5, interval - elapsed))
+            if time.monotonic() >= next_trending:
+                next_trending = time.monotonic() + interval
+                _run_locked(client, _LOCK_KEY, max(120, interval * 2), 'Trending ranking refresh', _refresh_trending)
+                _run_locked(client, _ITEM_CF_LOCK_KEY, 3600, 'Item CF model refresh', _refresh_item_cf)
+            if time.monotonic() >= next_search:
+                if index_enabled():
+                    _run_locked(client, _SEARCH_LOCK_KEY, 600, 'Search index refresh', _refresh_search_index)
+                _run_locked(client, _SUGGEST_LOCK_KEY, 600, 'Search suggestion refresh', _refresh_suggestions)
+                _run_locked(client, _EMBEDDING_LOCK_KEY, 900, 'Song embedding refresh', _refresh_song_matrix)
+                next_search = time.monotonic() + search_interval
+            time.sleep(max(1.0, min(next_trending, next_search) - time.monotonic()))
@@ -1,7 +1,11 @@
 import logging
 import os
+import signal
+import subprocess
+import sys
 import time
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import close_old_connections
 
@@ -10,7 +14,7 @@ from api.performance import user_affinity_version
 from api.recommendation_runtime import (
     enqueue_personal_recommendation_refresh,
     mark_personal_recommendation_refresh,
-    pop_personal_recommendation_refresh,
+    pop_personal_recommendation_refreshes,
 )
 
 logger = logging.getLogger(__name__)
@@ -19,15 +23,32 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = "Process deduplicated personal recommendation refresh jobs from Redis."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=getattr(settings, 'RECOMMENDATION_WORKER_BATCH_SIZE', 50),
+            help='Queued users drained and generated together per pass.',
+        )
+        parser.add_argument(
+            '--processes', type=int,
+            default=getattr(settings, 'RECOMMENDATION_WORKER_PROCESSES', 1),
+            help='Worker processes consuming the queue; more than one runs a supervisor.',
+        )
+
     def handle(self, *args, **options):
         try:
             os.nice(5)
         except (AttributeError, OSError):
             pass
-        self.stdout.write("recommendation worker ready")
+        batch_size = max(1, min(int(options['batch_size']), 500))
+        processes = max(1, min(int(options['processes']), 32))
+        if processes > 1:
+            self._supervise(processes, batch_size)
+            return
+        self.stdout.write(f"recommendation worker ready batch_size={batch_size}")
         while True:
-            user_id = pop_personal_recommendation_refresh(timeout=5)
-            if not user_id:
+            user_ids = pop_personal_recommendation_refreshes(batch_size, timeout=5)
+            if not user_ids:
                 close_old_connections()
                 # BRPOP normally blocks, but Redis outages short-circuit to a
                 # miss. Back off explicitly so a cache outage cannot turn this
@@ -36,25 +57,74 @@ class Command(BaseCommand):
                 continue
             try:
                 close_old_connections()
-                user = User.objects.filter(pk=user_id, is_active=True).first()
-                if not user:
-                    continue
-                # Capture the version this run is responsible for. If another
-                # interaction lands while generation is running, its signal bumps
-                # the version and queues another pass; we never mark that newer
-                # version complete by accident.
-                target_version = user_affinity_version(user.pk)
-                from api.views import _generate_personal_recommendations
-                _generate_personal_recommendations(user, target=18)
-                mark_personal_recommendation_refresh(user.pk, target_version)
-                if user_affinity_version(user.pk) > target_version:
-                    enqueue_personal_recommendation_refresh(user.pk)
+                self._refresh(user_ids)
             except Exception:
-                logger.exception("Personal recommendation refresh failed for user=%s", user_id)
+                logger.exception("Personal recommendation refresh failed for users=%s", user_ids)
                 # The queue dedupe key is released when a job is claimed. Give
                 # transient database/Redis failures a bounded retry instead of
                 # forcing Home to keep doing synchronous safety regeneration.
                 time.sleep(2.0)
-                enqueue_personal_recommendation_refresh(user_id, ttl=30)
+                for user_id in user_ids:
+                    enqueue_personal_recommendation_refresh(user_id, ttl=30)
             finally:
                 close_old_connections()
+
+    def _refresh(self, user_ids):
+        users = list(User.objects.filter(pk__in=user_ids, is_active=True))
+        if not users:
+            return
+        # Capture the version each run is responsible for. If another
+        # interaction lands while generation is running, its signal bumps
+        # the version and queues another pass; we never mark that newer
+        # version complete by accident.
+        target_versions = {user.pk: user_affinity_version(user.pk) for user in users}
+        from api.views import _generate_personal_recommendations_batch
+        _generate_personal_recommendations_batch(users, target=18)
+        for user_id, target_version in target_versions.items():
+            mark_personal_recommendation_refresh(user_id, target_version)
+            if user_affinity_version(user_id) > target_version:
+                enqueue_personal_recommendation_refresh(user_id)
+
+    def _supervise(self, processes, batch_size):
+        """Run single-process consumers side by side; the Redis queue shares work."""
+        command = [
+            sys.executable, sys.argv[0], 'run_recommendation_worker',
+            '--processes', '1', '--batch-size', str(batch_size),
+        ]
+        children = []
+        stopping = False
+
+        def spawn():
+            proc = subprocess.Popen(command)
+            children.append(proc)
+            self.stdout.write(f"recommendation worker pid={proc.pid} started")
+
+        def stop(_signum=None, _frame=None):
+            nonlocal stopping
+            stopping = True
+            for proc in list(children):
+                if proc.poll() is None:
+                    proc.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for _ in range(processes):
+            spawn()
+        while not stopping:
+            for proc in list(children):
+                code = proc.poll()
+                if code is None:
+                    continue
+                children.remove(proc)
+                logger.warning("Recommendation worker pid=%s exited code=%s", proc.pid, code)
+                if not stopping:
+                    time.sleep(0.25)
+                    spawn()
+            time.sleep(0.5)
+
+        deadline = time.monotonic() + 15
+        for proc in children:
+            try:
+                proc.wait(timeout=max(0.1, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
@@ -1,13 +1,20 @@
 import logging
 import os
 import time
+from datetime import timedelta
 
 from django.conf import settings
 from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.db import close_old_connections
+from django.utils import timezone
 
+from api.artist_analytics import refresh_artist_snapshots
+from api.artist_ledger import reconcile_artist_ledgers
+from api.dashboard_metrics import flush_dashboard_plays, rebuild_dashboard_metrics, refresh_top_artists
+from api.engagement_counters import reconcile_engagement_counters
 from api.runtime_maintenance import cleanup_runtime_state
+from api.user_history import flush_pending_history
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +24,7 @@ def enabled(name, default='1'):
 
 
 class Command(BaseCommand):
-    help = 'Run safe bounded runtime cleanup and preview backfill outside web workers.'
+    help = 'Run safe bounded runtime cleanup, history flushes, counter/ledger reconciliation, analytics snapshots, dashboard metrics and preview backfill outside web workers.'
 
     def handle(self, *args, **options):
         try:
@@ -28,8 +35,23 @@ class Command(BaseCommand):
         cleanup_interval = max(300, int(getattr(settings, 'RUNTIME_MAINTENANCE_INTERVAL', 900)))
         preview_interval = max(300, int(os.getenv('PREVIEW_MAINTENANCE_INTERVAL', '300')))
         preview_delay = max(30, int(os.getenv('PREVIEW_STARTUP_DELAY_SECONDS', '60')))
+        history_interval = max(5, int(getattr(settings, 'HISTORY_FLUSH_INTERVAL', 10)))
+        counters_interval = max(600, int(getattr(settings, 'ENGAGEMENT_COUNTER_RECONCILE_INTERVAL', 21600)))
+        ledgers_interval = max(600, int(getattr(settings, 'ARTIST_LEDGER_RECONCILE_INTERVAL', 21600)))
+        snapshots_interval = max(300, int(getattr(settings, 'ARTIST_ANALYTICS_SNAPSHOT_INTERVAL', 3600)))
+        leaderboard_interval = max(60, int(getattr(settings, 'ADMIN_DASHBOARD_LEADERBOARD_INTERVAL', 600)))
+        dashboard_interval = max(600, int(getattr(settings, 'ADMIN_DASHBOARD_RECONCILE_INTERVAL', 21600)))
+        dashboard_plays_interval = max(5, int(getattr(settings, 'ADMIN_DASHBOARD_PLAY_FLUSH_INTERVAL', 30)))
         preview_enabled = enabled('GENERATE_PREVIEWS_ON_STARTUP', '1')
         next_cleanup = 0.0
+        next_history = 0.0
+        next_counters = time.monotonic() + cleanup_interval
+        next_ledgers = time.monotonic() + cleanup_interval
+        next_snapshots = time.monotonic() + cleanup_interval
+        snapshots_played_since = timezone.now() - timedelta(seconds=snapshots_interval)
+        next_leaderboard = 0.0
+        next_dashboard = time.monotonic() + cleanup_interval
+        next_dashboard_plays = 0.0
         next_preview = time.monotonic() + preview_delay
         startup = True
 
@@ -42,6 +64,40 @@ class Command(BaseCommand):
                     startup = False
                     next_cleanup = time.monotonic() + cleanup_interval
 
+                if now >= next_history:
+                    # Drain buffered history touches, bounded by one interval.
+                    while flush_pending_history(limit=500) and time.monotonic() - now < history_interval:
+                        close_old_connections()
+                    next_history = time.monotonic() + history_interval
+
+                if now >= next_counters:
+                    reconcile_engagement_counters()
+                    next_counters = time.monotonic() + counters_interval
+
+                if now >= next_ledgers:
+                    reconcile_artist_ledgers()
+                    next_ledgers = time.monotonic() + ledgers_interval
+
+                if now >= next_snapshots:
+                    # Rebuild artists played since the previous pass, plus every
+                    # snapshot left from an earlier day after midnight.
+                    started_at = timezone.now()
+                    refresh_artist_snapshots(played_since=snapshots_played_since)
+                    snapshots_played_since = started_at
+                    next_snapshots = time.monotonic() + snapshots_interval
+
+                if now >= next_leaderboard:
+                    refresh_top_artists()
+                    next_leaderboard = time.monotonic() + leaderboard_interval
+
+                if now >= next_dashboard_plays:
+                    flush_dashboard_plays()
+                    next_dashboard_plays = time.monotonic() + dashboard_plays_interval
+
+                if now >= next_dashboard:
+                    rebuild_dashboard_metrics()
+                    next_dashboard = time.monotonic() + dashboard_interval
+
                 if preview_enabled and now >= next_preview:
                     # Small batches + one FFmpeg thread keep media backfill from
                     # contending with request workers on modest hosts.
@@ -58,10 +114,27 @@ class Command(BaseCommand):
                     next_cleanup = time.monotonic() + min(cleanup_interval, 60)
                 if next_preview <= now:
                     next_preview = time.monotonic() + min(preview_interval, 60)
+                if next_history <= now:
+                    next_history = time.monotonic() + history_interval
+                if next_counters <= now:
+                    next_counters = time.monotonic() + min(counters_interval, 600)
+                if next_ledgers <= now:
+                    next_ledgers = time.monotonic() + min(ledgers_interval, 600)
+                if next_snapshots <= now:
+                    next_snapshots = time.monotonic() + min(snapshots_interval, 600)
+                if next_leaderboard <= now:
+                    next_leaderboard = time.monotonic() + leaderboard_interval
+                if next_dashboard_plays <= now:
+                    next_dashboard_plays = time.monotonic() + dashboard_plays_interval
+                if next_dashboard <= now:
+                    next_dashboard = time.monotonic() + min(dashboard_interval, 600)
             finally:
                 close_old_connections()
 
-            deadlines = [next_cleanup]
+            deadlines = [
+                next_cleanup, next_history, next_counters, next_ledgers, next_snapshots,
+                next_leaderboard, next_dashboard_plays, next_dashboard,
+            ]
             if preview_enabled:
                 deadlines.append(next_preview)
             sleep_for = max(5.0, min(deadlines) - time.monotonic())
@@ -6,6 +6,7 @@ from django.contrib.auth.models import (
 )
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator, RegexValidator
 import os
@@ -305,12 +306,8 @@ class Artist(models.Model):
     @property
     def live_listeners(self):
         """Count unique active listeners for this artist's songs"""
-        from django.utils import timezone
-        now = timezone.now()
-        return ActivePlayback.objects.filter(
-            song__artist=self,
-            expiration_time__gt=now
-        ).values('user').distinct().count()
+        from .live_presence import artist_live_listener_count
+        return artist_live_listener_count(self.pk)
 
 
 class SocialPlatform(models.Model):
@@ -722,21 +719,43 @@ class SongLike(models.Model):
         ordering = ['-created_at']
 
 
-class ActivePlayback(models.Model):
-    """Track currently playing songs for live listener count"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='active_playbacks')
-    song = models.ForeignKey('Song', on_delete=models.CASCADE, related_name='active_playbacks')
-    start_time = models.DateTimeField(auto_now_add=True)
-    expiration_time = models.DateTimeField()
+class SimilarSongList(models.Model):
+    """Precomputed most-similar published songs for one published song.
+
+    Maintained by the ranking worker from the song feature matrix. ``signature``
+    fingerprints the features and taxonomy the list was computed from, so only
+    songs whose inputs changed (and their neighbours) are recomputed.
+    """
+    song = models.OneToOneField('Song', on_delete=models.CASCADE, primary_key=True, related_name='similar_list')
+    similar_ids = models.JSONField(default=list, blank=True)
+    signature = models.BigIntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
-            models.Index(fields=['expiration_time']),
-            models.Index(fields=['user']),
+            models.Index(fields=['computed_at']),
         ]
 
     def __str__(self):
-        return f"{self.user.phone_number} playing {self.song.title} (expires: {self.expiration_time})"
+        return f"SimilarSongList(song={self.song_id}, {len(self.similar_ids or [])} songs)"
+
+
+class UserTasteProfile(models.Model):
+    """Time-decayed genre/mood/tag/artist weights for one listener.
+
+    Maps are ``{id: weight}`` with weights decayed to ``decayed_at``; they are
+    updated incrementally from interaction signals (see ``api.taste_profile``).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='taste_profile')
+    genres = models.JSONField(default=dict, blank=True)
+    moods = models.JSONField(default=dict, blank=True)
+    tags = models.JSONField(default=dict, blank=True)
+    artists = models.JSONField(default=dict, blank=True)
+    decayed_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"UserTasteProfile(user={self.user_id})"
 
 
 class Playlist(models.Model):
@@ -802,6 +821,46 @@ class PlaylistLike(models.Model):
         ordering = ['-created_at']
 
 
+class EngagementCounter(models.Model):
+    """Denormalized like/follow/playlist totals for one song, album, playlist,
+    artist or user.
+
+    Kept in the same transaction as the like/follow/playlist write by signals
+    (see ``api.engagement_counters``) and periodically reconciled, so card
+    hydration reads one row per entity instead of grouping the relation tables.
+    """
+    KIND_SONG = 'song'
+    KIND_ALBUM = 'album'
+    KIND_PLAYLIST = 'playlist'
+    KIND_ARTIST = 'artist'
+    KIND_USER = 'user'
+
+    KIND_CHOICES = [
+        (KIND_SONG, 'Song'),
+        (KIND_ALBUM, 'Album'),
+        (KIND_PLAYLIST, 'Playlist'),
+        (KIND_ARTIST, 'Artist'),
+        (KIND_USER, 'User'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    likes = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    followings = models.PositiveIntegerField(default=0)
+    playlist_adds = models.PositiveIntegerField(default=0)
+    playlist_users = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_engagement_counter'),
+        ]
+
+    def __str__(self):
+        return f"EngagementCounter({self.kind}={self.object_id})"
+
+
 class PlayCount(models.Model):
     """Track individual play counts for songs"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='play_counts')
@@ -818,6 +877,114 @@ class PlayCount(models.Model):
         return f"PlayCount(user={self.user_id}, {self.city}, {self.country}, {self.created_at})"
 
 
+class PlayRollup(models.Model):
+    """Pre-aggregated song plays per UTC hour/day bucket.
+
+    Derived from the ``PlayCount`` ledger and maintained in the same transaction
+    as each recorded play. Artist and album totals are read through ``song`` so
+    a reassigned song never leaves stale per-artist rows behind.
+    """
+    GRANULARITY_HOUR = 'hour'
+    GRANULARITY_DAY = 'day'
+    GRANULARITY_CHOICES = [
+        (GRANULARITY_HOUR, 'Hour'),
+        (GRANULARITY_DAY, 'Day'),
+    ]
+
+    song = models.ForeignKey('Song', on_delete=models.CASCADE, related_name='play_rollups')
+    granularity = models.CharField(max_length=8, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    plays = models.PositiveBigIntegerField(default=0)
+    pay = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+    last_played_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['song', 'granularity', 'bucket_start'],
+                name='unique_play_rollup_song_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"PlayRollup(song={self.song_id}, {self.granularity} {self.bucket_start}, plays={self.plays})"
+
+
+class PlayDimensionRollup(models.Model):
+    """Daily song plays split by listener city, country or plan."""
+    DIMENSION_CITY = 'city'
+    DIMENSION_COUNTRY = 'country'
+    DIMENSION_PLAN = 'plan'
+    DIMENSION_CHOICES = [
+        (DIMENSION_CITY, 'City'),
+        (DIMENSION_COUNTRY, 'Country'),
+        (DIMENSION_PLAN, 'Plan'),
+    ]
+
+    song = models.ForeignKey('Song', on_delete=models.CASCADE, related_name='play_dimension_rollups')
+    day = models.DateField()
+    dimension = models.CharField(max_length=16, choices=DIMENSION_CHOICES)
+    value = models.CharField(max_length=100, blank=True)
+    plays = models.PositiveBigIntegerField(default=0)
+    pay = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['song', 'day', 'dimension', 'value'],
+                name='unique_play_dimension_rollup',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'day']),
+        ]
+
+    def __str__(self):
+        return f"PlayDimensionRollup(song={self.song_id}, {self.day}, {self.dimension}={self.value})"
+
+
+class ArtistAnalyticsSnapshot(models.Model):
+    """Precomputed artist dashboard figures for one analytics period.
+
+    Built by ``api.artist_analytics`` from everything recorded before
+    ``covers_until`` (an hour boundary) on ``day``; the analytics endpoint adds
+    the plays, likes and follows recorded since then.
+    """
+    PERIOD_TODAY = 'today'
+    PERIOD_7D = '7d'
+    PERIOD_30D = '30d'
+    PERIOD_365D = '365d'
+    PERIOD_ALL = 'all'
+    PERIOD_CHOICES = [
+        (PERIOD_TODAY, 'Today'),
+        (PERIOD_7D, 'Last 7 days'),
+        (PERIOD_30D, 'Last 30 days'),
+        (PERIOD_365D, 'Last 12 months'),
+        (PERIOD_ALL, 'All time'),
+    ]
+
+    artist = models.ForeignKey('Artist', on_delete=models.CASCADE, related_name='analytics_snapshots')
+    period = models.CharField(max_length=8, choices=PERIOD_CHOICES)
+    day = models.DateField()
+    covers_until = models.DateTimeField()
+    built_at = models.DateTimeField(auto_now=True)
+    payload = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['artist', 'period'], name='unique_artist_analytics_snapshot'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"ArtistAnalyticsSnapshot(artist={self.artist_id}, {self.period}, {self.covers_until})"
+
+
 class PlayConfiguration(models.Model):
     """Configuration for play worth based on user plan and payout rules."""
     free_play_worth = models.DecimalField(max_digits=12, decimal_places=8, default=0.000000)
@@ -1053,6 +1220,43 @@ class SearchSection(models.Model):
         return f"{self.title} ({self.type})"
 
 
+class SearchDocument(models.Model):
+    """Normalized search text for one searchable entity (PostgreSQL backend).
+
+    ``names`` holds the primary names (titles, artist names, handles) and
+    ``document`` every searchable field, both fa and en, folded the same way
+    as the in-memory search index. Rows exist only for entities SearchView
+    may return and are refreshed by signals. GIN trigram/tsvector indexes are
+    created by ``ensure_search_indexes``.
+    """
+    KIND_SONG = 'song'
+    KIND_ARTIST = 'artist'
+    KIND_ALBUM = 'album'
+    KIND_PLAYLIST = 'playlist'
+    KIND_USER = 'user'
+    KIND_CHOICES = [
+        (KIND_SONG, 'Song'),
+        (KIND_ARTIST, 'Artist'),
+        (KIND_ALBUM, 'Album'),
+        (KIND_PLAYLIST, 'Playlist'),
+        (KIND_USER, 'User'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    names = models.TextField(blank=True, default="")
+    document = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document_entity'),
+        ]
+
+    def __str__(self):
+        return f"SearchDocument({self.kind}={self.object_id})"
+
+
 class UserHistory(models.Model):
     """Tracks user interactions with songs, albums, playlists, and artists"""
     TYPE_USER = 'user'
@@ -1187,6 +1391,33 @@ class DepositRequest(models.Model):
         return f"DepositRequest({self.artist.name}, {self.amount}, {self.status})"
 
 
+class ArtistSongLedger(models.Model):
+    """Per-song earnings and payout allocations for one artist.
+
+    Play ingestion adds each play's ``pay`` and deposit status transitions move
+    the request's saved ``song_allocations`` between reserved, pending and
+    deposited (see ``api.artist_ledger``), so finance screens read one row per
+    song instead of summing plays and replaying the payout history.
+    """
+    artist = models.ForeignKey('Artist', on_delete=models.CASCADE, related_name='song_ledgers')
+    song = models.ForeignKey('Song', on_delete=models.CASCADE, related_name='artist_ledgers')
+    earned = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    paid_plays = models.PositiveBigIntegerField(default=0)
+    zero_value_plays = models.PositiveBigIntegerField(default=0)
+    reserved = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    deposited = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    pending = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['artist', 'song'], name='unique_artist_song_ledger'),
+        ]
+
+    def __str__(self):
+        return f"ArtistSongLedger(artist={self.artist_id}, song={self.song_id})"
+
+
 class Report(models.Model):
     """User reports for songs or artists."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reports')
@@ -1248,6 +1479,45 @@ class PaymentTransaction(models.Model):
         return f"Transaction {self.transaction_id} - {self.user.phone_number} ({self.amount})"
 
 
+class DashboardCounter(models.Model):
+    """Running all-time total behind the owner dashboard.
+
+    ``key`` is ``plays`` or ``payments:<status>`` / ``payouts:<status>``. Play
+    recording and payment/payout saves apply deltas in the writing transaction
+    (see ``api.dashboard_metrics``), so the dashboard never sums those tables.
+    """
+    key = models.CharField(max_length=48, unique=True)
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"DashboardCounter({self.key}={self.count})"
+
+
+class DashboardHourlyRollup(models.Model):
+    """Platform-wide plays or successful revenue per UTC hour for dashboard windows."""
+    METRIC_PLAYS = 'plays'
+    METRIC_REVENUE = 'revenue'
+    METRIC_CHOICES = [
+        (METRIC_PLAYS, 'Plays'),
+        (METRIC_REVENUE, 'Revenue'),
+    ]
+
+    metric = models.CharField(max_length=16, choices=METRIC_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'bucket_start'], name='unique_dashboard_hourly_rollup'),
+        ]
+
+    def __str__(self):
+        return f"DashboardHourlyRollup({self.metric} {self.bucket_start}, count={self.count})"
+
+
 class SupportTicket(models.Model):
     """Artist-to-admin support ticket. Audience users continue to use reports."""
 
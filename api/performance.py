@@ -3,15 +3,13 @@
 import hashlib
 import json
 import time
-from datetime import timedelta
 
 from django.core.cache import cache
 from django.db import connection
-from django.db.models import Count
-from django.utils import timezone
 
-from .models import ActivePlayback, AlbumLike, Artist, ArtistMonthlyListener, Follow, PlaylistLike, Song, SongLike, User, UserPlaylist
-from .song_play_metrics import hydrate_song_play_counts
+from .hydration import HydrationPlan
+from .live_presence import artist_live_listener_counts
+from .models import Artist, Follow, User
 
 CATALOG_VERSION_KEY = "catalog-version"
 AFFINITY_VERSION_KEY = "affinity-version"
@@ -102,170 +100,34 @@ def relation_ids(obj, name):
 
 def hydrate_song_metrics(songs, user=None, include_playlist_count=True):
     items = list(songs)
-    ids = [item.pk for item in items if item.pk]
-    if not ids:
-        return items
-    required = ('_play_count', '_likes_count', '_playlist_count', '_playlist_users_count', '_is_liked')
-    if all(all(hasattr(item, attr) for attr in required) for item in items):
-        return items
-    hydrate_song_play_counts(items)
-    likes = {
-        row["song_id"]: row["total"]
-        for row in SongLike.objects.filter(song_id__in=ids)
-        .values("song_id").annotate(total=Count("id"))
-    }
-    playlist_counts = {}
-    playlist_users = {}
-    if include_playlist_count:
-        links = UserPlaylist.songs.through.objects.filter(song_id__in=ids)
-        playlist_counts = {
-            row["song_id"]: row["total"]
-            for row in links.values("song_id").annotate(total=Count("userplaylist_id"))
-        }
-        playlist_users = {
-            row["song_id"]: row["total"]
-            for row in links.values("song_id").annotate(total=Count("userplaylist__user_id", distinct=True))
-        }
-    liked = set()
-    if user is not None and getattr(user, "is_authenticated", False):
-        liked = set(SongLike.objects.filter(user=user, song_id__in=ids).values_list("song_id", flat=True))
-    for song in items:
-        song._play_count = int(getattr(song, "_cached_tracked_plays", 0) or 0)
-        song._likes_count = likes.get(song.pk, 0)
-        song._playlist_count = playlist_counts.get(song.pk, 0)
-        song._playlist_users_count = playlist_users.get(song.pk, 0)
-        song._is_liked = song.pk in liked
+    HydrationPlan(user).extend(items, include_playlist_count=include_playlist_count).resolve()
     return items
 
 
 def hydrate_album_metrics(albums, user=None):
     items = list(albums)
-    ids = [item.pk for item in items if item.pk]
-    if not ids:
-        return items
-    counts = {
-        row["album_id"]: row["total"]
-        for row in AlbumLike.objects.filter(album_id__in=ids)
-        .values("album_id").annotate(total=Count("id"))
-    }
-    liked = set()
-    if user is not None and getattr(user, "is_authenticated", False):
-        liked = set(AlbumLike.objects.filter(user=user, album_id__in=ids).values_list("album_id", flat=True))
-    for album in items:
-        album._likes_count = counts.get(album.pk, 0)
-        album._is_liked = album.pk in liked
+    HydrationPlan(user).extend(items).resolve()
     return items
 
 
 def hydrate_artist_metrics(artists, user=None):
     items = list(artists)
-    ids = [item.pk for item in items if item.pk]
-    if not ids:
-        return items
-    followers = {
-        row["followed_artist_id"]: row["total"]
-        for row in Follow.objects.filter(followed_artist_id__in=ids)
-        .values("followed_artist_id").annotate(total=Count("id"))
-    }
-    following = {
-        row["follower_artist_id"]: row["total"]
-        for row in Follow.objects.filter(follower_artist_id__in=ids)
-        .values("follower_artist_id").annotate(total=Count("id"))
-    }
-    monthly = {
-        row["artist_id"]: row["total"]
-        for row in ArtistMonthlyListener.objects.filter(
-            artist_id__in=ids,
-            updated_at__gte=timezone.now() - timedelta(days=28),
-        ).values("artist_id").annotate(total=Count("user_id", distinct=True))
-    }
-    followed = set()
-    if user is not None and getattr(user, "is_authenticated", False):
-        followed = set(Follow.objects.filter(
-            follower_user=user, followed_artist_id__in=ids
-        ).values_list("followed_artist_id", flat=True))
-    for artist in items:
-        artist._followers_count = followers.get(artist.pk, 0)
-        artist._followings_count = following.get(artist.pk, 0)
-        artist._monthly_listeners_count = monthly.get(artist.pk, 0)
-        artist._is_following = artist.pk in followed
+    HydrationPlan(user).extend(items).resolve()
     return items
 
 
 def hydrate_playlist_metrics(playlists, user=None):
     items = list(playlists)
-    ids = [item.pk for item in items if item.pk]
-    if not ids:
-        return items
-    counts = {
-        row["playlist_id"]: row["total"]
-        for row in PlaylistLike.objects.filter(playlist_id__in=ids)
-        .values("playlist_id").annotate(total=Count("id"))
-    }
-    liked = set()
-    if user is not None and getattr(user, "is_authenticated", False):
-        liked = set(PlaylistLike.objects.filter(user=user, playlist_id__in=ids).values_list("playlist_id", flat=True))
-    for playlist in items:
-        playlist._likes_count = counts.get(playlist.pk, 0)
-        playlist._is_liked = playlist.pk in liked
+    HydrationPlan(user).extend(items).resolve()
     return items
 
 
 def hydrate_followable_metrics(entities, user=None):
     """Attach follow metrics for a mixed User/Artist collection in fixed queries."""
     items = list(entities)
-    artists = [item for item in items if isinstance(item, Artist) and item.pk]
-    users = [item for item in items if isinstance(item, User) and item.pk]
-    artist_ids = [item.pk for item in artists]
-    user_ids = [item.pk for item in users]
-
-    artist_followers = {}
-    artist_following = {}
-    user_followers = {}
-    user_following = {}
-    if artist_ids:
-        artist_followers = {
-            row['followed_artist_id']: row['total']
-            for row in Follow.objects.filter(followed_artist_id__in=artist_ids)
-            .values('followed_artist_id').annotate(total=Count('id'))
-        }
-        artist_following = {
-            row['follower_artist_id']: row['total']
-            for row in Follow.objects.filter(follower_artist_id__in=artist_ids)
-            .values('follower_artist_id').annotate(total=Count('id'))
-        }
-    if user_ids:
-        user_followers = {
-            row['followed_user_id']: row['total']
-            for row in Follow.objects.filter(followed_user_id__in=user_ids)
-            .values('followed_user_id').annotate(total=Count('id'))
-        }
-        user_following = {
-            row['follower_user_id']: row['total']
-            for row in Follow.objects.filter(follower_user_id__in=user_ids)
-            .values('follower_user_id').annotate(total=Count('id'))
-        }
-
-    followed_artists = set()
-    followed_users = set()
-    if user is not None and getattr(user, 'is_authenticated', False):
-        if artist_ids:
-            followed_artists = set(Follow.objects.filter(
-                follower_user=user, followed_artist_id__in=artist_ids,
-            ).values_list('followed_artist_id', flat=True))
-        if user_ids:
-            followed_users = set(Follow.objects.filter(
-                follower_user=user, followed_user_id__in=user_ids,
-            ).values_list('followed_user_id', flat=True))
-
-    for artist in artists:
-        artist._followers_count = artist_followers.get(artist.pk, 0)
-        artist._followings_count = artist_following.get(artist.pk, 0)
-        artist._is_following = artist.pk in followed_artists
-    for item in users:
-        item._followers_count = user_followers.get(item.pk, 0)
-        item._followings_count = user_following.get(item.pk, 0)
-        item._is_following = item.pk in followed_users
+    HydrationPlan(user).extend(
+        [item for item in items if isinstance(item, (Artist, User))], include_monthly_listeners=False,
+    ).resolve()
     return items
 
 
@@ -316,14 +178,8 @@ def hydrate_artist_full_list(
     if not ids:
         return items
 
-    hydrate_artist_metrics(items, user)
-    live = {
-        row['song__artist_id']: row['total']
-        for row in ActivePlayback.objects.filter(
-            song__artist_id__in=ids,
-            expiration_time__gt=timezone.now(),
-        ).values('song__artist_id').annotate(total=Count('user_id', distinct=True))
-    }
+    plan = HydrationPlan(user).extend(items)
+    live = artist_live_listener_counts(ids)
     for artist in items:
         artist._live_listeners_count = live.get(artist.pk, 0)
 
@@ -334,6 +190,7 @@ def hydrate_artist_full_list(
         ids, followed_side=False, offset=following_offset, page_size=following_page_size,
     )
     if follower_rows is None or following_rows is None:
+        plan.resolve()
         return items
 
     related_user_ids = {
@@ -360,7 +217,7 @@ def hydrate_artist_full_list(
             nested.append(entity)
 
     unique_nested = list({(type(item), item.pk): item for item in nested if item.pk}.values())
-    hydrate_followable_metrics(unique_nested, user)
+    plan.extend(unique_nested, include_monthly_listeners=False).resolve()
     for artist in items:
         artist._followers_page_items = followers_by_owner.get(artist.pk, [])
         artist._following_page_items = following_by_owner.get(artist.pk, [])
@@ -0,0 +1,316 @@
+"""Optional Redis-streamed, batched play ingestion.
+
+With ``PLAY_INGESTION_MODE=stream`` the play endpoint validates the one-time
+``unique_otplay_id``, claims it in Redis and appends the play to a Redis
+stream in one atomic script. ``run_play_ingestion_worker`` flushes the stream
+in batches: one ``bulk_create`` for ``PlayCount``, one bulk insert into the
+song relation, one monthly-listener upsert, one rollup write and one artist
+finance ledger update per batch.
+
+PostgreSQL stays authoritative for exactly-once accounting. The Redis claim
+only rejects duplicate submissions early; every flush re-checks
+``StreamAccess.one_time_used`` under a row lock and marks it in the same
+commit as the ledger rows, so a redelivered entry (worker crash between commit
+and ack) or a play also recorded by the synchronous fallback is skipped. When
+Redis is unavailable the endpoint records the play synchronously.
+Entries that cannot be recorded because of their own data go to a dead-letter
+stream; ``replay_play_dead_letters`` moves them back once the cause is fixed.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Sequence
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import Q
+
+from .artist_ledger import record_song_earnings
+from .artist_live import mark_artists_dirty
+from .dashboard_metrics import record_dashboard_plays
+from .models import ArtistMonthlyListener, PlayCount, Song, StreamAccess
+from .performance import AFFINITY_VERSION_KEY, bump_user_affinity_version, cache_increment
+from .play_rollups import record_play_rollups
+from .recommendation_runtime import enqueue_personal_recommendation_refresh, get_redis_client
+from .song_play_metrics import record_committed_song_play
+from .taste_profile import PLAY_WEIGHT, record_taste_events
+
+logger = logging.getLogger(__name__)
+
+MODE_SYNC = 'sync'
+MODE_STREAM = 'stream'
+
+_STREAM_KEY = "sedabox:plays:ingest:v1"
+_DEAD_LETTER_KEY = "sedabox:plays:ingest:dead:v1"
+_GROUP = "play-ingestion"
+_CLAIM_PREFIX = "sedabox:plays:claimed:v1"
+_CLAIM_TTL = 7 * 24 * 60 * 60
+_VERSION_TTL = 7 * 24 * 60 * 60
+# Errors caused by the entry itself (e.g. a deleted song or an out-of-range
+# value). Anything else is operational and the entry stays pending.
+_POISON_ERRORS = (DataError, IntegrityError, InvalidOperation, TypeError, ValueError)
+
+_CLAIM_AND_APPEND_LUA = r"""
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    return false
+end
+return redis.call('XADD', KEYS[2], '*', unpack(ARGV, 2))
+"""
+
+
+def stream_ingestion_enabled() -> bool:
+    return str(getattr(settings, 'PLAY_INGESTION_MODE', MODE_SYNC)).strip().lower() == MODE_STREAM
+
+
+def _claim_key(unique_otplay_id: str) -> str:
+    return f"{_CLAIM_PREFIX}:{unique_otplay_id}"
+
+
+def enqueue_play(stream_access: StreamAccess, *, user, city: str, country: str, ip: str | None,
+                 pay: Decimal) -> bool | None:
+    """Claim the play id and append the play to the ingestion stream.
+
+    Returns ``True`` when queued, ``False`` when the play id was already
+    claimed, and ``None`` when Redis is unavailable and the caller must record
+    the play synchronously.
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    fields = {
+        'access_id': stream_access.pk,
+        'user_id': user.pk,
+        'song_id': stream_access.song_id,
+        'city': city,
+        'country': country,
+        'ip': ip or '',
+        'pay': str(pay),
+        'plan': getattr(user, 'plan', '') or '',
+    }
+    args = [_CLAIM_TTL]
+    for key, value in fields.items():
+        args.extend([key, str(value)])
+    try:
+        entry_id = client.eval(
+            _CLAIM_AND_APPEND_LUA,
+            2,
+            _claim_key(stream_access.unique_otplay_id),
+            _STREAM_KEY,
+            *args,
+        )
+    except Exception as exc:
+        logger.warning("Play ingestion stream append failed; recording synchronously: %s", exc)
+        return None
+    return bool(entry_id)
+
+
+def _parse_entry(fields: dict) -> dict | None:
+    try:
+        return {
+            'access_id': int(fields['access_id']),
+            'user_id': int(fields['user_id']),
+            'song_id': int(fields['song_id']),
+            'city': str(fields.get('city') or '')[:100],
+            'country': str(fields.get('country') or '')[:100],
+            'ip': fields.get('ip') or None,
+            'pay': Decimal(str(fields.get('pay') or '0')),
+            'plan': str(fields.get('plan') or ''),
+        }
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        return None
+
+
+def flush_play_batch(entries: Sequence[dict]) -> int:
+    """Record parsed stream entries in one transaction; returns plays written.
+
+    Entries whose ``StreamAccess`` is gone or already used are skipped, which
+    is what makes redelivery safe.
+    """
+    by_access = {}
+    for entry in entries:
+        by_access.setdefault(entry['access_id'], entry)
+    if not by_access:
+        return 0
+
+    with transaction.atomic():
+        pending = dict(
+            StreamAccess.objects.select_for_update()
+            .filter(pk__in=list(by_access), one_time_used=False)
+            .values_list('pk', 'user_id')
+        )
+        accepted = [
+            entry for access_id, entry in sorted(by_access.items())
+            if pending.get(access_id) == entry['user_id']
+        ]
+        if not accepted:
+            return 0
+
+        plays = PlayCount.objects.bulk_create([
+            PlayCount(
+                user_id=entry['user_id'],
+                country=entry['country'],
+                city=entry['city'],
+                ip=entry['ip'],
+                pay=entry['pay'],
+            )
+            for entry in accepted
+        ])
+        Song.play_counts.through.objects.bulk_create([
+            Song.play_counts.through(song_id=entry['song_id'], playcount_id=play.pk)
+            for entry, play in zip(accepted, plays)
+        ])
+        StreamAccess.objects.filter(pk__in=[entry['access_id'] for entry in accepted]).update(one_time_used=True)
+        events = [
+            {
+                'song_id': entry['song_id'],
+                'played_at': play.created_at,
+                'pay': entry['pay'],
+                'city': entry['city'],
+                'country': entry['country'],
+                'plan': entry['plan'],
+            }
+            for entry, play in zip(accepted, plays)
+        ]
+        record_play_rollups(events)
+        record_dashboard_plays(events)
+
+        artist_by_song = dict(
+            Song.objects.filter(pk__in={entry['song_id'] for entry in accepted}, artist__isnull=False)
+            .values_list('pk', 'artist_id')
+        )
+        record_song_earnings(
+            (artist_by_song.get(entry['song_id']), entry['song_id'], entry['pay']) for entry in accepted
+        )
+        pairs = {
+            (artist_by_song[entry['song_id']], entry['user_id'])
+            for entry in accepted if entry['song_id'] in artist_by_song
+        }
+        new_listener = False
+        if pairs:
+            pair_filter = Q()
+            for artist_id, user_id in pairs:
+                pair_filter |= Q(artist_id=artist_id, user_id=user_id)
+            existing = set(ArtistMonthlyListener.objects.filter(pair_filter).values_list('artist_id', 'user_id'))
+            new_listener = bool(pairs - existing)
+            ArtistMonthlyListener.objects.bulk_create(
+                [ArtistMonthlyListener(artist_id=artist_id, user_id=user_id) for artist_id, user_id in sorted(pairs)],
+                update_conflicts=True,
+                unique_fields=['artist', 'user'],
+                update_fields=['updated_at'],
+            )
+
+        # bulk_create bypasses the post_save/m2m_changed receivers, so replay
+        # their committed side effects once per batch.
+        song_plays = [(entry['song_id'], play.pk) for entry, play in zip(accepted, plays)]
+        user_ids = sorted({entry['user_id'] for entry in accepted})
+        taste: dict[int, dict[int, float]] = {}
+        for entry in accepted:
+            songs = taste.setdefault(entry['user_id'], {})
+            songs[entry['song_id']] = songs.get(entry['song_id'], 0.0) + PLAY_WEIGHT
+        for user_id, song_weights in taste.items():
+            record_taste_events(user_id, song_weights)
+
+        def committed():
+            for song_id, play_id in song_plays:
+                record_committed_song_play(song_id, play_id)
+            for user_id in user_ids:
+                bump_user_affinity_version(user_id)
+                enqueue_personal_recommendation_refresh(user_id)
+            if new_listener:
+                cache_increment(AFFINITY_VERSION_KEY, _VERSION_TTL)
+            # plays_today and earnings on the artist live dashboard.
+            mark_artists_dirty(set(artist_by_song.values()))
+
+        transaction.on_commit(committed)
+    return len(accepted)
+
+
+def ensure_consumer_group(client) -> None:
+    try:
+        client.xgroup_create(_STREAM_KEY, _GROUP, id='0', mkstream=True)
+    except Exception as exc:
+        if 'BUSYGROUP' not in str(exc):
+            raise
+
+
+def _settle(client, entry_ids: Sequence[str]) -> None:
+    if entry_ids:
+        client.xack(_STREAM_KEY, _GROUP, *entry_ids)
+        client.xdel(_STREAM_KEY, *entry_ids)
+
+
+def _dead_letter(client, entry_id: str, fields: dict, reason: str) -> None:
+    logger.error("Dropping play ingestion entry %s to dead-letter stream: %s", entry_id, reason)
+    client.xadd(_DEAD_LETTER_KEY, {**fields, 'source_id': entry_id, 'reason': reason[:200]})
+    _settle(client, [entry_id])
+
+
+def process_stream_entries(client, messages: Sequence[tuple[str, dict]]) -> int:
+    """Flush one read of stream messages, isolating poison entries.
+
+    Only entries that fail on their own data are dead-lettered. An operational
+    failure (database down, lock timeout, deadlock) leaves the remaining
+    entries pending so ``XAUTOCLAIM`` redelivers them, and is re-raised so the
+    worker backs off.
+    """
+    parsed = []
+    for entry_id, fields in messages:
+        entry = _parse_entry(fields or {})
+        if entry is None:
+            _dead_letter(client, entry_id, fields or {}, 'unparseable entry')
+            continue
+        parsed.append((entry_id, fields, entry))
+    if not parsed:
+        return 0
+
+    try:
+        written = flush_play_batch([entry for _, _, entry in parsed])
+        _settle(client, [entry_id for entry_id, _, _ in parsed])
+        return written
+    except Exception:
+        logger.exception("Play ingestion batch of %s failed; retrying entries individually", len(parsed))
+
+    written = 0
+    for entry_id, fields, entry in parsed:
+        try:
+            written += flush_play_batch([entry])
+        except _POISON_ERRORS as exc:
+            _dead_letter(client, entry_id, fields, repr(exc))
+            continue
+        _settle(client, [entry_id])
+    return written
+
+
+def replay_dead_letters(client, *, limit: int | None = None) -> int:
+    """Move dead-lettered entries back onto the ingestion stream; returns entries moved.
+
+    Replaying is safe for plays that were recorded after all: the flush skips
+    any ``StreamAccess`` already marked used.
+    """
+    moved = 0
+    while limit is None or moved < limit:
+        count = 500 if limit is None else min(500, limit - moved)
+        batch = client.xrange(_DEAD_LETTER_KEY, min='-', max='+', count=count)
+        if not batch:
+            break
+        for entry_id, fields in batch:
+            fields = {key: value for key, value in fields.items() if key not in ('source_id', 'reason')}
+            client.xadd(_STREAM_KEY, fields)
+            client.xdel(_DEAD_LETTER_KEY, entry_id)
+            moved += 1
+    return moved
+
+
+def read_play_batch(client, consumer: str, *, batch_size: int, block_ms: int,
+                    reclaim_idle_ms: int) -> list[tuple[str, dict]]:
+    """Return stale pending entries first, then new entries for ``consumer``."""
+    reclaimed = client.xautoclaim(
+        _STREAM_KEY, _GROUP, consumer, min_idle_time=reclaim_idle_ms, start_id='0-0', count=batch_size,
+    )
+    messages = [message for message in (reclaimed[1] if reclaimed else []) if message and message[1] is not None]
+    if messages:
+        return messages
+    response = client.xreadgroup(_GROUP, consumer, {_STREAM_KEY: '>'}, count=batch_size, block=block_ms)
+    return [message for _, stream_messages in (response or []) for message in stream_messages]
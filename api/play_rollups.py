@@ -0,0 +1,354 @@
+"""Bounded play aggregates derived from the append-only ``PlayCount`` ledger.
+
+Charts, trending and dashboards used to count ``Song.play_counts`` rows across
+their whole window on every refresh. Each recorded play now also increments a
+per-song hour and day bucket (plus daily city/country/plan splits) inside the
+same transaction, so window reads touch at most one row per song per bucket.
+
+PostgreSQL remains the source of truth: every rollup can be rebuilt from the
+ledger with ``backfill_play_rollups`` and audited with ``check_play_rollups``.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Greatest, TruncHour
+from django.utils import timezone
+
+from .models import PlayDimensionRollup, PlayRollup, Song, User
+
+logger = logging.getLogger(__name__)
+
+HOUR = PlayRollup.GRANULARITY_HOUR
+DAY = PlayRollup.GRANULARITY_DAY
+_DIMENSIONS = (
+    PlayDimensionRollup.DIMENSION_CITY,
+    PlayDimensionRollup.DIMENSION_COUNTRY,
+    PlayDimensionRollup.DIMENSION_PLAN,
+)
+_VALUE_MAX_LENGTH = PlayDimensionRollup._meta.get_field('value').max_length
+
+
+def hour_bucket(value: datetime) -> datetime:
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(value: datetime) -> datetime:
+    return hour_bucket(value).replace(hour=0)
+
+
+def day_start(value: date) -> datetime:
+    return datetime.combine(value, dt_time.min, tzinfo=dt_timezone.utc)
+
+
+def _hourly_retention() -> timedelta:
+    return timedelta(days=max(2, int(getattr(settings, 'PLAY_ROLLUP_HOURLY_RETENTION_DAYS', 35))))
+
+
+def _dimension_value(value) -> str:
+    return str(value or '').strip()[:_VALUE_MAX_LENGTH]
+
+
+def _aggregate_events(events: Iterable[dict]):
+    """Fold play events into bucket and dimension increments."""
+    buckets: dict[tuple, list] = {}
+    dimensions: dict[tuple, list] = {}
+    for event in events:
+        song_id = int(event['song_id'])
+        played_at = event['played_at']
+        pay = Decimal(event.get('pay') or 0)
+        hour = hour_bucket(played_at)
+        for key in ((song_id, HOUR, hour), (song_id, DAY, hour.replace(hour=0))):
+            entry = buckets.setdefault(key, [0, Decimal('0'), played_at])
+            entry[0] += 1
+            entry[1] += pay
+            entry[2] = max(entry[2], played_at)
+        day = hour.date()
+        for dimension in _DIMENSIONS:
+            if dimension == PlayDimensionRollup.DIMENSION_PLAN:
+                raw = event.get('plan') or User.PLAN_FREE
+            else:
+                raw = event.get(dimension)
+            key = (song_id, day, dimension, _dimension_value(raw))
+            entry = dimensions.setdefault(key, [0, Decimal('0')])
+            entry[0] += 1
+            entry[1] += pay
+    return buckets, dimensions
+
+
+def _upsert_postgresql(buckets, dimensions) -> None:
+    qn = connection.ops.quote_name
+    rollup_table = qn(PlayRollup._meta.db_table)
+    dimension_table = qn(PlayDimensionRollup._meta.db_table)
+    with connection.cursor() as cursor:
+        if buckets:
+            rows = sorted(buckets.items())
+            placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+            params = []
+            for (song_id, granularity, bucket), (plays, pay, last_played_at) in rows:
+                params.extend((song_id, granularity, bucket, plays, pay, last_played_at))
+            cursor.execute(
+                f'INSERT INTO {rollup_table} '
+                '(song_id, granularity, bucket_start, plays, pay, last_played_at) '
+                f'VALUES {placeholders} '
+                'ON CONFLICT (song_id, granularity, bucket_start) DO UPDATE SET '
+                f'plays = {rollup_table}.plays + EXCLUDED.plays, '
+                f'pay = {rollup_table}.pay + EXCLUDED.pay, '
+                f'last_played_at = GREATEST({rollup_table}.last_played_at, EXCLUDED.last_played_at)',
+                params,
+            )
+        if dimensions:
+            rows = sorted(dimensions.items())
+            placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+            params = []
+            for (song_id, day, dimension, value), (plays, pay) in rows:
+                params.extend((song_id, day, dimension, value, plays, pay))
+            cursor.execute(
+                f'INSERT INTO {dimension_table} '
+                '(song_id, day, dimension, value, plays, pay) '
+                f'VALUES {placeholders} '
+                'ON CONFLICT (song_id, day, dimension, value) DO UPDATE SET '
+                f'plays = {dimension_table}.plays + EXCLUDED.plays, '
+                f'pay = {dimension_table}.pay + EXCLUDED.pay',
+                params,
+            )
+
+
+def _increment_or_create(model, lookup, plays, pay, **extra) -> None:
+    updates = {'plays': F('plays') + plays, 'pay': F('pay') + pay}
+    if 'last_played_at' in extra:
+        updates['last_played_at'] = Greatest('last_played_at', extra['last_played_at'])
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, plays=plays, pay=pay, **extra)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**updates)
+
+
+def _upsert_generic(buckets, dimensions) -> None:
+    for (song_id, granularity, bucket), (plays, pay, last_played_at) in sorted(buckets.items()):
+        _increment_or_create(
+            PlayRollup,
+            {'song_id': song_id, 'granularity': granularity, 'bucket_start': bucket},
+            plays, pay, last_played_at=last_played_at,
+        )
+    for (song_id, day, dimension, value), (plays, pay) in sorted(dimensions.items()):
+        _increment_or_create(
+            PlayDimensionRollup,
+            {'song_id': song_id, 'day': day, 'dimension': dimension, 'value': value},
+            plays, pay,
+        )
+
+
+def record_play_rollups(events: Iterable[dict]) -> None:
+    """Increment rollups for committed-together plays.
+
+    Each event is a dict with ``song_id``, ``played_at``, ``pay``, ``city``,
+    ``country`` and ``plan``. Call inside the transaction that creates the
+    ``PlayCount`` rows so ledger and aggregates commit or roll back together.
+    Rows are written in key order, keeping concurrent upserts deadlock-free.
+    """
+    buckets, dimensions = _aggregate_events(events)
+    if not buckets:
+        return
+    if connection.vendor == 'postgresql':
+        _upsert_postgresql(buckets, dimensions)
+    else:
+        _upsert_generic(buckets, dimensions)
+
+
+def _window_querysets(since: datetime | None, until: datetime | None):
+    """Cover ``[since, until)`` with hour rows at the edges and day rows between.
+
+    Edges are resolved to whole hours. Edges older than the hourly retention
+    fall back to the containing day, so very old windows are day-precise.
+    """
+    rollups = PlayRollup.objects.all()
+    if since is None and until is None:
+        return [rollups.filter(granularity=DAY)]
+
+    retention_cutoff = hour_bucket(timezone.now()) - _hourly_retention()
+    querysets = []
+    first_day = None
+    if since is not None:
+        since_hour = hour_bucket(since)
+        first_day = day_bucket(since_hour)
+        if since_hour != first_day and since_hour >= retention_cutoff:
+            first_day += timedelta(days=1)
+            edge_end = first_day if until is None else min(first_day, hour_bucket(until))
+            querysets.append(rollups.filter(
+                granularity=HOUR, bucket_start__gte=since_hour, bucket_start__lt=edge_end,
+            ))
+
+    last_day = None
+    if until is not None:
+        until_hour = hour_bucket(until)
+        last_day = day_bucket(until_hour)
+        if until_hour != last_day and until_hour >= retention_cutoff:
+            tail_start = last_day if first_day is None else max(last_day, first_day)
+            querysets.append(rollups.filter(
+                granularity=HOUR, bucket_start__gte=tail_start, bucket_start__lt=until_hour,
+            ))
+        elif until_hour != last_day:
+            last_day += timedelta(days=1)
+
+    days = rollups.filter(granularity=DAY)
+    if first_day is not None:
+        days = days.filter(bucket_start__gte=first_day)
+    if last_day is not None:
+        days = days.filter(bucket_start__lt=last_day)
+    if first_day is None or last_day is None or first_day < last_day:
+        querysets.append(days)
+    return querysets
+
+
+def window_play_totals(since: datetime | None = None, until: datetime | None = None, *,
+                       group_by: str | None = 'song_id', filters: Q | None = None):
+    """Sum rolled-up plays in a window, optionally grouped by a rollup path.
+
+    ``group_by`` accepts any ``values()`` path such as ``'song_id'`` or
+    ``'song__artist_id'``. Returns ``{key: {'plays', 'pay', 'last_played_at'}}``
+    or, with ``group_by=None``, one totals dict for the whole window.
+    """
+    totals: dict = {}
+    overall = {'plays': 0, 'pay': Decimal('0'), 'last_played_at': None}
+    for queryset in _window_querysets(since, until):
+        if filters is not None:
+            queryset = queryset.filter(filters)
+        if group_by is None:
+            rows = [queryset.aggregate(plays=Sum('plays'), pay=Sum('pay'), last=Max('last_played_at'))]
+        else:
+            rows = queryset.values(group_by).annotate(
+                plays=Sum('plays'), pay=Sum('pay'), last=Max('last_played_at'),
+            )
+        for row in rows:
+            target = overall if group_by is None else totals.setdefault(
+                row[group_by], {'plays': 0, 'pay': Decimal('0'), 'last_played_at': None}
+            )
+            target['plays'] += int(row['plays'] or 0)
+            target['pay'] += Decimal(row['pay'] or 0)
+            if row['last'] is not None and (target['last_played_at'] is None or row['last'] > target['last_played_at']):
+                target['last_played_at'] = row['last']
+    if group_by is None:
+        return overall
+    totals.pop(None, None)
+    return {key: value for key, value in totals.items() if value['plays'] > 0}
+
+
+def ranked_window_ids(since: datetime | None = None, *, group_by: str = 'song_id',
+                      filters: Q | None = None, limit: int = 300) -> list[int]:
+    """Return IDs ordered by windowed plays, newest activity breaking ties."""
+    totals = window_play_totals(since, group_by=group_by, filters=filters)
+    ordered = sorted(
+        totals.items(),
+        key=lambda item: (item[1]['plays'], item[1]['last_played_at'] or timezone.now() - timedelta(days=36500), item[0]),
+        reverse=True,
+    )
+    return [int(key) for key, _ in ordered[:limit]]
+
+
+def dimension_play_totals(dimension: str, *, since_day: date | None = None,
+                          filters: Q | None = None, limit: int | None = None) -> list[dict]:
+    queryset = PlayDimensionRollup.objects.filter(dimension=dimension)
+    if since_day is not None:
+        queryset = queryset.filter(day__gte=since_day)
+    if filters is not None:
+        queryset = queryset.filter(filters)
+    rows = queryset.values('value').annotate(plays=Sum('plays'), pay=Sum('pay')).order_by('-plays', 'value')
+    if limit is not None:
+        rows = rows[:limit]
+    return [
+        {'value': row['value'], 'plays': int(row['plays'] or 0), 'pay': Decimal(row['pay'] or 0)}
+        for row in rows
+    ]
+
+
+def ledger_day_counts(day: date) -> dict[int, int]:
+    """Exact per-song play counts for one UTC day straight from the ledger."""
+    start = day_start(day)
+    rows = Song.play_counts.through.objects.filter(
+        playcount__created_at__gte=start,
+        playcount__created_at__lt=start + timedelta(days=1),
+    ).values('song_id').annotate(total=Count('playcount_id'))
+    return {int(row['song_id']): int(row['total']) for row in rows}
+
+
+def rollup_day_counts(day: date) -> dict[int, int]:
+    rows = PlayRollup.objects.filter(granularity=DAY, bucket_start=day_start(day)).values_list('song_id', 'plays')
+    return {int(song_id): int(plays) for song_id, plays in rows}
+
+
+def rebuild_play_rollups_for_day(day: date) -> int:
+    """Replace one UTC day's rollups with exact aggregates from the ledger.
+
+    Plays recorded for the same day while the rebuild runs may be missed; run
+    ``check_play_rollups`` afterwards when rebuilding the current day.
+    """
+    start = day_start(day)
+    end = start + timedelta(days=1)
+    links = Song.play_counts.through.objects.filter(
+        playcount__created_at__gte=start,
+        playcount__created_at__lt=end,
+    )
+    hour_rows = list(
+        links.annotate(hour=TruncHour('playcount__created_at', tzinfo=dt_timezone.utc))
+        .values('song_id', 'hour')
+        .annotate(plays=Count('playcount_id'), pay=Sum('playcount__pay'), last=Max('playcount__created_at'))
+    )
+    rollups = []
+    day_totals: dict[int, list] = {}
+    for row in hour_rows:
+        pay = Decimal(row['pay'] or 0)
+        rollups.append(PlayRollup(
+            song_id=row['song_id'], granularity=HOUR, bucket_start=row['hour'],
+            plays=row['plays'], pay=pay, last_played_at=row['last'],
+        ))
+        entry = day_totals.setdefault(int(row['song_id']), [0, Decimal('0'), row['last']])
+        entry[0] += int(row['plays'])
+        entry[1] += pay
+        entry[2] = max(entry[2], row['last'])
+    rollups.extend(
+        PlayRollup(song_id=song_id, granularity=DAY, bucket_start=start, plays=plays, pay=pay, last_played_at=last)
+        for song_id, (plays, pay, last) in day_totals.items()
+    )
+
+    dimension_paths = {
+        PlayDimensionRollup.DIMENSION_CITY: 'playcount__city',
+        PlayDimensionRollup.DIMENSION_COUNTRY: 'playcount__country',
+        # The ledger does not snapshot the listener plan; backfill uses the
+        # current plan, while live ingestion records the plan at play time.
+        PlayDimensionRollup.DIMENSION_PLAN: 'playcount__user__plan',
+    }
+    merged: dict[tuple, list] = {}
+    for dimension, path in dimension_paths.items():
+        for row in links.values('song_id', path).annotate(plays=Count('playcount_id'), pay=Sum('playcount__pay')):
+            raw = row[path] or (User.PLAN_FREE if dimension == PlayDimensionRollup.DIMENSION_PLAN else '')
+            key = (int(row['song_id']), dimension, _dimension_value(raw))
+            entry = merged.setdefault(key, [0, Decimal('0')])
+            entry[0] += int(row['plays'])
+            entry[1] += Decimal(row['pay'] or 0)
+    dimensions = [
+        PlayDimensionRollup(song_id=song_id, day=day, dimension=dimension, value=value, plays=plays, pay=pay)
+        for (song_id, dimension, value), (plays, pay) in merged.items()
+    ]
+
+    with transaction.atomic():
+        PlayRollup.objects.filter(bucket_start__gte=start, bucket_start__lt=end).delete()
+        PlayDimensionRollup.objects.filter(day=day).delete()
+        PlayRollup.objects.bulk_create(rollups, batch_size=1000)
+        PlayDimensionRollup.objects.bulk_create(dimensions, batch_size=1000)
+    return sum(entry[0] for entry in day_totals.values())
+
+
+def expired_hourly_play_rollups():
+    """Hour buckets past retention; day buckets keep their totals."""
+    cutoff = hour_bucket(timezone.now()) - _hourly_retention()
+    return PlayRollup.objects.filter(granularity=HOUR, bucket_start__lt=cutoff)
@@ -486,3 +486,22 @@ def pop_personal_recommendation_refresh(timeout: int = 5) -> int | None:
         return user_id
     except Exception:
         return None
+
+
+def pop_personal_recommendation_refreshes(limit: int, timeout: int = 5) -> list[int]:
+    """Block for one queued user, then drain up to ``limit`` without waiting."""
+    client = get_redis_client()
+    if client is None:
+        return []
+    try:
+        item = client.brpop(_PERSONAL_REFRESH_QUEUE, timeout=max(1, int(timeout)))
+        if not item:
+            return []
+        values = [item[1]]
+        if limit > 1:
+            values.extend(client.rpop(_PERSONAL_REFRESH_QUEUE, limit - 1) or [])
+        user_ids = list(dict.fromkeys(int(value) for value in values))
+        client.delete(*(f"{_PERSONAL_REFRESH_DEDUPE_PREFIX}:{user_id}" for user_id in user_ids))
+        return user_ids
+    except Exception:
+        return []
@@ -760,7 +760,7 @@ def prepare_release(release: ArtistRelease, schedule=False) -> ArtistRelease:
         sync_release_tracks(release)
         for link in release.release_tracks.all():
             Song.objects.filter(pk=link.song_id).exclude(status=Song.STATUS_DELETED).update(
-                status=Song.STATUS_APPROVED
+                status=Song.STATUS_APPROVED, updated_at=timezone.now()
             )
         release.scheduled_at = scheduled_datetime(release) if schedule else None
         release.save(update_fields=['scheduled_at', 'updated_at'])
@@ -857,7 +857,7 @@ def take_down_release(release: ArtistRelease) -> None:
         release = ArtistRelease.objects.select_related('album').get(pk=release.pk)
         release_song_ids = list(release.release_tracks.values_list('song_id', flat=True))
         Song.objects.filter(pk__in=release_song_ids).exclude(status=Song.STATUS_DELETED).update(
-            status=Song.STATUS_APPROVED
+            status=Song.STATUS_APPROVED, updated_at=timezone.now()
         )
         # Legacy Album has no visibility state and public endpoints query every
         # row. Delete the materialized album only when it belongs exclusively to
@@ -871,7 +871,7 @@ def take_down_release(release: ArtistRelease) -> None:
         if can_delete_album:
             album.delete()
         elif album is not None:
-            Song.objects.filter(pk__in=release_song_ids, album=album).update(album=None, is_single=False)
+            Song.objects.filter(pk__in=release_song_ids, album=album).update(album=None, is_single=False, updated_at=timezone.now())
 
 
 def mark_release_for_review(
@@ -905,7 +905,7 @@ def mark_release_for_review(
             .exists()
         )
         if not shared_live:
-            Song.objects.filter(pk=song_id).update(status=Song.STATUS_PENDING)
+            Song.objects.filter(pk=song_id).update(status=Song.STATUS_PENDING, updated_at=timezone.now())
 
     release.submitted_at = timezone.now()
     release.scheduled_at = None
@@ -966,7 +966,7 @@ def set_release_status_from_admin(
         if release.status == ArtistRelease.STATUS_LIVE:
             take_down_release(release)
             release = ArtistRelease.objects.select_for_update().get(pk=release.pk)
-        Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_DRAFT)
+        Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_DRAFT, updated_at=timezone.now())
         release.submitted_at = None
         release.scheduled_at = None
         release.validation_snapshot = {}
@@ -975,10 +975,10 @@ def set_release_status_from_admin(
     elif target_status == ArtistRelease.STATUS_IN_REVIEW:
         mark_release_for_review(release, actor=actor, note=note, all_tracks=True)
     elif target_status == ArtistRelease.STATUS_CHANGES_REQUESTED:
-        Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_PENDING)
+        Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_PENDING, updated_at=timezone.now())
         change_status(release, target_status, actor=actor, note=note)
     elif target_status == ArtistRelease.STATUS_REJECTED:
-        Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_REJECTED)
+        Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_REJECTED, updated_at=timezone.now())
         change_status(release, target_status, actor=actor, note=note)
     elif target_status == ArtistRelease.STATUS_APPROVED:
         release = approve_release(release, actor=actor, note=note)
@@ -996,7 +996,7 @@ def set_release_status_from_admin(
             take_down_release(release)
             release = ArtistRelease.objects.select_for_update().get(pk=release.pk)
         else:
-            Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_APPROVED)
+            Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_APPROVED, updated_at=timezone.now())
         change_status(release, target_status, actor=actor, note=note)
     return release_queryset().get(pk=release.pk)
 
@@ -1015,18 +1015,18 @@ def synchronize_release_state(release: ArtistRelease) -> ArtistRelease:
         if release.status == ArtistRelease.STATUS_LIVE:
             release = materialize_release(release, publish=True)
         elif release.status in {ArtistRelease.STATUS_APPROVED, ArtistRelease.STATUS_SCHEDULED}:
-            songs.update(status=Song.STATUS_APPROVED)
+            songs.update(status=Song.STATUS_APPROVED, updated_at=timezone.now())
         elif release.status in {ArtistRelease.STATUS_IN_REVIEW, ArtistRelease.STATUS_CHANGES_REQUESTED}:
-            songs.update(status=Song.STATUS_PENDING)
+            songs.update(status=Song.STATUS_PENDING, updated_at=timezone.now())
         elif release.status == ArtistRelease.STATUS_REJECTED:
-            songs.update(status=Song.STATUS_REJECTED)
+            songs.update(status=Song.STATUS_REJECTED, updated_at=timezone.now())
         elif release.status == ArtistRelease.STATUS_DRAFT:
-            songs.update(status=Song.STATUS_DRAFT)
+            songs.update(status=Song.STATUS_DRAFT, updated_at=timezone.now())
         elif release.status == ArtistRelease.STATUS_TAKEN_DOWN:
             if release.album_id:
                 take_down_release(release)
                 release = ArtistRelease.objects.get(pk=release.pk)
-            songs.update(status=Song.STATUS_APPROVED)
+            songs.update(status=Song.STATUS_APPROVED, updated_at=timezone.now())
         return release_queryset().get(pk=release.pk)
 
 
@@ -15,6 +15,7 @@ from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .admin_pagination import AdminPagination
 from .admin_permissions import IsAdminPanelUser, has_employee_permission, is_employee, require_employee_permission
 from .models import (
     Album,
@@ -510,7 +511,7 @@ class ArtistReleaseDetailView(APIView):
             release.save()
             sync_release_tracks(release)
             if release.status == ArtistRelease.STATUS_IN_REVIEW:
-                Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_PENDING)
+                Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_PENDING, updated_at=timezone.now())
 
         return Response(serialize_release(release_queryset().get(pk=release.pk), request))
 
@@ -571,7 +572,7 @@ class ArtistReleaseDetailView(APIView):
 
             album = release.album
             if album and shared_detach_ids:
-                Song.objects.filter(pk__in=shared_detach_ids, album=album).update(album=None, is_single=True)
+                Song.objects.filter(pk__in=shared_detach_ids, album=album).update(album=None, is_single=True, updated_at=timezone.now())
             if hard_delete_ids:
                 Song.objects.filter(pk__in=hard_delete_ids).delete()
 
@@ -669,7 +670,7 @@ class ArtistReleaseTracksView(APIView):
                         extras={},
                     )
                     if release.status == ArtistRelease.STATUS_IN_REVIEW and editable_song.status != Song.STATUS_DELETED:
-                        Song.objects.filter(pk=editable_song.pk).update(status=Song.STATUS_PENDING)
+                        Song.objects.filter(pk=editable_song.pk).update(status=Song.STATUS_PENDING, updated_at=timezone.now())
                 if candidates:
                     sync_release_tracks(release)
                     _touch_release(release)
@@ -703,11 +704,11 @@ class ArtistReleaseTracksView(APIView):
             if links:
                 ArtistReleaseTrack.objects.filter(pk__in=[link.pk for link in links]).delete()
                 if album:
-                    Song.objects.filter(id__in=removed_ids, album=album).update(album=None, is_single=True)
+                    Song.objects.filter(id__in=removed_ids, album=album).update(album=None, is_single=True, updated_at=timezone.now())
                 if release.status == ArtistRelease.STATUS_DRAFT:
                     Song.objects.filter(id__in=removed_ids).exclude(
                         status=Song.STATUS_DELETED
-                    ).exclude(release_track_links__isnull=False).update(status=Song.STATUS_DRAFT)
+                    ).exclude(release_track_links__isnull=False).update(status=Song.STATUS_DRAFT, updated_at=timezone.now())
                 _renumber_release_links(release)
 
             album_deleted = False
@@ -876,7 +877,7 @@ class ArtistReleaseArtworkView(APIView):
                 if release.status == ArtistRelease.STATUS_IN_REVIEW:
                     Song.objects.filter(release_track_links__release=release).exclude(
                         status=Song.STATUS_DELETED
-                    ).update(status=Song.STATUS_PENDING)
+                    ).update(status=Song.STATUS_PENDING, updated_at=timezone.now())
         except Exception:
             cleanup_r2_urls([url])
             logger.exception('Release artwork save failed release=%s user=%s', pk, request.user.pk)
@@ -950,6 +951,7 @@ class ArtistReleaseSubmitView(APIView):
                 Song.objects.filter(pk=link.song_id).exclude(status=Song.STATUS_DELETED).update(
                     status=Song.STATUS_PENDING,
                     is_single=release.release_type == ArtistRelease.TYPE_SINGLE,
+                    updated_at=timezone.now(),
                 )
             release.submitted_at = timezone.now()
             release.current_step = 5
@@ -1075,6 +1077,10 @@ class AdminReleaseListView(APIView):
             if artist_id_value <= 0:
                 return Response({'artist_id': ['شناسه هنرمند معتبر نیست.']}, status=status.HTTP_400_BAD_REQUEST)
             queryset = queryset.filter(artist_id=artist_id_value)
+        if AdminPagination.cursor_query_param in request.query_params:
+            paginator = AdminPagination()
+            rows = paginator.paginate_queryset(queryset, request)
+            return paginator.get_paginated_response([serialize_release(item, request) for item in rows])
         try:
             page = max(1, int(request.query_params.get('page', 1)))
             page_size = max(1, min(100, int(request.query_params.get('page_size', 20))))
@@ -1216,7 +1222,7 @@ class AdminReleaseDetailView(APIView):
             release.save()
             sync_release_tracks(release)
             if release.status in {ArtistRelease.STATUS_IN_REVIEW, ArtistRelease.STATUS_CHANGES_REQUESTED}:
-                Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_PENDING)
+                Song.objects.filter(release_track_links__release=release).exclude(status=Song.STATUS_DELETED).update(status=Song.STATUS_PENDING, updated_at=timezone.now())
 
         return Response(serialize_release(release_queryset().get(pk=release.pk), request, include_history=True))
 
@@ -1668,7 +1674,7 @@ class AdminReleaseActionView(APIView):
             elif action == 'reject':
                 Song.objects.filter(release_track_links__release=release).exclude(
                     status=Song.STATUS_DELETED
-                ).update(status=Song.STATUS_REJECTED)
+                ).update(status=Song.STATUS_REJECTED, updated_at=timezone.now())
                 change_status(release, ArtistRelease.STATUS_REJECTED, actor=request.user, note=note or 'انتشار توسط مدیر رد شد.')
             elif action == 'approve':
                 release = approve_release(release, actor=request.user, note=note)
@@ -1695,7 +1701,7 @@ class AdminReleaseActionView(APIView):
             elif action == 'reopen':
                 Song.objects.filter(release_track_links__release=release).exclude(
                     status=Song.STATUS_DELETED
-                ).update(status=Song.STATUS_DRAFT)
+                ).update(status=Song.STATUS_DRAFT, updated_at=timezone.now())
                 release.submitted_at = None
                 release.scheduled_at = None
                 release.validation_snapshot = {}
@@ -1704,7 +1710,7 @@ class AdminReleaseActionView(APIView):
             elif action == 'return_to_review':
                 Song.objects.filter(release_track_links__release=release).exclude(
                     status=Song.STATUS_DELETED
-                ).update(status=Song.STATUS_PENDING)
+                ).update(status=Song.STATUS_PENDING, updated_at=timezone.now())
                 release.submitted_at = release.submitted_at or timezone.now()
                 release.save(update_fields=['submitted_at', 'updated_at'])
                 change_status(release, ArtistRelease.STATUS_IN_REVIEW, actor=request.user, note=note or 'انتشار دوباره به صف بررسی برگشت.')
@@ -1,7 +1,8 @@
 from django.urls import path
 
-from .consumers import NotificationConsumer
+from .consumers import ArtistLiveConsumer, NotificationConsumer
 
 websocket_urlpatterns = [
     path("ws/notifications/", NotificationConsumer.as_asgi()),
+    path("ws/artist/live/", ArtistLiveConsumer.as_asgi()),
 ]
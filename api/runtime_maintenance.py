@@ -2,7 +2,9 @@
 
 Only ephemeral state is deleted here. Plays, payouts, history, user content,
 notifications and durable recommendation interactions are intentionally never
-part of this cleanup.
+part of this cleanup. Hourly play rollups past retention are dropped because
+their daily rollups keep the same totals, as are dashboard hour buckets older
+than the longest dashboard window.
 """
 from __future__ import annotations
 
@@ -14,7 +16,9 @@ from django.db import close_old_connections
 from django.db.models import Q
 from django.utils import timezone
 
-from .models import ActivePlayback, OtpCode, RefreshToken, StreamAccess
+from .dashboard_metrics import expired_dashboard_hours
+from .models import OtpCode, RefreshToken, StreamAccess
+from .play_rollups import expired_hourly_play_rollups
 from .recommendation_runtime import cleanup_unused_generated_playlists, get_redis_client
 
 logger = logging.getLogger(__name__)
@@ -57,18 +61,16 @@ def cleanup_runtime_state(*, startup=False) -> dict[str, int]:
         days=max(2, int(getattr(settings, 'STREAM_ACCESS_USED_TTL_DAYS', 14)))
     )
     result = {
-        'active_playbacks': 0,
         'stream_access_unused': 0,
         'stream_access_abandoned': 0,
         'stream_access_used': 0,
         'expired_otps': 0,
         'expired_refresh_tokens': 0,
+        'play_rollup_hours': 0,
+        'dashboard_hours': 0,
     }
     try:
         close_old_connections()
-        result['active_playbacks'] = _delete_in_batches(
-            ActivePlayback.objects.filter(expiration_time__lt=now), batch_size=2000
-        )
         # Never delete a pending ad. Unopened old grants are disposable; once a
         # play has been submitted, the StreamAccess row is only transient proof
         # and the durable PlayCount remains untouched.
@@ -102,6 +104,8 @@ def cleanup_runtime_state(*, startup=False) -> dict[str, int]:
             RefreshToken.objects.filter(expires_at__lt=now - timedelta(days=7)),
             batch_size=1000,
         )
+        result['play_rollup_hours'] = _delete_in_batches(expired_hourly_play_rollups(), batch_size=2000)
+        result['dashboard_hours'] = _delete_in_batches(expired_dashboard_hours(), batch_size=1000)
         playlist_result = cleanup_unused_generated_playlists(startup=startup)
         result['generated_playlists'] = int(playlist_result.get('deleted', 0))
         logger.info('Runtime cleanup complete startup=%s result=%s', startup, result)
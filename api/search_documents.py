@@ -0,0 +1,208 @@
+"""PostgreSQL full-text/trigram search over precomputed search documents.
+
+``SearchDocument`` rows hold each entity's searchable text folded with the same
+normalization as the in-memory index, so one GIN trigram index and one
+``simple`` tsvector index serve every field instead of an ``icontains`` OR-chain
+that cannot use them. Rows are refreshed after commit by the model signals
+(only while ``SEARCH_BACKEND=postgres``) and rebuilt in bulk by
+``rebuild_search_documents``.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable, Sequence
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, F, FloatField, OuterRef, Q, Subquery
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Album, Artist, Playlist, SearchDocument, Song
+from .search_index import KINDS, index_tokens, iter_search_entries, normalize_text, text_values, tokenize
+
+logger = logging.getLogger(__name__)
+
+_REFRESH_BATCH = 500
+
+
+def documents_enabled() -> bool:
+    return (
+        str(getattr(settings, 'SEARCH_BACKEND', 'index')).strip().lower() == 'postgres'
+        and connection.vendor == 'postgresql'
+    )
+
+
+def build_document(fields: Sequence[tuple[object, int, bool]]) -> tuple[str, str]:
+    """Return ``(names, document)`` text for one entity's weighted fields."""
+    names: list[str] = []
+    document: list[str] = []
+    extras: list[str] = []
+    for raw, _weight, primary in fields:
+        for text in text_values(raw):
+            normalized = normalize_text(text)
+            if not normalized:
+                continue
+            document.append(normalized)
+            split = ' '.join(index_tokens(text))
+            if split != normalized:
+                extras.append(split)
+            if primary:
+                compact = ''.join(tokenize(text))
+                names.append(normalized)
+                if compact != normalized:
+                    names.append(compact)
+    # Compact names keep "شب های" / "شبهای" interchangeable for LIKE lookups.
+    return ' '.join(names), ' '.join(document + extras + names)
+
+
+def _upsert(rows: list[SearchDocument]) -> int:
+    SearchDocument.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['names', 'document', 'updated_at'],
+    )
+    return len(rows)
+
+
+def refresh_search_documents(kind: str, ids: Iterable[int]) -> int:
+    """Upsert documents for ``ids`` and drop rows that are no longer searchable."""
+    ids = sorted({int(pk) for pk in ids if pk})
+    if not ids:
+        return 0
+    written = 0
+    for start in range(0, len(ids), _REFRESH_BATCH):
+        chunk = ids[start:start + _REFRESH_BATCH]
+        rows = []
+        for pk, fields, _tags in iter_search_entries(kind, chunk):
+            names, document = build_document(fields)
+            rows.append(SearchDocument(kind=kind, object_id=pk, names=names, document=document))
+        with transaction.atomic():
+            SearchDocument.objects.filter(kind=kind, object_id__in=chunk).exclude(
+                object_id__in=[row.object_id for row in rows]
+            ).delete()
+            written += _upsert(rows)
+    return written
+
+
+def rebuild_search_documents(kind: str) -> int:
+    """Rebuild every document of one kind from the catalog."""
+    started = timezone.now()
+    batch: list[SearchDocument] = []
+    written = 0
+    for pk, fields, _tags in iter_search_entries(kind):
+        names, document = build_document(fields)
+        batch.append(SearchDocument(kind=kind, object_id=pk, names=names, document=document))
+        if len(batch) >= _REFRESH_BATCH:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    # Every searchable row was just touched; anything older is gone/hidden.
+    SearchDocument.objects.filter(kind=kind, updated_at__lt=started).delete()
+    return written
+
+
+def schedule_search_document_refresh(kind: str, ids: Iterable[int]) -> None:
+    """Refresh documents after the current transaction commits."""
+    if not documents_enabled():
+        return
+    ids = tuple(int(pk) for pk in ids if pk)
+    if not ids:
+        return
+
+    def refresh():
+        try:
+            refresh_search_documents(kind, ids)
+        except Exception:
+            # Search text lags until the next rebuild; never fail the write.
+            logger.exception('Search document refresh failed kind=%s ids=%s', kind, ids[:20])
+
+    transaction.on_commit(refresh)
+
+
+def delete_search_document(kind: str, object_id: int) -> None:
+    if not documents_enabled() or not object_id:
+        return
+    transaction.on_commit(lambda: SearchDocument.objects.filter(kind=kind, object_id=object_id).delete())
+
+
+def related_song_ids(*, artist_id=None, album_id=None) -> list[int]:
+    songs = Song.objects.none()
+    if artist_id:
+        songs = Song.objects.filter(Q(artist_id=artist_id) | Q(featured_artists__id=artist_id))
+    elif album_id:
+        songs = Song.objects.filter(album_id=album_id)
+    return list(songs.values_list('pk', flat=True).distinct())
+
+
+def related_album_ids(*, artist_id=None, song_ids: Iterable[int] = ()) -> list[int]:
+    albums = Q()
+    if artist_id:
+        albums |= Q(artist_id=artist_id)
+    song_ids = [pk for pk in song_ids if pk]
+    if song_ids:
+        albums |= Q(songs__id__in=song_ids)
+    if not albums:
+        return []
+    return list(Album.objects.filter(albums).values_list('pk', flat=True).distinct())
+
+
+def _popularity(kind: str):
+    if kind == 'song':
+        return Subquery(Song.objects.filter(pk=OuterRef('object_id')).values('plays')[:1])
+    if kind == 'artist':
+        return Subquery(Artist.objects.filter(pk=OuterRef('object_id')).values('verified')[:1])
+    return F('object_id')
+
+
+def search_ids(kind: str, query: str, moods: Sequence[str] = (), *, limit: int,
+               exclude_ids: Iterable[int] = ()) -> list[int] | None:
+    """Ranked ids from search documents, or ``None`` when this backend is off.
+
+    Empty queries return ``None`` so the default catalog ordering applies.
+    """
+    if kind not in KINDS or not documents_enabled():
+        return None
+    text = normalize_text(query)
+    if not text:
+        return None
+    compact = text.replace(' ', '')
+
+    documents = SearchDocument.objects.filter(kind=kind)
+    if not documents.exists():
+        return None
+    # Each predicate matches an index created by ensure_search_indexes:
+    # LIKE and <% use the trigram GIN index, @@ the tsvector GIN index.
+    matched = RawSQL(
+        "(to_tsvector('simple', document) @@ plainto_tsquery('simple', %s) OR %s <%% document)",
+        [text, text],
+        output_field=BooleanField(),
+    )
+    documents = documents.annotate(
+        score=RawSQL(
+            "GREATEST(similarity(names, %s), word_similarity(%s, document))"
+            " + ts_rank(to_tsvector('simple', document), plainto_tsquery('simple', %s))",
+            [text, text, text],
+            output_field=FloatField(),
+        ),
+        popularity=_popularity(kind),
+    ).filter(Q(document__contains=text) | Q(document__contains=compact) | matched)
+
+    if moods and kind in ('song', 'playlist'):
+        owner_field = 'song_id' if kind == 'song' else 'playlist_id'
+        through = Song.moods.through if kind == 'song' else Playlist.moods.through
+        links = through.objects.filter(
+            **({'mood_id__in': moods} if all(str(value).isdigit() for value in moods) else {'mood__slug__in': moods})
+        ).values(owner_field)
+        documents = documents.filter(object_id__in=links)
+    exclude_ids = [int(pk) for pk in exclude_ids if pk]
+    if exclude_ids:
+        documents = documents.exclude(object_id__in=exclude_ids)
+
+    return list(
+        documents.order_by('-score', F('popularity').desc(nulls_last=True), '-object_id')
+        .values_list('object_id', flat=True)[:limit]
+    )
@@ -0,0 +1,719 @@
+"""In-memory inverted search index shared across web workers.
+
+The ranking worker builds one compact segment per entity kind (songs, artists,
+albums, playlists, users), stores it in the shared cache as compressed JSON
+and keeps it current from the existing ``CATALOG_VERSION_KEY`` /
+``USER_DIRECTORY_VERSION_KEY`` bumps. Each Daphne worker decodes a segment
+once per version and answers searches from memory.
+
+A version bump does not rebuild the whole segment. Model signals mark the
+changed rows of each kind in a Redis set after commit (then bump the version
+again), and the worker patches the stored segment: only dirty rows, rows that
+became searchable and songs whose ``updated_at`` moved are re-read; rows no
+longer searchable are dropped and documents are re-laid out in the kind's
+current default order. Segments are rebuilt in full every half
+``SEARCH_INDEX_MAX_AGE_SECONDS``, which also repairs dirty marks lost while
+Redis was unavailable, and whenever no Redis client is configured.
+
+A segment is used only when it was built for the current version, so results
+are never staler than the SQL path. When no current segment exists the caller
+falls back to the database queryset.
+
+Text is normalized the Persian-aware way directory search already uses
+(Arabic letter variants, diacritics, tatweel and ZWNJ), plus Persian/Arabic
+digits. Matching is exact token, token prefix and trigram fuzzy on name-like
+fields; ties fall back to each kind's existing popularity/recency order.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import re
+import threading
+import time
+import zlib
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Album, Artist, Playlist, Song, User
+from .performance import (
+    CATALOG_VERSION_KEY,
+    USER_DIRECTORY_VERSION_KEY,
+    cache_get,
+    cache_increment,
+    cache_set,
+    cache_version,
+)
+from .recommendation_runtime import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('song', 'artist', 'album', 'playlist', 'user')
+_SEGMENT_KEY_PREFIX = 'search-index-segment:v1'
+_SEGMENT_TTL = 7 * 24 * 60 * 60
+_VERSION_TTL = 7 * 24 * 60 * 60
+_DIRTY_KEY_PREFIX = 'sedabox:search-index:dirty:v1'
+# Patching beats a rebuild only while a small share of the documents changed.
+_MAX_PATCH_SHARE = 0.25
+# Song saves stamp ``updated_at`` before they commit; re-read that far back.
+_UPDATED_SLACK_SECONDS = 300
+_EXACT_BONUS = 100
+_PREFIX_QUALITY = 0.75
+_FUZZY_QUALITY = 0.6
+_FUZZY_MIN_SIMILARITY = 0.3
+_FUZZY_MIN_WEIGHT = 4
+_MAX_PREFIX_TERMS = 2000
+_MAX_SHORT_PREFIX_TERMS = 300
+_MAX_TERM_LENGTH = 60
+
+# Field weights. Primary fields also feed exact whole-field matches and the
+# compact (space/ZWNJ-free) terms that mirror the old ``t_clean`` lookups.
+W_NAME = 10
+W_HANDLE = 8
+W_ARTIST = 6
+W_FEATURED = 5
+W_ALBUM = 4
+W_CREDIT = 2
+W_TEXT = 1
+
+_CHAR_TRANSLATION = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'ۀ': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+})
+_DROP_MARKS_RE = re.compile(r"[\u064B-\u065F\u0670\u06D6-\u06ED\u0640\u200C-\u200F]+")
+_SPLIT_RE = re.compile(r"[^\w]+|_+")
+
+_LOCAL_SEGMENTS: dict[str, '_Segment'] = {}
+_LOCAL_LOCK = threading.Lock()
+
+
+def normalize_text(value) -> str:
+    """Fold letter variants, digits, case and marks; keep word boundaries."""
+    text = str(value or '').translate(_CHAR_TRANSLATION).casefold()
+    text = _DROP_MARKS_RE.sub('', text)
+    return _SPLIT_RE.sub(' ', text).strip()
+
+
+def tokenize(value) -> list[str]:
+    return [token for token in normalize_text(value).split() if len(token) <= _MAX_TERM_LENGTH]
+
+
+def index_tokens(value) -> list[str]:
+    """Tokens for indexing: ZWNJ-joined words plus their separate parts."""
+    text = str(value or '')
+    tokens = tokenize(text)
+    if '\u200c' in text:
+        tokens += [token for token in tokenize(text.replace('\u200c', ' ')) if token not in tokens]
+    return tokens
+
+
+def _trigrams(term: str) -> set[str]:
+    padded = f'${term}$'
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def text_values(value) -> Iterable[str]:
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            yield from text_values(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from text_values(item)
+    elif value:
+        yield str(value)
+
+
+def _version_key(kind: str) -> str:
+    return USER_DIRECTORY_VERSION_KEY if kind == 'user' else CATALOG_VERSION_KEY
+
+
+def _segment_key(kind: str) -> str:
+    return f'{_SEGMENT_KEY_PREFIX}:{kind}'
+
+
+def _max_age() -> int:
+    return max(300, int(getattr(settings, 'SEARCH_INDEX_MAX_AGE_SECONDS', 3600)))
+
+
+def index_enabled() -> bool:
+    return str(getattr(settings, 'SEARCH_BACKEND', 'index')).strip().lower() == 'index'
+
+
+class _Segment:
+    """Decoded, query-ready segment for one entity kind."""
+
+    __slots__ = ('kind', 'version', 'built_at', 'ids', 'postings', 'terms', 'exact',
+                 'tags', 'fuzzy_terms', '_trigram_index')
+
+    def __init__(self, payload: dict):
+        self.kind = payload['kind']
+        self.version = int(payload['version'])
+        self.built_at = float(payload['built_at'])
+        self.ids = payload['ids']
+        self.postings = payload['postings']
+        self.terms = sorted(self.postings)
+        self.exact = payload['exact']
+        self.tags = [frozenset(values) for values in payload['tags']] if payload.get('tags') is not None else None
+        self.fuzzy_terms = payload['fuzzy']
+        self._trigram_index = None
+
+    def prefix_terms(self, token: str) -> list[str]:
+        cap = _MAX_SHORT_PREFIX_TERMS if len(token) < 2 else _MAX_PREFIX_TERMS
+        start = bisect.bisect_left(self.terms, token)
+        matches = []
+        for index in range(start, min(len(self.terms), start + cap)):
+            term = self.terms[index]
+            if not term.startswith(token):
+                break
+            matches.append(term)
+        return matches
+
+    def similar_terms(self, token: str) -> list[tuple[str, float]]:
+        if self._trigram_index is None:
+            trigram_index: dict[str, list[int]] = {}
+            for position, term in enumerate(self.fuzzy_terms):
+                for gram in _trigrams(term):
+                    trigram_index.setdefault(gram, []).append(position)
+            self._trigram_index = trigram_index
+        grams = _trigrams(token)
+        shared: dict[int, int] = {}
+        for gram in grams:
+            for position in self._trigram_index.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        matches = []
+        for position, count in shared.items():
+            term = self.fuzzy_terms[position]
+            similarity = count / (len(grams) + len(term) - count)
+            if similarity >= _FUZZY_MIN_SIMILARITY:
+                matches.append((term, similarity))
+        return matches
+
+
+class _SegmentBuilder:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.ids: list[int] = []
+        self.postings: dict[str, dict[int, int]] = {}
+        self.exact: dict[str, list[int]] = {}
+        self.tags: list[list[str]] | None = [] if kind in ('song', 'playlist') else None
+        self.fuzzy: set[str] = set()
+
+    def _add_term(self, term: str, doc: int, weight: int) -> None:
+        if not term or len(term) > _MAX_TERM_LENGTH:
+            return
+        docs = self.postings.setdefault(term, {})
+        if docs.get(doc, 0) < weight:
+            docs[doc] = weight
+        if weight >= _FUZZY_MIN_WEIGHT and len(term) >= 3:
+            self.fuzzy.add(term)
+
+    def add(self, pk: int, fields: Sequence[tuple[object, int, bool]], tags: Iterable[str] = ()) -> None:
+        doc = len(self.ids)
+        self.ids.append(int(pk))
+        if self.tags is not None:
+            self.tags.append(sorted(set(tags)))
+        for raw, weight, primary in fields:
+            for text in text_values(raw):
+                for token in index_tokens(text):
+                    self._add_term(token, doc, weight)
+                tokens = tokenize(text)
+                if not primary or not tokens:
+                    continue
+                # Compact and adjacent-pair terms keep "شب های" / "شبهای" /
+                # "شب‌های" interchangeable, like the old space-stripped lookups.
+                compact = ''.join(tokens)[:_MAX_TERM_LENGTH]
+                self._add_term(compact, doc, weight)
+                for left, right in zip(tokens, tokens[1:]):
+                    self._add_term(left + right, doc, weight)
+                docs = self.exact.setdefault(compact, [])
+                if not docs or docs[-1] != doc:
+                    docs.append(doc)
+
+    def payload(self, version: int) -> dict:
+        return {
+            'kind': self.kind,
+            'version': int(version),
+            'built_at': time.time(),
+            'ids': self.ids,
+            'postings': {
+                term: [value for doc, weight in sorted(docs.items()) for value in (doc, weight)]
+                for term, docs in self.postings.items()
+            },
+            'exact': self.exact,
+            'tags': self.tags,
+            'fuzzy': sorted(self.fuzzy),
+        }
+
+
+def _song_rows():
+    return Song.objects.filter(status=Song.STATUS_PUBLISHED).order_by('-plays', '-created_at')
+
+
+def _artist_rows():
+    return Artist.objects.order_by('-verified', '-created_at')
+
+
+def _album_rows():
+    published = Album.objects.filter(songs__status=Song.STATUS_PUBLISHED).values('pk')
+    return (
+        Album.objects.filter(pk__in=published)
+        .exclude(Q(title__iexact='single') | Q(title='سینگل'))
+        .order_by('-release_date', '-created_at')
+    )
+
+
+def _playlist_rows():
+    return Playlist.objects.order_by('-created_at')
+
+
+def _user_rows():
+    return (
+        User.objects.filter(is_active=True, is_banned=False)
+        .exclude(Q(unique_id__isnull=True) | Q(unique_id=''))
+        .order_by('-date_joined')
+    )
+
+
+def _mood_tags(through_model, owner_field: str, ids=None) -> dict[int, list[str]]:
+    links = through_model.objects.all()
+    if ids is not None:
+        links = links.filter(**{f'{owner_field}__in': ids})
+    tags: dict[int, list[str]] = {}
+    for owner_id, mood_id, slug in links.values_list(owner_field, 'mood_id', 'mood__slug'):
+        tags.setdefault(int(owner_id), []).extend([f'i:{mood_id}', f's:{slug}'])
+    return tags
+
+
+def _song_entries(ids=None):
+    include_lyrics = bool(getattr(settings, 'SEARCH_INDEX_LYRICS', True))
+    featured_links = Song.featured_artists.through.objects.all()
+    if ids is not None:
+        featured_links = featured_links.filter(song_id__in=ids)
+    featured: dict[int, list[str]] = {}
+    for song_id, *names in featured_links.values_list(
+        'song_id', 'artist__name', 'artist__name_en', 'artist__artistic_name', 'artist__artistic_name_en',
+    ):
+        featured.setdefault(int(song_id), []).extend(name for name in names if name)
+    moods = _mood_tags(Song.moods.through, 'song_id', ids)
+    fields = [
+        'id', 'title', 'title_en', 'artist__name', 'artist__name_en', 'album__title', 'album__title_en',
+        'description', 'description_en', 'label', 'label_en', 'producers', 'producers_en',
+        'composers', 'composers_en', 'lyricists', 'lyricists_en',
+    ]
+    if include_lyrics:
+        fields += ['lyrics', 'lyrics_en']
+    rows = _song_rows()
+    if ids is not None:
+        rows = rows.filter(pk__in=ids)
+    for row in rows.values(*fields).iterator(chunk_size=2000):
+        yield row['id'], [
+            (row['title'], W_NAME, True),
+            (row['title_en'], W_NAME, True),
+            (row['artist__name'], W_ARTIST, True),
+            (row['artist__name_en'], W_ARTIST, True),
+            (featured.get(row['id']), W_FEATURED, False),
+            (row['album__title'], W_ALBUM, False),
+            (row['album__title_en'], W_ALBUM, False),
+            ([row['label'], row['label_en'], row['producers'], row['producers_en'], row['composers'],
+              row['composers_en'], row['lyricists'], row['lyricists_en']], W_CREDIT, False),
+            ([row['description'], row['description_en'], row.get('lyrics'), row.get('lyrics_en')], W_TEXT, False),
+        ], moods.get(row['id'], ())
+
+
+def _artist_entries(ids=None):
+    rows = _artist_rows()
+    if ids is not None:
+        rows = rows.filter(pk__in=ids)
+    rows = rows.values(
+        'id', 'name', 'name_en', 'artistic_name', 'artistic_name_en', 'unique_id', 'bio', 'bio_en',
+    )
+    for row in rows.iterator(chunk_size=2000):
+        yield row['id'], [
+            (row['name'], W_NAME, True),
+            (row['name_en'], W_NAME, True),
+            (row['artistic_name'], W_NAME, True),
+            (row['artistic_name_en'], W_NAME, True),
+            (row['unique_id'], W_HANDLE, True),
+            ([row['bio'], row['bio_en']], W_TEXT, False),
+        ], ()
+
+
+def _album_entries(ids=None):
+    rows = _album_rows()
+    if ids is not None:
+        rows = rows.filter(pk__in=ids)
+    rows = rows.values(
+        'id', 'title', 'title_en', 'description', 'description_en', 'artist__name', 'artist__name_en',
+    )
+    for row in rows.iterator(chunk_size=2000):
+        yield row['id'], [
+            (row['title'], W_NAME, True),
+            (row['title_en'], W_NAME, True),
+            (row['artist__name'], W_ARTIST, True),
+            (row['artist__name_en'], W_ARTIST, True),
+            ([row['description'], row['description_en']], W_TEXT, False),
+        ], ()
+
+
+def _playlist_entries(ids=None):
+    moods = _mood_tags(Playlist.moods.through, 'playlist_id', ids)
+    rows = _playlist_rows()
+    if ids is not None:
+        rows = rows.filter(pk__in=ids)
+    rows = rows.values('id', 'title', 'title_en', 'description', 'description_en')
+    for row in rows.iterator(chunk_size=2000):
+        yield row['id'], [
+            (row['title'], W_NAME, True),
+            (row['title_en'], W_NAME, True),
+            ([row['description'], row['description_en']], W_TEXT, False),
+        ], moods.get(row['id'], ())
+
+
+def _user_entries(ids=None):
+    rows = _user_rows()
+    if ids is not None:
+        rows = rows.filter(pk__in=ids)
+    rows = rows.values('id', 'unique_id', 'first_name', 'last_name', 'roles')
+    for row in rows.iterator(chunk_size=2000):
+        # Role filtering happens here so the build works on every backend.
+        if User.ROLE_AUDIENCE not in (row['roles'] or []):
+            continue
+        yield row['id'], [
+            (row['unique_id'], W_NAME, True),
+            (row['first_name'], W_NAME, True),
+            (row['last_name'], W_NAME, True),
+        ], ()
+
+
+_ROW_SOURCES = {
+    'song': _song_rows,
+    'artist': _artist_rows,
+    'album': _album_rows,
+    'playlist': _playlist_rows,
+    'user': _user_rows,
+}
+
+_ENTRY_SOURCES = {
+    'song': _song_entries,
+    'artist': _artist_entries,
+    'album': _album_entries,
+    'playlist': _playlist_entries,
+    'user': _user_entries,
+}
+
+
+def iter_search_entries(kind: str, ids=None):
+    """Yield ``(pk, [(text, weight, primary), ...], tags)`` for searchable rows.
+
+    Rows come in each kind's default SearchView order and only include what
+    SearchView may return (published songs, non-single albums with a
+    published song, active audience users with a handle).
+    """
+    return _ENTRY_SOURCES[kind](ids)
+
+
+def _searchable_ids(kind: str) -> list[int]:
+    """Ids ``iter_search_entries`` would yield, in the same order, without their text."""
+    rows = _ROW_SOURCES[kind]()
+    if kind == 'user':
+        return [
+            pk for pk, roles in rows.values_list('id', 'roles').iterator(chunk_size=5000)
+            if User.ROLE_AUDIENCE in (roles or [])
+        ]
+    return list(rows.values_list('id', flat=True).iterator(chunk_size=5000))
+
+
+def _updated_ids(kind: str, since: float) -> set[int]:
+    """Rows changed by queryset updates, which bypass the dirty-marking signals."""
+    if kind not in ('song', 'album'):
+        return set()
+    songs = Song.objects.filter(updated_at__gte=datetime.fromtimestamp(since, tz=dt_timezone.utc))
+    if kind == 'album':
+        return {int(pk) for pk in songs.exclude(album_id__isnull=True).values_list('album_id', flat=True).distinct()}
+    return {int(pk) for pk in songs.values_list('pk', flat=True)}
+
+
+def _dirty_key(kind: str) -> str:
+    return f'{_DIRTY_KEY_PREFIX}:{kind}'
+
+
+def mark_search_index_dirty(kind: str, ids: Iterable[int]) -> None:
+    """Queue rows for the next segment patch, then bump the kind's version.
+
+    The bump comes after the mark so a refresh that sees the new version also
+    sees the mark.
+    """
+    ids = {int(pk) for pk in ids if pk}
+    client = get_redis_client()
+    if not ids or client is None:
+        return
+    try:
+        client.sadd(_dirty_key(kind), *ids)
+    except Exception:
+        return
+    cache_increment(_version_key(kind), _VERSION_TTL)
+
+
+def schedule_search_index_update(kind: str, ids: Iterable[int]) -> None:
+    """Mark rows dirty once the current transaction commits."""
+    if not index_enabled():
+        return
+    ids = tuple(int(pk) for pk in ids if pk)
+    if ids:
+        transaction.on_commit(lambda: mark_search_index_dirty(kind, ids))
+
+
+def _drain_dirty(client, kind: str) -> set[int] | None:
+    """Take and clear the dirty ids of ``kind``; ``None`` when they cannot be read."""
+    if client is None:
+        return None
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.smembers(_dirty_key(kind))
+        pipe.delete(_dirty_key(kind))
+        members, _ = pipe.execute()
+    except Exception:
+        return None
+    return {int(value) for value in members or ()}
+
+
+def _restore_dirty(client, kind: str, ids: set[int] | None) -> None:
+    if client is None or not ids:
+        return
+    try:
+        client.sadd(_dirty_key(kind), *ids)
+    except Exception:
+        logger.warning('Could not restore search index dirty ids kind=%s count=%s', kind, len(ids))
+
+
+def _stored_segment(kind: str) -> tuple[int, float, bytes] | None:
+    stored = cache_get(_segment_key(kind))
+    if isinstance(stored, (tuple, list)) and len(stored) == 3:
+        return int(stored[0]), float(stored[1]), stored[2]
+    return None
+
+
+def _patched_payload(kind: str, version: int, stored: tuple[int, float, bytes], dirty: set[int]) -> dict | None:
+    """Apply ``dirty`` rows to the stored segment, or ``None`` when a full build is cheaper."""
+    started = time.time()
+    base = json.loads(zlib.decompress(stored[2]))
+    if 'watermark' not in base:
+        return None
+    order = _searchable_ids(kind)
+    old_docs = {pk: doc for doc, pk in enumerate(base['ids'])}
+    dirty = set(dirty) | _updated_ids(kind, base['watermark'] - _UPDATED_SLACK_SECONDS)
+    dirty |= {pk for pk in order if pk not in old_docs}
+    if len(dirty) > max(50, len(order) * _MAX_PATCH_SHARE):
+        return None
+
+    fresh = _SegmentBuilder(kind)
+    for pk, fields, tags in iter_search_entries(kind, sorted(dirty)):
+        fresh.add(pk, fields, tags)
+    fresh_docs = {pk: doc for doc, pk in enumerate(fresh.ids)}
+
+    # Lay documents out in the current default order; a row that became
+    # searchable between the two queries waits for the next patch.
+    ids, old_map, fresh_map = [], {}, {}
+    for pk in order:
+        if pk in fresh_docs:
+            fresh_map[fresh_docs[pk]] = len(ids)
+        elif pk in old_docs and pk not in dirty:
+            old_map[old_docs[pk]] = len(ids)
+        else:
+            continue
+        ids.append(pk)
+
+    postings: dict[str, dict[int, int]] = {}
+    for term, posting in base['postings'].items():
+        for index in range(0, len(posting), 2):
+            doc = old_map.get(posting[index])
+            if doc is not None:
+                postings.setdefault(term, {})[doc] = posting[index + 1]
+    for term, docs in fresh.postings.items():
+        for doc, weight in docs.items():
+            if doc in fresh_map:
+                postings.setdefault(term, {})[fresh_map[doc]] = weight
+
+    exact: dict[str, set[int]] = {}
+    for sources, mapping in ((base['exact'], old_map), (fresh.exact, fresh_map)):
+        for term, docs in sources.items():
+            mapped = [mapping[doc] for doc in docs if doc in mapping]
+            if mapped:
+                exact.setdefault(term, set()).update(mapped)
+
+    tags = None
+    if base.get('tags') is not None:
+        tags = [[] for _ in ids]
+        for doc, new_doc in old_map.items():
+            tags[new_doc] = base['tags'][doc]
+        for doc, new_doc in fresh_map.items():
+            tags[new_doc] = fresh.tags[doc]
+
+    return {
+        'kind': kind,
+        'version': int(version),
+        # Keep the full build's age so the periodic rebuild still happens.
+        'built_at': float(base['built_at']),
+        'watermark': started,
+        'ids': ids,
+        'postings': {
+            term: [value for doc, weight in sorted(docs.items()) for value in (doc, weight)]
+            for term, docs in postings.items()
+        },
+        'exact': {term: sorted(docs) for term, docs in exact.items()},
+        'tags': tags,
+        'fuzzy': sorted(
+            term for term, docs in postings.items()
+            if len(term) >= 3 and max(docs.values()) >= _FUZZY_MIN_WEIGHT
+        ),
+    }
+
+
+def build_segment(kind: str, *, patch: bool = False) -> dict:
+    """Build (or with ``patch``, update) and publish one segment.
+
+    Returns ``{'docs', 'terms', 'bytes', 'patched'}``.
+    """
+    # Read the version first: a bump during the build leaves the segment
+    # labelled stale, so the next refresh updates it again.
+    version = cache_version(_version_key(kind))
+    client = get_redis_client()
+    dirty = _drain_dirty(client, kind)
+    try:
+        stored = _stored_segment(kind) if patch and dirty is not None else None
+        payload = _patched_payload(kind, version, stored, dirty) if stored is not None else None
+        patched = payload is not None
+        if payload is None:
+            started = time.time()
+            builder = _SegmentBuilder(kind)
+            for pk, fields, tags in iter_search_entries(kind):
+                builder.add(pk, fields, tags)
+            payload = builder.payload(version)
+            payload['watermark'] = started
+        blob = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode(), 6)
+    except Exception:
+        _restore_dirty(client, kind, dirty)
+        raise
+    cache_set(_segment_key(kind), (version, payload['built_at'], blob), _SEGMENT_TTL)
+    with _LOCAL_LOCK:
+        _LOCAL_SEGMENTS[kind] = _Segment(payload)
+    return {'docs': len(payload['ids']), 'terms': len(payload['postings']), 'bytes': len(blob), 'patched': patched}
+
+
+def refresh_search_index(*, force: bool = False) -> dict[str, dict]:
+    """Patch segments whose catalog/user-directory version moved; rebuild old ones."""
+    rebuilt = {}
+    now = time.time()
+    for kind in KINDS:
+        stored = _stored_segment(kind)
+        expired = force or stored is None or now - stored[1] >= _max_age() / 2
+        if not expired and stored[0] == cache_version(_version_key(kind)):
+            continue
+        try:
+            rebuilt[kind] = build_segment(kind, patch=not expired)
+        except Exception:
+            logger.exception('Search index segment build failed kind=%s', kind)
+    return rebuilt
+
+
+def _current_segment(kind: str) -> _Segment | None:
+    version = cache_version(_version_key(kind))
+    local = _LOCAL_SEGMENTS.get(kind)
+    if local is not None and local.version == version and time.time() - local.built_at < _max_age():
+        return local
+    stored = _stored_segment(kind)
+    if stored is None or stored[0] != version or time.time() - stored[1] >= _max_age():
+        return None
+    try:
+        segment = _Segment(json.loads(zlib.decompress(stored[2])))
+    except Exception:
+        logger.warning('Search index segment decode failed kind=%s', kind)
+        return None
+    with _LOCAL_LOCK:
+        _LOCAL_SEGMENTS[kind] = segment
+    return segment
+
+
+def _accumulate(scores: dict[int, float], posting: list[int], quality: float) -> None:
+    for index in range(0, len(posting), 2):
+        doc = posting[index]
+        score = posting[index + 1] * quality
+        if score > scores.get(doc, 0.0):
+            scores[doc] = score
+
+
+def _token_scores(segment: _Segment, token: str) -> dict[int, float]:
+    scores: dict[int, float] = {}
+    terms = segment.prefix_terms(token)
+    for term in terms:
+        _accumulate(scores, segment.postings[term], 1.0 if term == token else _PREFIX_QUALITY)
+    if len(terms) < 3 and len(token) >= 3:
+        seen = set(terms)
+        for term, similarity in segment.similar_terms(token):
+            if term not in seen:
+                _accumulate(scores, segment.postings[term], _FUZZY_QUALITY * similarity)
+    return scores
+
+
+def search_ids(kind: str, query: str, moods: Sequence[str] = (), *, limit: int,
+               exclude_ids: Iterable[int] = ()) -> list[int] | None:
+    """Return up to ``limit`` ranked ids, or ``None`` when no current segment exists."""
+    if not index_enabled():
+        return None
+    segment = _current_segment(kind)
+    if segment is None:
+        return None
+
+    wanted_tags = None
+    if moods and segment.tags is not None:
+        prefix = 'i:' if all(str(value).isdigit() for value in moods) else 's:'
+        wanted_tags = {f'{prefix}{value}' for value in moods}
+    excluded_docs = set()
+    if exclude_ids:
+        excluded = {int(pk) for pk in exclude_ids}
+        excluded_docs = {doc for doc, pk in enumerate(segment.ids) if pk in excluded}
+
+    def allowed(doc: int) -> bool:
+        if doc in excluded_docs:
+            return False
+        return wanted_tags is None or not wanted_tags.isdisjoint(segment.tags[doc])
+
+    tokens = tokenize(query)
+    if not tokens:
+        # Documents are stored in each kind's default order.
+        result = []
+        for doc in range(len(segment.ids)):
+            if allowed(doc):
+                result.append(segment.ids[doc])
+                if len(result) >= limit:
+                    break
+        return result
+
+    per_token = sorted((_token_scores(segment, token) for token in dict.fromkeys(tokens)), key=len)
+    scores = per_token[0]
+    for token_scores in per_token[1:]:
+        scores = {doc: score + token_scores[doc] for doc, score in scores.items() if doc in token_scores}
+        if not scores:
+            return []
+    for doc in segment.exact.get(''.join(tokens)[:_MAX_TERM_LENGTH], ()):
+        if doc in scores:
+            scores[doc] += _EXACT_BONUS
+    ranked = sorted((doc for doc in scores if allowed(doc)), key=lambda doc: (-scores[doc], doc))
+    return [segment.ids[doc] for doc in ranked[:limit]]
@@ -0,0 +1,253 @@
+"""Search-as-you-type suggestions from a per-process prefix index.
+
+Published song titles, artist names and album titles are folded with the
+search index normalization and laid out as a flattened prefix trie: one sorted
+key array (every key is the full name, the name from each later word, and the
+space/ZWNJ-free form) plus precomputed top-N lists for the short prefixes that
+match thousands of keys. Longer prefixes bisect to a small contiguous range.
+
+Songs are weighted by plays, albums by the plays of their published songs and
+artists by their plays plus followers. The ranking worker publishes the entry
+list to the shared cache per ``CATALOG_VERSION_KEY``; each web worker decodes
+it once per version and answers from memory.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import json
+import logging
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+
+from .models import Album, Artist, Follow, Song
+from .performance import CATALOG_VERSION_KEY, cache_get, cache_set, cache_version
+from .search_index import normalize_text, tokenize
+from .utils import generate_signed_r2_url
+
+logger = logging.getLogger(__name__)
+
+_ENTRIES_KEY = 'search-suggest-entries:v1'
+_ENTRIES_TTL = 7 * 24 * 60 * 60
+_SHORT_PREFIX = 3
+_TOP_PER_PREFIX = 20
+_MAX_SCAN = 4000
+_MAX_KEY_LENGTH = 80
+_FOLLOWER_WEIGHT = 20
+
+_LOCAL = {'index': None}
+_LOCAL_LOCK = threading.Lock()
+_BUILD_LOCK = threading.Lock()
+
+
+def _max_age() -> int:
+    return max(300, int(getattr(settings, 'SEARCH_INDEX_MAX_AGE_SECONDS', 3600)))
+
+
+def suggestion_keys(*texts) -> set[str]:
+    """Normalized lookup keys: each word suffix of a name plus its compact form."""
+    keys = set()
+    for text in texts:
+        tokens = tokenize(text)
+        if not tokens:
+            continue
+        for start in range(len(tokens)):
+            keys.add(' '.join(tokens[start:])[:_MAX_KEY_LENGTH])
+        compact = ''.join(tokens)[:_MAX_KEY_LENGTH]
+        keys.add(compact)
+        if '\u200c' in str(text):
+            keys.update(suggestion_keys(str(text).replace('\u200c', ' ')))
+    return keys
+
+
+def _song_entries():
+    rows = Song.objects.filter(status=Song.STATUS_PUBLISHED).values_list(
+        'id', 'title', 'title_en', 'artist__name', 'artist__name_en', 'cover_image', 'plays',
+    )
+    for pk, title, title_en, artist, artist_en, image, plays in rows.iterator(chunk_size=2000):
+        yield ['song', pk, title or '', title_en or '', artist or '', artist_en or '', image or '', int(plays or 0)]
+
+
+def _artist_entries():
+    plays = dict(
+        Song.objects.filter(status=Song.STATUS_PUBLISHED, artist__isnull=False)
+        .values('artist_id').annotate(total=Sum('plays')).values_list('artist_id', 'total')
+    )
+    followers = dict(
+        Follow.objects.filter(followed_artist__isnull=False)
+        .values('followed_artist_id').annotate(total=Count('id')).values_list('followed_artist_id', 'total')
+    )
+    rows = Artist.objects.values_list('id', 'name', 'name_en', 'artistic_name', 'artistic_name_en', 'profile_image')
+    for pk, name, name_en, artistic, artistic_en, image in rows.iterator(chunk_size=2000):
+        weight = int(plays.get(pk) or 0) + _FOLLOWER_WEIGHT * int(followers.get(pk) or 0)
+        yield ['artist', pk, artistic or name or '', artistic_en or name_en or '', '', '', image or '', weight,
+               [name, name_en, artistic, artistic_en]]
+
+
+def _album_entries():
+    plays = dict(
+        Song.objects.filter(status=Song.STATUS_PUBLISHED, album__isnull=False)
+        .values('album_id').annotate(total=Sum('plays')).values_list('album_id', 'total')
+    )
+    rows = (
+        Album.objects.filter(pk__in=list(plays))
+        .exclude(Q(title__iexact='single') | Q(title='سینگل'))
+        .values_list('id', 'title', 'title_en', 'artist__name', 'artist__name_en', 'cover_image')
+    )
+    for pk, title, title_en, artist, artist_en, image in rows.iterator(chunk_size=2000):
+        yield ['album', pk, title or '', title_en or '', artist or '', artist_en or '', image or '',
+               int(plays.get(pk) or 0)]
+
+
+def collect_entries() -> list[list]:
+    """``[type, id, text, text_en, subtitle, subtitle_en, image, weight, (names)]`` rows."""
+    entries = []
+    for source in (_song_entries, _artist_entries, _album_entries):
+        entries.extend(source())
+    return entries
+
+
+class _SuggestIndex:
+    """Sorted prefix keys with precomputed top entries for short prefixes."""
+
+    __slots__ = ('version', 'built_at', 'entries', 'keys', 'owners', 'top')
+
+    def __init__(self, version: int, built_at: float, entries: list[list]):
+        self.version = version
+        self.built_at = built_at
+        self.entries = entries
+        pairs = []
+        for position, entry in enumerate(entries):
+            names = entry[8] if len(entry) > 8 else entry[2:4]
+            for key in suggestion_keys(*names):
+                if key:
+                    pairs.append((key, position))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.owners = [position for _, position in pairs]
+
+        best: dict[str, list[tuple[int, int]]] = {}
+        for key, position in pairs:
+            weight = entries[position][7]
+            for length in range(1, min(_SHORT_PREFIX, len(key)) + 1):
+                heap = best.setdefault(key[:length], [])
+                item = (weight, -position)
+                if len(heap) < _TOP_PER_PREFIX * 2:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        # Several keys of one entry share a prefix, so keep room for dedup.
+        self.top = {
+            prefix: _unique_positions(-position for _, position in sorted(heap, reverse=True))
+            for prefix, heap in best.items()
+        }
+
+    def lookup(self, prefix: str, limit: int) -> list[list]:
+        start = bisect.bisect_left(self.keys, prefix)
+        exact_end = bisect.bisect_right(self.keys, prefix, start)
+        exact = sorted(
+            {self.owners[index] for index in range(start, exact_end)},
+            key=lambda position: (-self.entries[position][7], position),
+        )
+        if len(prefix) <= _SHORT_PREFIX and prefix in self.top:
+            ranked = self.top[prefix]
+        else:
+            end = bisect.bisect_left(self.keys, prefix + '\uffff', start, min(len(self.keys), start + _MAX_SCAN))
+            ranked = sorted(
+                {self.owners[index] for index in range(start, end)},
+                key=lambda position: (-self.entries[position][7], position),
+            )
+        positions = _unique_positions(exact + ranked)
+        return [self.entries[position] for position in positions[:limit]]
+
+
+def _unique_positions(positions) -> list[int]:
+    seen = set()
+    unique = []
+    for position in positions:
+        if position not in seen:
+            seen.add(position)
+            unique.append(position)
+    return unique
+
+
+def build_suggestions() -> int:
+    """Publish the entry list for the current catalog version; returns entry count."""
+    version = cache_version(CATALOG_VERSION_KEY)
+    entries = collect_entries()
+    built_at = time.time()
+    blob = zlib.compress(json.dumps(entries, ensure_ascii=False, separators=(',', ':')).encode(), 6)
+    cache_set(_ENTRIES_KEY, (version, built_at, blob), _ENTRIES_TTL)
+    with _LOCAL_LOCK:
+        _LOCAL['index'] = _SuggestIndex(version, built_at, entries)
+    return len(entries)
+
+
+def refresh_suggestions(*, force: bool = False) -> int | None:
+    """Rebuild when the catalog version moved; ``None`` when already current."""
+    stored = cache_get(_ENTRIES_KEY)
+    if (
+        not force
+        and isinstance(stored, (tuple, list)) and len(stored) == 3
+        and stored[0] == cache_version(CATALOG_VERSION_KEY)
+        and time.time() - float(stored[1]) < _max_age() / 2
+    ):
+        return None
+    return build_suggestions()
+
+
+def _current_index() -> _SuggestIndex | None:
+    version = cache_version(CATALOG_VERSION_KEY)
+    local = _LOCAL['index']
+    if local is not None and local.version == version and time.time() - local.built_at < _max_age():
+        return local
+    stored = cache_get(_ENTRIES_KEY)
+    if isinstance(stored, (tuple, list)) and len(stored) == 3 and int(stored[0]) == version:
+        try:
+            index = _SuggestIndex(version, float(stored[1]), json.loads(zlib.decompress(stored[2])))
+        except Exception:
+            logger.warning('Search suggestion entries decode failed')
+        else:
+            with _LOCAL_LOCK:
+                _LOCAL['index'] = index
+            return index
+    if local is not None and time.time() - local.built_at < _max_age():
+        # Suggestions may trail a catalog bump until the worker republishes;
+        # the search results page itself never does.
+        return local
+    with _BUILD_LOCK:
+        local = _LOCAL['index']
+        if local is not None and local.version == version:
+            return local
+        try:
+            build_suggestions()
+        except Exception:
+            logger.exception('Search suggestion build failed')
+            return local
+    return _LOCAL['index']
+
+
+def suggest(query: str, *, limit: int, language: str = 'fa') -> list[dict]:
+    prefix = normalize_text(query)[:_MAX_KEY_LENGTH]
+    if not prefix:
+        return []
+    index = _current_index()
+    if index is None:
+        return []
+    english = language == 'en'
+    results = []
+    for kind, pk, text, text_en, subtitle, subtitle_en, image, _weight, *_names in index.lookup(prefix, limit):
+        results.append({
+            'type': kind,
+            'id': pk,
+            'text': (text_en if english and text_en else text) or text_en,
+            'subtitle': (subtitle_en if english and subtitle_en else subtitle) or subtitle_en or None,
+            # Covers are stored as R2 object keys; sign them like every other endpoint.
+            'image': generate_signed_r2_url(image) if image else None,
+        })
+    return results
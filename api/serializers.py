@@ -3,6 +3,7 @@ import re
 import uuid
 
 from rest_framework import serializers
+from rest_framework.fields import SkipField
 from .utils import (
     absolute_api_url, cleanup_r2_urls, generate_signed_r2_url, public_media_url,
     r2_object_key, upload_file_to_r2, user_profile_image_url,
@@ -28,7 +29,8 @@ from django.utils.text import slugify as django_slugify
 from .localization import get_request_language, localized_value, translate_generated_text, generated_playlist_english
 from .subscriptions import normalize_expired_premium, premium_expires_at
 from .stream_grants import create_stream_grant_url
-from .similarity import ranked_similar_song_ids
+from .similarity import ranked_similar_song_ids, ranked_similar_song_ids_bulk
+from .card_fragments import fragment_key, get_fragments, store_fragments
 
 from .performance import (
     CATALOG_VERSION_KEY, cache_get_or_claim, cache_set, cache_version,
@@ -154,6 +156,9 @@ class SongMetricsListSerializer(serializers.ListSerializer):
         request = self.context.get('request')
         user = getattr(request, 'user', None) if request is not None else None
         hydrate_song_metrics(items, user if getattr(user, 'is_authenticated', False) else None)
+        prime = getattr(self.child, 'prime_fragments', None)
+        if prime is not None:
+            prime(items)
         return super().to_representation(items)
 
 
@@ -212,7 +217,7 @@ class SongWithSimilarListSerializer(SongMetricsListSerializer):
         page = positive('similar_page', 1, 1000)
         page_size = positive('similar_page_size', 6, 24)
         start = (page - 1) * page_size
-        ranked = {song.pk: ranked_similar_song_ids(song) for song in items}
+        ranked = ranked_similar_song_ids_bulk(items)
         wanted = []
         seen = set()
         for ids in ranked.values():
@@ -357,7 +362,97 @@ class LocalizedModelSerializer(serializers.ModelSerializer):
         return data
 
 
-class SongSummarySerializer(LocalizedModelSerializer):
+class CardFragmentMixin:
+    """Serve a card's user-independent fields from ``card_fragments``.
+
+    ``fragment_dynamic_fields`` are computed on every call; the rest of the
+    payload is rendered once per entity version, language and catalog version.
+    Subclasses extend ``render_fragment`` for post-processing that depends only
+    on the entity.
+    """
+
+    fragment_dynamic_fields = ()
+
+    @property
+    def _readable_fields(self):
+        skipped = self.fragment_dynamic_fields if getattr(self, '_rendering_fragment', False) else ()
+        for field in super()._readable_fields:
+            if field.field_name not in skipped:
+                yield field
+
+    def _fragment_key(self, instance):
+        if not getattr(instance, 'pk', None) or 'updated_at' in instance.get_deferred_fields():
+            return None
+        updated_at = getattr(instance, 'updated_at', None)
+        if updated_at is None:
+            return None
+        root = self.root
+        variant = getattr(root, '_card_fragment_variant', None)
+        if variant is None:
+            request = self.context.get('request')
+            request_path = str(getattr(request, 'path', '') or '')
+            artist_panel = request_path.startswith('/api/artist/') or request_path.startswith('/artist/')
+            variant = (
+                f"{get_request_language(request)}{'-panel' if artist_panel else ''}",
+                cache_version(CATALOG_VERSION_KEY),
+            )
+            root._card_fragment_variant = variant
+        return fragment_key(type(self).__name__, instance.pk, f'{updated_at.timestamp():.6f}', *variant)
+
+    def prime_fragments(self, instances):
+        """Load the fragments of a whole list with one cache read."""
+        keyed = [(instance, self._fragment_key(instance)) for instance in instances]
+        found = get_fragments([key for _, key in keyed if key])
+        for instance, key in keyed:
+            if key:
+                primed = getattr(instance, '_card_fragments', None)
+                if primed is None:
+                    primed = instance._card_fragments = {}
+                primed[key] = found.get(key)
+
+    def render_fragment(self, instance):
+        self._rendering_fragment = True
+        try:
+            data = super().to_representation(instance)
+        finally:
+            self._rendering_fragment = False
+        # Keep the declared field order, with the dynamic fields as placeholders.
+        fragment = {}
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in self.fragment_dynamic_fields:
+                fragment[name] = None
+            elif name in data:
+                fragment[name] = data.pop(name)
+        fragment.update(data)
+        return fragment
+
+    def to_representation(self, instance):
+        key = self._fragment_key(instance)
+        fragment = None
+        if key is not None:
+            primed = getattr(instance, '_card_fragments', None) or {}
+            fragment = primed[key] if key in primed else get_fragments([key]).get(key)
+        if fragment is None:
+            fragment = self.render_fragment(instance)
+            if key is not None:
+                store_fragments({key: fragment})
+        data = dict(fragment)
+        for name in self.fragment_dynamic_fields:
+            field = self.fields.get(name)
+            if field is None or field.write_only:
+                continue
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                data.pop(name, None)
+                continue
+            data[name] = None if attribute is None else field.to_representation(attribute)
+        return data
+
+
+class SongSummarySerializer(CardFragmentMixin, LocalizedModelSerializer):
     """Compact song payload used by cards, queues and nested detail responses."""
     artist_name = serializers.CharField(source='artist.name', read_only=True)
     artist_id = serializers.IntegerField(source='artist.id', read_only=True)
@@ -382,6 +477,8 @@ class SongSummarySerializer(LocalizedModelSerializer):
     sub_genre_ids = serializers.SerializerMethodField()
     is_promoted = serializers.SerializerMethodField()
 
+    fragment_dynamic_fields = ('stream_url', 'preview_url', 'is_preview', 'is_liked', 'play_count', 'is_promoted')
+
     class Meta:
         model = Song
         list_serializer_class = SongMetricsListSerializer
@@ -450,10 +547,14 @@ class SongSummarySerializer(LocalizedModelSerializer):
         _ensure_song_metrics(obj, self.context.get('request'))
         return int(obj.plays or 0) + int(getattr(obj, '_play_count', 0) or 0)
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
+    def render_fragment(self, instance):
+        data = super().render_fragment(instance)
         data['artist_url_slug'] = _related_url_slug(getattr(instance, 'artist', None))
         data['album_url_slug'] = _related_url_slug(getattr(instance, 'album', None))
+        return data
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
         data['cover_image'] = _signed_url(data.get('cover_image'))
         return data
 
@@ -2159,7 +2260,7 @@ class PlaylistForEventSerializer(LocalizedModelSerializer):
         return SongSerializer(_ordered_playlist_songs(obj), many=True, context=self.context).data
 
 
-class SongStreamSerializer(LocalizedModelSerializer):
+class SongStreamSerializer(CardFragmentMixin, LocalizedModelSerializer):
     artist_name = serializers.CharField(source='artist.name', read_only=True)
     artist_id = serializers.IntegerField(read_only=True)
     artist_unique_id = serializers.CharField(source='artist.unique_id', read_only=True)
@@ -2180,6 +2281,11 @@ class SongStreamSerializer(LocalizedModelSerializer):
     genre_ids = serializers.SerializerMethodField()
     is_promoted = serializers.SerializerMethodField()
 
+    fragment_dynamic_fields = (
+        'stream_url', 'preview_url', 'is_preview', 'plays', 'likes_count', 'is_liked', 'is_promoted',
+        'uploader_unique_id',
+    )
+
     class Meta:
         model = Song
         list_serializer_class = SongMetricsListSerializer
@@ -0,0 +1,81 @@
+"""Cached user rows and session states for JWT request authentication.
+
+``OptionalJWTAuthentication`` used to load the user and check its
+``RefreshToken`` session row on every authenticated request. Both now come from
+one cache entry per user: the user's row without password hashes (reading one
+loads it from the database) and the expiry of each session ID seen with an
+access token, or ``0`` for a revoked or unknown session. A warm request runs no
+queries; ``normalize_expired_premium`` still runs on the cached row, so Premium
+expiry is applied on time and its write refreshes the entry.
+
+Every ``User`` or ``RefreshToken`` save drops the entry (signals), and the
+bulk revocations in the auth and admin views call ``invalidate_auth_cache``
+after their ``update()``. Revocations that bypass both, or race a request that
+is refilling the entry, take effect within ``AUTH_SESSION_CACHE_TTL`` seconds.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import RefreshToken, User
+from .performance import cache_delete, cache_get, cache_set
+
+_KEY_PREFIX = 'auth-user:v1'
+_UNCACHED_FIELDS = frozenset({'password', 'artist_password', 'admin_password'})
+_CACHED_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields if field.attname not in _UNCACHED_FIELDS
+)
+_INACTIVE = 0
+
+
+def _key(user_id) -> str:
+    return f'{_KEY_PREFIX}:{int(user_id)}'
+
+
+def _ttl() -> int:
+    return max(1, int(getattr(settings, 'AUTH_SESSION_CACHE_TTL', 120)))
+
+
+def authenticated_session(user_id, session_id) -> tuple[User | None, bool]:
+    """Return the token's user and whether ``session_id`` is an active session of it.
+
+    The user is ``None`` when the account no longer exists.
+    """
+    key = _key(user_id)
+    entry = cache_get(key)
+    changed = False
+    if not isinstance(entry, dict):
+        row = User.objects.filter(pk=user_id).values_list(*_CACHED_FIELDS).first()
+        if row is None:
+            return None, False
+        entry = {'row': dict(zip(_CACHED_FIELDS, row)), 'sessions': {}}
+        changed = True
+
+    expires = entry['sessions'].get(str(session_id))
+    if expires is None:
+        expires_at = RefreshToken.objects.filter(
+            pk=session_id,
+            user_id=user_id,
+            revoked_at__isnull=True,
+        ).values_list('expires_at', flat=True).first()
+        expires = expires_at.timestamp() if expires_at is not None else _INACTIVE
+        entry['sessions'][str(session_id)] = expires
+        changed = True
+    if changed:
+        cache_set(key, entry, _ttl())
+
+    row = entry['row']
+    names = [name for name in _CACHED_FIELDS if name in row]
+    user = User.from_db(DEFAULT_DB_ALIAS, names, [row[name] for name in names])
+    return user, expires > time.time()
+
+
+def invalidate_auth_cache(*user_ids) -> None:
+    """Drop the cached entries of ``user_ids`` once the current transaction commits."""
+    keys = [_key(user_id) for user_id in user_ids if user_id]
+    if keys:
+        transaction.on_commit(lambda: cache_delete(*keys))
@@ -1,7 +1,7 @@
 import logging
 
 from django.db import transaction
-from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
@@ -13,7 +13,10 @@ from .models import (
     ArtistRelease,
     ArtistMonthlyListener,
     DepositRequest,
+    EngagementCounter,
     Follow,
+    Genre,
+    Mood,
     Notification,
     NotificationSetting,
     PlayCount,
@@ -24,8 +27,11 @@ from .models import (
     PaymentTransaction,
     PlaylistLike,
     RecommendedPlaylist,
+    RefreshToken,
     Song,
     SongLike,
+    SubGenre,
+    Tag,
     User,
     UserImageProfile,
     UserPlaylist,
@@ -362,10 +368,11 @@ def notify_album_like(sender, instance, created, **kwargs):
 def capture_old_song_status(sender, instance, **kwargs):
     if not instance.pk:
         instance._old_status = None
+        instance._old_album_id = None
+        instance._old_artist_id = None
         return
-    instance._old_status = (
-        Song.objects.filter(pk=instance.pk).values_list("status", flat=True).first()
-    )
+    previous = Song.objects.filter(pk=instance.pk).values_list("status", "album_id", "artist_id").first()
+    instance._old_status, instance._old_album_id, instance._old_artist_id = previous or (None, None, None)
 
 
 def _deliver_song_release(song_id, followed_artist_ids=None):
@@ -892,7 +899,7 @@ def _connect_m2m_version_bump(model, field_names, prefix):
 
 post_save.connect(_bump_catalog, sender=Song, dispatch_uid="api.song.catalog.save")
 post_delete.connect(_bump_catalog, sender=Song, dispatch_uid="api.song.catalog.delete")
-_connect_m2m_version_bump(Song, ("genres", "moods", "tags"), "api.song.catalog")
+_connect_m2m_version_bump(Song, ("genres", "moods", "tags", "sub_genres", "featured_artists"), "api.song.catalog")
 
 post_save.connect(_bump_affinity, sender=Follow, dispatch_uid="api.affinity.follow.save")
 post_delete.connect(_bump_affinity, sender=Follow, dispatch_uid="api.affinity.follow.delete")
@@ -912,7 +919,8 @@ def _bump_user_directory(**_kwargs):
     cache_increment(USER_DIRECTORY_VERSION_KEY, _VERSION_TTL)
 
 
-for model in (Artist, Album, Playlist, RecommendedPlaylist):
+# Taxonomy names are rendered into cached song card fragments.
+for model in (Artist, Album, Playlist, RecommendedPlaylist, Genre, Mood, Tag, SubGenre):
     post_save.connect(_bump_catalog, sender=model, dispatch_uid=f"api.catalog.{model.__name__}.save")
     post_delete.connect(_bump_catalog, sender=model, dispatch_uid=f"api.catalog.{model.__name__}.delete")
 
@@ -996,19 +1004,514 @@ for field_name in ('liked_by', 'saved_by', 'viewed_by'):
     )
 
 
+# Apply each interaction's delta to the persisted taste profile after commit.
+from .taste_profile import (
+    FOLLOW_WEIGHT,
+    LIKE_WEIGHT,
+    PLAYLIST_WEIGHT,
+    decayed_weight,
+    record_play_taste_events,
+    record_taste_events,
+)
+
+
+@receiver(post_save, sender=SongLike, dispatch_uid='api.taste-profile.song-like.save')
+def _song_like_taste(sender, instance, created, **_kwargs):
+    if created:
+        record_taste_events(instance.user_id, {instance.song_id: LIKE_WEIGHT})
+
+
+@receiver(post_delete, sender=SongLike, dispatch_uid='api.taste-profile.song-like.delete')
+def _song_unlike_taste(sender, instance, **_kwargs):
+    record_taste_events(instance.user_id, {instance.song_id: -decayed_weight(LIKE_WEIGHT, instance.created_at)})
+
+
+@receiver(post_save, sender=Follow, dispatch_uid='api.taste-profile.follow.save')
+def _follow_artist_taste(sender, instance, created, **_kwargs):
+    if created and instance.follower_user_id and instance.followed_artist_id:
+        record_taste_events(instance.follower_user_id, artist_weights={instance.followed_artist_id: FOLLOW_WEIGHT})
+
+
+@receiver(post_delete, sender=Follow, dispatch_uid='api.taste-profile.follow.delete')
+def _unfollow_artist_taste(sender, instance, **_kwargs):
+    if instance.follower_user_id and instance.followed_artist_id:
+        record_taste_events(
+            instance.follower_user_id,
+            artist_weights={instance.followed_artist_id: -decayed_weight(FOLLOW_WEIGHT, instance.created_at)},
+        )
+
+
+def _removed_playlist_weights(playlists):
+    # Like the rebuild, a playlist entry's weight decays from the playlist's updated_at.
+    weights = {}
+    for user_id, updated_at in playlists.values_list('user_id', 'updated_at'):
+        weights[user_id] = weights.get(user_id, 0.0) - decayed_weight(PLAYLIST_WEIGHT, updated_at)
+    return weights
+
+
+@receiver(m2m_changed, sender=UserPlaylist.songs.through, dispatch_uid='api.taste-profile.user-playlist.songs')
+def _user_playlist_taste(sender, instance, action, reverse, pk_set, **_kwargs):
+    if action == 'pre_clear':
+        # The cleared entries are only known before the clear runs.
+        if reverse:
+            for user_id, weight in _removed_playlist_weights(instance.user_playlists.all()).items():
+                record_taste_events(user_id, {instance.pk: weight})
+        else:
+            weight = -decayed_weight(PLAYLIST_WEIGHT, instance.updated_at)
+            record_taste_events(instance.user_id, {song_id: weight for song_id in instance.songs.values_list('id', flat=True)})
+        return
+    if action not in {'post_add', 'post_remove'} or not pk_set:
+        return
+    if reverse:
+        if action == 'post_add':
+            weights = {}
+            for user_id in UserPlaylist.objects.filter(pk__in=pk_set).values_list('user_id', flat=True):
+                weights[user_id] = weights.get(user_id, 0.0) + PLAYLIST_WEIGHT
+        else:
+            weights = _removed_playlist_weights(UserPlaylist.objects.filter(pk__in=pk_set))
+        for user_id, weight in weights.items():
+            record_taste_events(user_id, {instance.pk: weight})
+    else:
+        weight = PLAYLIST_WEIGHT if action == 'post_add' else -decayed_weight(PLAYLIST_WEIGHT, instance.updated_at)
+        record_taste_events(instance.user_id, {song_id: weight for song_id in pk_set})
+
+
+@receiver(pre_delete, sender=UserPlaylist, dispatch_uid='api.taste-profile.user-playlist.pre-delete')
+def _user_playlist_delete_taste_capture(sender, instance, **_kwargs):
+    instance._taste_song_ids = list(instance.songs.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=UserPlaylist, dispatch_uid='api.taste-profile.user-playlist.delete')
+def _user_playlist_delete_taste(sender, instance, **_kwargs):
+    weight = -decayed_weight(PLAYLIST_WEIGHT, instance.updated_at)
+    record_taste_events(instance.user_id, {song_id: weight for song_id in getattr(instance, '_taste_song_ids', ())})
+
+
+@receiver(m2m_changed, sender=Song.play_counts.through, dispatch_uid='api.taste-profile.song-plays')
+def _song_play_taste(sender, instance, action, reverse, pk_set, **_kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        record_play_taste_events([instance.pk], pk_set)
+    else:
+        record_play_taste_events(pk_set, [instance.pk])
+
+
+# Artist dashboard counters: mark the artist dirty for the coalescing publisher.
+from .artist_live import schedule_artist_live_update, schedule_new_follower, schedule_song_artists_live_update
+
+
+@receiver(m2m_changed, sender=Song.play_counts.through, dispatch_uid='api.artist-live.song-plays')
+def _song_play_artist_live(sender, instance, action, reverse, pk_set, **_kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        schedule_song_artists_live_update(pk_set)
+    else:
+        schedule_artist_live_update([instance.artist_id])
+
+
+@receiver(post_save, sender=Follow, dispatch_uid='api.artist-live.follow.save')
+def _follow_artist_live(sender, instance, created, **_kwargs):
+    if not created or not instance.followed_artist_id:
+        return
+    if instance.follower_user_id:
+        schedule_new_follower(instance.followed_artist_id, instance.follower_user_id)
+    else:
+        schedule_artist_live_update([instance.followed_artist_id])
+
+
+@receiver(post_delete, sender=Follow, dispatch_uid='api.artist-live.follow.delete')
+def _unfollow_artist_live(sender, instance, **_kwargs):
+    if instance.followed_artist_id:
+        schedule_artist_live_update([instance.followed_artist_id])
+
+
+# Materialized engagement counters, updated in the writing transaction.
+from .engagement_counters import adjust_counter, recompute_counters
+
+_LIKE_COUNTERS = {
+    SongLike: (EngagementCounter.KIND_SONG, 'song_id'),
+    AlbumLike: (EngagementCounter.KIND_ALBUM, 'album_id'),
+    PlaylistLike: (EngagementCounter.KIND_PLAYLIST, 'playlist_id'),
+}
+
+
+def _like_counter_saved(sender, instance, created, raw=False, **_kwargs):
+    if created and not raw:
+        kind, column = _LIKE_COUNTERS[sender]
+        adjust_counter(kind, getattr(instance, column), 'likes', 1)
+
+
+def _like_counter_deleted(sender, instance, **_kwargs):
+    kind, column = _LIKE_COUNTERS[sender]
+    adjust_counter(kind, getattr(instance, column), 'likes', -1)
+
+
+for like_model in _LIKE_COUNTERS:
+    post_save.connect(
+        _like_counter_saved, sender=like_model,
+        dispatch_uid=f'api.engagement-counter.{like_model.__name__}.save',
+    )
+    post_delete.connect(
+        _like_counter_deleted, sender=like_model,
+        dispatch_uid=f'api.engagement-counter.{like_model.__name__}.delete',
+    )
+
+
+def _follow_counter_deltas(instance, delta):
+    adjust_counter(EngagementCounter.KIND_ARTIST, instance.followed_artist_id, 'followers', delta)
+    adjust_counter(EngagementCounter.KIND_USER, instance.followed_user_id, 'followers', delta)
+    adjust_counter(EngagementCounter.KIND_ARTIST, instance.follower_artist_id, 'followings', delta)
+    adjust_counter(EngagementCounter.KIND_USER, instance.follower_user_id, 'followings', delta)
+
+
+@receiver(post_save, sender=Follow, dispatch_uid='api.engagement-counter.follow.save')
+def _follow_counters(sender, instance, created, raw=False, **_kwargs):
+    if created and not raw:
+        _follow_counter_deltas(instance, 1)
+
+
+@receiver(post_delete, sender=Follow, dispatch_uid='api.engagement-counter.follow.delete')
+def _unfollow_counters(sender, instance, **_kwargs):
+    _follow_counter_deltas(instance, -1)
+
+
+@receiver(m2m_changed, sender=UserPlaylist.songs.through, dispatch_uid='api.engagement-counter.user-playlist.songs')
+def _user_playlist_song_counters(sender, instance, action, reverse, pk_set, **_kwargs):
+    if action == 'pre_clear' and not reverse:
+        instance._engagement_song_ids = list(instance.songs.values_list('id', flat=True))
+        return
+    if action not in {'post_add', 'post_remove', 'post_clear'}:
+        return
+    if reverse:
+        song_ids = [instance.pk]
+    elif action == 'post_clear':
+        song_ids = getattr(instance, '_engagement_song_ids', ())
+    else:
+        song_ids = pk_set or ()
+    recompute_counters(EngagementCounter.KIND_SONG, song_ids)
+
+
+@receiver(pre_delete, sender=UserPlaylist, dispatch_uid='api.engagement-counter.user-playlist.pre-delete')
+def _user_playlist_delete_capture(sender, instance, **_kwargs):
+    instance._engagement_song_ids = list(instance.songs.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=UserPlaylist, dispatch_uid='api.engagement-counter.user-playlist.delete')
+def _user_playlist_delete_counters(sender, instance, **_kwargs):
+    recompute_counters(EngagementCounter.KIND_SONG, getattr(instance, '_engagement_song_ids', ()))
+
+
+# Per-user like/follow sets used by card hydration, updated after commit.
+from .user_membership import (
+    KIND_LIKED_ALBUMS,
+    KIND_LIKED_PLAYLISTS,
+    KIND_LIKED_SONGS,
+    follow_membership_kind,
+    record_membership,
+)
+
+_LIKE_MEMBERSHIPS = {
+    SongLike: (KIND_LIKED_SONGS, 'song_id'),
+    AlbumLike: (KIND_LIKED_ALBUMS, 'album_id'),
+    PlaylistLike: (KIND_LIKED_PLAYLISTS, 'playlist_id'),
+}
+
+
+def _like_membership_saved(sender, instance, created, raw=False, **_kwargs):
+    if created and not raw:
+        kind, column = _LIKE_MEMBERSHIPS[sender]
+        record_membership(kind, instance.user_id, getattr(instance, column), True)
+
+
+def _like_membership_deleted(sender, instance, **_kwargs):
+    kind, column = _LIKE_MEMBERSHIPS[sender]
+    record_membership(kind, instance.user_id, getattr(instance, column), False)
+
+
+for like_model in _LIKE_MEMBERSHIPS:
+    post_save.connect(
+        _like_membership_saved, sender=like_model,
+        dispatch_uid=f'api.user-membership.{like_model.__name__}.save',
+    )
+    post_delete.connect(
+        _like_membership_deleted, sender=like_model,
+        dispatch_uid=f'api.user-membership.{like_model.__name__}.delete',
+    )
+
+
+@receiver(post_save, sender=Follow, dispatch_uid='api.user-membership.follow.save')
+def _follow_membership_saved(sender, instance, created, raw=False, **_kwargs):
+    target = follow_membership_kind(instance) if created and not raw else None
+    if target is not None:
+        record_membership(target[0], instance.follower_user_id, target[1], True)
+
+
+@receiver(post_delete, sender=Follow, dispatch_uid='api.user-membership.follow.delete')
+def _follow_membership_deleted(sender, instance, **_kwargs):
+    target = follow_membership_kind(instance)
+    if target is not None:
+        record_membership(target[0], instance.follower_user_id, target[1], False)
+
+
+# Artist finance ledger: deposit transitions move allocations in the writing
+# transaction; a reassigned song rebuilds both artists after commit.
+from .artist_ledger import rebuild_stored_ledgers, record_deposit_change
+
+
+@receiver(post_save, sender=DepositRequest, dispatch_uid='api.artist-ledger.deposit.save')
+def _deposit_ledger_saved(sender, instance, created, raw=False, **_kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_notification_old_status', instance.status)
+    record_deposit_change(instance, previous, instance.status)
+
+
+@receiver(post_delete, sender=DepositRequest, dispatch_uid='api.artist-ledger.deposit.delete')
+def _deposit_ledger_deleted(sender, instance, **_kwargs):
+    record_deposit_change(instance, instance.status, None)
+
+
+@receiver(post_save, sender=Song, dispatch_uid='api.artist-ledger.song.artist')
+def _song_ledger_artist_changed(sender, instance, created, raw=False, **_kwargs):
+    previous = getattr(instance, '_old_artist_id', None)
+    if created or raw or previous is None or previous == instance.artist_id:
+        return
+    artist_ids = (previous, instance.artist_id)
+    transaction.on_commit(lambda: rebuild_stored_ledgers(artist_ids))
+
+
+# Owner dashboard counters: payment and payout saves move one row between the
+# status totals in the saving transaction.
+from .dashboard_metrics import record_payment_change, record_payout_change
+
+
+def _capture_dashboard_state(instance, model):
+    instance._dashboard_previous = (
+        model.objects.filter(pk=instance.pk).values_list('status', 'amount').first()
+        if instance.pk else None
+    )
+
+
+def _dashboard_state(instance):
+    return (instance.status, instance.amount)
+
+
+@receiver(pre_save, sender=PaymentTransaction, dispatch_uid='api.dashboard.payment.capture')
+def _capture_payment_dashboard(sender, instance, raw=False, **_kwargs):
+    if not raw:
+        _capture_dashboard_state(instance, PaymentTransaction)
+
+
+@receiver(post_save, sender=PaymentTransaction, dispatch_uid='api.dashboard.payment.save')
+def _payment_dashboard_saved(sender, instance, created, raw=False, **_kwargs):
+    if not raw:
+        previous = None if created else getattr(instance, '_dashboard_previous', None)
+        record_payment_change(previous, _dashboard_state(instance), instance.created_at)
+
+
+@receiver(post_delete, sender=PaymentTransaction, dispatch_uid='api.dashboard.payment.delete')
+def _payment_dashboard_deleted(sender, instance, **_kwargs):
+    record_payment_change(_dashboard_state(instance), None, instance.created_at)
+
+
+@receiver(pre_save, sender=DepositRequest, dispatch_uid='api.dashboard.payout.capture')
+def _capture_payout_dashboard(sender, instance, raw=False, **_kwargs):
+    if not raw:
+        _capture_dashboard_state(instance, DepositRequest)
+
+
+@receiver(post_save, sender=DepositRequest, dispatch_uid='api.dashboard.payout.save')
+def _payout_dashboard_saved(sender, instance, created, raw=False, **_kwargs):
+    if not raw:
+        previous = None if created else getattr(instance, '_dashboard_previous', None)
+        record_payout_change(previous, _dashboard_state(instance))
+
+
+@receiver(post_delete, sender=DepositRequest, dispatch_uid='api.dashboard.payout.delete')
+def _payout_dashboard_deleted(sender, instance, **_kwargs):
+    record_payout_change(_dashboard_state(instance), None)
+
+
+# Analytics snapshots leave out deleted songs: deleting, restoring or moving a
+# song drops the affected artists' snapshots so the next read rebuilds them.
+from .artist_analytics import invalidate_artist_snapshots
+
+
+@receiver(post_save, sender=Song, dispatch_uid='api.artist-analytics.song')
+def _song_analytics_changed(sender, instance, created, raw=False, **_kwargs):
+    if created or raw:
+        return
+    previous_artist = getattr(instance, '_old_artist_id', None)
+    was_deleted = getattr(instance, '_old_status', None) == Song.STATUS_DELETED
+    moved = previous_artist is not None and previous_artist != instance.artist_id
+    if not moved and was_deleted == (instance.status == Song.STATUS_DELETED):
+        return
+    artist_ids = (previous_artist, instance.artist_id)
+    transaction.on_commit(lambda: invalidate_artist_snapshots(artist_ids))
+
+
+# Request authentication reads users and their sessions from one cached entry
+# per user; any write to either drops it.
+from .session_cache import invalidate_auth_cache
+
+
+@receiver(post_save, sender=User, dispatch_uid='api.auth-cache.user.save')
+@receiver(post_delete, sender=User, dispatch_uid='api.auth-cache.user.delete')
+def _invalidate_user_auth_cache(sender, instance, **_kwargs):
+    invalidate_auth_cache(instance.pk)
+
+
+@receiver(post_save, sender=RefreshToken, dispatch_uid='api.auth-cache.session.save')
+def _invalidate_session_auth_cache(sender, instance, **_kwargs):
+    invalidate_auth_cache(instance.user_id)
+
+
 @receiver(post_save, sender=PlayConfiguration, dispatch_uid='api.stream-config.cache.save')
 @receiver(post_delete, sender=PlayConfiguration, dispatch_uid='api.stream-config.cache.delete')
 def _invalidate_stream_config_cache(**_kwargs):
     cache_delete('stream-play-config:v1', 'stream-play-worth:v1')
 
 
+from .stream_ad_state import ACTIVE_AUDIO_ADS_CACHE_KEY
+
+
 @receiver(post_save, sender=AudioAd, dispatch_uid='api.audio-ad.cache.save')
 @receiver(post_delete, sender=AudioAd, dispatch_uid='api.audio-ad.cache.delete')
 def _invalidate_audio_ad_pool(**_kwargs):
-    cache_delete('stream-active-audio-ads:v1')
+    cache_delete(ACTIVE_AUDIO_ADS_CACHE_KEY)
 
 
 @receiver(post_save, sender=BannerAd, dispatch_uid='api.banner-active.cache.save')
 @receiver(post_delete, sender=BannerAd, dispatch_uid='api.banner-active.cache.delete')
 def _invalidate_banner_active_cache(**_kwargs):
     cache_delete('banner-active-ids:v2')
+
+
+# Keep PostgreSQL search documents (SEARCH_BACKEND=postgres) and the in-memory
+# search index segments (SEARCH_BACKEND=index) current.
+from .search_documents import (
+    delete_search_document,
+    documents_enabled,
+    related_album_ids,
+    related_song_ids,
+    schedule_search_document_refresh,
+)
+from .search_index import index_enabled, schedule_search_index_update
+
+
+def _search_enabled():
+    return documents_enabled() or index_enabled()
+
+
+def _schedule_search_refresh(kind, ids):
+    ids = [pk for pk in ids if pk]
+    schedule_search_document_refresh(kind, ids)
+    schedule_search_index_update(kind, ids)
+
+
+def _refresh_song_documents(sender=None, instance=None, **_kwargs):
+    _schedule_search_refresh("song", [instance.pk])
+    album_ids = {instance.album_id, getattr(instance, "_old_album_id", None)}
+    _schedule_search_refresh("album", [pk for pk in album_ids if pk])
+
+
+def _delete_song_document(sender=None, instance=None, **_kwargs):
+    delete_search_document("song", instance.pk)
+    schedule_search_index_update("song", [instance.pk])
+    if instance.album_id:
+        _schedule_search_refresh("album", [instance.album_id])
+
+
+def _refresh_artist_documents(sender=None, instance=None, **_kwargs):
+    if not _search_enabled():
+        return
+    _schedule_search_refresh("artist", [instance.pk])
+    song_ids = related_song_ids(artist_id=instance.pk)
+    _schedule_search_refresh("song", song_ids)
+    _schedule_search_refresh("album", related_album_ids(artist_id=instance.pk))
+
+
+def _refresh_album_documents(sender=None, instance=None, **_kwargs):
+    if not _search_enabled():
+        return
+    _schedule_search_refresh("album", [instance.pk])
+    _schedule_search_refresh("song", related_song_ids(album_id=instance.pk))
+
+
+def _refresh_featured_song_documents(sender=None, instance=None, action=None, reverse=False, pk_set=None, **_kwargs):
+    if action not in {"post_add", "post_remove", "post_clear"} or not _search_enabled():
+        return
+    if reverse:
+        song_ids = pk_set or related_song_ids(artist_id=instance.pk)
+    else:
+        song_ids = [instance.pk]
+    _schedule_search_refresh("song", song_ids)
+
+
+def _mood_index_updater(kind, model):
+    # Mood links only feed the index's mood tags, not the search documents.
+    def update_index(sender=None, instance=None, action=None, reverse=False, pk_set=None, **_kwargs):
+        if action not in {"post_add", "post_remove", "pre_clear"} or not index_enabled():
+            return
+        if not reverse:
+            ids = [instance.pk]
+        elif action == "pre_clear":
+            ids = model.objects.filter(moods=instance).values_list("pk", flat=True)
+        else:
+            ids = pk_set or ()
+        schedule_search_index_update(kind, list(ids))
+    return update_index
+
+
+def _refresh_mood_tags(sender=None, instance=None, **_kwargs):
+    # Runs before a delete too: the links are gone once the mood is.
+    if not index_enabled() or not instance.pk:
+        return
+    schedule_search_index_update("song", list(Song.objects.filter(moods=instance).values_list("pk", flat=True)))
+    schedule_search_index_update("playlist", list(Playlist.objects.filter(moods=instance).values_list("pk", flat=True)))
+
+
+def _refresh_playlist_document(sender=None, instance=None, **_kwargs):
+    _schedule_search_refresh("playlist", [instance.pk])
+
+
+def _refresh_user_document(sender=None, instance=None, **_kwargs):
+    _schedule_search_refresh("user", [instance.pk])
+
+
+def _search_document_deleter(kind):
+    def delete_document(sender=None, instance=None, **_kwargs):
+        delete_search_document(kind, instance.pk)
+        schedule_search_index_update(kind, [instance.pk])
+    return delete_document
+
+
+post_save.connect(_refresh_song_documents, sender=Song, dispatch_uid="api.search-document.song.save")
+post_delete.connect(_delete_song_document, sender=Song, dispatch_uid="api.search-document.song.delete")
+m2m_changed.connect(
+    _refresh_featured_song_documents,
+    sender=Song.featured_artists.through,
+    dispatch_uid="api.search-document.song.featured-artists",
+)
+post_save.connect(_refresh_artist_documents, sender=Artist, dispatch_uid="api.search-document.artist.save")
+post_save.connect(_refresh_album_documents, sender=Album, dispatch_uid="api.search-document.album.save")
+post_save.connect(_refresh_playlist_document, sender=Playlist, dispatch_uid="api.search-document.playlist.save")
+post_save.connect(_refresh_user_document, sender=User, dispatch_uid="api.search-document.user.save")
+for model, kind in ((Artist, "artist"), (Album, "album"), (Playlist, "playlist"), (User, "user")):
+    post_delete.connect(
+        _search_document_deleter(kind),
+        sender=model,
+        weak=False,
+        dispatch_uid=f"api.search-document.{kind}.delete",
+    )
+for model, kind in ((Song, "song"), (Playlist, "playlist")):
+    m2m_changed.connect(
+        _mood_index_updater(kind, model),
+        sender=model.moods.through,
+        weak=False,
+        dispatch_uid=f"api.search-index.{kind}.moods",
+    )
+post_save.connect(_refresh_mood_tags, sender=Mood, dispatch_uid="api.search-index.mood.save")
+pre_delete.connect(_refresh_mood_tags, sender=Mood, dispatch_uid="api.search-index.mood.delete")
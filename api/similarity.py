@@ -1,70 +1,131 @@
-"""Cached similar-song ranking isolated from serialization concerns."""
+"""Precomputed similar-song ranking isolated from serialization concerns.
+
+Requests only read ``SimilarSongList`` rows. ``run_ranking_worker`` keeps them
+current from the song feature matrix, recomputing just the songs whose
+similarity inputs changed, the songs that listed them and their new
+neighbours, plus a slow rolling refresh so play-count tie breaks do not drift.
+"""
 from __future__ import annotations
 
+from collections.abc import Iterable
+from datetime import timedelta
+
 from django.conf import settings
-from django.db.models import Q
+from django.db import transaction
+from django.utils import timezone
 
-from .models import Song
-from .performance import CATALOG_VERSION_KEY, cache_get_or_claim, cache_set, cache_version, relation_ids, stable_cache_key
+from .models import SimilarSongList, Song
+from .performance import CATALOG_VERSION_KEY, cache_get, cache_set, cache_version, stable_cache_key
+from .song_embeddings import current_song_matrix
 
+SIMILAR_LIMIT = 100
+_WRITE_BATCH = 1000
+_STATE_KEY = 'similar-song-lists-state:v1'
+_STATE_TTL = 7 * 24 * 60 * 60
+_ROLLING_INTERVAL = 600
 
-def ranked_similar_song_ids(song) -> list[int]:
-    genres = relation_ids(song, 'genres')
-    moods = relation_ids(song, 'moods')
-    tags = relation_ids(song, 'tags')
-    key = stable_cache_key('similar-songs-v6', song.pk, song.updated_at, cache_version(CATALOG_VERSION_KEY))
-    ranked_ids, claimed = cache_get_or_claim(key, lock_timeout=20, wait_timeout=1.0)
-    if ranked_ids is not None:
-        return list(ranked_ids)
-
-    match = Q(artist_id=song.artist_id)
-    if genres:
-        match |= Q(genres__in=genres)
-    if moods:
-        match |= Q(moods__in=moods)
-    if tags:
-        match |= Q(tags__in=tags)
-
-    candidates = list(
-        Song.objects.filter(status=Song.STATUS_PUBLISHED)
-        .exclude(pk=song.pk).filter(match).distinct()
-        .select_related('artist', 'album')
-        .prefetch_related('genres', 'moods', 'tags')
-        .order_by('-plays', '-release_date', '-created_at')[:300]
-    )
-    source_year = getattr(song.release_date, 'year', None)
-
-    def near(a, b, weight, scale=100):
-        return 0 if a is None or b is None else max(0, scale - abs(a - b)) / scale * weight
-
-    scored = []
-    for candidate in candidates:
-        score = (
-            3 * len(genres & relation_ids(candidate, 'genres'))
-            + 2 * len(moods & relation_ids(candidate, 'moods'))
-            + 1.5 * len(tags & relation_ids(candidate, 'tags'))
-        )
-        score += 8 if candidate.artist_id == song.artist_id else 0
-        year = getattr(candidate.release_date, 'year', None)
-        score += 3 if source_year and year and source_year // 10 == year // 10 else 0
-        score += (
-            near(song.energy, candidate.energy, 3)
-            + near(song.danceability, candidate.danceability, 2.5)
-            + near(song.valence, candidate.valence, 2)
-            + near(song.tempo, candidate.tempo, 1, 200)
-        )
-        if score > 0:
-            scored.append((candidate.pk, score, candidate.plays or 0))
 
-    scored.sort(key=lambda row: (row[1], row[2]), reverse=True)
-    ranked_ids = [row[0] for row in scored]
-    if not ranked_ids:
+def _popular_song_ids() -> list[int]:
+    key = stable_cache_key('similar-fallback-v1', cache_version(CATALOG_VERSION_KEY))
+    ranked_ids = cache_get(key)
+    if ranked_ids is None:
         ranked_ids = list(
             Song.objects.filter(status=Song.STATUS_PUBLISHED)
-            .exclude(pk=song.pk).order_by('-plays', '-created_at')
-            .values_list('id', flat=True)[:100]
+            .order_by('-plays', '-created_at')
+            .values_list('id', flat=True)[:SIMILAR_LIMIT + 1]
         )
-    # Only the lock holder should normally compute, but correctness is identical
-    # if a timeout caused a second worker to reach here.
-    cache_set(key, ranked_ids, getattr(settings, 'CACHE_TTL_SIMILAR', 90))
-    return ranked_ids
+        cache_set(key, ranked_ids, getattr(settings, 'CACHE_TTL_SIMILAR', 90))
+    return list(ranked_ids)
+
+
+def ranked_similar_song_ids_bulk(songs: Iterable) -> dict[int, list[int]]:
+    """Stored similar ids per song; songs without a list get popular songs."""
+    ids = [song.pk for song in songs if song.pk]
+    stored = dict(SimilarSongList.objects.filter(song_id__in=ids).values_list('song_id', 'similar_ids'))
+    ranked = {}
+    fallback = None
+    for song_id in ids:
+        similar = stored.get(song_id)
+        if not similar:
+            # Not computed yet (new song or first deploy): never score inline.
+            if fallback is None:
+                fallback = _popular_song_ids()
+            similar = [pk for pk in fallback if pk != song_id][:SIMILAR_LIMIT]
+        ranked[song_id] = list(similar)
+    return ranked
+
+
+def ranked_similar_song_ids(song) -> list[int]:
+    return ranked_similar_song_ids_bulk([song]).get(song.pk, [])
+
+
+def _stale_after() -> timedelta:
+    return timedelta(hours=max(1, int(getattr(settings, 'SIMILAR_SONGS_FULL_REFRESH_HOURS', 24))))
+
+
+def refresh_similar_song_lists(*, force: bool = False, rolling_batch: int = 2000) -> dict | None:
+    """Recompute lists affected by feature/taxonomy changes since the last pass.
+
+    Returns ``None`` when there is nothing to do: the feature matrix is not
+    current for this catalog version, or this build was already diffed and
+    the rolling refresh is not due.
+    """
+    matrix = current_song_matrix()
+    if matrix is None:
+        return None
+    state = cache_get(_STATE_KEY)
+    now = timezone.now().timestamp()
+    if (
+        not force
+        and isinstance(state, (tuple, list)) and len(state) == 2
+        and state[0] == matrix.path
+        and now - float(state[1]) < _ROLLING_INTERVAL
+    ):
+        return None
+
+    signatures = {int(song_id): int(signature) for song_id, signature in zip(matrix.ids, matrix.signatures)}
+    stored = dict(SimilarSongList.objects.values_list('song_id', 'signature').iterator(chunk_size=5000))
+    changed = {song_id for song_id, signature in signatures.items() if stored.get(song_id) != signature}
+    removed = set(stored) - set(signatures)
+
+    affected = set(changed)
+    # Cosine similarity is symmetric, so a song's own old/new neighbours are
+    # the lists it left or should now enter.
+    for similar in SimilarSongList.objects.filter(song_id__in=sorted((changed | removed) & set(stored))).values_list(
+        'similar_ids', flat=True,
+    ).iterator(chunk_size=2000):
+        affected.update(similar or [])
+    if len(changed) * 2 >= len(signatures):
+        affected = set(signatures)
+    elif changed:
+        for neighbours in matrix.top_k(sorted(changed), SIMILAR_LIMIT).values():
+            affected.update(neighbours)
+    affected &= set(signatures)
+
+    stale_before = timezone.now() - _stale_after()
+    rolling = set(
+        SimilarSongList.objects.filter(computed_at__lt=stale_before)
+        .order_by('computed_at').values_list('song_id', flat=True)[:rolling_batch]
+    ) - affected
+    affected |= rolling & set(signatures)
+
+    written = 0
+    pending = sorted(affected)
+    for start in range(0, len(pending), _WRITE_BATCH):
+        chunk = pending[start:start + _WRITE_BATCH]
+        ranked = matrix.top_k(chunk, SIMILAR_LIMIT)
+        with transaction.atomic():
+            SimilarSongList.objects.bulk_create(
+                [
+                    SimilarSongList(song_id=song_id, similar_ids=ranked.get(song_id, []), signature=signatures[song_id])
+                    for song_id in chunk
+                ],
+                update_conflicts=True,
+                unique_fields=['song'],
+                update_fields=['similar_ids', 'signature', 'computed_at'],
+            )
+        written += len(chunk)
+    if removed:
+        SimilarSongList.objects.filter(song_id__in=sorted(removed)).delete()
+    cache_set(_STATE_KEY, (matrix.path, now), _STATE_TTL)
+    return {'changed': len(changed), 'written': written, 'removed': len(removed)}
@@ -0,0 +1,287 @@
+"""Catalog-wide song feature matrix for vectorized similarity.
+
+Every published song becomes one L2-normalized ``float32`` row: centered audio
+features, multi-hot genre/sub-genre/mood/tag blocks and a one-hot decade. Block
+weights mirror the old per-candidate scoring, so a dot product between two rows
+is their weighted cosine similarity. Same-artist bonuses and play-count tie
+breaks are applied from side arrays rather than a one-hot artist block.
+
+The ranking worker builds the matrix once per ``CATALOG_VERSION_KEY`` into
+``SONG_EMBEDDING_DIR`` and atomically swaps ``current.json``. Web workers
+memory-map the ``.npy`` files read-only, so one copy in the page cache serves
+every process. A matrix is used only while it matches the current catalog
+version; otherwise callers fall back to the database ranking.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+
+from .models import Song
+from .performance import CATALOG_VERSION_KEY, cache_version
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST = 'current.json'
+_FORMAT = 2
+_KEEP_BUILDS = 2
+_BLOCK_ROWS = 64
+SAME_ARTIST_BONUS = 0.35
+
+# Audio feature columns and their weights; tempo is scaled over 200 BPM like
+# the old nearness score.
+_AUDIO_FEATURES = (
+    ('energy', 100, 3.0),
+    ('danceability', 100, 2.5),
+    ('valence', 100, 2.0),
+    ('acousticness', 100, 1.5),
+    ('instrumentalness', 100, 1.0),
+    ('speechiness', 100, 1.0),
+    ('tempo', 200, 1.0),
+)
+_GENRE_WEIGHT = 3.0
+_SUB_GENRE_WEIGHT = 2.0
+_MOOD_WEIGHT = 2.0
+_TAG_WEIGHT = 1.5
+_DECADE_WEIGHT = 3.0
+
+_LOCAL = {'matrix': None}
+_LOCAL_LOCK = threading.Lock()
+
+
+def embedding_dir() -> str:
+    return str(getattr(settings, 'SONG_EMBEDDING_DIR', os.path.join(settings.BASE_DIR, 'var', 'song_embeddings')))
+
+
+def _max_tags() -> int:
+    return max(0, int(getattr(settings, 'SONG_EMBEDDING_MAX_TAGS', 256)))
+
+
+class SongMatrix:
+    """Memory-mapped feature rows plus id/artist/popularity side arrays."""
+
+    __slots__ = ('version', 'built_at', 'path', 'ids', 'vectors', 'artists', 'popularity', 'signatures', 'rows')
+
+    def __init__(self, version: int, built_at: float, path: str, *, mmap: bool = True):
+        mode = 'r' if mmap else None
+        self.version = version
+        self.built_at = built_at
+        self.path = path
+        self.ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode=mode)
+        self.vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode=mode)
+        self.artists = np.load(os.path.join(path, 'artists.npy'), mmap_mode=mode)
+        self.popularity = np.load(os.path.join(path, 'popularity.npy'), mmap_mode=mode)
+        self.signatures = np.load(os.path.join(path, 'signatures.npy'), mmap_mode=mode)
+        self.rows = {int(song_id): row for row, song_id in enumerate(self.ids)}
+
+    def _scores(self, rows: np.ndarray) -> np.ndarray:
+        scores = np.asarray(self.vectors[rows] @ self.vectors.T, dtype=np.float32)
+        scores += SAME_ARTIST_BONUS * (
+            (self.artists[rows][:, None] == self.artists[None, :]) & (self.artists[rows][:, None] > 0)
+        )
+        # Popularity only separates otherwise equal scores.
+        scores += np.where(scores > 0, self.popularity[None, :], 0)
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+    def top_k(self, song_ids: Sequence[int], k: int) -> dict[int, list[int]]:
+        """Batch top-k neighbours for ``song_ids`` present in the matrix."""
+        wanted = [(int(song_id), self.rows[int(song_id)]) for song_id in song_ids if int(song_id) in self.rows]
+        result: dict[int, list[int]] = {}
+        k = max(1, min(k, len(self.ids) - 1)) if len(self.ids) > 1 else 0
+        for start in range(0, len(wanted), _BLOCK_ROWS):
+            block = wanted[start:start + _BLOCK_ROWS]
+            rows = np.fromiter((row for _, row in block), dtype=np.int64, count=len(block))
+            if not k:
+                result.update({song_id: [] for song_id, _ in block})
+                continue
+            scores = self._scores(rows)
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for index, (song_id, _) in enumerate(block):
+                picked = candidates[index]
+                picked = picked[np.argsort(-scores[index, picked], kind='stable')]
+                picked = picked[scores[index, picked] > 0]
+                result[song_id] = [int(value) for value in self.ids[picked]]
+        return result
+
+
+def _taxonomy(through, column: str, limit: int | None = None) -> tuple[dict[int, int], dict]:
+    """Column positions for one M2M block and ``{song_id: [taxonomy ids]}``."""
+    published = through.objects.filter(song__status=Song.STATUS_PUBLISHED)
+    counts = published.values(column).annotate(total=Count('song_id'))
+    ordered = counts.order_by('-total', column)
+    if limit is not None:
+        ordered = ordered[:limit]
+    columns = {int(row[column]): position for position, row in enumerate(ordered)}
+    links: dict[int, list[int]] = {}
+    for song_id, value in published.filter(**{f'{column}__in': list(columns)}).values_list(
+        'song_id', column,
+    ).iterator(chunk_size=5000):
+        links.setdefault(int(song_id), []).append(int(value))
+    return columns, links
+
+
+def _signature(*parts) -> int:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def build_song_matrix() -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return ``(ids, vectors, artists, popularity, signatures)`` for every published song.
+
+    A signature fingerprints a song's raw features, taxonomy, artist and
+    decade (not plays), so it only moves when its similarity inputs do.
+    """
+    feature_names = [name for name, _, _ in _AUDIO_FEATURES]
+    rows = list(
+        Song.objects.filter(status=Song.STATUS_PUBLISHED)
+        .order_by('pk')
+        .values_list('pk', 'artist_id', 'plays', 'release_date', *feature_names)
+    )
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    blocks = [
+        (Song.genres.through, 'genre_id', _GENRE_WEIGHT, None),
+        (Song.sub_genres.through, 'subgenre_id', _SUB_GENRE_WEIGHT, None),
+        (Song.moods.through, 'mood_id', _MOOD_WEIGHT, None),
+        (Song.tags.through, 'tag_id', _TAG_WEIGHT, _max_tags()),
+    ]
+    taxonomies = [(_taxonomy(through, column, limit), weight) for through, column, weight, limit in blocks]
+    decades = sorted({row[3].year // 10 for row in rows if row[3]})
+    decade_columns = {decade: position for position, decade in enumerate(decades)}
+
+    width = len(_AUDIO_FEATURES) + sum(len(columns) for (columns, _), _ in taxonomies) + len(decade_columns)
+    vectors = np.zeros((len(rows), width), dtype=np.float32)
+    for position, (_name, scale, weight) in enumerate(_AUDIO_FEATURES):
+        # Missing values become NaN, then the neutral midpoint (0 once centered).
+        values = np.array([row[4 + position] for row in rows], dtype=np.float64)
+        values = np.nan_to_num(values, nan=scale / 2)
+        # Centered so songs on the same side of the range reinforce each other.
+        vectors[:, position] = np.clip((values - scale / 2) / (scale / 2), -1, 1) * np.sqrt(weight)
+
+    offset = len(_AUDIO_FEATURES)
+    row_of = {int(song_id): row for row, song_id in enumerate(ids)}
+    terms: list[list[tuple[int, int]]] = [[] for _ in rows]
+    for block, ((columns, links), weight) in enumerate(taxonomies):
+        scale = np.float32(np.sqrt(weight))
+        for song_id, values in links.items():
+            row = row_of.get(song_id)
+            if row is not None:
+                vectors[row, [offset + columns[value] for value in values]] = scale
+                terms[row].extend((block, value) for value in values)
+        offset += len(columns)
+    decade_scale = np.float32(np.sqrt(_DECADE_WEIGHT))
+    for row, values in enumerate(rows):
+        if values[3]:
+            vectors[row, offset + decade_columns[values[3].year // 10]] = decade_scale
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    artists = np.array([row[1] or 0 for row in rows], dtype=np.int64)
+    plays = np.log1p(np.array([max(0, row[2] or 0) for row in rows], dtype=np.float64))
+    popularity = (plays / plays.max() * 1e-4 if len(plays) and plays.max() > 0 else plays).astype(np.float32)
+    signatures = np.array([
+        _signature(values[1], values[3].year // 10 if values[3] else None, values[4:], sorted(terms[row]))
+        for row, values in enumerate(rows)
+    ], dtype=np.int64)
+    return ids, vectors, artists, popularity, signatures
+
+
+def publish_arrays(kind: str, manifest_name: str, arrays: Sequence[tuple[str, np.ndarray]], meta: dict) -> str:
+    """Write one build of ``.npy`` arrays and atomically point ``manifest_name`` at it."""
+    root = embedding_dir()
+    os.makedirs(root, exist_ok=True)
+    name = f'{kind}-{int(time.time() * 1000)}'
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    for label, array in arrays:
+        np.save(os.path.join(path, f'{label}.npy'), array)
+    manifest = os.path.join(root, manifest_name)
+    with open(f'{manifest}.tmp', 'w', encoding='utf-8') as handle:
+        json.dump({**meta, 'build': name}, handle)
+    os.replace(f'{manifest}.tmp', manifest)
+    _prune_builds(root, f'{kind}-', keep=name)
+    return name
+
+
+def publish_song_matrix() -> dict:
+    """Build the matrix for the current catalog version and swap it in."""
+    version = cache_version(CATALOG_VERSION_KEY)
+    ids, vectors, artists, popularity, signatures = build_song_matrix()
+    arrays = (
+        ('ids', ids), ('vectors', vectors), ('artists', artists), ('popularity', popularity),
+        ('signatures', signatures),
+    )
+    publish_arrays('matrix', _MANIFEST, arrays, {'version': version, 'built_at': time.time(), 'format': _FORMAT})
+    with _LOCAL_LOCK:
+        _LOCAL['matrix'] = None
+    return {'songs': int(len(ids)), 'dimensions': int(vectors.shape[1]), 'bytes': int(vectors.nbytes)}
+
+
+def _prune_builds(root: str, prefix: str, keep: str) -> None:
+    builds = sorted(
+        (entry for entry in os.scandir(root) if entry.is_dir() and entry.name.startswith(prefix)),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    # Mapped files stay readable after unlink, so older builds can go at once.
+    for entry in builds[_KEEP_BUILDS:]:
+        if entry.name != keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def read_manifest(manifest_name: str = _MANIFEST) -> dict | None:
+    try:
+        with open(os.path.join(embedding_dir(), manifest_name), encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def refresh_song_matrix(*, force: bool = False) -> dict | None:
+    """Rebuild when the catalog version moved; ``None`` when already current."""
+    manifest = read_manifest()
+    if (
+        not force
+        and manifest is not None
+        and manifest.get('format') == _FORMAT
+        and manifest.get('version') == cache_version(CATALOG_VERSION_KEY)
+    ):
+        return None
+    return publish_song_matrix()
+
+
+def current_song_matrix() -> SongMatrix | None:
+    """The mapped matrix for the current catalog version, or ``None``."""
+    version = cache_version(CATALOG_VERSION_KEY)
+    local = _LOCAL['matrix']
+    if local is not None and local.version == version:
+        return local
+    manifest = read_manifest()
+    if manifest is None or manifest.get('format') != _FORMAT or manifest.get('version') != version:
+        return None
+    try:
+        matrix = SongMatrix(version, float(manifest['built_at']), os.path.join(embedding_dir(), manifest['build']))
+    except Exception:
+        logger.warning('Song embedding matrix load failed build=%s', manifest.get('build'))
+        return None
+    with _LOCAL_LOCK:
+        _LOCAL['matrix'] = matrix
+    return matrix
+
+
+def similar_song_ids(song_ids: Iterable[int], k: int = 100) -> dict[int, list[int]] | None:
+    matrix = current_song_matrix()
+    if matrix is None:
+        return None
+    return matrix.top_k(list(song_ids), k)
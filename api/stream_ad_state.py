@@ -0,0 +1,244 @@
+"""Per-user stream/ad counters for the unwrap endpoints.
+
+Each listener has a Redis hash (songs since the last seen ad, pending ad) and a
+sorted set of unwrap timestamps for the 24 hour sliding window. One Lua call
+checks for a pending ad, records the unwrap, trims the window and, when the
+ad frequency is reached, claims the pre-picked ad as pending. The unwrap
+endpoints therefore need one Redis round trip and one ``StreamAccess`` write
+instead of separate pending/window/last-ad/since-last-ad queries.
+
+``StreamAccess`` stays the source of truth. A missing state (eviction, TTL,
+first unwrap) is rebuilt from it before deciding, and when Redis is down the
+same decision is computed from the database directly.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import AudioAd, StreamAccess
+from .performance import cache_delete, cache_get, cache_set
+from .recommendation_runtime import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_AUDIO_ADS_CACHE_KEY = "stream-active-audio-ads:v2"
+_STATE_KEY = "sedabox:stream-ad:state:{}:v1"
+_UNWRAPS_KEY = "sedabox:stream-ad:unwraps:{}:v1"
+_WINDOW_SECONDS = 24 * 60 * 60
+_STATE_TTL = _WINDOW_SECONDS + 60 * 60
+
+# KEYS: state hash, unwrap window.
+# ARGV: record (0/1), access id, now, window start, frequency, ad id, submit id, ttl.
+_DECIDE_LUA = """
+if redis.call('HEXISTS', KEYS[1], 'ready') == 0 then
+    return {'miss'}
+end
+local pending = redis.call('HMGET', KEYS[1], 'pending', 'pending_ad', 'pending_submit')
+if pending[1] and pending[1] ~= '' then
+    return {'pending', '0', '0', pending[1], pending[2] or '', pending[3] or ''}
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[4])
+local since
+if ARGV[1] == '1' then
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[2])
+    since = redis.call('HINCRBY', KEYS[1], 'since', 1)
+else
+    since = tonumber(redis.call('HGET', KEYS[1], 'since') or '0')
+end
+local total = redis.call('ZCARD', KEYS[2])
+local decision = 'stream'
+local frequency = tonumber(ARGV[5])
+if frequency > 0 and since >= frequency then
+    if ARGV[6] ~= '' then
+        redis.call('HSET', KEYS[1], 'pending', ARGV[2], 'pending_ad', ARGV[6], 'pending_submit', ARGV[7])
+        decision = 'ad'
+    else
+        decision = 'no_ad'
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[8])
+redis.call('EXPIRE', KEYS[2], ARGV[8])
+return {decision, tostring(total), tostring(since), '', '', ''}
+"""
+
+# KEYS: state hash, unwrap window.
+# ARGV: since, pending, pending ad, pending submit, ttl, then score/member pairs.
+_SEED_LUA = """
+if redis.call('HEXISTS', KEYS[1], 'ready') == 1 then
+    return 0
+end
+redis.call('DEL', KEYS[2])
+redis.call('HSET', KEYS[1], 'ready', '1', 'since', ARGV[1],
+    'pending', ARGV[2], 'pending_ad', ARGV[3], 'pending_submit', ARGV[4])
+for i = 6, #ARGV, 2 do
+    redis.call('ZADD', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return 1
+"""
+
+# KEYS: state hash. ARGV: access id, reset since (0/1).
+_CLEAR_PENDING_LUA = """
+if redis.call('HEXISTS', KEYS[1], 'ready') == 0 then
+    return 0
+end
+if redis.call('HGET', KEYS[1], 'pending') == ARGV[1] then
+    redis.call('HSET', KEYS[1], 'pending', '', 'pending_ad', '', 'pending_submit', '')
+end
+if ARGV[2] == '1' then
+    redis.call('HSET', KEYS[1], 'since', '0')
+end
+return 1
+"""
+
+
+def _active_audio_ads() -> list[AudioAd]:
+    ads = cache_get(ACTIVE_AUDIO_ADS_CACHE_KEY)
+    if ads is None:
+        ads = list(AudioAd.objects.filter(is_active=True))
+        if not ads:
+            # Fallback: if no active ads, but some ads exist at all, use them.
+            ads = list(AudioAd.objects.all())
+        cache_set(ACTIVE_AUDIO_ADS_CACHE_KEY, ads, 300)
+    return ads
+
+
+def choose_audio_ad() -> AudioAd | None:
+    ads = _active_audio_ads()
+    return random.choice(ads) if ads else None
+
+
+def audio_ad_by_id(ad_id) -> AudioAd | None:
+    if not ad_id:
+        return None
+    for ad in _active_audio_ads():
+        if ad.pk == int(ad_id):
+            return ad
+    ad = AudioAd.objects.filter(pk=ad_id).first()
+    if ad is None:
+        cache_delete(ACTIVE_AUDIO_ADS_CACHE_KEY)
+    return ad
+
+
+class StreamAdDecision:
+    """Outcome of one unwrap: ``stream``, ``ad``, ``no_ad`` or ``pending``."""
+
+    __slots__ = ('state', 'total_24h', 'since_last_ad', 'pending_access_id', 'pending_ad_id', 'pending_submit_id')
+
+    def __init__(self, state, total_24h=0, since_last_ad=0, pending_access_id=None,
+                 pending_ad_id=None, pending_submit_id=''):
+        self.state = state
+        self.total_24h = int(total_24h or 0)
+        self.since_last_ad = int(since_last_ad or 0)
+        self.pending_access_id = int(pending_access_id) if pending_access_id else None
+        self.pending_ad_id = int(pending_ad_id) if pending_ad_id else None
+        self.pending_submit_id = pending_submit_id or ''
+
+
+def _database_state(user_id: int) -> dict:
+    """Counters as implied by committed ``StreamAccess`` rows."""
+    window_start = timezone.now() - timedelta(seconds=_WINDOW_SECONDS)
+    pending = StreamAccess.objects.filter(
+        user_id=user_id, ad_required=True, ad_seen=False,
+    ).values('id', 'ad_object_id', 'ad_submit_id').first()
+    last_ad_at = StreamAccess.objects.filter(
+        user_id=user_id, ad_required=True, ad_seen=True, unwrapped_at__isnull=False,
+    ).order_by('-unwrapped_at').values_list('unwrapped_at', flat=True).first()
+    since_filter = Q(unwrapped_at__isnull=False)
+    if last_ad_at is not None:
+        since_filter &= Q(unwrapped_at__gt=last_ad_at)
+    since = StreamAccess.objects.filter(user_id=user_id, unwrapped=True).aggregate(
+        total=Count('id', filter=since_filter),
+    )['total']
+    window = list(StreamAccess.objects.filter(
+        user_id=user_id, unwrapped=True, unwrapped_at__gte=window_start,
+    ).values_list('id', 'unwrapped_at'))
+    return {'pending': pending, 'since': int(since or 0), 'window': window}
+
+
+def _seed(client, user_id: int, state: dict) -> None:
+    pending = state['pending'] or {}
+    args = [
+        state['since'],
+        pending.get('id') or '',
+        pending.get('ad_object_id') or '',
+        pending.get('ad_submit_id') or '',
+        _STATE_TTL,
+    ]
+    for access_id, unwrapped_at in state['window']:
+        args.extend([unwrapped_at.timestamp(), access_id])
+    client.eval(_SEED_LUA, 2, _STATE_KEY.format(user_id), _UNWRAPS_KEY.format(user_id), *args)
+
+
+def _decide_from_database(user_id, access_id, frequency, record, ad_id, submit_id) -> StreamAdDecision:
+    state = _database_state(user_id)
+    pending = state['pending']
+    if pending:
+        return StreamAdDecision(
+            'pending', pending_access_id=pending['id'],
+            pending_ad_id=pending['ad_object_id'], pending_submit_id=pending['ad_submit_id'],
+        )
+    since = state['since'] + (1 if record else 0)
+    total = len(state['window']) + (1 if record else 0)
+    decision = 'stream'
+    if frequency > 0 and since >= frequency:
+        decision = 'ad' if ad_id else 'no_ad'
+    return StreamAdDecision(decision, total, since)
+
+
+def decide_stream_ad(user_id: int, access_id: int, *, frequency: int, record: bool = True,
+                     ad_id: int | None = None, submit_id: str = '') -> StreamAdDecision:
+    """Record an unwrap (unless ``record`` is false) and decide whether an ad is due.
+
+    ``ad_id``/``submit_id`` are the candidate ad; they become the user's pending
+    ad only when the decision is ``ad``. ``frequency`` 0 disables ads but still
+    counts, which is how premium listeners are handled.
+    """
+    user_id = int(user_id)
+    frequency = max(0, int(frequency or 0))
+    client = get_redis_client()
+    if client is None:
+        return _decide_from_database(user_id, access_id, frequency, record, ad_id, submit_id)
+    now = time.time()
+    args = [
+        '1' if record else '0', int(access_id), now, now - _WINDOW_SECONDS,
+        frequency, ad_id or '', submit_id or '', _STATE_TTL,
+    ]
+    try:
+        for attempt in range(2):
+            result = client.eval(_DECIDE_LUA, 2, _STATE_KEY.format(user_id), _UNWRAPS_KEY.format(user_id), *args)
+            if result[0] != 'miss':
+                return StreamAdDecision(*result)
+            if attempt == 0:
+                _seed(client, user_id, _database_state(user_id))
+    except Exception as exc:
+        logger.warning("Stream ad state unavailable; deciding from database: %s", exc)
+    return _decide_from_database(user_id, access_id, frequency, record, ad_id, submit_id)
+
+
+def _clear_pending(user_id: int, access_id: int, reset_since: bool) -> None:
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.eval(_CLEAR_PENDING_LUA, 1, _STATE_KEY.format(int(user_id)), int(access_id), '1' if reset_since else '0')
+    except Exception:
+        # The state expires; the next miss is rebuilt from StreamAccess.
+        pass
+
+
+def mark_stream_ad_seen(user_id: int, access_id: int) -> None:
+    """The ad on ``access_id`` was watched: unblock and restart the count."""
+    _clear_pending(user_id, access_id, reset_since=True)
+
+
+def release_stream_ad(user_id: int, access_id: int) -> None:
+    """Drop a pending ad whose ``StreamAccess`` write did not happen."""
+    _clear_pending(user_id, access_id, reset_since=False)
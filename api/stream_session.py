@@ -0,0 +1,252 @@
+"""Stream session engine shared by the unwrap endpoints.
+
+``UnwrapStreamView`` and ``StreamShortRedirectView`` resolve their tokens
+differently but then run the same session: one Redis decision for the ad
+frequency (``stream_ad_state``), one ``StreamAccess`` UPDATE carrying both the
+unwrap and any ad, and in-process URL signing. Listening history and the
+live-listener registry are bookkeeping the client does not wait for; they run
+on a small after-response queue once the request's transaction commits.
+
+Each session times its stages and returns them in a ``Server-Timing`` header
+so the playback path can be measured from the client or the proxy logs.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import secrets
+import threading
+import time
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .artist_live import mark_artists_dirty
+from .live_presence import record_playback
+from .models import PlayConfiguration, User, UserHistory
+from .performance import cache_get, cache_set
+from .serializers import AudioAdSerializer
+from .stream_ad_state import audio_ad_by_id, choose_audio_ad, decide_stream_ad, release_stream_ad
+from .user_history import touch_user_history
+from .utils import generate_signed_r2_url
+
+logger = logging.getLogger(__name__)
+
+STREAM_PLAY_CONFIG_CACHE_KEY = 'stream-play-config:v1'
+SIGNED_URL_TTL = 3600
+
+_AFTER_RESPONSE_QUEUE: queue.Queue = queue.Queue(maxsize=2048)
+_WORKER_LOCK = threading.Lock()
+_worker: threading.Thread | None = None
+
+
+def _run_after_response_jobs() -> None:
+    while True:
+        job = _AFTER_RESPONSE_QUEUE.get()
+        try:
+            job()
+        except Exception:
+            logger.exception("Stream after-response job failed")
+        finally:
+            close_old_connections()
+
+
+def _submit(job) -> None:
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        with _WORKER_LOCK:
+            if _worker is None or not _worker.is_alive():
+                _worker = threading.Thread(
+                    target=_run_after_response_jobs, name='stream-after-response', daemon=True,
+                )
+                _worker.start()
+    try:
+        _AFTER_RESPONSE_QUEUE.put_nowait(job)
+    except queue.Full:
+        # A saturated queue degrades to the old inline behavior.
+        job()
+
+
+def defer_after_response(job) -> None:
+    """Run ``job`` off the request thread after the current transaction commits."""
+    transaction.on_commit(lambda: _submit(job))
+
+
+def stream_ad_frequency() -> int:
+    cached = cache_get(STREAM_PLAY_CONFIG_CACHE_KEY)
+    if cached is not None:
+        return int(cached)
+    config = PlayConfiguration.objects.order_by('-updated_at', '-pk').values('ad_frequency').first()
+    value = int(config['ad_frequency']) if config else 15
+    cache_set(STREAM_PLAY_CONFIG_CACHE_KEY, value, 300)
+    return value
+
+
+def _record_stream_bookkeeping(user, song) -> None:
+    touch_user_history(user, UserHistory.TYPE_SONG, song=song)
+    mark_artists_dirty(record_playback(user.pk, song.pk, song.artist_id, song.duration_seconds))
+
+
+def signed_stream_url(song, quality: str) -> tuple[str, int | None]:
+    """Pick the file for ``quality`` and sign it when it lives on the R2 CDN.
+
+    High quality always serves ``audio_file``; otherwise the 128kbps
+    ``converted_audio_url`` is used when one exists.
+    """
+    if quality == 'high' or not song.converted_audio_url:
+        audio_url = song.audio_file
+    else:
+        audio_url = song.converted_audio_url
+
+    cdn_base = getattr(settings, 'R2_CDN_BASE', '').rstrip('/')
+    if audio_url and audio_url.startswith(cdn_base):
+        object_key = unquote(audio_url.replace(cdn_base + '/', ''))
+        return generate_signed_r2_url(object_key, expiration=SIGNED_URL_TTL), SIGNED_URL_TTL
+    return audio_url, None
+
+
+class StreamSession:
+    """One playback request: ad decision, unwrap write and stream payload."""
+
+    __slots__ = ('request', 'user', 'stages', '_last')
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+        self.stages: list[tuple[str, float]] = []
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stages.append((stage, (now - self._last) * 1000))
+        self._last = now
+
+    def finish(self, response):
+        """Attach the stage timings to ``response`` and return it."""
+        if self.stages and response is not None:
+            total = sum(duration for _, duration in self.stages)
+            response['Server-Timing'] = ', '.join(
+                [f'{stage};dur={duration:.1f}' for stage, duration in self.stages] + [f'total;dur={total:.1f}']
+            )
+        return response
+
+    def decide(self, stream_access, *, record: bool = True):
+        """Record an unwrap and decide on an ad in one Redis call.
+
+        The candidate ad is picked from the cached pool up front; it only
+        becomes the user's pending ad when the decision is ``ad``. Returns
+        ``(decision, ad or None, submit_id, ad_status)``.
+        """
+        ad_freq = stream_ad_frequency()
+        is_premium = self.user.plan == User.PLAN_PREMIUM
+        ad = None if is_premium or ad_freq <= 0 else choose_audio_ad()
+        submit_id = secrets.token_urlsafe(32) if ad is not None else ''
+        decision = decide_stream_ad(
+            self.user.pk, stream_access.pk,
+            frequency=0 if is_premium else ad_freq,
+            record=record,
+            ad_id=ad.pk if ad is not None else None,
+            submit_id=submit_id,
+        )
+        self.mark('ad')
+        ad_status = {
+            'since_last_ad': decision.since_last_ad,
+            'frequency': ad_freq,
+            'is_premium': is_premium,
+            'total_24h': decision.total_24h,
+        }
+        if decision.state == 'no_ad':
+            ad_status['error'] = 'No ads available in database'
+        return decision, (ad if decision.state == 'ad' else None), submit_id, ad_status
+
+    def pending_ad_response(self, decision=None):
+        """The blocking response for an unwatched ad, or ``None``."""
+        if decision is None:
+            decision = decide_stream_ad(self.user.pk, 0, frequency=0, record=False)
+            self.mark('pending')
+        if decision.state != 'pending':
+            return None
+        return Response({
+            'type': 'ad',
+            'ad': AudioAdSerializer(audio_ad_by_id(decision.pending_ad_id), context={'request': self.request}).data,
+            'submit_id': decision.pending_submit_id,
+            'message': 'You must finish watching the previous advertisement',
+            'pending': True,
+            'ad_status': 'blocking_pending'
+        })
+
+    def _save(self, stream_access, fields, ad, submit_id) -> None:
+        if ad is not None:
+            stream_access.ad_required = True
+            stream_access.ad_seen = False
+            stream_access.ad_submit_id = submit_id
+            stream_access.ad_object = ad
+            fields = [*fields, 'ad_required', 'ad_seen', 'ad_submit_id', 'ad_object']
+        if not fields:
+            return
+        try:
+            stream_access.save(update_fields=fields)
+        except Exception:
+            if ad is not None:
+                release_stream_ad(self.user.pk, stream_access.pk)
+            raise
+        finally:
+            self.mark('save')
+
+    def ad_response(self, ad, submit_id, decision, ad_status, *, new_stream_url=None, status=200):
+        data = {
+            'type': 'ad',
+            'ad': AudioAdSerializer(ad, context={'request': self.request}).data,
+            'submit_id': submit_id,
+            'message': 'Please listen to this brief advertisement',
+            'unwrap_count': decision.total_24h,
+            'since_last_ad': decision.since_last_ad,
+        }
+        if new_stream_url is not None:
+            data['new_stream_url'] = new_stream_url
+        data['ad_status'] = ad_status
+        return Response(data, status=status)
+
+    def unwrap(self, stream_access):
+        """Mark a fresh ``StreamAccess`` unwrapped and return the ad or stream payload."""
+        decision, ad, submit_id, ad_status = self.decide(stream_access)
+        pending = self.pending_ad_response(decision)
+        if pending is not None:
+            return self.finish(pending)
+
+        stream_access.unwrapped = True
+        stream_access.unwrapped_at = timezone.now()
+        self._save(stream_access, ['unwrapped', 'unwrapped_at'], ad, submit_id)
+        if ad is not None:
+            return self.finish(self.ad_response(ad, submit_id, decision, ad_status))
+        return self.finish(self.stream_response(stream_access, decision.total_24h, ad_status))
+
+    def claim_ad(self, stream_access):
+        """Read the counters for a not-yet-unwrapped link and attach an ad if one is due."""
+        decision, ad, submit_id, ad_status = self.decide(stream_access, record=False)
+        if ad is not None:
+            self._save(stream_access, [], ad, submit_id)
+        return decision, ad, submit_id, ad_status
+
+    def stream_response(self, stream_access, unwrap_count, ad_status=None):
+        """Signed stream payload; history and live presence are recorded after the response."""
+        song = stream_access.song
+        url, expires = signed_stream_url(song, self.user.stream_quality)
+        self.mark('sign')
+        defer_after_response(lambda user=self.user, song=song: _record_stream_bookkeeping(user, song))
+        data = {
+            'type': 'stream',
+            'url': url,
+            'song_id': song.id,
+            'song_title': song.display_title,
+            'expires_in': expires,
+            'unwrap_count': unwrap_count,
+            'unique_otplay_id': stream_access.unique_otplay_id
+        }
+        if ad_status is not None:
+            data['ad_status'] = ad_status
+        return Response(data)
@@ -0,0 +1,210 @@
+"""Persisted per-user taste profile with time decay.
+
+``UserTasteProfile`` keeps weighted genre, mood, tag and artist maps for one
+listener. The interaction signals that refresh personal recommendations also
+apply their delta here after commit (like, play, playlist add/remove, artist
+follow), so recommendation generation reads one compact row instead of
+aggregating the user's whole history. Stored weights are decayed to
+``decayed_at`` with a ``TASTE_PROFILE_HALF_LIFE_DAYS`` half-life; a missing
+profile is rebuilt once from history.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Follow, PlayCount, Song, SongLike, UserPlaylist, UserTasteProfile
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ('genres', 'moods', 'tags', 'artists')
+LIKE_WEIGHT = 3.0
+PLAYLIST_WEIGHT = 2.0
+PLAY_WEIGHT = 1.0
+FOLLOW_WEIGHT = 4.0
+_MAX_ENTRIES = 64
+_MIN_WEIGHT = 0.01
+
+
+def _half_life_days() -> float:
+    return max(1.0, float(getattr(settings, 'TASTE_PROFILE_HALF_LIFE_DAYS', 30)))
+
+
+def _decay(since, now) -> float:
+    if since is None:
+        return 1.0
+    days = max(0.0, (now - since).total_seconds() / 86400)
+    return 0.5 ** (days / _half_life_days())
+
+
+def decayed_weight(weight: float, since) -> float:
+    """``weight`` of an interaction made at ``since``, decayed to now.
+
+    Removals subtract this, the amount the interaction still contributes,
+    rather than the full weight, which would also cancel other interactions
+    sharing its genres, moods, tags or artist.
+    """
+    return weight * _decay(since, timezone.now())
+
+
+def _song_features(song_ids: Iterable[int]) -> dict[int, dict[str, list[int]]]:
+    song_ids = sorted({int(pk) for pk in song_ids if pk})
+    if not song_ids:
+        return {}
+    features = {
+        pk: {'genres': [], 'moods': [], 'tags': [], 'artists': [artist_id] if artist_id else []}
+        for pk, artist_id in Song.objects.filter(pk__in=song_ids).values_list('pk', 'artist_id')
+    }
+    for dimension, through, column in (
+        ('genres', Song.genres.through, 'genre_id'),
+        ('moods', Song.moods.through, 'mood_id'),
+        ('tags', Song.tags.through, 'tag_id'),
+    ):
+        for song_id, value in through.objects.filter(song_id__in=song_ids).values_list('song_id', column):
+            if song_id in features:
+                features[song_id][dimension].append(value)
+    return features
+
+
+def _accumulate(maps: dict[str, dict[str, float]], song_weights: dict[int, float],
+                artist_weights: dict[int, float]) -> None:
+    for song_id, features in _song_features(song_weights).items():
+        weight = song_weights[song_id]
+        for dimension in DIMENSIONS:
+            for value in features[dimension]:
+                key = str(value)
+                maps[dimension][key] = maps[dimension].get(key, 0.0) + weight
+    for artist_id, weight in artist_weights.items():
+        key = str(artist_id)
+        maps['artists'][key] = maps['artists'].get(key, 0.0) + weight
+
+
+def _compact(mapping: dict[str, float]) -> dict[str, float]:
+    kept = sorted(
+        ((key, round(value, 4)) for key, value in mapping.items() if value >= _MIN_WEIGHT),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return dict(kept[:_MAX_ENTRIES])
+
+
+def rebuild_taste_profile(user_id: int) -> UserTasteProfile:
+    """Recompute one profile from the full interaction history."""
+    now = timezone.now()
+    song_weights: dict[int, float] = {}
+    for song_id, created_at in SongLike.objects.filter(user_id=user_id).values_list('song_id', 'created_at'):
+        song_weights[song_id] = song_weights.get(song_id, 0.0) + LIKE_WEIGHT * _decay(created_at, now)
+    plays = (
+        Song.play_counts.through.objects.filter(playcount__user_id=user_id)
+        .values('song_id').annotate(total=Count('id'), last=Max('playcount__created_at'))
+        .values_list('song_id', 'total', 'last')
+    )
+    for song_id, total, last in plays:
+        song_weights[song_id] = song_weights.get(song_id, 0.0) + PLAY_WEIGHT * total * _decay(last, now)
+    for song_id, updated_at in UserPlaylist.songs.through.objects.filter(userplaylist__user_id=user_id).values_list(
+        'song_id', 'userplaylist__updated_at',
+    ):
+        song_weights[song_id] = song_weights.get(song_id, 0.0) + PLAYLIST_WEIGHT * _decay(updated_at, now)
+    artist_weights: dict[int, float] = {}
+    for artist_id, created_at in Follow.objects.filter(
+        follower_user_id=user_id, followed_artist__isnull=False,
+    ).values_list('followed_artist_id', 'created_at'):
+        artist_weights[artist_id] = artist_weights.get(artist_id, 0.0) + FOLLOW_WEIGHT * _decay(created_at, now)
+
+    maps: dict[str, dict[str, float]] = {dimension: {} for dimension in DIMENSIONS}
+    _accumulate(maps, song_weights, artist_weights)
+    profile, _ = UserTasteProfile.objects.update_or_create(
+        user_id=user_id,
+        defaults={**{dimension: _compact(maps[dimension]) for dimension in DIMENSIONS}, 'decayed_at': now},
+    )
+    return profile
+
+
+def apply_taste_events(user_id: int, song_weights: dict[int, float] | None = None,
+                       artist_weights: dict[int, float] | None = None) -> None:
+    """Decay the stored profile to now and add signed interaction deltas."""
+    song_weights = {int(pk): weight for pk, weight in (song_weights or {}).items() if pk and weight}
+    artist_weights = {int(pk): weight for pk, weight in (artist_weights or {}).items() if pk and weight}
+    if not song_weights and not artist_weights:
+        return
+    with transaction.atomic():
+        profile = UserTasteProfile.objects.select_for_update().filter(user_id=user_id).first()
+        if profile is None:
+            # The committed event is already part of the history being read.
+            try:
+                with transaction.atomic():
+                    rebuild_taste_profile(user_id)
+            except IntegrityError:
+                pass
+            return
+        now = timezone.now()
+        factor = _decay(profile.decayed_at, now)
+        maps = {
+            dimension: {key: value * factor for key, value in (getattr(profile, dimension) or {}).items()}
+            for dimension in DIMENSIONS
+        }
+        _accumulate(maps, song_weights, artist_weights)
+        for dimension in DIMENSIONS:
+            setattr(profile, dimension, _compact(maps[dimension]))
+        profile.decayed_at = now
+        profile.save(update_fields=[*DIMENSIONS, 'decayed_at', 'updated_at'])
+
+
+def record_taste_events(user_id, song_weights: dict[int, float] | None = None,
+                        artist_weights: dict[int, float] | None = None) -> None:
+    """Apply interaction deltas after the current transaction commits."""
+    if not user_id or not (song_weights or artist_weights):
+        return
+    user_id = int(user_id)
+    song_weights = dict(song_weights or {})
+    artist_weights = dict(artist_weights or {})
+
+    def apply():
+        try:
+            apply_taste_events(user_id, song_weights, artist_weights)
+        except Exception:
+            # The profile catches up on the next event or rebuild.
+            logger.exception('Taste profile update failed user=%s', user_id)
+
+    transaction.on_commit(apply)
+
+
+def record_play_taste_events(play_ids: Iterable[int], song_ids: Iterable[int]) -> None:
+    """Taste deltas for plays linked to songs through ``Song.play_counts``."""
+    song_ids = [int(pk) for pk in song_ids if pk]
+    if not song_ids:
+        return
+    for user_id in set(PlayCount.objects.filter(pk__in=list(play_ids)).values_list('user_id', flat=True)):
+        record_taste_events(user_id, {song_id: PLAY_WEIGHT for song_id in song_ids})
+
+
+def get_taste_profiles_bulk(user_ids: Iterable[int]) -> dict[int, UserTasteProfile]:
+    """Stored profiles for many users; missing ones are rebuilt from history."""
+    user_ids = sorted({int(pk) for pk in user_ids if pk})
+    profiles = {profile.user_id: profile for profile in UserTasteProfile.objects.filter(user_id__in=user_ids)}
+    for user_id in user_ids:
+        if user_id in profiles:
+            continue
+        try:
+            with transaction.atomic():
+                profiles[user_id] = rebuild_taste_profile(user_id)
+        except IntegrityError:
+            profiles[user_id] = UserTasteProfile.objects.get(user_id=user_id)
+    return profiles
+
+
+def get_taste_profile(user_id: int) -> UserTasteProfile:
+    return get_taste_profiles_bulk([user_id])[int(user_id)]
+
+
+def top_taste_ids(profile: UserTasteProfile, dimension: str, limit: int) -> list[int]:
+    """Strongest ids of one dimension; decay is uniform so stored order holds."""
+    mapping = getattr(profile, dimension) or {}
+    ranked = sorted(mapping.items(), key=lambda item: (-item[1], int(item[0])))
+    return [int(key) for key, _ in ranked[:limit]]
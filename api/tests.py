@@ -0,0 +1,81 @@
+import json
+import zlib
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from . import search_index
+from .models import Artist, Song, StreamAccess, User
+from .play_ingestion import flush_play_batch
+
+
+class FlushPlayBatchTests(TestCase):
+    def test_flush_marks_played_artists_dirty(self):
+        user = User.objects.create(phone_number='09120000001')
+        artists = [Artist.objects.create(name=f'Artist {index}') for index in range(2)]
+        songs = [Song.objects.create(title=f'Song {index}', artist=artist) for index, artist in enumerate(artists)]
+        entries = []
+        for song in songs:
+            access = StreamAccess.objects.create(user=user, song=song)
+            entries.append({
+                'access_id': access.pk,
+                'user_id': user.pk,
+                'song_id': song.pk,
+                'city': '',
+                'country': '',
+                'ip': '127.0.0.1',
+                'pay': Decimal('0.5'),
+                'plan': user.plan,
+            })
+
+        with mock.patch('api.play_ingestion.mark_artists_dirty') as mark_dirty:
+            with self.captureOnCommitCallbacks(execute=True):
+                written = flush_play_batch(entries)
+
+        self.assertEqual(written, 2)
+        mark_dirty.assert_called_once_with({artist.pk for artist in artists})
+
+
+class SearchIndexPatchTests(TestCase):
+    def _build(self, kind):
+        builder = search_index._SegmentBuilder(kind)
+        for pk, fields, tags in search_index.iter_search_entries(kind):
+            builder.add(pk, fields, tags)
+        payload = builder.payload(1)
+        payload['watermark'] = payload['built_at']
+        return payload
+
+    def _by_id(self, payload):
+        ids = payload['ids']
+        postings = {
+            term: sorted((ids[posting[index]], posting[index + 1]) for index in range(0, len(posting), 2))
+            for term, posting in payload['postings'].items()
+        }
+        exact = {term: sorted(ids[doc] for doc in docs) for term, docs in payload['exact'].items()}
+        return ids, postings, exact, payload['tags'], payload['fuzzy']
+
+    def test_patch_matches_full_build(self):
+        artists = [Artist.objects.create(name=f'Artist {index}') for index in range(2)]
+        songs = [
+            Song.objects.create(
+                title=f'Track {index}', artist=artists[index % 2], status=Song.STATUS_PUBLISHED, plays=index,
+            )
+            for index in range(6)
+        ]
+        base = self._build('song')
+        stored = (1, base['built_at'], zlib.compress(json.dumps(base).encode()))
+
+        songs[1].status = Song.STATUS_DRAFT
+        songs[1].save()
+        songs[2].title = 'Renamed'
+        songs[2].save()
+        Song.objects.create(title='Brand new', artist=artists[0], status=Song.STATUS_PUBLISHED, plays=10)
+        artists[1].name = 'Renamed artist'
+        artists[1].save()
+        dirty = {songs[2].pk, *Song.objects.filter(artist=artists[1]).values_list('pk', flat=True)}
+
+        patched = search_index._patched_payload('song', 2, stored, dirty)
+
+        self.assertIsNotNone(patched)
+        self.assertEqual(self._by_id(patched), self._by_id(self._build('song')))
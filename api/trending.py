@@ -8,11 +8,12 @@ from __future__ import annotations
 
 from datetime import timedelta
 
-from django.db.models import Count, Max, Q
+from django.db.models import Q
 from django.utils import timezone
 
 from .models import Song
 from .performance import CATALOG_VERSION_KEY, cache_get, cache_set, cache_version, stable_cache_key
+from .play_rollups import window_play_totals
 from .song_play_metrics import get_tracked_song_play_counts
 
 TRENDING_MIN_SONGS = 6
@@ -26,18 +27,17 @@ def _cache_key(require_preview: bool) -> str:
         'home-trending-songs',
         'preview' if require_preview else 'full',
         cache_version(CATALOG_VERSION_KEY),
-        'v2',
+        'v3',
     )
 
 
 def trending_song_ids(*, require_preview: bool = False, force: bool = False) -> dict:
-    """Return the unchanged trending ranking with a cheaper hot-window query.
+    """Return the unchanged trending ranking from bounded play rollups.
 
-    The previous implementation aggregated every configured window and all-time
-    counts across the whole play relation in one request-time query. This keeps
-    the same smallest-useful-window rules, but scans only one window at a time
-    and normally stops at seven days. All-time tracked counts used as the final
-    tie-breaker come from the exact coherent Redis mirror / PostgreSQL fallback.
+    The same smallest-useful-window rules apply, but each window reads at most
+    one hour/day rollup row per song instead of every play in the window. All-
+    time tracked counts used as the final tie-breaker come from the exact
+    coherent Redis mirror / PostgreSQL fallback.
     """
     key = _cache_key(require_preview)
     if not force:
@@ -46,57 +46,40 @@ def trending_song_ids(*, require_preview: bool = False, force: bool = False) ->
             return cached
 
     now = timezone.now()
-    through = Song.play_counts.through
     base = Q(song__status=Song.STATUS_PUBLISHED)
     if require_preview:
         base &= Q(song__preview_audio_url__isnull=False)
         base &= ~Q(song__preview_audio_url='')
 
     selected_window = None
-    candidates = []
+    candidates = {}
     for days in TRENDING_WINDOWS_DAYS:
-        cutoff = now - timedelta(days=days)
-        period_rows = list(
-            through.objects.filter(base, playcount__created_at__gte=cutoff)
-            .values('song_id')
-            .annotate(
-                recorded_plays=Count('playcount_id'),
-                last_play=Max('playcount__created_at'),
-            )
-        )
-        if len(period_rows) >= TRENDING_MIN_SONGS:
+        period_totals = window_play_totals(now - timedelta(days=days), filters=base)
+        if len(period_totals) >= TRENDING_MIN_SONGS:
             selected_window = days
-            candidates = period_rows
+            candidates = period_totals
             break
 
     if selected_window is not None:
-        candidate_ids = [int(row['song_id']) for row in candidates]
-        all_time_tracked = get_tracked_song_play_counts(candidate_ids)
-        candidates.sort(
-            key=lambda row: (
-                int(row.get('recorded_plays') or 0),
-                row.get('last_play') or now - timedelta(days=36500),
-                int(all_time_tracked.get(int(row['song_id']), 0)),
-                int(row['song_id']),
+        all_time_tracked = get_tracked_song_play_counts(candidates.keys())
+        ranked = sorted(
+            candidates.items(),
+            key=lambda item: (
+                item[1]['plays'],
+                item[1]['last_played_at'] or now - timedelta(days=36500),
+                int(all_time_tracked.get(int(item[0]), 0)),
+                int(item[0]),
             ),
             reverse=True,
         )
         result = {
-            'ids': [int(row['song_id']) for row in candidates[:TRENDING_MAX_SONGS]],
+            'ids': [int(song_id) for song_id, _ in ranked[:TRENDING_MAX_SONGS]],
             'window_days': selected_window,
             'is_all_time': False,
         }
     else:
         # Sparse/legacy installations: preserve the old all-time fallback.
-        rows = list(
-            through.objects.filter(base)
-            .values('song_id')
-            .annotate(
-                recorded_plays_all=Count('playcount_id'),
-                last_play_all=Max('playcount__created_at'),
-            )
-        )
-        row_by_song = {int(row['song_id']): row for row in rows}
+        row_by_song = window_play_totals(None, filters=base)
         song_filter = Q(status=Song.STATUS_PUBLISHED)
         if require_preview:
             song_filter &= Q(preview_audio_url__isnull=False)
@@ -109,7 +92,7 @@ def trending_song_ids(*, require_preview: bool = False, force: bool = False) ->
         for song_row in legacy_rows:
             song_id = int(song_row['id'])
             event_row = row_by_song.get(song_id, {})
-            recorded = int(event_row.get('recorded_plays_all') or 0)
+            recorded = int(event_row.get('plays') or 0)
             legacy = int(song_row.get('plays') or 0)
             total = recorded + legacy
             if total <= 0:
@@ -118,7 +101,7 @@ def trending_song_ids(*, require_preview: bool = False, force: bool = False) ->
                 'song_id': song_id,
                 'score': total,
                 'recorded': recorded,
-                'last_play': event_row.get('last_play_all'),
+                'last_play': event_row.get('last_played_at'),
             })
 
         all_time.sort(
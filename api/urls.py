@@ -94,6 +94,7 @@ from .views import (
     PremiumPlanActivateView,
     PlaylistSaveToggleView,
     SearchView,
+    SearchSuggestView,
     EventPlaylistView,
     EventPlaylistDetailView,
     SearchSectionListView,
@@ -116,6 +117,7 @@ from .admin_views import (
     AdminPendingArtistListView,
     AdminPendingArtistDetailView,
     AdminHomeSummaryView,
+    AdminExportView,
     AdminUserSearchView,
     AdminSongListView,
     AdminSongDetailView,
@@ -332,6 +334,7 @@ urlpatterns = [
     path('search/event-playlists/<int:pk>/', EventPlaylistDetailView.as_view(), name='event_playlist_detail'),
     path('search/sections/', SearchSectionListView.as_view(), name='search_section_list'),
     path('search/sections/<int:pk>/', SearchSectionDetailView.as_view(), name='search_section_detail'),
+    path('search/suggest/', SearchSuggestView.as_view(), name='search_suggest'),
     path('search/', SearchView.as_view(), name='search'),
     path('plans/premium/price/', PremiumPlanPriceView.as_view(), name='premium_plan_price'),
     path('plans/premium/activate/', PremiumPlanActivateView.as_view(), name='premium_plan_activate'),
@@ -345,6 +348,7 @@ urlpatterns = [
     path('admin/pend_artists/', AdminPendingArtistListView.as_view(), name='admin_pending_artist_list'),
     path('admin/pend_artists/<int:pk>/', AdminPendingArtistDetailView.as_view(), name='admin_pending_artist_detail'),
     path('admin/home-summary/', AdminHomeSummaryView.as_view(), name='admin_home_summary'),
+    path('admin/export/<str:dataset>/', AdminExportView.as_view(), name='admin_export'),
     path('admin/users/search/', AdminUserSearchView.as_view(), name='admin_user_search'),
     path('admin/songs/', AdminSongListView.as_view(), name='admin_song_list'),
     path('admin/songs/<int:pk>/', AdminSongDetailView.as_view(), name='admin_song_detail'),
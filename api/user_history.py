@@ -0,0 +1,214 @@
+"""Write-behind listening/visit history.
+
+``touch_user_history`` no longer writes ``UserHistory`` in the request. Each
+touch is a ``ZADD`` into a per-user sorted set (member ``type:target_id``,
+score = touch time) plus the user id in a dirty set, so repeated plays of the
+same item coalesce in Redis. ``run_runtime_maintenance`` drains dirty users
+with ``flush_pending_history``: one lookup of the existing rows per batch,
+duplicate rows collapsed, then bulk update/create. History reads flush the
+reader's own pending touches first, so lists never look stale.
+
+Without Redis a touch is written synchronously. Both paths take the same
+per-user advisory lock, so concurrent writers never duplicate a row.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterable
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Album, Artist, Playlist, Song, User, UserHistory
+from .recommendation_runtime import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "sedabox:history:pending:{}:v1"
+_DIRTY_KEY = "sedabox:history:dirty-users:v1"
+# Pending touches outlive several missed flush cycles, never indefinitely.
+_PENDING_TTL = 7 * 24 * 60 * 60
+
+_TARGETS = {
+    UserHistory.TYPE_USER: ('target_user', User),
+    UserHistory.TYPE_SONG: ('song', Song),
+    UserHistory.TYPE_ALBUM: ('album', Album),
+    UserHistory.TYPE_PLAYLIST: ('playlist', Playlist),
+    UserHistory.TYPE_ARTIST: ('artist', Artist),
+}
+
+
+def _lock_history_users(user_ids: Iterable[int]) -> None:
+    """Serialize history writes per user until the current transaction ends.
+
+    ``UserHistory`` has no unique constraint on (user, type, target) in older
+    databases, so concurrent writers for one user (a buffered flush from a
+    history read, the maintenance flush, the synchronous fallback) could each
+    see no row and create one. PostgreSQL advisory locks, taken in user order so
+    batches cannot deadlock, prevent that without requiring a migration.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for user_id in sorted({int(pk) for pk in user_ids}):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [int(user_id) % 2147483647, 0])
+
+
+def _write_user_history(user, content_type, **target):
+    """Atomically touch one history row and collapse legacy duplicates."""
+    lookup = {'user': user, 'content_type': content_type, **target}
+    now = timezone.now()
+
+    with transaction.atomic():
+        _lock_history_users([user.pk])
+
+        rows = UserHistory.objects.select_for_update().filter(**lookup).order_by('-updated_at', '-id')
+        current = rows.first()
+        if current is None:
+            return UserHistory.objects.create(**lookup)
+
+        rows.exclude(pk=current.pk).delete()
+        UserHistory.objects.filter(pk=current.pk).update(updated_at=now)
+        current.updated_at = now
+        return current
+
+
+def touch_user_history(user, content_type, **target) -> None:
+    """Record that ``user`` opened ``target``; written to the database later."""
+    field, _ = _TARGETS[content_type]
+    value = target.get(field)
+    if value is None:
+        return
+    target_id = value.pk if hasattr(value, 'pk') else int(value)
+    client = get_redis_client()
+    if client is not None:
+        key = _PENDING_KEY.format(int(user.pk))
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(key, {f"{content_type}:{target_id}": time.time()})
+            pipe.expire(key, _PENDING_TTL)
+            pipe.sadd(_DIRTY_KEY, int(user.pk))
+            pipe.execute()
+            return
+        except Exception as exc:
+            logger.warning("History buffer unavailable; writing synchronously: %s", exc)
+    _write_user_history(user, content_type, **target)
+
+
+def _take_pending(client, user_ids: list[int]) -> dict[int, list[tuple[str, float]]]:
+    pipe = client.pipeline(transaction=True)
+    for user_id in user_ids:
+        key = _PENDING_KEY.format(user_id)
+        pipe.zrange(key, 0, -1, withscores=True)
+        pipe.delete(key)
+    results = pipe.execute()
+    return {user_id: results[index * 2] or [] for index, user_id in enumerate(user_ids)}
+
+
+def _restore_pending(client, pending: dict[int, list[tuple[str, float]]]) -> None:
+    try:
+        pipe = client.pipeline(transaction=False)
+        for user_id, entries in pending.items():
+            if entries:
+                key = _PENDING_KEY.format(user_id)
+                # GT keeps a newer touch that arrived during the failed flush.
+                pipe.zadd(key, dict(entries), gt=True)
+                pipe.expire(key, _PENDING_TTL)
+                pipe.sadd(_DIRTY_KEY, user_id)
+        pipe.execute()
+    except Exception:
+        logger.exception("Could not restore pending history for users=%s", sorted(pending))
+
+
+def _apply_pending(pending: dict[int, list[tuple[str, float]]]) -> int:
+    """Upsert the latest touch per (user, type, target); returns rows written."""
+    touches: dict[str, dict[tuple[int, int], datetime]] = {content_type: {} for content_type in _TARGETS}
+    for user_id, entries in pending.items():
+        for member, score in entries:
+            content_type, _, target_id = str(member).partition(':')
+            if content_type in touches and target_id.isdigit():
+                touches[content_type][(user_id, int(target_id))] = datetime.fromtimestamp(
+                    float(score), tz=dt_timezone.utc,
+                )
+
+    to_update = []
+    to_create = []
+    created_times = []
+    duplicate_ids = []
+    with transaction.atomic():
+        _lock_history_users(pending)
+        for content_type, entries in touches.items():
+            if not entries:
+                continue
+            field, model = _TARGETS[content_type]
+            column = f'{field}_id'
+            user_ids = {user_id for user_id, _ in entries}
+            target_ids = {target_id for _, target_id in entries}
+            # Targets deleted since the touch are dropped, as CASCADE would.
+            existing_targets = set(model.objects.filter(pk__in=target_ids).values_list('pk', flat=True))
+            current = {}
+            rows = UserHistory.objects.filter(
+                user_id__in=user_ids, content_type=content_type, **{f'{column}__in': target_ids},
+            ).order_by('-updated_at', '-id').only('id', 'user_id', column, 'updated_at')
+            for row in rows:
+                key = (row.user_id, getattr(row, column))
+                if key not in entries:
+                    continue
+                if key in current:
+                    duplicate_ids.append(row.pk)
+                else:
+                    current[key] = row
+            for key, touched_at in entries.items():
+                row = current.get(key)
+                if row is not None:
+                    if touched_at > row.updated_at:
+                        row.updated_at = touched_at
+                        to_update.append(row)
+                elif key[1] in existing_targets:
+                    to_create.append(UserHistory(user_id=key[0], content_type=content_type, **{column: key[1]}))
+                    created_times.append(touched_at)
+
+        if duplicate_ids:
+            UserHistory.objects.filter(pk__in=duplicate_ids).delete()
+        if to_update:
+            UserHistory.objects.bulk_update(to_update, ['updated_at'], batch_size=500)
+        if to_create:
+            created = UserHistory.objects.bulk_create(to_create, batch_size=500)
+            # auto_now/auto_now_add stamp the flush time; restore touch times.
+            if all(row.pk for row in created):
+                for row, touched_at in zip(created, created_times):
+                    row.created_at = row.updated_at = touched_at
+                UserHistory.objects.bulk_update(created, ['created_at', 'updated_at'], batch_size=500)
+    return len(to_update) + len(to_create)
+
+
+def flush_pending_history(user_ids: Iterable[int] | None = None, *, limit: int = 500) -> int:
+    """Write buffered touches to ``UserHistory``.
+
+    With ``user_ids`` only those users are flushed (history reads); otherwise up
+    to ``limit`` dirty users are drained. Returns the number of rows written.
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+    try:
+        if user_ids is None:
+            users = sorted(int(value) for value in client.spop(_DIRTY_KEY, max(1, int(limit))) or ())
+        else:
+            users = sorted({int(pk) for pk in user_ids if pk})
+        if not users:
+            return 0
+        pending = _take_pending(client, users)
+    except Exception as exc:
+        logger.warning("History buffer unavailable: %s", exc)
+        return 0
+    if not any(pending.values()):
+        return 0
+    try:
+        return _apply_pending(pending)
+    except Exception:
+        _restore_pending(client, pending)
+        raise
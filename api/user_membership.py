@@ -0,0 +1,184 @@
+"""Per-user like/follow membership sets for card hydration.
+
+Each signed-in user gets one Redis set per relation (liked songs, albums and
+playlists, followed artists and users) holding the related ids plus a ``0``
+sentinel that marks the set as loaded. ``member_ids`` answers ``_is_liked`` /
+``_is_following`` for any mix of kinds with one pipelined ``SMISMEMBER`` per
+kind; a set that is missing or expired is loaded from the database once and
+stored for ``_SET_TTL``.
+
+Like and follow signals keep loaded sets current after their transaction
+commits. Every write also bumps a per-user version, and a load only stores its
+snapshot when the version it read beforehand is unchanged, so a write that
+lands while a set is being rebuilt cannot be lost. Without Redis, or for users
+with more relations than ``_MAX_MEMBERS``, the ids are checked in the database
+as before.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+
+from django.db import transaction
+
+from .models import AlbumLike, Follow, PlaylistLike, SongLike
+from .recommendation_runtime import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+KIND_LIKED_SONGS = 'liked-songs'
+KIND_LIKED_ALBUMS = 'liked-albums'
+KIND_LIKED_PLAYLISTS = 'liked-playlists'
+KIND_FOLLOWED_ARTISTS = 'followed-artists'
+KIND_FOLLOWED_USERS = 'followed-users'
+
+# kind -> (relation model, owner column, member column)
+_SOURCES = {
+    KIND_LIKED_SONGS: (SongLike, 'user_id', 'song_id'),
+    KIND_LIKED_ALBUMS: (AlbumLike, 'user_id', 'album_id'),
+    KIND_LIKED_PLAYLISTS: (PlaylistLike, 'user_id', 'playlist_id'),
+    KIND_FOLLOWED_ARTISTS: (Follow, 'follower_user_id', 'followed_artist_id'),
+    KIND_FOLLOWED_USERS: (Follow, 'follower_user_id', 'followed_user_id'),
+}
+
+_SET_KEY = "sedabox:membership:{}:{}:v1"
+_VERSION_KEY = "sedabox:membership:{}:version:v1"
+_SENTINEL = '0'
+_SET_TTL = 6 * 60 * 60
+# Outlives every set, so a load can never match a version that expired under it.
+_VERSION_TTL = _SET_TTL * 2
+_MAX_MEMBERS = 50_000
+
+# KEYS: set, version. ARGV: version read before the load ('' = none), ttl, members...
+_STORE_LUA = """
+local current = redis.call('GET', KEYS[2]) or ''
+if current ~= ARGV[1] then
+  return 0
+end
+redis.call('DEL', KEYS[1])
+for i = 3, #ARGV, 4096 do
+  redis.call('SADD', KEYS[1], unpack(ARGV, i, math.min(i + 4095, #ARGV)))
+end
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+return 1
+"""
+
+# KEYS: set, version. ARGV: 1 = add / 0 = remove, member, version ttl.
+_WRITE_LUA = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[3]))
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  if ARGV[1] == '1' then
+    redis.call('SADD', KEYS[1], ARGV[2])
+  else
+    redis.call('SREM', KEYS[1], ARGV[2])
+  end
+end
+return 1
+"""
+
+
+def _filtered_ids(kind: str, user_id: int, ids: list[int]) -> set[int]:
+    model, owner, column = _SOURCES[kind]
+    return set(model.objects.filter(**{owner: user_id, f'{column}__in': ids}).values_list(column, flat=True))
+
+
+def _load_all_ids(kind: str, user_id: int) -> list[int] | None:
+    """Every related id, or ``None`` when the relation is too large to cache."""
+    model, owner, column = _SOURCES[kind]
+    rows = list(
+        model.objects.filter(**{owner: user_id, f'{column}__isnull': False})
+        .values_list(column, flat=True)[:_MAX_MEMBERS + 1]
+    )
+    return None if len(rows) > _MAX_MEMBERS else rows
+
+
+def member_ids(user, requested: dict[str, Iterable[int]]) -> dict[str, set[int]]:
+    """The subset of each kind's ids that ``user`` likes or follows.
+
+    ``requested`` maps a ``KIND_*`` constant to candidate ids; every requested
+    kind is present in the result, empty for anonymous users.
+    """
+    wanted = {kind: sorted({int(pk) for pk in ids if pk}) for kind, ids in requested.items()}
+    result = {kind: set() for kind in wanted}
+    wanted = {kind: ids for kind, ids in wanted.items() if ids}
+    if not wanted or user is None or not getattr(user, 'is_authenticated', False):
+        return result
+    user_id = int(user.pk)
+
+    missing = list(wanted)
+    client = get_redis_client()
+    version = ''
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.get(_VERSION_KEY.format(user_id))
+            for kind, ids in wanted.items():
+                pipe.smismember(_SET_KEY.format(user_id, kind), [_SENTINEL, *ids])
+            replies = pipe.execute()
+            version = replies[0].decode() if isinstance(replies[0], bytes) else str(replies[0] or '')
+            missing = []
+            for (kind, ids), flags in zip(wanted.items(), replies[1:]):
+                if not flags or not int(flags[0]):
+                    missing.append(kind)
+                    continue
+                result[kind] = {pk for pk, flag in zip(ids, flags[1:]) if int(flag)}
+        except Exception as exc:
+            logger.warning("Membership cache unavailable; reading from the database: %s", exc)
+            client = None
+            missing = list(wanted)
+
+    snapshots = {}
+    for kind in missing:
+        loaded = _load_all_ids(kind, user_id) if client is not None else None
+        if loaded is None:
+            result[kind] = _filtered_ids(kind, user_id, wanted[kind])
+            continue
+        members = set(loaded)
+        result[kind] = members.intersection(wanted[kind])
+        snapshots[kind] = members
+    if snapshots:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for kind, members in snapshots.items():
+                pipe.eval(
+                    _STORE_LUA, 2, _SET_KEY.format(user_id, kind), _VERSION_KEY.format(user_id),
+                    version, _SET_TTL, _SENTINEL, *members,
+                )
+            pipe.execute()
+        except Exception as exc:
+            logger.warning("Could not store membership sets for user=%s: %s", user_id, exc)
+    return result
+
+
+def _write_membership(kind: str, user_id: int, object_id: int, present: bool) -> None:
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.eval(
+            _WRITE_LUA, 2, _SET_KEY.format(user_id, kind), _VERSION_KEY.format(user_id),
+            '1' if present else '0', int(object_id), _VERSION_TTL,
+        )
+    except Exception as exc:
+        logger.warning("Could not update membership kind=%s user=%s: %s", kind, user_id, exc)
+
+
+def record_membership(kind: str, user_id, object_id, present: bool) -> None:
+    """Apply one like/follow change to ``user_id``'s set once the write commits."""
+    if not user_id or not object_id:
+        return
+    user_id, object_id = int(user_id), int(object_id)
+    transaction.on_commit(lambda: _write_membership(kind, user_id, object_id, present))
+
+
+def follow_membership_kind(follow) -> tuple[str, int] | None:
+    """``(kind, followed id)`` for a user-owned follow row, else ``None``."""
+    if not follow.follower_user_id:
+        return None
+    if follow.followed_artist_id:
+        return KIND_FOLLOWED_ARTISTS, follow.followed_artist_id
+    if follow.followed_user_id:
+        return KIND_FOLLOWED_USERS, follow.followed_user_id
+    return None
@@ -11,8 +11,8 @@ from .models import (
     User, Artist, Album, ArtistRelease, ArtistReleaseStatusHistory, ArtistReleaseTrack, Playlist,NotificationSetting, Genre, Mood, Tag, SubGenre, Song,
     StreamAccess, PlayCount, UserPlaylist, RecommendedPlaylist, EventPlaylist, SearchSection,
     ArtistMonthlyListener, UserHistory, Follow, SongLike, AlbumLike, PlaylistLike, Rules, PlayConfiguration,
-    ActivePlayback, DepositRequest, Report, Notification, AudioAd, ArtistSocialAccount, SocialPlatform, DownloadHistory,
-    InitialCheck, UserImageProfile, SupportTicket, SongPromotion
+    DepositRequest, Report, Notification, ArtistSocialAccount, SocialPlatform, DownloadHistory,
+    InitialCheck, UserImageProfile, SupportTicket, SongPromotion,
 )
 from .models import BannerAd, BannerAdServeCounter
 from .localization import generated_term_en, get_request_language
@@ -80,7 +80,7 @@ from django.db.models import (
     Sum, Count, F, IntegerField, BigIntegerField, Value, Prefetch, DecimalField, CharField, ExpressionWrapper,
     TextField, OuterRef, Subquery, Max, Case, When,
 )
-from django.db.models.functions import Coalesce, TruncDate, TruncHour, TruncWeek, TruncMonth, Replace, Cast, Concat
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek, TruncMonth, Replace, Cast, Concat
 from django.utils import timezone
 from django.conf import settings
 from django.http import Http404, StreamingHttpResponse
@@ -130,11 +130,29 @@ from .recommendation_runtime import (
 from .release_service import mark_release_for_review, merged_release_metadata, merged_shared
 from .stream_grants import materialize_stream_grant, stream_grant_identity
 from .song_play_metrics import get_tracked_song_play_counts
+from .stream_ad_state import decide_stream_ad, mark_stream_ad_seen, release_stream_ad
+from .stream_session import StreamSession
+from .user_history import flush_pending_history, touch_user_history
+from .live_presence import artist_live_listener_count, wait_for_artist_live_listener_change
+from .item_cf import recommended_song_ids, user_interaction_weights, user_interaction_weights_bulk
+from .taste_profile import get_taste_profile, get_taste_profiles_bulk, top_taste_ids
+from .play_ingestion import enqueue_play, stream_ingestion_enabled
+from .search_documents import search_ids as search_document_ids
+from .search_suggest import suggest as search_suggestions
+from .search_index import search_ids as search_index_ids
+from .play_rollups import ranked_window_ids, record_play_rollups, window_play_totals
 from .trending import TRENDING_MIN_SONGS, trending_song_ids
+from .hydration import HydrationPlan
+from .artist_analytics import (
+    CHART_TYPES as ARTIST_ANALYTICS_CHART_TYPES, PERIODS as ARTIST_ANALYTICS_PERIODS, artist_analytics,
+)
+from .artist_ledger import (
+    FINANCE_QUANTUM, allocate_across_songs, artist_ledger, rebuild_artist_ledger, record_song_earnings,
+)
+from .dashboard_metrics import record_dashboard_plays
 
 logger = logging.getLogger(__name__)
 
-FINANCE_QUANTUM = Decimal('0.00000001')
 PAYOUT_QUANTUM = Decimal('0.01')
 DEFAULT_MINIMUM_PAYOUT_AMOUNT = Decimal('0.01')
 
@@ -175,9 +193,7 @@ def _minimum_payout_amount():
     return max(DEFAULT_MINIMUM_PAYOUT_AMOUNT, _payout_decimal(configured))
 
 
-_STREAM_PLAY_CONFIG_CACHE_KEY = 'stream-play-config:v1'
 _STREAM_PLAY_WORTH_CACHE_KEY = 'stream-play-worth:v1'
-_ACTIVE_AUDIO_AD_IDS_CACHE_KEY = 'stream-active-audio-ads:v1'
 
 
 def _create_stream_access(user, song):
@@ -201,16 +217,6 @@ def _create_stream_access(user, song):
     )
 
 
-def _stream_ad_frequency():
-    cached = cache_get(_STREAM_PLAY_CONFIG_CACHE_KEY)
-    if cached is not None:
-        return int(cached)
-    config = PlayConfiguration.objects.order_by('-updated_at', '-pk').values('ad_frequency').first()
-    value = int(config['ad_frequency']) if config else 15
-    cache_set(_STREAM_PLAY_CONFIG_CACHE_KEY, value, 300)
-    return value
-
-
 def _stream_play_worth(plan):
     cached = cache_get(_STREAM_PLAY_WORTH_CACHE_KEY)
     if not isinstance(cached, dict):
@@ -226,37 +232,6 @@ def _stream_play_worth(plan):
     return _finance_decimal(cached.get(key, '0'))
 
 
-def _stream_access_stats(user):
-    cutoff = timezone.now() - timedelta(hours=24)
-    last_ad_at = StreamAccess.objects.filter(
-        user=user, ad_required=True, ad_seen=True, unwrapped_at__isnull=False
-    ).order_by('-unwrapped_at').values_list('unwrapped_at', flat=True).first()
-    since_filter = Q(unwrapped_at__isnull=False)
-    if last_ad_at is not None:
-        since_filter &= Q(unwrapped_at__gt=last_ad_at)
-    stats = StreamAccess.objects.filter(user=user, unwrapped=True).aggregate(
-        total_24h=Count('id', filter=Q(unwrapped_at__gte=cutoff)),
-        since_last_ad=Count('id', filter=since_filter),
-    )
-    return int(stats['total_24h'] or 0), int(stats['since_last_ad'] or 0)
-
-
-def _choose_audio_ad():
-    ids = cache_get(_ACTIVE_AUDIO_AD_IDS_CACHE_KEY)
-    if ids is None:
-        ids = list(AudioAd.objects.filter(is_active=True).values_list('id', flat=True))
-        if not ids:
-            ids = list(AudioAd.objects.values_list('id', flat=True))
-        cache_set(_ACTIVE_AUDIO_AD_IDS_CACHE_KEY, ids, 300)
-    if not ids:
-        return None
-    ad = AudioAd.objects.filter(pk=random.choice(ids)).first()
-    if ad is None:
-        cache_delete(_ACTIVE_AUDIO_AD_IDS_CACHE_KEY)
-        return _choose_audio_ad()
-    return ad
-
-
 def _finance_day_start(value):
     return timezone.make_aware(
         datetime.combine(value, datetime.min.time()),
@@ -316,108 +291,6 @@ def _complete_daily_count_series(queryset, days, field='created_at'):
     return scoped, series
 
 
-def _finance_song_totals(artist):
-    rows = Song.objects.filter(artist=artist).annotate(
-        finance_income=Coalesce(Sum('play_counts__pay'), _finance_zero()),
-    ).values_list('id', 'finance_income')
-    return {int(song_id): _finance_decimal(income) for song_id, income in rows}
-
-
-def _finance_saved_song_allocations(summary):
-    if not isinstance(summary, dict):
-        return {}
-    raw = summary.get('song_allocations')
-    if isinstance(raw, dict):
-        items = raw.items()
-    elif isinstance(raw, list):
-        items = ((item.get('song_id'), item.get('amount')) for item in raw if isinstance(item, dict))
-    else:
-        return {}
-
-    allocations = {}
-    for song_id, amount in items:
-        try:
-            song_id = int(song_id)
-            value = max(Decimal('0'), _finance_decimal(amount))
-        except (TypeError, ValueError, ArithmeticError):
-            continue
-        if value:
-            allocations[song_id] = allocations.get(song_id, Decimal('0')) + value
-    return allocations
-
-
-def _finance_allocate_across_songs(song_totals, already_allocated, amount):
-    target = max(Decimal('0'), _finance_decimal(amount))
-    available = {
-        song_id: max(Decimal('0'), _finance_decimal(total) - _finance_decimal(already_allocated.get(song_id, 0)))
-        for song_id, total in song_totals.items()
-    }
-    available = {song_id: value for song_id, value in available.items() if value > 0}
-    available_total = sum(available.values(), Decimal('0'))
-    target = min(target, available_total)
-    if target <= 0 or available_total <= 0:
-        return {}
-
-    ordered = sorted(available.items(), key=lambda item: (-item[1], item[0]))
-    allocations = {}
-    allocated_total = Decimal('0')
-    for song_id, balance in ordered:
-        share = (target * balance / available_total).quantize(FINANCE_QUANTUM, rounding=ROUND_DOWN)
-        share = min(balance, share)
-        if share > 0:
-            allocations[song_id] = share
-            allocated_total += share
-
-    remainder = target - allocated_total
-    if remainder > 0:
-        for song_id, balance in ordered:
-            capacity = balance - allocations.get(song_id, Decimal('0'))
-            if capacity <= 0:
-                continue
-            addition = min(capacity, remainder)
-            allocations[song_id] = allocations.get(song_id, Decimal('0')) + addition
-            remainder -= addition
-            if remainder <= 0:
-                break
-
-    return {song_id: _finance_decimal(value) for song_id, value in allocations.items() if value > 0}
-
-
-def _finance_artist_song_allocations(artist, song_totals=None, requests=None):
-    song_totals = song_totals if song_totals is not None else _finance_song_totals(artist)
-    requests = requests if requests is not None else DepositRequest.objects.filter(
-        artist=artist,
-        status__in=[DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED, DepositRequest.STATUS_DONE],
-    ).order_by('submission_date', 'pk')
-
-    reserved = {song_id: Decimal('0') for song_id in song_totals}
-    deposited = {song_id: Decimal('0') for song_id in song_totals}
-    pending = {song_id: Decimal('0') for song_id in song_totals}
-
-    for payout in requests:
-        saved = _finance_saved_song_allocations(payout.summary)
-        valid_saved = {
-            song_id: min(value, max(Decimal('0'), song_totals.get(song_id, Decimal('0')) - reserved.get(song_id, Decimal('0'))))
-            for song_id, value in saved.items()
-            if song_id in song_totals and value > 0
-        }
-        requested_amount = max(Decimal('0'), _finance_decimal(payout.amount))
-        saved_total = sum(valid_saved.values(), Decimal('0'))
-        if not valid_saved or abs(saved_total - requested_amount) > FINANCE_QUANTUM:
-            allocation = _finance_allocate_across_songs(song_totals, reserved, requested_amount)
-        else:
-            allocation = valid_saved
-
-        for song_id, value in allocation.items():
-            reserved[song_id] = reserved.get(song_id, Decimal('0')) + value
-            if payout.status == DepositRequest.STATUS_DONE:
-                deposited[song_id] = deposited.get(song_id, Decimal('0')) + value
-            else:
-                pending[song_id] = pending.get(song_id, Decimal('0')) + value
-
-    return reserved, deposited, pending
-
-
 def _artist_album_payload(album, serialized, songs=None):
     """Add artist-only operational stats without changing public album serializers."""
     tracks = list(songs if songs is not None else album.songs.all())
@@ -688,41 +561,12 @@ def _delete_artist_song_locked(song, actor=None):
     return 'hard', media_urls
 
 
-def _touch_user_history(user, content_type, **target):
-    """Atomically touch one history row and collapse legacy duplicates.
-
-    PostgreSQL advisory locks serialize concurrent requests for the same user/item
-    even though older databases do not have a matching unique constraint. This
-    avoids ``MultipleObjectsReturned`` without requiring a migration.
-    """
-    target_ids = [value.pk if hasattr(value, 'pk') else int(value) for value in target.values() if value is not None]
-    target_id = target_ids[0] if target_ids else 0
-    type_codes = {
-        UserHistory.TYPE_USER: 1,
-        UserHistory.TYPE_SONG: 2,
-        UserHistory.TYPE_ALBUM: 3,
-        UserHistory.TYPE_PLAYLIST: 4,
-        UserHistory.TYPE_ARTIST: 5,
-    }
-    lookup = {'user': user, 'content_type': content_type, **target}
-    now = timezone.now()
-
-    with transaction.atomic():
-        if connection.vendor == 'postgresql':
-            first_key = int(user.pk) % 2147483647
-            second_key = ((type_codes.get(content_type, 0) << 24) ^ int(target_id)) % 2147483647
-            with connection.cursor() as cursor:
-                cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [first_key, second_key])
-
-        rows = UserHistory.objects.select_for_update().filter(**lookup).order_by('-updated_at', '-id')
-        current = rows.first()
-        if current is None:
-            return UserHistory.objects.create(**lookup)
-
-        rows.exclude(pk=current.pk).delete()
-        UserHistory.objects.filter(pk=current.pk).update(updated_at=now)
-        current.updated_at = now
-        return current
+def _flush_own_history(user):
+    # Touches are buffered in Redis; write the reader's own before listing.
+    try:
+        flush_pending_history([user.pk])
+    except Exception:
+        logger.exception('History flush failed user=%s', user.pk)
 
 
 def _history_queryset(user):
@@ -756,20 +600,10 @@ def _prepare_history(entries, user):
     albums = [item.album for item in entries if item.album_id]
     artists = [item.artist for item in entries if item.artist_id]
     playlists = [item.playlist for item in entries if item.playlist_id]
-    hydrate_song_metrics(songs, user, False)
-    hydrate_album_metrics(albums, user)
-    hydrate_artist_metrics(artists, user)
-    hydrate_playlist_metrics(playlists, user)
-    target_ids = [item.target_user_id for item in entries if item.target_user_id]
-    followed = set(Follow.objects.filter(
-        follower_user=user, followed_user_id__in=target_ids
-    ).values_list('followed_user_id', flat=True)) if target_ids else set()
-    follower_counts = dict(Follow.objects.filter(followed_user_id__in=target_ids)
-        .values('followed_user_id').annotate(total=Count('id')).values_list('followed_user_id','total'))
-    for entry in entries:
-        if entry.target_user_id:
-            entry.target_user._is_following = entry.target_user_id in followed
-            entry.target_user._followers_count = follower_counts.get(entry.target_user_id, 0)
+    target_users = [item.target_user for item in entries if item.target_user_id]
+    HydrationPlan(user).extend(songs, include_playlist_count=False).extend(
+        albums + artists + playlists + target_users
+    ).resolve()
     return entries
 
 
@@ -1376,9 +1210,8 @@ class LikedAlbumsView(APIView):
         paginator = PageNumberPagination(); paginator.page_size = 10
         page = list(paginator.paginate_queryset(queryset, request))
         albums = [item.album for item in page]
-        hydrate_album_metrics(albums, request.user)
         all_songs = [song for album in albums for song in album.songs.all()]
-        hydrate_song_metrics(all_songs, request.user, False)
+        HydrationPlan(request.user).extend(albums).extend(all_songs, include_playlist_count=False).resolve()
         return paginator.get_paginated_response(LikedAlbumSerializer(page, many=True, context={'request': request}).data)
 
 
@@ -1455,6 +1288,7 @@ class MyLibraryView(APIView):
         if content_type and content_type not in allowed:
             return Response({'detail': 'Invalid type.'}, status=status.HTTP_400_BAD_REQUEST)
         page, page_size = _page_values(request, 20, 50)
+        _flush_own_history(request.user)
         queryset = _history_queryset(request.user)
         if content_type: queryset = queryset.filter(content_type=content_type)
         offset = (page - 1) * page_size
@@ -1525,6 +1359,7 @@ class UserHistoryView(generics.ListAPIView):
         return queryset
 
     def list(self, request, *args, **kwargs):
+        _flush_own_history(request.user)
         queryset = self.filter_queryset(self.get_queryset())
         content_type = request.query_params.get('type')
         page_number, page_size = _page_values(request, 20, 100)
@@ -2334,7 +2169,7 @@ class PlaylistDetailView(APIView):
         ).filter(pk=pk, songs__status=Song.STATUS_PUBLISHED).distinct().first()
         if not playlist: return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
         if request.user.is_authenticated:
-            _touch_user_history(request.user, UserHistory.TYPE_PLAYLIST, playlist=playlist)
+            touch_user_history(request.user, UserHistory.TYPE_PLAYLIST, playlist=playlist)
         songs = list(playlist.songs.all()); hydrate_song_metrics(songs, request.user, False); hydrate_playlist_metrics([playlist], request.user)
         return Response(PlaylistSerializer(playlist, context={'request': request}).data)
 
@@ -2574,7 +2409,7 @@ class ArtistDetailView(APIView):
         artist = Artist.objects.prefetch_related('social_account_links__platform').filter(pk=pk).first()
         if not artist: return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
         if request.user.is_authenticated:
-            _touch_user_history(request.user, UserHistory.TYPE_ARTIST, artist=artist)
+            touch_user_history(request.user, UserHistory.TYPE_ARTIST, artist=artist)
         page, page_size = _page_values(request, 10, 50); offset = (page - 1) * page_size
         song_base = _song_card_queryset().filter(artist=artist)
         # Rank artist songs from lightweight rows + the exact coherent Redis play
@@ -2608,16 +2443,20 @@ class ArtistDetailView(APIView):
             return Response({'items': SongStreamSerializer(items, many=True, context={'request': request}).data,
                              'total': total, 'page': page, 'has_next': total > offset + page_size})
         if list_type == 'albums':
-            total = albums.count(); items = list(albums[offset:offset+page_size]); hydrate_album_metrics(items, request.user)
-            for album in items: hydrate_song_metrics(list(album.songs.all()), request.user, False)
+            total = albums.count(); items = list(albums[offset:offset+page_size])
+            HydrationPlan(request.user).extend(items).extend(
+                [song for album in items for song in album.songs.all()], include_playlist_count=False
+            ).resolve()
             return Response({'items': AlbumSerializer(items, many=True, context={'request': request}).data,
                              'total': total, 'page': page, 'has_next': total > offset + page_size})
         top_total = latest_total = len(top_ids)
         album_total = albums.count()
         top_items = _ordered_queryset_items(song_base, top_ids[:5])
         album_items, latest_items = list(albums[:5]), list(latest[:5])
-        hydrate_song_metrics(top_items + latest_items, request.user, False); hydrate_album_metrics(album_items, request.user); hydrate_artist_metrics([artist], request.user)
-        for album in album_items: hydrate_song_metrics(list(album.songs.all()), request.user, False)
+        HydrationPlan(request.user).add(artist).extend(album_items).extend(
+            top_items + latest_items + [song for album in album_items for song in album.songs.all()],
+            include_playlist_count=False,
+        ).resolve()
         discovered = list(Playlist.objects.filter(songs__artist=artist).values('id','title','cover_image','created_by').distinct()[:8])
         for item in discovered: item.update(type='playlist', image=item.pop('cover_image'), source=item.pop('created_by'))
         key = stable_cache_key('similar-artists-v7', artist.pk, cache_version(CATALOG_VERSION_KEY), cache_version(AFFINITY_VERSION_KEY))
@@ -2786,8 +2625,8 @@ class AlbumDetailView(APIView):
         ).filter(pk=pk, songs__status=Song.STATUS_PUBLISHED).distinct().first()
         if not album: return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
         if request.user.is_authenticated:
-            _touch_user_history(request.user, UserHistory.TYPE_ALBUM, album=album)
-        hydrate_album_metrics([album], request.user); hydrate_song_metrics(album._detail_songs, request.user, False)
+            touch_user_history(request.user, UserHistory.TYPE_ALBUM, album=album)
+        HydrationPlan(request.user).add(album).extend(album._detail_songs, include_playlist_count=False).resolve()
         return Response(AlbumSerializer(album, context={'request': request}).data)
 
 
@@ -3284,7 +3123,7 @@ class SongDetailView(APIView):
         song = queryset.filter(pk=pk).first()
         if not song: return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
         if request.user.is_authenticated:
-            _touch_user_history(request.user, UserHistory.TYPE_SONG, song=song)
+            touch_user_history(request.user, UserHistory.TYPE_SONG, song=song)
         hydrate_song_metrics([song], request.user)
         data = SongSerializer(song, context={'request': request}).data
         artist_profile = getattr(request.user, 'artist_profile', None) if request.user.is_authenticated else None
@@ -3500,169 +3339,27 @@ class UnwrapStreamView(APIView):
         }
     )
     def get(self, request, token):
-        # 1. Global check for pending ads (enforce sequential viewing for FREE users)
-        # Check if user has any pending ads (required but not seen) from previous requests
-        pending_ad = StreamAccess.objects.filter(user=request.user, ad_required=True, ad_seen=False).select_related('ad_object').first()
-        if pending_ad:
-            return Response({
-                'type': 'ad',
-                'ad': AudioAdSerializer(pending_ad.ad_object, context={'request': request}).data,
-                'submit_id': pending_ad.ad_submit_id,
-                'message': 'You must finish watching the previous advertisement',
-                'pending': True,
-                'ad_status': 'blocking_pending'
-            })
-
-        try:
-            # Get the stream access record
-            stream_access = StreamAccess.objects.select_related('song', 'user').get(
-                unwrap_token=token,
-                user=request.user
-            )
-
-            # Check if already unwrapped
-            if stream_access.unwrapped:
+        session = StreamSession(request)
+        stream_access = StreamAccess.objects.select_related('song').filter(
+            unwrap_token=token,
+            user=request.user
+        ).first()
+        session.mark('lookup')
+        if stream_access is None or stream_access.unwrapped:
+            # Enforce sequential viewing: a pending ad wins over token errors.
+            pending = session.pending_ad_response()
+            if pending is not None:
+                return session.finish(pending)
+            if stream_access is None:
                 return Response(
-                    {'error': 'This stream token has already been used', 'ad_status': 'already_unwrapped'},
-                    status=status.HTTP_400_BAD_REQUEST
+                    {'error': 'Invalid or unauthorized stream token'},
+                    status=status.HTTP_404_NOT_FOUND
                 )
-
-            # Mark as unwrapped (ONLY after passing pending ad check)
-            stream_access.unwrapped = True
-            stream_access.unwrapped_at = timezone.now()
-            stream_access.save(update_fields=['unwrapped', 'unwrapped_at'])
-
-            # Count unwrapped streams for this user (last 24 hours for fairness)
-            cutoff_time = timezone.now() - timedelta(hours=24)
-            unwrapped_count = StreamAccess.objects.filter(
-                user=request.user,
-                unwrapped=True,
-                unwrapped_at__gte=cutoff_time
-            ).count()
-
-            # Use ad frequency from configuration
-            ad_freq = _stream_ad_frequency()
-
-            # ONLY show ads for FREE users
-            is_premium = request.user.plan == User.PLAN_PREMIUM
-
-            # Calculate songs since last ad (ignoring the past)
-            last_ad_seen = StreamAccess.objects.filter(
-                user=request.user,
-                ad_required=True,
-                ad_seen=True
-            ).order_by('-unwrapped_at').first()
-
-            since_query = Q(user=request.user, unwrapped=True)
-            if last_ad_seen and last_ad_seen.unwrapped_at:
-                since_query &= Q(unwrapped_at__gt=last_ad_seen.unwrapped_at)
-
-            unwrapped_since_last_ad = StreamAccess.objects.filter(since_query).count()
-
-            # Ad decision status for response diagnostic
-            ad_status = {
-                'since_last_ad': unwrapped_since_last_ad,
-                'frequency': ad_freq,
-                'is_premium': is_premium,
-                'total_24h': unwrapped_count
-            }
-
-            if not is_premium and ad_freq > 0 and unwrapped_since_last_ad >= ad_freq:
-                # Pick a random active ad
-                active_ads = AudioAd.objects.filter(is_active=True)
-                if not active_ads.exists():
-                    # Fallback: if no active ads, but some ads exist at all, use them
-                    active_ads = AudioAd.objects.all()
-
-                if active_ads.exists():
-                    import random
-                    import secrets
-                    ad = random.choice(active_ads)
-                    submit_id = secrets.token_urlsafe(32)
-
-                    stream_access.ad_required = True
-                    stream_access.ad_seen = False
-                    stream_access.ad_submit_id = submit_id
-                    stream_access.ad_object = ad
-                    stream_access.save(update_fields=['ad_required', 'ad_seen', 'ad_submit_id', 'ad_object'])
-
-                    return Response({
-                        'type': 'ad',
-                        'ad': AudioAdSerializer(ad, context={'request': request}).data,
-                        'submit_id': submit_id,
-                        'message': 'Please listen to this brief advertisement',
-                        'unwrap_count': unwrapped_count,
-                        'since_last_ad': unwrapped_since_last_ad,
-                        'ad_status': ad_status
-                    })
-                else:
-                    ad_status['error'] = 'No ads available in database'
-
-            # No ad required, return stream response
-            res = self._get_stream_response(request, stream_access, unwrapped_count)
-            if hasattr(res, 'data') and isinstance(res.data, dict):
-                res.data['ad_status'] = ad_status
-            return res
-
-        except StreamAccess.DoesNotExist:
             return Response(
-                {'error': 'Invalid or unauthorized stream token'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'This stream token has already been used', 'ad_status': 'already_unwrapped'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-
-    def _get_stream_response(self, request, stream_access, unwrapped_count):
-        """Helper to generate the final stream response with quality selection"""
-        song = stream_access.song
-
-        # Record history
-        _touch_user_history(request.user, UserHistory.TYPE_SONG, song=song)
-
-        # Quality selection: Use user setting if available
-        # if high quality was selected by user we only provide audio_url (128kbps/320kbps usually)
-        # but if medium quality was selected, we provide converted_audio_url (128kbps) if available,
-        # otherwise fallback to audio_url
-        quality = request.user.stream_quality
-        if quality == 'high' or not song.converted_audio_url:
-            audio_url = song.audio_file
-        else:
-            audio_url = song.converted_audio_url
-
-        # Extract path for signing if it's an R2 URL
-        cdn_base = getattr(settings, 'R2_CDN_BASE', '').rstrip('/')
-        from urllib.parse import unquote, urlparse
-        if audio_url.startswith(cdn_base):
-            object_key = unquote(audio_url.replace(cdn_base + '/', ''))
-        else:
-            parsed = urlparse(audio_url)
-            object_key = unquote(parsed.path.lstrip('/'))
-
-        # Generate signed URL
-        if audio_url and audio_url.startswith(cdn_base):
-            signed_url = generate_signed_r2_url(object_key, expiration=3600)
-            expires = 3600
-        else:
-            signed_url = audio_url
-            expires = None
-
-        # Record active playback for live listener count
-        ActivePlayback.objects.filter(user=request.user).delete()
-        duration = song.duration_seconds or 0
-        expiration_time = timezone.now() + timedelta(seconds=duration)
-        ActivePlayback.objects.create(
-            user=request.user,
-            song=song,
-            expiration_time=expiration_time
-        )
-
-        return Response({
-            'type': 'stream',
-            'url': signed_url,
-            'song_id': song.id,
-            'song_title': song.display_title,
-            'expires_in': expires,
-            'unwrap_count': unwrapped_count,
-            'unique_otplay_id': stream_access.unique_otplay_id
-        })
+        return session.unwrap(stream_access)
 
 
 @extend_schema(tags=['Utility , DetailScreens & action Endpoints اندپوینت های ابزار و صفحات جزئیات و عملیات'])
@@ -3696,23 +3393,18 @@ class StreamShortRedirectView(APIView):
         }
     )
     def get(self, request, token):
-        # 1. Global check for pending ads (enforce sequential viewing for FREE users)
-        pending_ad = StreamAccess.objects.filter(user=request.user, ad_required=True, ad_seen=False).select_related('ad_object').first()
-        if pending_ad:
-            return Response({
-                'type': 'ad',
-                'ad': AudioAdSerializer(pending_ad.ad_object, context={'request': request}).data,
-                'submit_id': pending_ad.ad_submit_id,
-                'message': 'You must finish watching the previous advertisement',
-                'pending': True,
-                'ad_status': 'blocking_pending'
-            })
+        session = StreamSession(request)
 
         # Database-backed legacy short tokens are capped at 16 chars by the
         # model. New stateless grants are longer, so consume them directly and
         # avoid an guaranteed-miss indexed lookup plus recursive re-entry.
         if len(token) > 16:
             identity = stream_grant_identity(token)
+            if not identity or identity[0] != request.user.pk:
+                # Enforce sequential viewing: a pending ad wins over link errors.
+                pending = session.pending_ad_response()
+                if pending is not None:
+                    return session.finish(pending)
             if not identity:
                 return Response(
                     {'error': 'Invalid or unauthorized stream URL'},
@@ -3736,148 +3428,38 @@ class StreamShortRedirectView(APIView):
                     'new_stream_url': absolute_api_url(request, new_path),
                 }, status=421)
 
-            granted = materialize_stream_grant(token, user=request.user)
-            if not granted or not granted.short_token:
+            # The materialized row already carries the song; no second lookup.
+            stream_access = materialize_stream_grant(token, user=request.user)
+            if not stream_access or not stream_access.short_token:
                 return Response(
                     {'error': 'Invalid or unauthorized stream URL'},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            token = granted.short_token
-
-        try:
-            # Get the stream access record
-            stream_access = StreamAccess.objects.select_related('song', 'user').get(
+        else:
+            stream_access = StreamAccess.objects.select_related('song').filter(
                 short_token=token,
                 user=request.user
-            )
-
-            # Use ad frequency from configuration
-            ad_freq = _stream_ad_frequency()
-            is_premium = request.user.plan == User.PLAN_PREMIUM
-
-            # Check if already unwrapped
-            if stream_access.unwrapped:
-                # Generate a new short token for this user/song and return it
-                from django.urls import reverse
-                import secrets
-                import random
-
-                # Unique constraints handle the astronomically rare collision;
-                # avoid 12 preflight EXISTS queries on this playback path.
-                new_sa = _create_stream_access(request.user, stream_access.song)
-                short_token = new_sa.short_token
-
-                # Build new short URL
-                new_path = reverse('stream-short', kwargs={'token': short_token})
-                new_url = absolute_api_url(request, new_path)
-
-                # One indexed aggregate replaces three history queries.
-                unwrapped_count, unwrapped_since_last_ad = _stream_access_stats(request.user)
-
-                # Ad decision status for response diagnostic
-                ad_status = {
-                    'since_last_ad': unwrapped_since_last_ad,
-                    'frequency': ad_freq,
-                    'is_premium': is_premium,
-                    'total_24h': unwrapped_count,
-                    'is_already_unwrapped': True
-                }
-
-                if not is_premium and ad_freq > 0 and unwrapped_since_last_ad >= ad_freq:
-                    ad = _choose_audio_ad()
-                    if ad is not None:
-                        submit_id = secrets.token_urlsafe(32)
-
-                        new_sa.ad_required = True
-                        new_sa.ad_seen = False
-                        new_sa.ad_submit_id = submit_id
-                        new_sa.ad_object = ad
-                        new_sa.save(update_fields=['ad_required', 'ad_seen', 'ad_submit_id', 'ad_object'])
-
-                        return Response({
-                            'type': 'ad',
-                            'ad': AudioAdSerializer(ad, context={'request': request}).data,
-                            'submit_id': submit_id,
-                            'message': 'Please listen to this brief advertisement',
-                            'unwrap_count': unwrapped_count,
-                            'since_last_ad': unwrapped_since_last_ad,
-                            'new_stream_url': new_url,
-                            'ad_status': ad_status
-                        }, status=413)
-
-                # Otherwise return error with new stream url and HTTP 413
-                return Response({
-                    'error': 'This stream URL has already been used',
-                    'new_stream_url': new_url,
-                    'ad_status': ad_status
-                }, status=413)
-
-            # Mark as unwrapped
-            stream_access.unwrapped = True
-            stream_access.unwrapped_at = timezone.now()
-            stream_access.save(update_fields=['unwrapped', 'unwrapped_at'])
-
-            unwrapped_count, unwrapped_since_last_ad = _stream_access_stats(request.user)
-
-            # Ad decision status for response diagnostic
-            ad_status = {
-                'since_last_ad': unwrapped_since_last_ad,
-                'frequency': ad_freq,
-                'is_premium': is_premium,
-                'total_24h': unwrapped_count
-            }
-
-            if not is_premium and ad_freq > 0 and unwrapped_since_last_ad >= ad_freq:
-                # Pick from the invalidation-backed active-id cache.
-                ad = _choose_audio_ad()
-                if ad is not None:
-                    submit_id = secrets.token_urlsafe(32)
-
-                    stream_access.ad_required = True
-                    stream_access.ad_seen = False
-                    stream_access.ad_submit_id = submit_id
-                    stream_access.ad_object = ad
-                    stream_access.save(update_fields=['ad_required', 'ad_seen', 'ad_submit_id', 'ad_object'])
-
-                    return Response({
-                        'type': 'ad',
-                        'ad': AudioAdSerializer(ad, context={'request': request}).data,
-                        'submit_id': submit_id,
-                        'message': 'Please listen to this brief advertisement',
-                        'unwrap_count': unwrapped_count,
-                        'since_last_ad': unwrapped_since_last_ad,
-                        'ad_status': ad_status
-                    })
-                else:
-                    ad_status['error'] = 'No ads available in database'
+            ).first()
+        session.mark('lookup')
 
-            # No ad required, return stream response
-            response = UnwrapStreamView()._get_stream_response(request, stream_access, unwrapped_count)
-            if hasattr(response, 'data') and isinstance(response.data, dict):
-                response.data['ad_status'] = ad_status
-            return response
+        if stream_access is None or stream_access.unwrapped:
+            pending = session.pending_ad_response()
+            if pending is not None:
+                return session.finish(pending)
 
-        except StreamAccess.DoesNotExist:
+        if stream_access is None:
             # Try to find a legacy StreamAccess with this token regardless of user.
             # If found, it means the short link exists but belongs to another user
             # or was expired/removed for this user. Create a new short token for
             # the current user for the same song and return 421 with the new link.
-            from django.urls import reverse
             other = StreamAccess.objects.select_related('song').filter(short_token=token).first()
             if other and other.song:
-                # generate a new short token and unique_otplay_id
-                import secrets
-
                 new_sa = _create_stream_access(request.user, other.song)
-                short_token = new_sa.short_token
-
-                new_path = reverse('stream-short', kwargs={'token': short_token})
-                new_url = absolute_api_url(request, new_path)
-
+                new_path = reverse('stream-short', kwargs={'token': new_sa.short_token})
                 return Response({
                     'error': 'Stream link expired or unauthorized for this user',
                     'message': 'A new short stream link has been generated',
-                    'new_stream_url': new_url
+                    'new_stream_url': absolute_api_url(request, new_path)
                 }, status=421)
 
             return Response(
@@ -3885,6 +3467,32 @@ class StreamShortRedirectView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        if stream_access.unwrapped:
+            # Generate a new short token for this user/song and return it.
+            # Unique constraints handle the astronomically rare collision;
+            # avoid 12 preflight EXISTS queries on this playback path.
+            new_sa = _create_stream_access(request.user, stream_access.song)
+            new_path = reverse('stream-short', kwargs={'token': new_sa.short_token})
+            new_url = absolute_api_url(request, new_path)
+
+            # The new link is not unwrapped yet: read the counters without
+            # recording, but still claim an ad for it when one is due.
+            decision, ad, submit_id, ad_status = session.claim_ad(new_sa)
+            ad_status['is_already_unwrapped'] = True
+            if ad is not None:
+                return session.finish(session.ad_response(
+                    ad, submit_id, decision, ad_status, new_stream_url=new_url, status=413,
+                ))
+
+            # Otherwise return error with new stream url and HTTP 413
+            return session.finish(Response({
+                'error': 'This stream URL has already been used',
+                'new_stream_url': new_url,
+                'ad_status': ad_status
+            }, status=413))
+
+        return session.unwrap(stream_access)
+
 
 @extend_schema(tags=['Utility , DetailScreens & action Endpoints اندپوینت های ابزار و صفحات جزئیات و عملیات'])
 class AdSubmitView(APIView):
@@ -3935,17 +3543,18 @@ class AdSubmitView(APIView):
             # Mark ad as seen
             stream_access.ad_seen = True
             stream_access.save(update_fields=['ad_seen'])
+            # Only an ad on an unwrapped stream restarts the count, matching
+            # how the counters are rebuilt from StreamAccess rows.
+            if stream_access.unwrapped_at is not None:
+                mark_stream_ad_seen(request.user.pk, stream_access.pk)
+            else:
+                release_stream_ad(request.user.pk, stream_access.pk)
 
-            # Count unwrapped streams for this user (last 24 hours)
-            cutoff_time = timezone.now() - timedelta(hours=24)
-            unwrapped_count = StreamAccess.objects.filter(
-                user=request.user,
-                unwrapped=True,
-                unwrapped_at__gte=cutoff_time
-            ).count()
+            # Unwraps in the last 24 hours, read from the same counters
+            unwrapped_count = decide_stream_ad(request.user.pk, stream_access.pk, frequency=0, record=False).total_24h
 
             # Return the final stream response
-            return UnwrapStreamView()._get_stream_response(request, stream_access, unwrapped_count)
+            return StreamSession(request).stream_response(stream_access, unwrapped_count)
 
         except StreamAccess.DoesNotExist:
             return Response({'error': 'Invalid submit_id'}, status=status.HTTP_404_NOT_FOUND)
@@ -4189,6 +3798,30 @@ class PlayCountView(APIView):
         if not all([unique_otplay_id, city, country]):
             return Response({'error': 'unique_otplay_id, city, and country are required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if stream_ingestion_enabled():
+            stream_access = (
+                StreamAccess.objects.select_related('song')
+                .filter(unique_otplay_id=unique_otplay_id, user=request.user)
+                .first()
+            )
+            if stream_access is None:
+                return Response({'error': 'Invalid unique_otplay_id'}, status=status.HTTP_400_BAD_REQUEST)
+            if stream_access.one_time_used:
+                return Response({'error': 'This play ID has already been used'}, status=status.HTTP_400_BAD_REQUEST)
+            queued = enqueue_play(
+                stream_access,
+                user=request.user,
+                city=city,
+                country=country,
+                ip=get_client_ip(request),
+                pay=_stream_play_worth(request.user.plan),
+            )
+            if queued is False:
+                return Response({'error': 'This play ID has already been used'}, status=status.HTTP_400_BAD_REQUEST)
+            if queued:
+                return Response({'message': 'Play count recorded successfully'})
+            # Redis is unavailable: fall through to the durable synchronous path.
+
         try:
             with transaction.atomic():
                 # Serialize consumption of a one-time stream token so concurrent
@@ -4219,6 +3852,17 @@ class PlayCountView(APIView):
                 # is updated by the m2m signal only after this transaction commits.
                 stream_access.one_time_used = True
                 stream_access.save(update_fields=['one_time_used'])
+                events = [{
+                    'song_id': song.pk,
+                    'played_at': play_count.created_at,
+                    'pay': pay_value,
+                    'city': city,
+                    'country': country,
+                    'plan': request.user.plan,
+                }]
+                record_play_rollups(events)
+                record_dashboard_plays(events)
+                record_song_earnings([(song.artist_id, song.pk, pay_value)])
 
                 if song.artist:
                     ArtistMonthlyListener.objects.update_or_create(
@@ -4572,7 +4216,7 @@ class UserProfilePublicView(APIView):
         # default: full public profile
         # Record profile view in history (skip if anonymous or viewing own profile)
         if request.user.is_authenticated and request.user.id != user.id:
-            _touch_user_history(request.user, UserHistory.TYPE_USER, target_user=user)
+            touch_user_history(request.user, UserHistory.TYPE_USER, target_user=user)
 
         serializer = UserPublicProfileSerializer(user, context={'request': request})
         data = serializer.data
@@ -4797,7 +4441,7 @@ class SedaBoxProfileView(APIView):
         profile_data['unique_id'] = 'sedabox'
 
         if request.user.is_authenticated and request.user.id != user.id:
-            _touch_user_history(request.user, UserHistory.TYPE_USER, target_user=user)
+            touch_user_history(request.user, UserHistory.TYPE_USER, target_user=user)
 
         page, page_size = _page_values(request, default_size=20, max_size=100)
         end = page * page_size
@@ -4985,18 +4629,12 @@ def _recent_play_song_ids(require_preview=False, days=1, limit=300):
     if cached is not None:
         return cached
 
-    links = Song.play_counts.through.objects.filter(
-        playcount__created_at__gte=timezone.now() - timedelta(days=days),
-        song__status=Song.STATUS_PUBLISHED,
-    )
+    song_filter = Q(song__status=Song.STATUS_PUBLISHED)
     if require_preview:
-        links = links.filter(song__preview_audio_url__isnull=False).exclude(
-            song__preview_audio_url=''
-        )
-    rows = links.values('song_id').annotate(
-        total=Count('playcount_id')
-    ).order_by('-total', '-song_id')[:limit]
-    ids = [row['song_id'] for row in rows]
+        song_filter &= Q(song__preview_audio_url__isnull=False) & ~Q(song__preview_audio_url='')
+    totals = window_play_totals(timezone.now() - timedelta(days=days), filters=song_filter)
+    ranked = sorted(totals.items(), key=lambda item: (item[1]['plays'], item[0]), reverse=True)
+    ids = [song_id for song_id, _ in ranked[:limit]]
     cache_set(key, ids, 120)
     return ids
 
@@ -5191,110 +4829,131 @@ def _dynamic_playlist_items(user=None, bucket=None):
     return items
 
 
+def _users_with_music_activity(users):
+    """Ids of ``users`` with any like, play or non-empty playlist."""
+    active = set()
+    pending = {}
+    for user in users:
+        key = stable_cache_key('user-music-activity', user.pk, user_affinity_version(user.pk), 'v2')
+        cached = cache_get(key)
+        if cached is None:
+            pending[user.pk] = key
+        elif cached:
+            active.add(user.pk)
+    if pending:
+        ids = list(pending)
+        found = set(SongLike.objects.filter(user_id__in=ids).values_list('user_id', flat=True).distinct())
+        found |= set(PlayCount.objects.filter(user_id__in=ids).values_list('user_id', flat=True).distinct())
+        found |= set(
+            UserPlaylist.objects.filter(user_id__in=ids, songs__isnull=False)
+            .values_list('user_id', flat=True).distinct()
+        )
+        for user_id, key in pending.items():
+            cache_set(key, user_id in found, 300 if user_id in found else 30)
+        active |= found
+    return active
+
+
 def _user_has_music_activity(user):
     if user is None or not getattr(user, 'is_authenticated', False):
         return False
-    key = stable_cache_key('user-music-activity', user.pk, user_affinity_version(user.pk), 'v2')
-    cached = cache_get(key)
-    if cached is not None:
-        return bool(cached)
-    active = (
-        SongLike.objects.filter(user=user).exists()
-        or PlayCount.objects.filter(user=user).exists()
-        or UserPlaylist.objects.filter(user=user, songs__isnull=False).exists()
-    )
-    cache_set(key, active, 300 if active else 30)
-    return active
+    return user.pk in _users_with_music_activity([user])
 
 
-def _generate_personal_recommendations(user, target=18):
-    """Maintain a compact, current personal playlist pool for one user.
+def _normalize_personal_playlist_titles(users):
+    """Repair old server-generated fallback titles such as "Fresh for You 5".
 
-    The expensive factor analysis runs at most once per five-minute bucket and
-    again immediately when that user's affinity version changes. Rows are
-    created in bulk and old unused generations are removed by Redis maintenance.
+    This is deliberately narrow so user-authored or editorial titles ending
+    in a number are never modified.
     """
-    if user is None or not getattr(user, 'is_authenticated', False):
-        return []
-    if not _user_has_music_activity(user):
-        return []
+    pending = {}
+    for user in users:
+        key = stable_cache_key('normalize-personal-playlist-fallback-titles', user.pk, 'v1')
+        if cache_get(key) is None:
+            pending[user.pk] = key
+    if not pending:
+        return
+    fallback_titles_fa = ('تازه برای شما', 'محبوب برای شما', 'کشف بعدی شما')
+    fallback_titles_en = ('Fresh for You', 'Popular for You', 'Your Next Discovery')
+
+    def strip_legacy_suffix(value, allowed_titles):
+        text = str(value or '').strip()
+        for allowed_title in allowed_titles:
+            if re.fullmatch(rf'{re.escape(allowed_title)}\s+[0-9]+', text):
+                return allowed_title
+        return text
+
+    repaired = []
+    legacy_rows = RecommendedPlaylist.objects.filter(user_id__in=list(pending)).only(
+        'id', 'title', 'title_en'
+    )
+    for item in legacy_rows.iterator(chunk_size=100):
+        clean_title = strip_legacy_suffix(item.title, fallback_titles_fa)
+        clean_title_en = strip_legacy_suffix(item.title_en, fallback_titles_en)
+        if clean_title == item.title and clean_title_en == item.title_en:
+            continue
+        item.title = clean_title
+        item.title_en = clean_title_en
+        repaired.append(item)
+    if repaired:
+        RecommendedPlaylist.objects.bulk_update(
+            repaired, ['title', 'title_en'], batch_size=100
+        )
+    for key in pending.values():
+        cache_set(key, True, 24 * 60 * 60)
 
-    affinity = user_affinity_version(user.pk)
-    bucket = _time_bucket(15)
 
-    # Repair old server-generated fallback titles such as "Fresh for You 5".
-    # This is deliberately narrow so user-authored or editorial titles ending
-    # in a number are never modified.
-    title_cleanup_key = stable_cache_key(
-        'normalize-personal-playlist-fallback-titles', user.pk, 'v1'
-    )
-    if cache_get(title_cleanup_key) is None:
-        fallback_titles_fa = ('تازه برای شما', 'محبوب برای شما', 'کشف بعدی شما')
-        fallback_titles_en = ('Fresh for You', 'Popular for You', 'Your Next Discovery')
-
-        def strip_legacy_suffix(value, allowed_titles):
-            text = str(value or '').strip()
-            for allowed_title in allowed_titles:
-                if re.fullmatch(rf'{re.escape(allowed_title)}\s+[0-9]+', text):
-                    return allowed_title
-            return text
-
-        repaired = []
-        legacy_rows = RecommendedPlaylist.objects.filter(user=user).only(
-            'id', 'title', 'title_en'
-        )
-        for item in legacy_rows.iterator(chunk_size=100):
-            clean_title = strip_legacy_suffix(item.title, fallback_titles_fa)
-            clean_title_en = strip_legacy_suffix(item.title_en, fallback_titles_en)
-            if clean_title == item.title and clean_title_en == item.title_en:
-                continue
-            item.title = clean_title
-            item.title_en = clean_title_en
-            repaired.append(item)
-        if repaired:
-            RecommendedPlaylist.objects.bulk_update(
-                repaired, ['title', 'title_en'], batch_size=100
+class _PersonalRecommendationInputs:
+    """Catalog lookups shared by every user generated in one batch.
+
+    Users with overlapping genres, moods or artists reuse the same candidate
+    lists and display rows instead of querying them once per user.
+    """
+
+    def __init__(self):
+        self.base = _home_song_queryset()
+        self.genres = {}
+        self.moods = {}
+        self.artists = {}
+        self._candidates = {}
+
+    def load_rows(self, genre_ids, mood_ids, artist_ids):
+        missing = set(genre_ids) - set(self.genres)
+        if missing:
+            self.genres.update(
+                (row['id'], row) for row in Genre.objects.filter(id__in=missing)
+                .values('id', 'name', 'name_en', 'slug')
+            )
+        missing = set(mood_ids) - set(self.moods)
+        if missing:
+            self.moods.update(
+                (row['id'], row) for row in Mood.objects.filter(id__in=missing)
+                .values('id', 'name', 'name_en', 'slug')
+            )
+        missing = set(artist_ids) - set(self.artists)
+        if missing:
+            self.artists.update(
+                (row['id'], row) for row in Artist.objects.filter(id__in=missing)
+                .values('id', 'name', 'name_en')
             )
-        cache_set(title_cleanup_key, True, 24 * 60 * 60)
 
-    generation_key = stable_cache_key(
-        'ensure-personal-playlist-pool', user.pk, affinity, bucket, target, 'v9'
-    )
-    cached, claimed = cache_get_or_claim(generation_key, lock_timeout=30, wait_timeout=0.6)
-    if cached is not None:
-        return list(cached)
-
-    interacted = Song.objects.filter(
-        Q(liked_by=user) | Q(play_counts__user=user) | Q(user_playlists__user=user),
-        status=Song.STATUS_PUBLISHED,
-    ).distinct()
-    genre_ids = list(
-        interacted.exclude(genres__id=None)
-        .values('genres__id').annotate(n=Count('id')).order_by('-n')
-        .values_list('genres__id', flat=True)[:4]
-    )
-    mood_ids = list(
-        interacted.exclude(moods__id=None)
-        .values('moods__id').annotate(n=Count('id')).order_by('-n')
-        .values_list('moods__id', flat=True)[:3]
-    )
-    artist_ids = list(
-        interacted.values('artist_id').annotate(n=Count('id')).order_by('-n')
-        .values_list('artist_id', flat=True)[:3]
-    )
-
-    genre_rows = {
-        row['id']: row for row in Genre.objects.filter(id__in=genre_ids)
-        .values('id', 'name', 'name_en', 'slug')
-    }
-    mood_rows = {
-        row['id']: row for row in Mood.objects.filter(id__in=mood_ids)
-        .values('id', 'name', 'name_en', 'slug')
-    }
-    artist_rows = {
-        row['id']: row for row in Artist.objects.filter(id__in=artist_ids)
-        .values('id', 'name', 'name_en')
-    }
+    def candidate_ids(self, key, build_queryset):
+        ids = self._candidates.get(key)
+        if ids is None:
+            ids = list(build_queryset().values_list('id', flat=True)[:120])
+            self._candidates[key] = ids
+        return ids
+
+    def available_ids(self, song_ids):
+        return set(self.base.filter(id__in=song_ids).values_list('id', flat=True)) if song_ids else set()
+
+
+def _personal_recommendation_recipes(user, affinity, bucket, target, taste, collaborative_ids, inputs):
+    """Ordered playlist recipes for one user from precomputed inputs."""
+    genre_ids = top_taste_ids(taste, 'genres', 4)
+    mood_ids = top_taste_ids(taste, 'moods', 3)
+    artist_ids = top_taste_ids(taste, 'artists', 3)
+    inputs.load_rows(genre_ids, mood_ids, artist_ids)
 
     configs = []
     for value in genre_ids:
@@ -5305,12 +4964,11 @@ def _generate_personal_recommendations(user, target=18):
         configs.append(('artist', value, 1))
     configs.append(('blend', 0, 1))
 
-    base = _home_song_queryset()
+    base = inputs.base
     used_song_ids = set()
     seen_song_sets = set()
     seen_song_orders = set()
     recipes = []
-    now = timezone.now()
 
     def register_song_order(song_ids):
         ordered_ids = list(dict.fromkeys(song_ids))
@@ -5324,7 +4982,7 @@ def _generate_personal_recommendations(user, target=18):
         used_song_ids.update(ordered_ids)
         return ordered_ids
 
-    def pick(queryset, size, seed):
+    def pick(ranked_ids, size, seed):
         """Build a recommendation distinct by content, or at least by order.
 
         Duplicate playlist titles are harmless and intentionally allowed. Exact
@@ -5332,9 +4990,7 @@ def _generate_personal_recommendations(user, target=18):
         accept the same set only when its order is new. If the available catalog
         cannot produce another distinct order, no redundant playlist is created.
         """
-        candidates = list(dict.fromkeys(
-            queryset.values_list('id', flat=True)[:120]
-        ))
+        candidates = list(dict.fromkeys(ranked_ids[:120]))
         if len(candidates) < 3:
             return []
 
@@ -5401,32 +5057,38 @@ def _generate_personal_recommendations(user, target=18):
         if len(recipes) >= target:
             break
         if kind == 'genre':
-            row = genre_rows.get(value, {})
+            row = inputs.genres.get(value, {})
             fa = row.get('name') or 'سبک محبوب شما'
             en = generated_term_en(row.get('name'), row.get('name_en'), generic='Your Favorite Genre')
             title = f'میکس {fa}' if variant == 1 else f'کشف {fa}'
             title_en = f'{en} Mix' if variant == 1 else f'Discover {en}'
             description = 'منتخب تازه براساس سبک‌های مورد علاقه شما'
             description_en = 'A fresh selection based on the genres you enjoy most'
-            queryset = base.filter(genres__id=value).distinct().order_by('-plays', '-release_date', '-created_at')
+            ranked_ids = inputs.candidate_ids(('genre', value), lambda: (
+                base.filter(genres__id=value).distinct().order_by('-plays', '-release_date', '-created_at')
+            ))
             playlist_type = RecommendedPlaylist.PLAYLIST_TYPE_DISCOVER_GENRE
         elif kind == 'mood':
-            row = mood_rows.get(value, {})
+            row = inputs.moods.get(value, {})
             fa = row.get('name') or 'حال‌وهوای شما'
             en = generated_term_en(row.get('name'), row.get('name_en'), generic='Your Mood')
             title, title_en = f'حال‌وهوای {fa}', f'{en} Mood'
             description = 'یک جریان تازه متناسب با حال‌وهوای شنیداری شما'
             description_en = 'A fresh flow matched to your listening mood'
-            queryset = base.filter(moods__id=value).distinct().order_by('-plays', '-release_date', '-created_at')
+            ranked_ids = inputs.candidate_ids(('mood', value), lambda: (
+                base.filter(moods__id=value).distinct().order_by('-plays', '-release_date', '-created_at')
+            ))
             playlist_type = RecommendedPlaylist.PLAYLIST_TYPE_MOOD_BASED
         elif kind == 'artist':
-            row = artist_rows.get(value, {})
+            row = inputs.artists.get(value, {})
             fa = row.get('name') or 'هنرمند محبوب شما'
             en = generated_term_en(row.get('name'), row.get('name_en'), generic='Your Favorite Artist')
             title, title_en = f'منتخب {fa}', f'{en} Essentials'
             description = 'ترک‌های برتر از هنرمندانی که بیشتر دنبال می‌کنید'
             description_en = 'Top tracks from artists closest to your current taste'
-            queryset = base.filter(artist_id=value).order_by('-plays', '-release_date', '-created_at')
+            ranked_ids = inputs.candidate_ids(('artist', value), lambda: (
+                base.filter(artist_id=value).order_by('-plays', '-release_date', '-created_at')
+            ))
             playlist_type = RecommendedPlaylist.PLAYLIST_TYPE_ARTIST_MIX
         else:
             title, title_en = 'برای امروز شما', 'Made for You Today'
@@ -5439,12 +5101,15 @@ def _generate_personal_recommendations(user, target=18):
                 factor_filter |= Q(moods__id__in=mood_ids)
             if artist_ids:
                 factor_filter |= Q(artist_id__in=artist_ids)
-            queryset = (
-                base.filter(factor_filter).distinct() if factor_filter else base
-            ).order_by('-plays', '-release_date', '-created_at')
+            # Co-listened songs already ranked by the item-item model.
+            ranked_ids = collaborative_ids if len(collaborative_ids) >= 3 else inputs.candidate_ids(
+                ('blend', tuple(sorted(genre_ids)), tuple(sorted(mood_ids)), tuple(sorted(artist_ids))),
+                lambda: (base.filter(factor_filter).distinct() if factor_filter else base)
+                .order_by('-plays', '-release_date', '-created_at'),
+            )
             playlist_type = RecommendedPlaylist.PLAYLIST_TYPE_SIMILAR_TASTE
 
-        song_ids = pick(queryset, 18, f'{user.pk}:{affinity}:{bucket}:{kind}:{value}:{variant}')
+        song_ids = pick(ranked_ids, 18, f'{user.pk}:{affinity}:{bucket}:{kind}:{value}:{variant}')
         if len(song_ids) < 3:
             continue
         recipes.append({
@@ -5470,9 +5135,11 @@ def _generate_personal_recommendations(user, target=18):
     max_fallback_attempts = max(target * 6, 36)
     while len(recipes) < target and fallback_index < max_fallback_attempts:
         fa_title, en_title, ordering = fallback_specs[fallback_index % len(fallback_specs)]
-        queryset = base.order_by(ordering, '-release_date', '-created_at')
+        ranked_ids = inputs.candidate_ids(('fallback', ordering), lambda: (
+            base.order_by(ordering, '-release_date', '-created_at')
+        ))
         song_ids = pick(
-            queryset, 18,
+            ranked_ids, 18,
             f'{user.pk}:{affinity}:{bucket}:fallback:{fallback_index}',
         )
         fallback_index += 1
@@ -5494,15 +5161,18 @@ def _generate_personal_recommendations(user, target=18):
             'playlist_type': RecommendedPlaylist.PLAYLIST_TYPE_SIMILAR_TASTE,
             'song_ids': song_ids,
         })
+    return recipes
 
-    if not recipes:
-        cache_set(generation_key, [], 60)
-        return []
 
-    unique_ids = [
-        f'smart_rec_{user.pk}_{affinity}_{bucket}_{index}'
-        for index in range(1, len(recipes) + 1)
-    ]
+def _store_personal_recommendations(plans, now):
+    """Write generated rows and song links for many users in bulk.
+
+    ``plans`` holds ``(user, unique_ids, recipes)``. Rows that were viewed,
+    liked, saved or made permanent are never rewritten.
+    """
+    unique_ids = [unique_id for _, ids, _ in plans for unique_id in ids]
+    if not unique_ids:
+        return
     existing_qs = RecommendedPlaylist.objects.filter(unique_id__in=unique_ids)
     existing = {item.unique_id: item for item in existing_qs}
     durable_ids = set(
@@ -5514,29 +5184,30 @@ def _generate_personal_recommendations(user, target=18):
     )
     to_create = []
     to_update = []
-    for index, (unique_id, recipe) in enumerate(zip(unique_ids, recipes), 1):
-        defaults = {
-            'user': user,
-            'title': recipe['title'],
-            'title_en': recipe['title_en'],
-            'description': recipe['description'],
-            'description_en': recipe['description_en'],
-            'playlist_type': recipe['playlist_type'],
-            'song_order': recipe['song_ids'],
-            'relevance_score': 110 - index,
-            'match_percentage': max(78, 98 - index),
-            'expires_at': now + timedelta(hours=2),
-            'updated_at': now,
-        }
-        item = existing.get(unique_id)
-        if item is None:
-            to_create.append(RecommendedPlaylist(
-                unique_id=unique_id, created_at=now, **defaults
-            ))
-        elif item.pk not in durable_ids:
-            for field, value in defaults.items():
-                setattr(item, field, value)
-            to_update.append(item)
+    for user, user_unique_ids, recipes in plans:
+        for index, (unique_id, recipe) in enumerate(zip(user_unique_ids, recipes), 1):
+            defaults = {
+                'user': user,
+                'title': recipe['title'],
+                'title_en': recipe['title_en'],
+                'description': recipe['description'],
+                'description_en': recipe['description_en'],
+                'playlist_type': recipe['playlist_type'],
+                'song_order': recipe['song_ids'],
+                'relevance_score': 110 - index,
+                'match_percentage': max(78, 98 - index),
+                'expires_at': now + timedelta(hours=2),
+                'updated_at': now,
+            }
+            item = existing.get(unique_id)
+            if item is None:
+                to_create.append(RecommendedPlaylist(
+                    unique_id=unique_id, created_at=now, **defaults
+                ))
+            elif item.pk not in durable_ids:
+                for field, value in defaults.items():
+                    setattr(item, field, value)
+                to_update.append(item)
 
     if to_create:
         RecommendedPlaylist.objects.bulk_create(to_create, ignore_conflicts=True, batch_size=100)
@@ -5549,25 +5220,104 @@ def _generate_personal_recommendations(user, target=18):
             batch_size=100,
         )
 
-    stored = list(RecommendedPlaylist.objects.filter(unique_id__in=unique_ids))
-    stored_by_uid = {item.unique_id: item for item in stored}
+    stored_by_uid = {
+        unique_id: pk for unique_id, pk in
+        RecommendedPlaylist.objects.filter(unique_id__in=unique_ids).values_list('unique_id', 'id')
+    }
     through = RecommendedPlaylist.songs.through
-    mutable_ids = [item.pk for item in stored if item.pk not in durable_ids]
+    mutable_ids = [pk for pk in stored_by_uid.values() if pk not in durable_ids]
     if mutable_ids:
         through.objects.filter(recommendedplaylist_id__in=mutable_ids).delete()
         links = []
-        for unique_id, recipe in zip(unique_ids, recipes):
-            item = stored_by_uid.get(unique_id)
-            if item is None or item.pk in durable_ids:
-                continue
-            links.extend(
-                through(recommendedplaylist_id=item.pk, song_id=song_id)
-                for song_id in recipe['song_ids']
-            )
+        for _, user_unique_ids, recipes in plans:
+            for unique_id, recipe in zip(user_unique_ids, recipes):
+                pk = stored_by_uid.get(unique_id)
+                if pk is None or pk in durable_ids:
+                    continue
+                links.extend(
+                    through(recommendedplaylist_id=pk, song_id=song_id)
+                    for song_id in recipe['song_ids']
+                )
         through.objects.bulk_create(links, ignore_conflicts=True, batch_size=1000)
 
-    cache_set(generation_key, unique_ids, 5 * 60)
-    return unique_ids
+
+def _generate_personal_recommendations_batch(users, target=18, wait_timeout=0.0):
+    """Maintain personal playlist pools for many users with shared queries.
+
+    Taste profiles, interaction vectors, catalog candidates and display rows
+    are loaded once for the batch, and all rows and song links are written in
+    bulk. Returns ``{user_id: unique_ids}`` for every active user.
+    """
+    users = [user for user in users if user is not None and getattr(user, 'is_authenticated', False)]
+    active_ids = _users_with_music_activity(users)
+    users = [user for user in users if user.pk in active_ids]
+    if not users:
+        return {}
+    _normalize_personal_playlist_titles(users)
+
+    bucket = _time_bucket(15)
+    results = {}
+    pending = []
+    for user in users:
+        affinity = user_affinity_version(user.pk)
+        generation_key = stable_cache_key(
+            'ensure-personal-playlist-pool', user.pk, affinity, bucket, target, 'v10'
+        )
+        cached, _ = cache_get_or_claim(generation_key, lock_timeout=30, wait_timeout=wait_timeout)
+        if cached is not None:
+            results[user.pk] = list(cached)
+        else:
+            pending.append((user, affinity, generation_key))
+    if not pending:
+        return results
+
+    user_ids = [user.pk for user, _, _ in pending]
+    tastes = get_taste_profiles_bulk(user_ids)
+    weights = user_interaction_weights_bulk(user_ids)
+    collaborative = {
+        user_id: recommended_song_ids(user_id, 240, weights=weights.get(user_id, {})) or []
+        for user_id in user_ids
+    }
+    inputs = _PersonalRecommendationInputs()
+    available = inputs.available_ids({song_id for ids in collaborative.values() for song_id in ids})
+
+    now = timezone.now()
+    plans = []
+    for user, affinity, generation_key in pending:
+        recipes = _personal_recommendation_recipes(
+            user, affinity, bucket, target, tastes[user.pk],
+            [song_id for song_id in collaborative[user.pk] if song_id in available],
+            inputs,
+        )
+        if not recipes:
+            cache_set(generation_key, [], 60)
+            results[user.pk] = []
+            continue
+        unique_ids = [
+            f'smart_rec_{user.pk}_{affinity}_{bucket}_{index}'
+            for index in range(1, len(recipes) + 1)
+        ]
+        plans.append((user, unique_ids, recipes))
+        results[user.pk] = unique_ids
+
+    _store_personal_recommendations(plans, now)
+    for user, affinity, generation_key in pending:
+        if results[user.pk]:
+            cache_set(generation_key, results[user.pk], 5 * 60)
+    return results
+
+
+def _generate_personal_recommendations(user, target=18):
+    """Maintain a compact, current personal playlist pool for one user.
+
+    The expensive factor analysis runs at most once per five-minute bucket and
+    again immediately when that user's affinity version changes. Rows are
+    created in bulk and old unused generations are removed by Redis maintenance.
+    """
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return []
+    results = _generate_personal_recommendations_batch([user], target=target, wait_timeout=0.6)
+    return results.get(user.pk, [])
 
 
 def _ensure_personal_recommendations(user, target=18):
@@ -5865,43 +5615,31 @@ def _song_recommendation_candidate_ids(request, pool_limit=240):
     affinity_version = user_affinity_version(user.pk)
     key = stable_cache_key(
         'home-song-candidate-pool', user.pk, catalog_version,
-        affinity_version, pool_limit, 'v7',
+        affinity_version, pool_limit, 'v8',
     )
     cached, claimed = cache_get_or_claim(key, lock_timeout=30, wait_timeout=1.0)
     if cached is not None:
         return cached.get('type', 'personalized'), cached.get('ids', [])
 
     base = _home_song_queryset()
-    liked = set(SongLike.objects.filter(user=user).values_list('song_id', flat=True))
-    played = set(
-        Song.objects.filter(play_counts__user=user)
-        .order_by('-play_counts__created_at')
-        .values_list('id', flat=True)[:1500]
-    )
-    playlist = set(
-        UserPlaylist.songs.through.objects.filter(userplaylist__user=user)
-        .values_list('song_id', flat=True)[:1500]
-    )
-    interacted_ids = liked | played | playlist
+    interaction_weights = user_interaction_weights(user.pk)
+    interacted_ids = set(interaction_weights)
     recommendation_type = 'personalized'
 
     ranked_ids = []
-    if interacted_ids:
-        interacted = Song.objects.filter(id__in=interacted_ids)
-        genre_ids = list(
-            interacted.exclude(genres__id=None)
-            .values('genres__id').annotate(n=Count('id')).order_by('-n')
-            .values_list('genres__id', flat=True)[:5]
-        )
-        mood_ids = list(
-            interacted.exclude(moods__id=None)
-            .values('moods__id').annotate(n=Count('id')).order_by('-n')
-            .values_list('moods__id', flat=True)[:4]
-        )
-        artist_ids = list(
-            interacted.values('artist_id').annotate(n=Count('id')).order_by('-n')
-            .values_list('artist_id', flat=True)[:6]
-        )
+    # Item-item co-occurrence ranks candidates in one sparse product; the
+    # taste-factor aggregates remain the fallback for users it cannot place.
+    collaborative_ids = (
+        recommended_song_ids(user.pk, pool_limit * 2, interaction_weights) if interacted_ids else None
+    )
+    if collaborative_ids:
+        available = set(base.filter(id__in=collaborative_ids).values_list('id', flat=True))
+        ranked_ids = [song_id for song_id in collaborative_ids if song_id in available][:pool_limit]
+    if not ranked_ids and interacted_ids:
+        taste = get_taste_profile(user.pk)
+        genre_ids = top_taste_ids(taste, 'genres', 5)
+        mood_ids = top_taste_ids(taste, 'moods', 4)
+        artist_ids = top_taste_ids(taste, 'artists', 6)
         if genre_ids or mood_ids or artist_ids:
             ranked_ids = list(
                 base.exclude(id__in=interacted_ids).filter(
@@ -5913,7 +5651,7 @@ def _song_recommendation_candidate_ids(request, pool_limit=240):
             )
         else:
             recommendation_type = 'trending'
-    else:
+    elif not ranked_ids:
         recommendation_type = 'trending'
 
     # Fill from strong catalog candidates without weakening the personalized top.
@@ -6124,13 +5862,11 @@ class HomeSummaryView(APIView):
         artist_ids = _cached_ranked_ids('home-popular-artists', artist_qs.order_by('-score', '-verified', 'name'), 80, 300)
         artist_page_ids, artist_next = _slice_items(artist_ids, pages['artists'], 6)
         artist_page = _ordered_queryset_items(artist_qs, artist_page_ids)
-        hydrate_artist_metrics(artist_page, user if user.is_authenticated else None)
 
         album_qs = _album_popularity_queryset()
         album_ids = _cached_ranked_ids('home-popular-albums', album_qs.order_by('-score', '-release_date'), 80, 300)
         album_page_ids, album_next = _slice_items(album_ids, pages['albums'], 6)
         album_page = _ordered_queryset_items(album_qs, album_page_ids)
-        hydrate_album_metrics(album_page, user if user.is_authenticated else None)
 
         discovery_base = _home_song_queryset(not user.is_authenticated)
         excluded = set(latest_ids[:30]) | {song.id for song in rec_songs}
@@ -6146,17 +5882,11 @@ class HomeSummaryView(APIView):
 
         trending_ranking, trending_songs = _trending_songs(request, hydrate_metrics=False)
 
-        # One metric batch for every song card in Home. The serializers detect
+        # One metric batch for every card in Home. The serializers detect
         # these attached metrics and perform zero additional metric queries.
-        metric_songs = []
-        seen_song_ids = set()
-        for group in (rec_page, latest_page, discovery_page, trending_songs):
-            for song in group:
-                if song.pk in seen_song_ids:
-                    continue
-                seen_song_ids.add(song.pk)
-                metric_songs.append(song)
-        hydrate_song_metrics(metric_songs, user if user.is_authenticated else None)
+        HydrationPlan(user).extend(
+            [*rec_page, *latest_page, *discovery_page, *trending_songs, *artist_page, *album_page]
+        ).resolve()
 
         payload = {
             'sections': 6,
@@ -6333,17 +6063,8 @@ class _GlobalChartView(APIView):
         key = stable_cache_key('global-chart', self.entity, self.days, version, timezone.now().strftime('%Y-%m-%d-%H'), 'v3')
         ids, claimed = cache_get_or_claim(key, lock_timeout=30, wait_timeout=1.0)
         if ids is None:
-            through = Song.play_counts.through
-            links = through.objects.filter(playcount__created_at__gte=cutoff)
-            if self.entity == 'song':
-                rows = links.values('song_id').annotate(total=Count('playcount_id')).order_by('-total')[:300]
-                ids = [row['song_id'] for row in rows]
-            elif self.entity == 'artist':
-                rows = links.values('song__artist_id').annotate(total=Count('playcount_id')).order_by('-total')[:300]
-                ids = [row['song__artist_id'] for row in rows]
-            else:
-                rows = links.exclude(song__album_id=None).values('song__album_id').annotate(total=Count('playcount_id')).order_by('-total')[:300]
-                ids = [row['song__album_id'] for row in rows]
+            group_by = {'song': 'song_id', 'artist': 'song__artist_id'}.get(self.entity, 'song__album_id')
+            ids = ranked_window_ids(cutoff, group_by=group_by, limit=300)
             cache_set(key, ids, 300)
         page_ids, has_next = _slice_items(ids, page, size)
         if self.entity == 'song':
@@ -6709,6 +6430,30 @@ def _normalized_directory_expression(*field_names):
     return expression
 
 
+@extend_schema(
+    tags=['Search Page Endpoints اندپوینت های صفحه جستجو'],
+    parameters=[
+        OpenApiParameter(name='q', type=OpenApiTypes.STR, required=True, description='Typed prefix'),
+        OpenApiParameter(name='limit', type=OpenApiTypes.INT, required=False, description='Max suggestions (default 8, max 20)'),
+    ],
+)
+class SearchSuggestView(APIView):
+    """Search-as-you-type suggestions for songs, artists and albums."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', 8))
+        except (TypeError, ValueError):
+            limit = 8
+        limit = max(1, min(limit, 20))
+        return Response({
+            'query': query,
+            'results': search_suggestions(query, limit=limit, language=get_request_language(request)),
+        })
+
+
 @extend_schema(tags=['Search Page Endpoints اندپوینت های صفحه جستجو'])
 class SearchView(APIView):
     permission_classes = [AllowAny]
@@ -6735,7 +6480,7 @@ class SearchView(APIView):
             else 0
         )
         key = stable_cache_key(
-            'search-ids-v13',
+            'search-ids-v14',
             query.casefold(),
             search_type or 'mixed',
             moods,
@@ -6751,12 +6496,9 @@ class SearchView(APIView):
             offset = (page - 1) * page_size
 
             if search_type:
-                queryset = self._queryset(search_type, query, moods, request)
-                ids = list(
-                    queryset.values_list('id', flat=True)[
-                        offset:offset + page_size + 1
-                    ]
-                )
+                ids = self._search_ids(
+                    search_type, query, moods, request, offset + page_size + 1,
+                )[offset:]
                 cached = {
                     'refs': [(search_type, pk) for pk in ids[:page_size]],
                     'has_next': len(ids) > page_size,
@@ -6768,10 +6510,7 @@ class SearchView(APIView):
                 window_end = offset + page_size + 1
                 groups = []
                 for kind in self.TYPES:
-                    ids = list(
-                        self._queryset(kind, query, moods, request)
-                        .values_list('id', flat=True)[:window_end]
-                    )
+                    ids = self._search_ids(kind, query, moods, request, window_end)
                     groups.append([(kind, pk) for pk in ids])
 
                 mixed_refs = []
@@ -6817,6 +6556,18 @@ class SearchView(APIView):
             'is_empty': not serialized_results,
         })
 
+    def _search_ids(self, kind, query, moods, request, limit):
+        # SEARCH_BACKEND picks the shared in-memory index or PostgreSQL search
+        # documents; either declines (None) when unavailable and the SQL
+        # lookups below run instead.
+        exclude_ids = (request.user.pk,) if kind == 'user' and request.user.is_authenticated else ()
+        ids = search_index_ids(kind, query, moods, limit=limit, exclude_ids=exclude_ids)
+        if ids is None:
+            ids = search_document_ids(kind, query, moods, limit=limit, exclude_ids=exclude_ids)
+        if ids is None:
+            ids = list(self._queryset(kind, query, moods, request).values_list('id', flat=True)[:limit])
+        return ids
+
     def _queryset(self, kind, query, moods, request):
         return {'song':self._search_songs,'artist':self._search_artists,'album':self._search_albums,
                 'playlist':self._search_playlists,'user':self._search_users}[kind](query, moods, request)
@@ -6923,14 +6674,7 @@ class SearchView(APIView):
         }
         maps={kind:{obj.pk:obj for obj in qs} for kind,qs in querysets.items()}
         results=[maps[kind][pk] for kind,pk in refs if pk in maps[kind]]
-        hydrate_song_metrics([x for x in results if isinstance(x,Song)],request.user,False)
-        hydrate_album_metrics([x for x in results if isinstance(x,Album)],request.user)
-        hydrate_playlist_metrics([x for x in results if isinstance(x,Playlist)],request.user)
-        hydrate_artist_metrics([x for x in results if isinstance(x,Artist)],request.user)
-        user_ids=[x.pk for x in results if isinstance(x,User)]
-        followed=set(Follow.objects.filter(follower_user=request.user,followed_user_id__in=user_ids).values_list('followed_user_id',flat=True)) if request.user.is_authenticated and user_ids else set()
-        for obj in results:
-            if isinstance(obj,User): obj._is_following=obj.pk in followed
+        HydrationPlan(request.user).extend(results,include_playlist_count=False).resolve()
         return results
 
 
@@ -7409,7 +7153,7 @@ class ArtistLiveListenersView(APIView):
         return Response({
             "artist_id": artist.id,
             "artist_name": artist.name,
-            "live_listeners": artist.live_listeners
+            "live_listeners": artist_live_listener_count(artist.pk)
         })
 
 
@@ -7417,7 +7161,7 @@ class ArtistLiveListenersView(APIView):
 class ArtistLiveListenersPollView(APIView):
     """
     Long-polling endpoint for live listener updates.
-    Blocks until the set of live listeners changes or a timeout occurs.
+    Waits on the Redis live-listener change feed until the count changes or a timeout occurs.
     """
     permission_classes = [IsAuthenticated]
 
@@ -7444,36 +7188,20 @@ class ArtistLiveListenersPollView(APIView):
         except Artist.DoesNotExist:
             return Response({"error": "پروفایل هنرمند پیدا نشد."}, status=status.HTTP_404_NOT_FOUND)
 
-        def get_current_listeners():
-            return set(ActivePlayback.objects.filter(
-                song__artist=artist,
-                expiration_time__gt=timezone.now()
-            ).values_list('user_id', flat=True).distinct())
-
-        initial_listeners = get_current_listeners()
-
-        # Long polling loop
-        timeout = 30  # seconds
-        start_time = time.time()
-
-        while time.time() - start_time < timeout:
-            current_listeners = get_current_listeners()
-            if current_listeners != initial_listeners:
-                return Response({
-                    "live_listeners": len(current_listeners),
-                    "changed": True
-                })
-            time.sleep(3)  # Check every 3 seconds
-
+        artist_id = artist.pk
+        # The wait below only touches Redis; hand the DB connection back first.
+        if not connection.in_atomic_block:
+            connection.close()
+        live_listeners, changed = wait_for_artist_live_listener_change(artist_id, timeout=30)
         return Response({
-            "live_listeners": len(initial_listeners),
-            "changed": False
+            "live_listeners": live_listeners,
+            "changed": changed
         })
 
 
 @extend_schema(tags=['Artist App Endpoints اندپوینت های اپلیکیشن هنرمند'])
 class ArtistAnalyticsView(APIView):
-    """Real-time compatible analytics for the authenticated artist."""
+    """Analytics for the authenticated artist from hourly snapshots plus live plays."""
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -7486,167 +7214,12 @@ class ArtistAnalyticsView(APIView):
 
         period = request.query_params.get('period', '30d').lower()
         chart_type = request.query_params.get('chart', '').lower()
-        allowed_periods = {'today', '7d', '30d', '365d', 'all'}
-        if period not in allowed_periods:
+        if period not in ARTIST_ANALYTICS_PERIODS:
             return Response({"error": "بازه زمانی معتبر نیست. یکی از مقادیر امروز، ۷ روز، ۳۰ روز، ۳۶۵ روز یا همه را انتخاب کنید."}, status=status.HTTP_400_BAD_REQUEST)
-        if chart_type and chart_type not in {'hourly', 'daily', 'monthly'}:
+        if chart_type and chart_type not in ARTIST_ANALYTICS_CHART_TYPES:
             return Response({"error": "نوع نمودار معتبر نیست. یکی از حالت‌های ساعتی، روزانه یا ماهانه را انتخاب کنید."}, status=status.HTTP_400_BAD_REQUEST)
 
-        now = timezone.now()
-        today_date = timezone.localdate(now)
-        today = _finance_day_start(today_date)
-        current_month = _finance_month_start(today_date)
-        twelve_month_start = _finance_shift_month(current_month, -11)
-        windows = {
-            'today': (today, today - timedelta(days=1), today),
-            '7d': (_finance_day_start(today_date - timedelta(days=6)), _finance_day_start(today_date - timedelta(days=13)), _finance_day_start(today_date - timedelta(days=6))),
-            '30d': (_finance_day_start(today_date - timedelta(days=29)), _finance_day_start(today_date - timedelta(days=59)), _finance_day_start(today_date - timedelta(days=29))),
-            '365d': (_finance_day_start(twelve_month_start), _finance_day_start(_finance_shift_month(twelve_month_start, -12)), _finance_day_start(twelve_month_start)),
-            'all': (None, None, None),
-        }
-        start, previous_start, previous_end = windows[period]
-        chart_type = chart_type or ('hourly' if period == 'today' else 'monthly' if period in {'365d', 'all'} else 'daily')
-
-        def period_qs(model, field='created_at'):
-            qs = model
-            if start:
-                qs = qs.filter(**{f'{field}__gte': start})
-            return qs
-
-        active_songs = Song.objects.filter(artist=artist).exclude(status=Song.STATUS_DELETED)
-        current_plays = period_qs(PlayCount.objects.filter(songs__in=active_songs)).distinct()
-        previous_plays = PlayCount.objects.none()
-        if previous_start and previous_end:
-            previous_plays = PlayCount.objects.filter(
-                songs__in=active_songs,
-                created_at__gte=previous_start,
-                created_at__lt=previous_end,
-            ).distinct()
-
-        current_likes = period_qs(SongLike.objects.filter(song__in=active_songs))
-        current_followers = period_qs(Follow.objects.filter(followed_artist=artist))
-        previous_likes = SongLike.objects.none()
-        previous_followers = Follow.objects.none()
-        if previous_start and previous_end:
-            previous_likes = SongLike.objects.filter(song__in=active_songs, created_at__gte=previous_start, created_at__lt=previous_end)
-            previous_followers = Follow.objects.filter(followed_artist=artist, created_at__gte=previous_start, created_at__lt=previous_end)
-
-        current_income = current_plays.aggregate(total=Coalesce(
-            Sum('pay'), Value(0, output_field=DecimalField(max_digits=20, decimal_places=8))
-        ))['total']
-        previous_income = previous_plays.aggregate(total=Coalesce(
-            Sum('pay'), Value(0, output_field=DecimalField(max_digits=20, decimal_places=8))
-        ))['total']
-        current_play_count = current_plays.count()
-        previous_play_count = previous_plays.count()
-        if period == 'all':
-            current_play_count += active_songs.aggregate(total=Coalesce(Sum('plays'), Value(0, output_field=BigIntegerField())))['total'] or 0
-
-        def change(current, previous):
-            if previous in (None, 0):
-                return None
-            return round(((float(current) - float(previous)) / float(previous)) * 100, 1)
-
-        summary = {
-            'total_plays': int(current_play_count),
-            'total_likes': current_likes.count(),
-            'total_income': current_income,
-            'total_followers': Follow.objects.filter(followed_artist=artist).count(),
-            'new_followers': current_followers.count() if period != 'all' else Follow.objects.filter(followed_artist=artist).count(),
-            'unique_listeners': current_plays.values('user_id').distinct().count(),
-            'monthly_listeners': ArtistMonthlyListener.objects.filter(artist=artist, updated_at__gte=now - timedelta(days=28)).count(),
-            'period': period,
-            'growth': {
-                'plays': change(current_play_count, previous_play_count),
-                'likes': change(current_likes.count(), previous_likes.count()),
-                'income': change(current_income, previous_income),
-                'followers': change(current_followers.count(), previous_followers.count()),
-            },
-        }
-
-        chart_qs = current_plays
-        bucket = TruncHour('created_at') if chart_type == 'hourly' else TruncMonth('created_at') if chart_type == 'monthly' else TruncDate('created_at')
-        chart_rows = chart_qs.annotate(bucket=bucket).values('bucket').annotate(count=Count('id', distinct=True)).order_by('bucket')
-
-        def chart_bucket_key(value):
-            if chart_type == 'hourly':
-                if timezone.is_aware(value):
-                    value = timezone.localtime(value)
-                return value.replace(minute=0, second=0, microsecond=0)
-            return _finance_bucket_key(value, 'monthly' if chart_type == 'monthly' else 'daily')
-
-        chart_counts = {chart_bucket_key(row['bucket']): int(row['count']) for row in chart_rows}
-        if chart_type == 'hourly':
-            chart_start = today
-            chart_end = today + timedelta(hours=23)
-            chart_buckets = (chart_start + timedelta(hours=hour) for hour in range(24))
-        elif chart_type == 'monthly':
-            chart_end = current_month
-            if period == 'all':
-                chart_start = min(chart_counts, default=chart_end)
-            elif period == '365d':
-                chart_start = twelve_month_start
-            else:
-                chart_start = _finance_month_start(timezone.localdate(start)) if start else chart_end
-            chart_buckets = _finance_bucket_range('monthly', chart_start, chart_end)
-        else:
-            chart_end = today_date
-            if period == 'all':
-                chart_start = min(chart_counts, default=chart_end)
-            else:
-                chart_start = timezone.localdate(start) if start else chart_end
-            chart_buckets = _finance_bucket_range('daily', chart_start, chart_end)
-
-        chart = [{'time': item.isoformat(), 'count': chart_counts.get(item, 0)} for item in chart_buckets]
-
-        base_count = current_plays.count()
-        def distribution(field, label):
-            rows = current_plays.values(field).annotate(count=Count('id', distinct=True)).order_by('-count')[:20]
-            return [{
-                label: row[field] or 'Unknown',
-                'count': row['count'],
-                'percentage': round((row['count'] / base_count * 100), 2) if base_count else 0,
-            } for row in rows]
-
-        plan_rows = current_plays.values('user__plan').annotate(
-            count=Count('id', distinct=True),
-            income=Coalesce(Sum('pay'), Value(0, output_field=DecimalField(max_digits=20, decimal_places=8))),
-        ).order_by('user__plan')
-        plan_distribution = [{
-            'plan': row['user__plan'] or User.PLAN_FREE,
-            'count': row['count'],
-            'income': row['income'],
-            'percentage': round((row['count'] / base_count * 100), 2) if base_count else 0,
-        } for row in plan_rows]
-
-        period_filter = Q(play_counts__created_at__gte=start) if start else Q()
-        top_qs = active_songs.annotate(
-            period_plays=Count('play_counts', filter=period_filter, distinct=True),
-            likes_total=Count('liked_by', distinct=True),
-        )
-        if period == 'all':
-            top_qs = top_qs.annotate(ranked_plays=ExpressionWrapper(F('plays') + F('period_plays'), output_field=BigIntegerField()))
-        else:
-            top_qs = top_qs.annotate(ranked_plays=F('period_plays'))
-        top_qs = top_qs.order_by('-ranked_plays', '-likes_total', '-created_at')[:10]
-        top_songs = [{
-            'id': song.id,
-            'title': song.title,
-            'title_en': song.title_en,
-            'cover_image': generate_signed_r2_url(song.cover_image) if song.cover_image else '',
-            'plays': int(song.ranked_plays or 0),
-            'likes': int(song.likes_total or 0),
-            'stream_share': round((int(song.ranked_plays or 0) / current_play_count * 100), 2) if current_play_count else 0,
-        } for song in top_qs]
-
-        return Response({
-            'summary': summary,
-            'chart': {'type': chart_type, 'data': chart},
-            'city_distribution': distribution('city', 'city'),
-            'country_distribution': distribution('country', 'country'),
-            'plan_distribution': plan_distribution,
-            'top_songs': top_songs,
-        })
+        return Response(artist_analytics(artist, period, chart_type))
 
 
 @extend_schema(tags=['Artist App Endpoints اندپوینت های اپلیکیشن هنرمند'])
@@ -7681,10 +7254,9 @@ class DepositRequestView(APIView):
             if active.exists():
                 return Response({"error": "یک درخواست تسویه فعال دارید و تا تعیین وضعیت آن امکان ثبت درخواست جدید وجود ندارد."}, status=status.HTTP_400_BAD_REQUEST)
 
-            plays = PlayCount.objects.filter(songs__artist=artist).distinct()
-            total_credit = plays.aggregate(total=Coalesce(
-                Sum('pay'), _finance_zero()
-            ))['total']
+            # Allocate against an exact rebuild rather than incrementally kept rows.
+            ledger = rebuild_artist_ledger(artist.pk)
+            total_credit = sum((row['earned'] for row in ledger.values()), Decimal('0'))
             reserved = DepositRequest.objects.filter(
                 artist=artist,
                 status__in=[DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED, DepositRequest.STATUS_DONE],
@@ -7706,20 +7278,15 @@ class DepositRequestView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
+            plays = PlayCount.objects.filter(songs__artist=artist).distinct()
             total_plays = plays.count()
             free_plays = plays.filter(user__plan=User.PLAN_FREE).count()
             premium_plays = plays.filter(user__plan=User.PLAN_PREMIUM).count()
-            song_totals = _finance_song_totals(artist)
-            existing_requests = DepositRequest.objects.filter(
-                artist=artist,
-                status__in=[DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED, DepositRequest.STATUS_DONE],
-            ).order_by('submission_date', 'pk')
-            already_reserved, _, _ = _finance_artist_song_allocations(
-                artist,
-                song_totals=song_totals,
-                requests=existing_requests,
+            song_allocations = allocate_across_songs(
+                {song_id: row['earned'] for song_id, row in ledger.items()},
+                {song_id: row['reserved'] for song_id, row in ledger.items()},
+                available,
             )
-            song_allocations = _finance_allocate_across_songs(song_totals, already_reserved, available)
             if abs(sum(song_allocations.values(), Decimal('0')) - _finance_decimal(available)) > FINANCE_QUANTUM:
                 return Response({"error": "تقسیم مبلغ تسویه بین آهنگ‌ها انجام نشد. لطفاً دوباره تلاش کنید."}, status=status.HTTP_409_CONFLICT)
 
@@ -7764,28 +7331,30 @@ class ArtistWalletView(APIView):
         if not artist:
             return Response({"error": "پروفایل هنرمند پیدا نشد."}, status=status.HTTP_404_NOT_FOUND)
 
-        plays = PlayCount.objects.filter(songs__artist=artist).distinct()
-        total_credit = plays.aggregate(total=Coalesce(
-            Sum('pay'), _finance_zero()
-        ))['total']
-        requests = DepositRequest.objects.filter(artist=artist)
-        reserved = requests.filter(status__in=[DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED, DepositRequest.STATUS_DONE]).aggregate(total=Coalesce(
-            Sum('amount'), Value(0, output_field=DecimalField(max_digits=15, decimal_places=2))
-        ))['total']
-        withdrawn = requests.filter(status=DepositRequest.STATUS_DONE).aggregate(total=Coalesce(
-            Sum('amount'), Value(0, output_field=DecimalField(max_digits=15, decimal_places=2))
-        ))['total']
-        pending_amount = requests.filter(status__in=[DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED]).aggregate(total=Coalesce(
-            Sum('amount'), Value(0, output_field=DecimalField(max_digits=15, decimal_places=2))
-        ))['total']
+        ledger = artist_ledger(artist.pk).values()
+        total_credit = sum((row['earned'] for row in ledger), Decimal('0'))
+        by_status = {
+            row['status']: (row['total'] or Decimal('0'), row['count'])
+            for row in DepositRequest.objects.filter(artist=artist).values('status').annotate(
+                total=Sum('amount'), count=Count('id'),
+            )
+        }
+
+        def requested(*statuses):
+            return sum((by_status.get(value, (Decimal('0'), 0))[0] for value in statuses), Decimal('0'))
+
+        def submissions(*statuses):
+            return sum(by_status.get(value, (Decimal('0'), 0))[1] for value in statuses)
+
+        reserved = requested(DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED, DepositRequest.STATUS_DONE)
+        withdrawn = requested(DepositRequest.STATUS_DONE)
+        pending_amount = requested(DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED)
         available = max(Decimal('0'), total_credit - reserved)
         withdrawable = available.quantize(PAYOUT_QUANTUM, rounding=ROUND_DOWN)
         minimum_payout = _minimum_payout_amount()
         amount_needed = max(Decimal('0'), minimum_payout - withdrawable).quantize(PAYOUT_QUANTUM)
         meets_minimum = withdrawable >= minimum_payout
-        has_active_request = requests.filter(
-            status__in=[DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED]
-        ).exists()
+        has_active_request = submissions(DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED) > 0
 
         return Response({
             'total_credit': _finance_string(total_credit),
@@ -7798,15 +7367,15 @@ class ArtistWalletView(APIView):
             'amount_needed_for_payout': _payout_string(amount_needed),
             'meets_minimum_payout': meets_minimum,
             'can_request_payout': meets_minimum and not has_active_request,
-            'paid_plays': plays.filter(pay__gt=0).count(),
-            'zero_value_plays': plays.filter(pay=0).count(),
+            'paid_plays': sum(row['paid_plays'] for row in ledger),
+            'zero_value_plays': sum(row['zero_value_plays'] for row in ledger),
             'has_active_request': has_active_request,
             'deposit_requests': {
-                'total_submissions': requests.count(),
-                'pending': requests.filter(status=DepositRequest.STATUS_PENDING).count(),
-                'approved': requests.filter(status=DepositRequest.STATUS_APPROVED).count(),
-                'rejected': requests.filter(status=DepositRequest.STATUS_REJECTED).count(),
-                'done': requests.filter(status=DepositRequest.STATUS_DONE).count(),
+                'total_submissions': submissions(*by_status),
+                'pending': submissions(DepositRequest.STATUS_PENDING),
+                'approved': submissions(DepositRequest.STATUS_APPROVED),
+                'rejected': submissions(DepositRequest.STATUS_REJECTED),
+                'done': submissions(DepositRequest.STATUS_DONE),
             },
         })
 
@@ -7990,39 +7559,28 @@ class ArtistFinanceSongsView(APIView):
             'artist', 'album', 'uploader'
         ).prefetch_related(
             'featured_artists', 'genres', 'sub_genres', 'moods', 'tags'
-        ).annotate(
-            play_counts_count=Count('play_counts', distinct=True),
-            paid_plays=Count('play_counts', filter=Q(play_counts__pay__gt=0), distinct=True),
-            zero_value_plays=Count('play_counts', filter=Q(play_counts__pay=0), distinct=True),
-            income=Coalesce(Sum('play_counts__pay'), _finance_zero()),
-        ).annotate(
-            total_plays=ExpressionWrapper(F('plays') + F('play_counts_count'), output_field=BigIntegerField()),
         ))
 
-        song_totals = {
-            song.id: _finance_decimal(getattr(song, 'income', 0))
-            for song in songs
+        ledger = artist_ledger(artist.pk)
+        empty = {
+            'earned': Decimal('0'), 'paid_plays': 0, 'zero_value_plays': 0,
+            'reserved': Decimal('0'), 'deposited': Decimal('0'), 'pending': Decimal('0'),
         }
-        payout_requests = DepositRequest.objects.filter(
-            artist=artist,
-            status__in=[DepositRequest.STATUS_PENDING, DepositRequest.STATUS_APPROVED, DepositRequest.STATUS_DONE],
-        ).order_by('submission_date', 'pk')
-        reserved_by_song, deposited_by_song, pending_by_song = _finance_artist_song_allocations(
-            artist,
-            song_totals=song_totals,
-            requests=payout_requests,
-        )
-
         records = []
         for song in songs:
-            total_income = song_totals.get(song.id, Decimal('0'))
-            deposited_income = min(total_income, deposited_by_song.get(song.id, Decimal('0')))
+            row = ledger.get(song.id, empty)
+            song.paid_plays = row['paid_plays']
+            song.zero_value_plays = row['zero_value_plays']
+            song.play_counts_count = row['paid_plays'] + row['zero_value_plays']
+            song.total_plays = int(song.plays or 0) + song.play_counts_count
+            total_income = row['earned']
+            deposited_income = min(total_income, row['deposited'])
             pending_income = min(
                 max(Decimal('0'), total_income - deposited_income),
-                pending_by_song.get(song.id, Decimal('0')),
+                row['pending'],
             )
             remaining_income = max(Decimal('0'), total_income - deposited_income)
-            available_income = max(Decimal('0'), total_income - reserved_by_song.get(song.id, Decimal('0')))
+            available_income = max(Decimal('0'), total_income - row['reserved'])
             records.append({
                 'song': song,
                 'total_income': total_income,
@@ -8830,7 +8388,7 @@ class ArtistSongsManagementView(APIView):
                     elif linked_release.status == ArtistRelease.STATUS_IN_REVIEW:
                         Song.objects.filter(release_track_links__release=linked_release).exclude(
                             status=Song.STATUS_DELETED
-                        ).update(status=Song.STATUS_PENDING)
+                        ).update(status=Song.STATUS_PENDING, updated_at=timezone.now())
                         ArtistRelease.objects.filter(pk=linked_release.pk).update(
                             validation_snapshot={}, lock_version=F('lock_version') + 1, updated_at=timezone.now(),
                         )
@@ -8937,8 +8495,7 @@ class ArtistAlbumsManagementView(APIView):
 
         if pk:
             album = get_object_or_404(albums_qs, pk=pk)
-            hydrate_album_metrics([album], request.user)
-            hydrate_song_metrics(album.songs.all(), request.user)
+            HydrationPlan(request.user).add(album).extend(album.songs.all()).resolve()
             tracks = list(album.songs.all())
             data = _artist_album_payload(
                 album,
@@ -8952,8 +8509,9 @@ class ArtistAlbumsManagementView(APIView):
         paginator = StandardResultsSetPagination()
         page = paginator.paginate_queryset(queryset, request)
         if page is not None:
-            hydrate_album_metrics(page, request.user)
-            hydrate_song_metrics([song for album in page for song in album.songs.all()], request.user)
+            HydrationPlan(request.user).extend(page).extend(
+                [song for album in page for song in album.songs.all()]
+            ).resolve()
             serializer = AlbumSerializer(page, many=True, context={'request': request})
             results = [
                 _artist_album_payload(album, item, list(album.songs.all()))
@@ -8962,8 +8520,9 @@ class ArtistAlbumsManagementView(APIView):
             return paginator.get_paginated_response(results)
 
         albums = list(queryset)
-        hydrate_album_metrics(albums, request.user)
-        hydrate_song_metrics([song for album in albums for song in album.songs.all()], request.user)
+        HydrationPlan(request.user).extend(albums).extend(
+            [song for album in albums for song in album.songs.all()]
+        ).resolve()
         serializer = AlbumSerializer(albums, many=True, context={'request': request})
         return Response([
             _artist_album_payload(album, item, list(album.songs.all()))
@@ -9051,7 +8610,7 @@ class ArtistAlbumsManagementView(APIView):
         # 2. Process Songs
         if existing_song_ids:
             Song.objects.filter(id__in=existing_song_ids, artist=artist, album__isnull=True).update(
-                album=album, is_single=False
+                album=album, is_single=False, updated_at=timezone.now()
             )
 
         # Process new songs
@@ -9243,14 +8802,14 @@ class ArtistAlbumsManagementView(APIView):
             serializer.save(**({'cover_image': cover_url} if cover_url else {}))
             if replace_song_ids is not None:
                 Song.objects.filter(album=album).exclude(status=Song.STATUS_DELETED).exclude(id__in=replace_song_ids).update(
-                    album=None, is_single=True
+                    album=None, is_single=True, updated_at=timezone.now()
                 )
                 if replace_song_ids:
                     Song.objects.filter(
                         Q(album__isnull=True) | Q(album=album),
                         id__in=replace_song_ids,
                         artist=artist,
-                    ).update(album=album, is_single=False)
+                    ).update(album=album, is_single=False, updated_at=timezone.now())
 
         album.refresh_from_db()
         response_tracks = list(
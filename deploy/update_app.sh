@@ -13,7 +13,7 @@ cd "$REPO_DIR"
 
 BRANCH="${1:-main}"
 WEB_SERVICE="${WEB_SERVICE:-web}"
-RUNTIME_SERVICES="${RUNTIME_SERVICES:-release_scheduler recommendation_worker runtime_maintenance ranking_worker}"
+RUNTIME_SERVICES="${RUNTIME_SERVICES:-release_scheduler recommendation_worker runtime_maintenance ranking_worker artist_live_publisher play_ingestion_worker}"
 NGINX_CONTAINER="${NGINX_CONTAINER_NAME:-nginx}"
 DEPLOY_REEXECED="${SEDABOX_DEPLOY_REEXECED:-0}"
 
@@ -97,6 +97,12 @@ $COMPOSE_CMD build "$WEB_SERVICE"
 echo "Running migrations from the freshly built image"
 $COMPOSE_CMD run --rm --no-deps "$WEB_SERVICE" python manage.py migrate --noinput
 
+echo "Backfilling play rollups (first deploy only)"
+$COMPOSE_CMD run --rm --no-deps "$WEB_SERVICE" python manage.py backfill_play_rollups --if-empty
+
+echo "Building search documents (SEARCH_BACKEND=postgres only)"
+$COMPOSE_CMD run --rm --no-deps "$WEB_SERVICE" python manage.py rebuild_search_documents --if-empty
+
 echo "Repairing initial genre and sub-genre records (one-time)"
 $COMPOSE_CMD run --rm --no-deps "$WEB_SERVICE" python manage.py repair_initial_genres
 
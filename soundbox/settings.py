@@ -145,18 +145,59 @@ CACHE_TTL_SEARCH = int(os.environ.get('CACHE_TTL_SEARCH', '45'))
 CACHE_TTL_USER_SEARCH = int(os.environ.get('CACHE_TTL_USER_SEARCH', '15'))
 CACHE_TTL_DISCOVERY = int(os.environ.get('CACHE_TTL_DISCOVERY', '300'))
 CACHE_TTL_SIMILAR = int(os.environ.get('CACHE_TTL_SIMILAR', '90'))
+# 'index' serves SearchView from the shared in-memory index (SQL fallback while
+# a segment is rebuilding); 'postgres' uses trigram/full-text search documents;
+# 'database' always uses the SQL lookups.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'index').strip().lower()
+SEARCH_INDEX_REFRESH_INTERVAL = int(os.environ.get('SEARCH_INDEX_REFRESH_INTERVAL', '5'))
+SEARCH_INDEX_MAX_AGE_SECONDS = int(os.environ.get('SEARCH_INDEX_MAX_AGE_SECONDS', '3600'))
+SEARCH_INDEX_LYRICS = os.environ.get('SEARCH_INDEX_LYRICS', '1').lower() in {'1', 'true', 'yes', 'on'}
+# Shared by the ranking worker (writer) and web workers (read-only mmap).
+SONG_EMBEDDING_DIR = os.environ.get('SONG_EMBEDDING_DIR', os.path.join(BASE_DIR, 'var', 'song_embeddings'))
+SONG_EMBEDDING_MAX_TAGS = int(os.environ.get('SONG_EMBEDDING_MAX_TAGS', '256'))
+SIMILAR_SONGS_FULL_REFRESH_HOURS = int(os.environ.get('SIMILAR_SONGS_FULL_REFRESH_HOURS', '24'))
+ITEM_CF_REFRESH_HOURS = int(os.environ.get('ITEM_CF_REFRESH_HOURS', '6'))
+ITEM_CF_PLAY_DAYS = int(os.environ.get('ITEM_CF_PLAY_DAYS', '180'))
+ITEM_CF_NEIGHBOURS = int(os.environ.get('ITEM_CF_NEIGHBOURS', '50'))
+TASTE_PROFILE_HALF_LIFE_DAYS = int(os.environ.get('TASTE_PROFILE_HALF_LIFE_DAYS', '30'))
 SONG_PLAY_COUNT_CACHE_TTL = int(os.environ.get('SONG_PLAY_COUNT_CACHE_TTL', '21600'))
+# DEBUG-only ceiling on the queries one HydrationPlan.resolve() may run.
+HYDRATION_QUERY_BUDGET = int(os.environ.get('HYDRATION_QUERY_BUDGET', '32'))
+CARD_FRAGMENT_TTL = int(os.environ.get('CARD_FRAGMENT_TTL', '3600'))
+CARD_FRAGMENT_LOCAL_SIZE = int(os.environ.get('CARD_FRAGMENT_LOCAL_SIZE', '4096'))
+# Encode success responses with orjson and skip message localization when no
+# message key is present (falls back to the stdlib renderer without orjson).
+JSON_RENDERER_FAST_PATH = os.environ.get('JSON_RENDERER_FAST_PATH', '1').lower() in {'1', 'true', 'yes', 'on'}
 R2_MAX_POOL_CONNECTIONS = int(os.environ.get('R2_MAX_POOL_CONNECTIONS', '64'))
 DAPHNE_WORKERS = int(os.environ.get('DAPHNE_WORKERS', '0'))
 RUNTIME_MAINTENANCE_INTERVAL = int(os.environ.get('RUNTIME_MAINTENANCE_INTERVAL', '900'))
+HISTORY_FLUSH_INTERVAL = int(os.environ.get('HISTORY_FLUSH_INTERVAL', '10'))
+ENGAGEMENT_COUNTER_RECONCILE_INTERVAL = int(os.environ.get('ENGAGEMENT_COUNTER_RECONCILE_INTERVAL', '21600'))
+ARTIST_LEDGER_RECONCILE_INTERVAL = int(os.environ.get('ARTIST_LEDGER_RECONCILE_INTERVAL', '21600'))
+ARTIST_ANALYTICS_SNAPSHOT_INTERVAL = int(os.environ.get('ARTIST_ANALYTICS_SNAPSHOT_INTERVAL', '3600'))
+ARTIST_ANALYTICS_SNAPSHOT_MAX_AGE = int(os.environ.get('ARTIST_ANALYTICS_SNAPSHOT_MAX_AGE', '86400'))
+ADMIN_DASHBOARD_LEADERBOARD_INTERVAL = int(os.environ.get('ADMIN_DASHBOARD_LEADERBOARD_INTERVAL', '600'))
+ADMIN_DASHBOARD_RECONCILE_INTERVAL = int(os.environ.get('ADMIN_DASHBOARD_RECONCILE_INTERVAL', '21600'))
+ADMIN_DASHBOARD_PLAY_FLUSH_INTERVAL = int(os.environ.get('ADMIN_DASHBOARD_PLAY_FLUSH_INTERVAL', '30'))
+ADMIN_DASHBOARD_DIRECTORY_TTL = int(os.environ.get('ADMIN_DASHBOARD_DIRECTORY_TTL', '60'))
+AUTH_SESSION_CACHE_TTL = int(os.environ.get('AUTH_SESSION_CACHE_TTL', '120'))
 TRENDING_REFRESH_INTERVAL = int(os.environ.get('TRENDING_REFRESH_INTERVAL', '90'))
 STREAM_ACCESS_UNUSED_TTL_HOURS = int(os.environ.get('STREAM_ACCESS_UNUSED_TTL_HOURS', '720'))
 STREAM_ACCESS_ABANDONED_TTL_DAYS = int(os.environ.get('STREAM_ACCESS_ABANDONED_TTL_DAYS', '14'))
 STREAM_ACCESS_USED_TTL_DAYS = int(os.environ.get('STREAM_ACCESS_USED_TTL_DAYS', '14'))
 STREAM_GRANT_MAX_AGE_SECONDS = int(os.environ.get('STREAM_GRANT_MAX_AGE_SECONDS', str(30 * 24 * 60 * 60)))
 RUNTIME_CLEANUP_MAX_ROWS_PER_TABLE = int(os.environ.get('RUNTIME_CLEANUP_MAX_ROWS_PER_TABLE', '5000'))
+PLAY_ROLLUP_HOURLY_RETENTION_DAYS = int(os.environ.get('PLAY_ROLLUP_HOURLY_RETENTION_DAYS', '35'))
+# 'sync' records each play in the request; 'stream' queues it for run_play_ingestion_worker.
+PLAY_INGESTION_MODE = os.environ.get('PLAY_INGESTION_MODE', 'sync').strip().lower()
+PLAY_INGESTION_BATCH_SIZE = int(os.environ.get('PLAY_INGESTION_BATCH_SIZE', '200'))
+PLAY_INGESTION_BLOCK_MS = int(os.environ.get('PLAY_INGESTION_BLOCK_MS', '500'))
+PLAY_INGESTION_RECLAIM_IDLE_MS = int(os.environ.get('PLAY_INGESTION_RECLAIM_IDLE_MS', '60000'))
 RECOMMENDATION_BACKGROUND_WAIT_MS = int(os.environ.get('RECOMMENDATION_BACKGROUND_WAIT_MS', '150'))
 RECOMMENDATION_REFRESH_VERSION_TTL = int(os.environ.get('RECOMMENDATION_REFRESH_VERSION_TTL', str(7 * 24 * 60 * 60)))
+RECOMMENDATION_WORKER_BATCH_SIZE = int(os.environ.get('RECOMMENDATION_WORKER_BATCH_SIZE', '50'))
+RECOMMENDATION_WORKER_PROCESSES = int(os.environ.get('RECOMMENDATION_WORKER_PROCESSES', '1'))
+ARTIST_LIVE_PUBLISH_INTERVAL_MS = int(os.environ.get('ARTIST_LIVE_PUBLISH_INTERVAL_MS', '1000'))
 
 
 # Redis-backed recommendation freshness and safe generated-row housekeeping.